@@ -0,0 +1,70 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """
+    :return: Returns the value below which the given fraction of samples fall, using the nearest-rank method.
+    """
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize_ns(samples: List[int]) -> Dict[str, float]:
+    """
+    :return: Returns the p50, p99 and maximum of nanosecond samples, in microseconds.
+    """
+    return {
+        "samples": len(samples),
+        "p50_us": percentile(samples, 0.5) / 1000,
+        "p99_us": percentile(samples, 0.99) / 1000,
+        "max_us": max(samples) / 1000 if samples else float("nan"),
+    }
+
+
+def _package_version() -> str:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            return version("srmlib.gpiocontrollers")
+        except PackageNotFoundError:
+            return "unknown"
+    except ImportError:
+        return "unknown"
+
+
+def argument_parser(description: str) -> ArgumentParser:
+    parser = ArgumentParser(description=description)
+    parser.add_argument("--output", "-o", help="File to write JSON results to. Defaults to stdout.")
+    return parser
+
+
+def write_results(benchmark: str, results: Dict[str, Any], output: str = None) -> None:
+    """
+    Writes benchmark results as JSON, along with enough about the environment to compare runs between releases.
+    """
+    document = {
+        "benchmark": benchmark,
+        "version": _package_version(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
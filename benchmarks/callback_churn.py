@@ -0,0 +1,94 @@
+"""
+Benchmarks dispatching to a CallbackRegistry while subscribers come and go.
+
+Reports:
+- dispatch: for registries of increasing size, the cost of CallbackRegistry.invoke with no-op callbacks, per
+  dispatch and per subscriber, when the subscribers are fixed and while another thread continually subscribes and
+  unsubscribes a callback. A plain list iterated under a lock, as the inputs used before, is timed alongside as a
+  baseline.
+- churn: the subscribe and unsubscribe operations the churning thread completed per second during the timed
+  dispatches, which grow more expensive with the registry's size as each copies the subscriptions.
+
+Usage: PYTHONPATH=src python benchmarks/callback_churn.py [--dispatches N] [--output results.json]
+"""
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter_ns
+from typing import Any, Callable, Dict, List
+
+from _common import argument_parser, summarize_ns, write_results
+from srmlib.gpiocontrollers.callbacks import CallbackRegistry
+
+SUBSCRIBERS = (1, 4, 16, 64, 256)
+
+
+def _no_op(_) -> None:
+    pass
+
+
+def _time(dispatch: Callable[[int], None], dispatches: int) -> List[int]:
+    samples = []
+    for value in range(dispatches):
+        start = perf_counter_ns()
+        dispatch(value)
+        samples.append(perf_counter_ns() - start)
+    return samples
+
+
+def _locked_list_dispatch(subscribers: int) -> Callable[[int], None]:
+    callbacks = [_no_op] * subscribers
+    lock = Lock()
+
+    def dispatch(value: int) -> None:
+        with lock:
+            for callback in callbacks:
+                try:
+                    callback(value)
+                except RuntimeError:
+                    pass
+
+    return dispatch
+
+
+def _churn(registry: CallbackRegistry, stop: Event, operations: List[int]) -> None:
+    while not stop.is_set():
+        registry.subscribe(_no_op).unsubscribe()
+        operations[0] += 2
+
+
+def bench_dispatch(dispatches: int) -> List[Dict[str, Any]]:
+    results = []
+    for subscribers in SUBSCRIBERS:
+        registry = CallbackRegistry()
+        for _ in range(subscribers):
+            registry.subscribe(_no_op)
+        baseline = _time(_locked_list_dispatch(subscribers), dispatches)
+        steady = _time(registry.invoke, dispatches)
+        stop = Event()
+        operations = [0]
+        churner = Thread(target=_churn, args=(registry, stop, operations), daemon=True)
+        churner.start()
+        start = monotonic()
+        churning = _time(registry.invoke, dispatches)
+        elapsed = monotonic() - start
+        stop.set()
+        churner.join()
+        results.append({
+            "subscribers": subscribers,
+            "locked_list": summarize_ns(baseline),
+            "steady": summarize_ns(steady),
+            "steady_ns_per_subscriber": sum(steady) / len(steady) / subscribers,
+            "churning": summarize_ns(churning),
+            "churn": {"operations_per_second": operations[0] / elapsed},
+        })
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--dispatches", type=int, default=20000, help="Dispatches to time for each configuration.")
+    args = parser.parse_args()
+    write_results("callback_churn", {"dispatch": bench_dispatch(args.dispatches)}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares two benchmark result files written by the benchmark scripts, printing every numeric result side by side.
+
+Usage: python benchmarks/compare.py baseline.json candidate.json
+"""
+import json
+from argparse import ArgumentParser
+from typing import Any, Dict, Iterator, Tuple
+
+
+def _flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _flatten(child, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            yield from _flatten(child, f"{prefix}[{index}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as file:
+        return json.load(file)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    if baseline["benchmark"] != candidate["benchmark"]:
+        parser.error(f"Cannot compare {baseline['benchmark']} results with {candidate['benchmark']} results")
+    print(f"{baseline['benchmark']}: {baseline['version']} -> {candidate['version']}")
+    candidate_values = dict(_flatten(candidate["results"]))
+    for key, old in _flatten(baseline["results"]):
+        new = candidate_values.get(key)
+        if new is None:
+            print(f"  {key}: {old:g} -> (missing)")
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"  {key}: {old:g} -> {new:g} {change}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmarks the path from a KY040 detent to a CytronMD10C duty cycle change, driven through SimulatedGPIO.
+
+Reports:
+- direct: wall-clock latency from the edge completing a detent to the new duty cycle being applied, through
+  RotaryEncoderKY040 -> RotaryEncoderPercentageInput -> CytronMD10C.speed.
+- rate_limited: the same path through a RateLimitedPercentageInput, reporting virtual time until the motor first
+  responds and the CPU cost of each ramp step.
+- edge_rate: for a range of edge intervals, the fraction of detents decoded, the highest edge rate decoded without
+  loss, and the CPU cost per edge.
+
+Usage: PYTHONPATH=src python benchmarks/encoder_to_motor.py [--detents N] [--output results.json]
+"""
+from time import perf_counter_ns, process_time_ns
+from typing import Any, Dict, List
+
+from _common import argument_parser, summarize_ns, write_results
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import (
+    RotaryEncoderKY040, RotaryEncoderPercentageInput, RateLimitedPercentageInput
+)
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+EDGE_INTERVALS = (0.005, 0.002, 0.001, 0.0005, 0.00025, 0.0001)
+
+
+def _build(rate_limited: bool = False):
+    gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+    gpio.setmode(BOARD)
+    set_backend(gpio)
+    scheduler = gpio.clock.create_scheduler()
+    encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN)
+    percentage_input = RotaryEncoderPercentageInput(encoder, -1_000_000, 1_000_000)
+    if rate_limited:
+        percentage_input = RateLimitedPercentageInput(
+            percentage_input, 50, scheduler=scheduler, step_interval=0.02, initial_percent=50)
+    motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+    return gpio, encoder, percentage_input, motor
+
+
+def bench_direct(detents: int) -> Dict[str, Any]:
+    gpio, _, percentage_input, motor = _build()
+    state = {"start": 0}
+    latencies: List[int] = []
+
+    def to_motor(percent: float) -> None:
+        motor.speed = percent
+        latencies.append(perf_counter_ns() - state["start"])
+
+    percentage_input.add_percent_changed_callback(to_motor)
+    for delay, channel, level in quadrature_edges(CLK_PIN, DT_PIN, detents):
+        gpio.clock.advance(delay)
+        state["start"] = perf_counter_ns()
+        gpio.set_input(channel, level)
+    return {"detents": detents, "outputs": len(latencies), "latency": summarize_ns(latencies)}
+
+
+def bench_rate_limited(detents: int) -> Dict[str, Any]:
+    gpio, _, percentage_input, motor = _build(rate_limited=True)
+    output_times: List[float] = []
+    step_costs: List[int] = []
+
+    def to_motor(percent: float) -> None:
+        motor.speed = percent
+        output_times.append(gpio.clock())
+
+    percentage_input.add_percent_changed_callback(to_motor)
+    first_output_latencies = []
+    for _ in range(detents):
+        del output_times[:]
+        gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001))
+        detent_time = gpio.clock()
+        while not output_times:
+            start = process_time_ns()
+            gpio.clock.advance(0.02)
+            step_costs.append(process_time_ns() - start)
+        first_output_latencies.append(output_times[0] - detent_time)
+        gpio.clock.advance(1)
+    first_output_latencies.sort()
+    return {
+        "detents": detents,
+        "virtual_first_output_latency_ms": {
+            "p50": first_output_latencies[len(first_output_latencies) // 2] * 1000,
+            "max": first_output_latencies[-1] * 1000,
+        },
+        "ramp_step_cpu": summarize_ns(step_costs),
+    }
+
+
+def bench_edge_rate(detents: int) -> Dict[str, Any]:
+    sweep = []
+    max_lossless_rate = 0.0
+    for interval in EDGE_INTERVALS:
+        gpio, encoder, _, _ = _build()
+        decoded = []
+        encoder.add_rotation_callback(decoded.append)
+        edges = quadrature_edges(CLK_PIN, DT_PIN, detents, interval=interval)
+        start = process_time_ns()
+        gpio.inject(edges)
+        cpu_ns = process_time_ns() - start
+        rate = 1 / interval
+        ratio = len(decoded) / detents
+        if ratio == 1:
+            max_lossless_rate = max(max_lossless_rate, rate)
+        sweep.append({
+            "edge_rate_hz": rate,
+            "decoded_ratio": ratio,
+            "cpu_per_edge_us": cpu_ns / len(edges) / 1000,
+        })
+    return {"detents": detents, "max_lossless_edge_rate_hz": max_lossless_rate, "sweep": sweep}
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--detents", type=int, default=2000, help="Detents to turn in each scenario.")
+    args = parser.parse_args()
+    try:
+        results = {
+            "direct": bench_direct(args.detents),
+            "rate_limited": bench_rate_limited(min(args.detents, 200)),
+            "edge_rate": bench_edge_rate(args.detents),
+        }
+    finally:
+        set_backend(None)
+    write_results("encoder_to_motor", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmarks SpeedRegulator control loops running on a real, threaded Scheduler.
+
+Reports:
+- loops: for a number of regulators sharing one scheduler, each holding a simulated locomotive (a first order lag
+  behind its CytronMD10C's duty cycle, on SimulatedGPIO) at a target speed, the control interval jitter and CPU
+  time per loop from SpeedRegulator.stats, aggregated over every regulator.
+- process: the CPU time of the whole process per second of wall-clock time while the loops ran.
+
+Usage: PYTHONPATH=src python benchmarks/regulation.py [--regulators N] [--control-rate N] [--seconds N]
+       [--output results.json]
+"""
+from time import monotonic, process_time, sleep
+from typing import Any, Dict
+
+from _common import argument_parser, write_results
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.regulation import PIDGains, SpeedFeedback, SpeedRegulator
+from srmlib.gpiocontrollers.scheduling import Scheduler
+
+
+class _Locomotive(SpeedFeedback):
+    def __init__(self, motor: CytronMD10C, load: float, time_constant: float = 0.2) -> None:
+        self.motor = motor
+        self.load = load
+        self.time_constant = time_constant
+        self.speed = 0.0
+        self.last_time = None
+
+    def read(self, now: float) -> float:
+        if self.last_time is not None:
+            steady_speed = self.motor.speed * (1 - self.load)
+            self.speed += (steady_speed - self.speed) * min(1.0, (now - self.last_time) / self.time_constant)
+        self.last_time = now
+        return self.speed
+
+
+def bench_loops(regulators: int, control_rate: float, seconds: float) -> Dict[str, Any]:
+    gpio = SimulatedGPIO()
+    gpio.setmode(BOARD)
+    set_backend(gpio)
+    scheduler = Scheduler(tick_resolution=0.001, name="regulation-benchmark")
+    running = []
+    for index in range(regulators):
+        motor = CytronMD10C(1000 + 2 * index, 1001 + 2 * index)
+        regulator = SpeedRegulator(motor, _Locomotive(motor, load=index / regulators / 2), PIDGains(kp=0.5, ki=4),
+                                   control_rate=control_rate, scheduler=scheduler)
+        regulator.target = 50
+        running.append(regulator)
+    start, cpu_start = monotonic(), process_time()
+    sleep(seconds)
+    elapsed, cpu = monotonic() - start, process_time() - cpu_start
+    scheduler.shutdown()
+    set_backend(None)
+    stats = [regulator.stats() for regulator in running]
+    loops = sum(stat.loops for stat in stats)
+    return {
+        "regulators": regulators,
+        "control_rate": control_rate,
+        "loops": {
+            "loops_per_second": loops / elapsed,
+            "mean_interval_ms": sum(stat.mean_interval * stat.loops for stat in stats) / loops * 1000,
+            "jitter_rms_ms": max(stat.jitter for stat in stats) * 1000,
+            "max_jitter_ms": max(stat.max_jitter for stat in stats) * 1000,
+            "mean_cpu_us": sum(stat.mean_cpu_us * stat.loops for stat in stats) / loops,
+            "max_cpu_us": max(stat.max_cpu_us for stat in stats),
+        },
+        "process": {"cpu_fraction": cpu / elapsed},
+    }
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--regulators", type=int, default=16, help="Regulators sharing the scheduler.")
+    parser.add_argument("--control-rate", type=float, default=50, help="Control loops per second per regulator.")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of the test.")
+    args = parser.parse_args()
+    write_results("regulation", bench_loops(args.regulators, args.control_rate, args.seconds), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmarks scanned inputs: reading a chain of 74HC165 shift registers and diffing successive scans.
+
+Reports:
+- read: for chains of increasing length on a SimulatedGPIO with a SimulatedShiftRegisterChain attached, the backend
+  calls per scan and the wall-clock cost of ShiftRegisterChain.read, per scan and per hundred inputs. The
+  simulated backend is far slower per call than RPi.GPIO, so backend calls per scan is the figure to carry over to
+  hardware.
+- diff: the cost of ScannedInputs.scan beyond the read, against a bank returning precomputed bitmasks, when nothing
+  changed and when a number of inputs changed (including invoking a callback per change).
+
+Usage: PYTHONPATH=src python benchmarks/scanning.py [--scans N] [--output results.json]
+"""
+from statistics import mean
+from time import perf_counter_ns
+from typing import Any, Dict, List
+
+from _common import argument_parser, summarize_ns, write_results
+from srmlib.gpiocontrollers.gpio import set_backend, PinSetup
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, SimulatedShiftRegisterChain
+from srmlib.gpiocontrollers.scanning import InputBank, ScannedInputs, ShiftRegisterChain
+from srmlib.gpiocontrollers.scheduling import Scheduler
+
+LOAD_PIN = 11
+CLOCK_PIN = 13
+DATA_PIN = 15
+CHAIN_LENGTHS = (2, 4, 8, 16, 32)
+CHANGED_INPUTS = (0, 1, 8, 64)
+
+
+class _CountingGPIO(SimulatedGPIO):
+    calls = 0
+
+    def input(self, channel: int) -> int:
+        self.calls += 1
+        return super().input(channel)
+
+    def output(self, *args, **kwargs) -> None:
+        self.calls += 1
+        super().output(*args, **kwargs)
+
+
+class _PrecomputedBank(InputBank):
+    """
+    A bank which returns the next of a sequence of bitmasks on each read, without touching GPIO.
+    """
+
+    def __init__(self, size: int, reads: List[int]) -> None:
+        self._size = size
+        self._reads = reads
+        self._next = 0
+        super().__init__(auto_open=False)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def pin_setups(self) -> List[PinSetup]:
+        return []
+
+    @property
+    def is_open(self) -> bool:
+        return True
+
+    def read(self) -> int:
+        bits = self._reads[self._next]
+        self._next = (self._next + 1) % len(self._reads)
+        return bits
+
+
+def bench_read(scans: int) -> List[Dict[str, Any]]:
+    results = []
+    for registers in CHAIN_LENGTHS:
+        gpio = _CountingGPIO()
+        set_backend(gpio)
+        chain = SimulatedShiftRegisterChain(gpio, LOAD_PIN, CLOCK_PIN, DATA_PIN, registers)
+        bank = ShiftRegisterChain(LOAD_PIN, CLOCK_PIN, DATA_PIN, registers)
+        for index in range(0, len(chain), 3):
+            chain.press(index)
+        gpio.calls = 0
+        samples = []
+        for _ in range(scans):
+            start = perf_counter_ns()
+            bank.read()
+            samples.append(perf_counter_ns() - start)
+            gpio.writes.clear()
+        inputs = registers * 8
+        results.append({
+            "registers": registers,
+            "inputs": inputs,
+            "backend_calls_per_scan": gpio.calls / scans,
+            "scan": summarize_ns(samples),
+            "mean_us_per_100_inputs": mean(samples) / 1000 * 100 / inputs,
+        })
+    set_backend(None)
+    return results
+
+
+def bench_diff(scans: int, inputs: int = 256) -> List[Dict[str, Any]]:
+    results = []
+    for changed_inputs in CHANGED_INPUTS:
+        changed = sum(1 << (index * inputs // max(changed_inputs, 1)) for index in range(changed_inputs))
+        # Alternate between two states, each held for two reads so that every change is stable
+        reads = [0, 0, changed, changed]
+        scanned = ScannedInputs(_PrecomputedBank(inputs, reads), stable_scans=2,
+                                scheduler=Scheduler(threaded=False))
+        scanned.terminate()
+        invocations = []
+        scanned.add_change_callback(lambda index, state: invocations.append(index))
+        scanned.scan()
+        samples = []
+        for _ in range(scans):
+            start = perf_counter_ns()
+            scanned.scan()
+            samples.append(perf_counter_ns() - start)
+        results.append({
+            "inputs": inputs,
+            "changed_inputs": changed_inputs,
+            "callbacks_invoked": len(invocations),
+            "scan": summarize_ns(samples),
+        })
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--scans", type=int, default=2000, help="Scans to time for each configuration.")
+    args = parser.parse_args()
+    results = {
+        "read": bench_read(args.scans),
+        "diff": bench_diff(args.scans),
+    }
+    write_results("scanning", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
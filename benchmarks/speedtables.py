@@ -0,0 +1,86 @@
+"""
+Benchmarks mapping throttle percentages to duty cycles through speed tables.
+
+Reports:
+- lookup: the cost of SpeedTable.lookup for smooth tables of increasing resolution and for 28 and 126 step tables,
+  alongside interpolating the same curve's points on every update, as consumers did before speed tables.
+- build: the cost of building and calibrating a table, paid once per locomotive rather than per update.
+
+Usage: PYTHONPATH=src python benchmarks/speedtables.py [--lookups N] [--output results.json]
+"""
+from bisect import bisect_right
+from random import Random
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List
+
+from _common import argument_parser, summarize_ns, write_results
+from srmlib.gpiocontrollers.speedtables import DCC_28_STEPS, DCC_128_STEPS, SpeedTable
+
+POINTS = [(0, 18), (10, 24), (25, 33), (50, 48), (75, 66), (90, 80), (100, 88)]
+RESOLUTIONS = (100, 1000, 10000)
+BATCH = 100
+
+
+def _time_per_lookup(lookup: Callable[[float], float], throttles: List[float], lookups: int) -> List[int]:
+    samples = []
+    for start in range(0, lookups, BATCH):
+        batch = throttles[start:start + BATCH]
+        begin = perf_counter_ns()
+        for throttle in batch:
+            lookup(throttle)
+        samples.append((perf_counter_ns() - begin) // len(batch))
+    return samples
+
+
+def _interpolate_points(throttle: float) -> float:
+    throttles = [point[0] for point in POINTS]
+    index = min(max(bisect_right(throttles, throttle), 1), len(POINTS) - 1)
+    (x0, y0), (x1, y1) = POINTS[index - 1], POINTS[index]
+    return y0 + (y1 - y0) * (throttle - x0) / (x1 - x0)
+
+
+def bench_lookup(lookups: int) -> List[Dict[str, Any]]:
+    rng = Random(22)
+    throttles = [rng.uniform(0, 100) for _ in range(lookups)]
+    tables = {f"smooth_{resolution}": SpeedTable.from_points(POINTS, resolution=resolution)
+              for resolution in RESOLUTIONS}
+    tables["steps_28"] = SpeedTable.from_points(POINTS, steps=DCC_28_STEPS)
+    tables["steps_126"] = SpeedTable.from_points(POINTS, steps=DCC_128_STEPS)
+    results = [{"table": "points_per_update", "lookup": summarize_ns(
+        _time_per_lookup(_interpolate_points, throttles, lookups))}]
+    for name, table in tables.items():
+        results.append({"table": name, "lookup": summarize_ns(_time_per_lookup(table.lookup, throttles, lookups))})
+    return results
+
+
+def bench_build(repeats: int = 50) -> Dict[str, Any]:
+    measurements = [(duty_cycle, max(0.0, duty_cycle - 20) * 1.2) for duty_cycle in range(0, 101, 5)]
+    builds = {
+        "from_points_1000": lambda: SpeedTable.from_points(POINTS),
+        "steps_28": lambda: SpeedTable.from_points(POINTS, steps=DCC_28_STEPS),
+        "calibrate_1000": lambda: SpeedTable.calibrate(measurements),
+    }
+    results = {}
+    for name, build in builds.items():
+        samples = []
+        for _ in range(repeats):
+            start = perf_counter_ns()
+            build()
+            samples.append(perf_counter_ns() - start)
+        results[name] = summarize_ns(samples)
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=100000, help="Lookups to time for each table.")
+    args = parser.parse_args()
+    results = {
+        "lookup": bench_lookup(args.lookups),
+        "build": bench_build(),
+    }
+    write_results("speedtables", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
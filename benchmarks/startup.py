@@ -0,0 +1,172 @@
+"""
+Benchmarks startup: importing the library, and constructing and setting up a large panel of devices.
+
+Reports:
+- import: wall-clock time to import inputs and motorshields in a fresh interpreter, and whether RPi.GPIO was
+  imported as a side effect.
+- panel: for a panel of encoders and motor shields on a SimulatedGPIO charging a fixed cost per backend call (to
+  stand in for RPi.GPIO's per-call kernel round trips), the backend calls made and wall-clock time taken when each
+  device opens itself on construction (eager), versus constructing with auto_open=False and opening every device
+  with open_devices (batched).
+- layout: for a 200 device Layout (encoders and motor shields on every header GPIO pin, plus encoder and
+  rate-limited inputs), the backend calls and time taken to build it from configuration, and to reload it with a
+  single input changed.
+
+Usage: PYTHONPATH=src python benchmarks/startup.py [--encoders N] [--motors N] [--call-cost-us N] [--output results.json]
+"""
+import os
+import subprocess
+import sys
+from time import perf_counter, perf_counter_ns
+from typing import Any, Dict
+
+from _common import argument_parser, write_results
+from srmlib.gpiocontrollers.gpio import set_backend, open_devices, BOARD, BOARD_TO_BCM, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040
+from srmlib.gpiocontrollers.layout import Layout
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+
+_IMPORT_SCRIPT = """
+import sys
+from time import perf_counter
+start = perf_counter()
+import srmlib.gpiocontrollers.inputs, srmlib.gpiocontrollers.motorshields
+print(perf_counter() - start, "RPi" in sys.modules)
+"""
+
+
+class _CostlyGPIO(SimulatedGPIO):
+    """
+    SimulatedGPIO which busy-waits for a fixed time on every setup, event detection and PWM call.
+    """
+
+    def __init__(self, call_cost_ns: int, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.call_cost_ns = call_cost_ns
+        self.calls = 0
+
+    def _charge(self) -> None:
+        self.calls += 1
+        end = perf_counter_ns() + self.call_cost_ns
+        while perf_counter_ns() < end:
+            pass
+
+    def setmode(self, mode: int) -> None:
+        self._charge()
+        super().setmode(mode)
+
+    def setup(self, *args, **kwargs) -> None:
+        self._charge()
+        super().setup(*args, **kwargs)
+
+    def input(self, channel: int) -> int:
+        self._charge()
+        return super().input(channel)
+
+    def add_event_detect(self, *args, **kwargs) -> None:
+        self._charge()
+        super().add_event_detect(*args, **kwargs)
+
+    def PWM(self, channel: int, frequency: float):
+        self._charge()
+        return super().PWM(channel, frequency)
+
+
+def bench_import() -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, ["src", os.environ.get("PYTHONPATH")])))
+    output = subprocess.run([sys.executable, "-c", _IMPORT_SCRIPT], env=env, capture_output=True, text=True,
+                            check=True).stdout.split()
+    return {"import_ms": float(output[0]) * 1000, "imports_rpi_gpio": output[1] == "True"}
+
+
+def _bench_panel(encoders: int, motors: int, call_cost_ns: int, batched: bool) -> Dict[str, Any]:
+    # Synthetic channel numbers; SimulatedGPIO does not restrict them to the 40-pin header
+    encoder_pins = [(1000 + 3 * index, 1001 + 3 * index, 1002 + 3 * index) for index in range(encoders)]
+    motor_pins = [(5000 + 2 * index, 5001 + 2 * index) for index in range(motors)]
+    gpio = _CostlyGPIO(call_cost_ns, external_levels={pin: HIGH for pins in encoder_pins for pin in pins})
+    gpio.setmode(BOARD)
+    gpio.calls = 0
+    set_backend(gpio)
+    start = perf_counter()
+    devices = [RotaryEncoderKY040(*pins, auto_open=not batched) for pins in encoder_pins]
+    devices += [CytronMD10C(*pins, auto_open=not batched) for pins in motor_pins]
+    if batched:
+        open_devices(devices)
+    elapsed = perf_counter() - start
+    return {"backend_calls": gpio.calls, "startup_ms": elapsed * 1000}
+
+
+def bench_panel(encoders: int, motors: int, call_cost_us: float) -> Dict[str, Any]:
+    call_cost_ns = int(call_cost_us * 1000)
+    eager = _bench_panel(encoders, motors, call_cost_ns, batched=False)
+    batched = _bench_panel(encoders, motors, call_cost_ns, batched=True)
+    return {
+        "encoders": encoders,
+        "motors": motors,
+        "call_cost_us": call_cost_us,
+        "eager": eager,
+        "batched": batched,
+        "speedup": eager["startup_ms"] / batched["startup_ms"],
+    }
+
+
+def _layout_config(devices: int) -> Dict[str, Any]:
+    pins = sorted(BOARD_TO_BCM)
+    encoders = {f"knob{index}": dict(zip(("clk", "dt", "sw"), pins[3 * index:3 * index + 3])) for index in range(6)}
+    motor_pins = pins[3 * len(encoders):]
+    motors = {f"cab{index}": {"direction": motor_pins[2 * index], "pwm": motor_pins[2 * index + 1]}
+              for index in range(len(motor_pins) // 2)}
+    inputs = {}
+    for index in range(devices - len(encoders) - len(motors)):
+        if index % 2 == 0:
+            inputs[f"throttle{index // 2}"] = {"type": "encoder", "encoder": f"knob{index // 2 % len(encoders)}",
+                                               "min": 0, "max": 100}
+        else:
+            inputs[f"momentum{index // 2}"] = {"type": "rate_limited", "source": f"throttle{index // 2}", "rate": 20}
+    return {"encoders": encoders, "inputs": inputs, "motors": motors}
+
+
+def bench_layout(call_cost_us: float, devices: int = 200) -> Dict[str, Any]:
+    config = _layout_config(devices)
+    gpio = _CostlyGPIO(int(call_cost_us * 1000),
+                       external_levels={pin: HIGH for pins in config["encoders"].values() for pin in pins.values()})
+    set_backend(gpio)
+    start = perf_counter()
+    layout = Layout(config)
+    build_ms = (perf_counter() - start) * 1000
+    build_calls = gpio.calls
+    config["inputs"]["throttle0"] = dict(config["inputs"]["throttle0"], max=50)
+    gpio.calls = 0
+    start = perf_counter()
+    changes = layout.reload(config)
+    reload_ms = (perf_counter() - start) * 1000
+    size = len(layout)
+    layout.close()
+    return {
+        "devices": size,
+        "build": {"backend_calls": build_calls, "build_ms": build_ms},
+        "reload": {"backend_calls": gpio.calls, "reload_ms": reload_ms, "rebuilt": len(changes.rebuilt),
+                   "kept": len(changes.kept)},
+    }
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--encoders", type=int, default=32, help="Encoders in the panel.")
+    parser.add_argument("--motors", type=int, default=32, help="Motor shields in the panel.")
+    parser.add_argument("--call-cost-us", type=float, default=200, help="Simulated cost of each backend call.")
+    args = parser.parse_args()
+    try:
+        results = {
+            "import": bench_import(),
+            "panel": bench_panel(args.encoders, args.motors, args.call_cost_us),
+            "layout": bench_layout(args.call_cost_us),
+        }
+    finally:
+        set_backend(None)
+    write_results("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmarks publishing device state into the shared-memory state table, and reading it from other processes.
+
+Reports:
+- publish: for tables of increasing size, the cost of StatePublisher.publish when no device changed and when every
+  device changed, with no readers and while a number of reader processes poll the whole table as fast as they can.
+  Readers share no lock with the publisher, so only contention for the CPU should move these figures.
+- read: the cost of StateReader.read for one device and of StateReader.snapshot of the whole table.
+
+Usage: PYTHONPATH=src python benchmarks/statetable.py [--samples N] [--readers N] [--output results.json]
+"""
+import os
+from multiprocessing import Event, Process
+from tempfile import TemporaryDirectory
+from time import perf_counter_ns
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+
+from _common import argument_parser, summarize_ns, write_results
+from srmlib.gpiocontrollers.constants import FORWARD
+from srmlib.gpiocontrollers.scheduling import Scheduler
+from srmlib.gpiocontrollers.statetable import StatePublisher, StateReader
+
+DEVICES = (4, 16, 64)
+
+
+def _poll(path: str, stop: Event) -> None:
+    reader = StateReader(path)
+    while not stop.is_set():
+        reader.snapshot()
+    reader.close()
+
+
+def _time(function: Callable[[], Any], samples: int) -> List[int]:
+    durations = []
+    for _ in range(samples):
+        start = perf_counter_ns()
+        function()
+        durations.append(perf_counter_ns() - start)
+    return durations
+
+
+def _publisher(path: str, devices: int) -> Tuple[StatePublisher, List[SimpleNamespace]]:
+    publisher = StatePublisher(path, capacity=devices, scheduler=Scheduler(threaded=False))
+    states = []
+    for index in range(devices):
+        state = SimpleNamespace(current_percent=0.0, speed=0.0, direction=FORWARD)
+        if index % 2:
+            publisher.add_motor(f"motor-{index}", state)
+        else:
+            publisher.add_input(f"input-{index}", state)
+        states.append(state)
+    return publisher, states
+
+
+def bench_publish(directory: str, samples: int, readers: int) -> List[Dict[str, Any]]:
+    results = []
+    for devices in DEVICES:
+        for reader_count in (0, readers):
+            path = os.path.join(directory, f"state-{devices}-{reader_count}")
+            publisher, states = _publisher(path, devices)
+            stop = Event()
+            pollers = [Process(target=_poll, args=(path, stop), daemon=True) for _ in range(reader_count)]
+            for poller in pollers:
+                poller.start()
+
+            def change_all() -> None:
+                for state in states:
+                    state.current_percent = state.speed = (state.speed + 1) % 100
+                publisher.publish()
+
+            unchanged = _time(publisher.publish, samples)
+            changed = _time(change_all, samples)
+            stop.set()
+            for poller in pollers:
+                poller.join()
+            publisher.close()
+            results.append({
+                "devices": devices,
+                "readers": reader_count,
+                "unchanged": summarize_ns(unchanged),
+                "all_changed": summarize_ns(changed),
+            })
+    return results
+
+
+def bench_read(directory: str, samples: int) -> Dict[str, Any]:
+    path = os.path.join(directory, "state-read")
+    publisher, _ = _publisher(path, max(DEVICES))
+    reader = StateReader(path)
+    results = {
+        "read": summarize_ns(_time(lambda: reader.read("motor-1"), samples)),
+        f"snapshot_{max(DEVICES)}": summarize_ns(_time(reader.snapshot, samples)),
+    }
+    reader.close()
+    publisher.close()
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000, help="Operations to time for each configuration.")
+    parser.add_argument("--readers", type=int, default=4, help="Reader processes polling during publishing.")
+    args = parser.parse_args()
+    with TemporaryDirectory() as directory:
+        results = {
+            "publish": bench_publish(directory, args.samples, args.readers),
+            "read": bench_read(directory, args.samples),
+        }
+    write_results("statetable", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
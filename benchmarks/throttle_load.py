@@ -0,0 +1,131 @@
+"""
+Load tests ThrottleServer over localhost.
+
+Many JSON lines clients connect to a server with a set of motor channels (CytronMD10C on SimulatedGPIO) and send it
+speed changes at a fixed rate (or as fast as possible), while a probe client periodically sets a distinct speed on
+its own channel and waits for the broadcast reflecting it. The clients run in a separate process, so that they do
+not compete with the server for its event loop.
+
+Reports:
+- throughput: messages per second accepted by the server, broadcasts made, and motor writes issued.
+- latency: end-to-end time from the probe sending a set to it receiving the resulting broadcast.
+
+Usage: PYTHONPATH=src python benchmarks/throttle_load.py [--clients N] [--channels N] [--rate N] [--seconds N]
+       [--output results.json]
+"""
+import asyncio
+import json
+from multiprocessing import get_context
+from time import perf_counter, perf_counter_ns
+from typing import Any, Dict, List
+
+from _common import argument_parser, summarize_ns, write_results
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.throttleserver import ThrottleServer
+
+PROBE_CHANNEL = "probe"
+
+
+async def _flood(port: int, channels: int, rate: float, index: int, stop: asyncio.Event) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def drain_broadcasts() -> None:
+        while await reader.readline():
+            pass
+
+    draining = asyncio.ensure_future(drain_broadcasts())
+    channel = f"cab{index % channels}"
+    speed = 0
+    while not stop.is_set():
+        speed = (speed + 1) % 101
+        writer.write(json.dumps({"op": "set", "channel": channel, "speed": speed}).encode() + b"\n")
+        await writer.drain()
+        await asyncio.sleep(1 / rate if rate else 0)
+    writer.close()
+    draining.cancel()
+
+
+async def _probe(port: int, stop: asyncio.Event, latencies: List[int]) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    speed = 0
+    while not stop.is_set():
+        speed = speed % 100 + 1
+        start = perf_counter_ns()
+        writer.write(json.dumps({"op": "set", "channel": PROBE_CHANNEL, "speed": speed}).encode() + b"\n")
+        while True:
+            message = json.loads(await reader.readline())
+            if message.get("channel") == PROBE_CHANNEL and message.get("speed") == speed:
+                latencies.append(perf_counter_ns() - start)
+                break
+        await asyncio.sleep(0.01)
+    writer.close()
+
+
+async def _run_clients(port: int, clients: int, channels: int, rate: float, seconds: float) -> List[int]:
+    latencies: List[int] = []
+    stop = asyncio.Event()
+    tasks = [asyncio.ensure_future(_flood(port, channels, rate, index, stop)) for index in range(clients)]
+    tasks.append(asyncio.ensure_future(_probe(port, stop, latencies)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies
+
+
+def _clients_process(port: int, clients: int, channels: int, rate: float, seconds: float, results) -> None:
+    results.put(asyncio.run(_run_clients(port, clients, channels, rate, seconds)))
+
+
+async def _run(clients: int, channels: int, rate: float, seconds: float, max_rate: float) -> Dict[str, Any]:
+    gpio = SimulatedGPIO()
+    gpio.setmode(BOARD)
+    set_backend(gpio)
+    motors = {f"cab{index}": CytronMD10C(1000 + 2 * index, 1001 + 2 * index) for index in range(channels)}
+    motors[PROBE_CHANNEL] = CytronMD10C(5000, 5001)
+    server = ThrottleServer(port=0, max_rate=max_rate)
+    for channel, motor in motors.items():
+        server.register_motor(channel, motor)
+    context = get_context("spawn")
+    results = context.Queue()
+    async with server:
+        process = context.Process(
+            target=_clients_process, args=(server.port, clients, channels, rate, seconds, results), daemon=True)
+        start = perf_counter()
+        process.start()
+        latencies = await asyncio.get_running_loop().run_in_executor(None, results.get)
+        elapsed = perf_counter() - start
+        process.join()
+    return {
+        "clients": clients,
+        "channels": channels,
+        "client_rate": rate,
+        "max_rate": max_rate,
+        "throughput": {
+            "messages_per_second": server.messages_received / elapsed,
+            "broadcasts_per_second": server.broadcasts / elapsed,
+            "motor_writes": sum(motor.write_counts.issued for motor in motors.values()),
+        },
+        "latency": summarize_ns(latencies),
+    }
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200, help="Flooding clients to connect.")
+    parser.add_argument("--channels", type=int, default=8, help="Motor channels the clients are spread over.")
+    parser.add_argument("--rate", type=float, default=20,
+                        help="Messages per second sent by each client, or 0 for as fast as possible.")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of the test.")
+    parser.add_argument("--max-rate", type=float, default=50, help="The server's per channel flush rate.")
+    args = parser.parse_args()
+    try:
+        results = asyncio.run(_run(args.clients, args.channels, args.rate, args.seconds, args.max_rate))
+    finally:
+        set_backend(None)
+    write_results("throttle_load", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
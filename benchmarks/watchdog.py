@@ -0,0 +1,124 @@
+"""
+Benchmarks the Watchdog against stalls of a real, threaded Scheduler.
+
+Reports:
+- lag: the watchdog's heartbeat and task lag histograms for a scheduler running ramps of RateLimitedPercentageInputs
+  driving watched CytronMD10Cs (on SimulatedGPIO), with no stalls.
+- stalls: for stalls of increasing length injected as a task which blocks the scheduler, whether the motors were
+  tripped, and the time from the stall starting to them being stopped against the bound the watchdog promises
+  (heartbeat interval + budget + check interval).
+
+Usage: PYTHONPATH=src python benchmarks/watchdog.py [--seconds N] [--budget N] [--output results.json]
+"""
+from threading import Event
+from time import monotonic, sleep
+from typing import Any, Dict, List, Tuple
+
+from _common import argument_parser, write_results
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.inputs import PercentageInput, RateLimitedPercentageInput
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.scheduling import Scheduler
+from srmlib.gpiocontrollers.watchdog import Watchdog, WatchedMotorShield
+
+MOTORS = 4
+HEARTBEAT_INTERVAL = 0.02
+CHECK_INTERVAL = 0.005
+STALLS = (0.01, 0.05, 0.1, 0.25, 0.5)
+
+
+class _Setpoint(PercentageInput):
+    def set(self, percent: float) -> None:
+        self._current_percent = percent
+        self._invoke_all_callbacks()
+
+
+def _rig(budget: float) -> Tuple[Scheduler, Watchdog, List[WatchedMotorShield]]:
+    gpio = SimulatedGPIO()
+    gpio.setmode(BOARD)
+    set_backend(gpio)
+    scheduler = Scheduler(tick_resolution=0.001, name="watchdog-benchmark")
+    watchdog = Watchdog(check_interval=CHECK_INTERVAL)
+    motors = []
+    for index in range(MOTORS):
+        motor = watchdog.watch_motor(CytronMD10C(1000 + 2 * index, 1001 + 2 * index), f"motor-{index}")
+        motors.append(motor)
+    watchdog.watch_scheduler(scheduler, budget=budget, interval=HEARTBEAT_INTERVAL)
+    return scheduler, watchdog, motors
+
+
+def _teardown(scheduler: Scheduler, watchdog: Watchdog, motors: List[WatchedMotorShield]) -> None:
+    watchdog.shutdown()
+    scheduler.shutdown()
+    for motor in motors:
+        motor.motor.close()
+    set_backend(None)
+
+
+def bench_lag(seconds: float, budget: float) -> Dict[str, Any]:
+    scheduler, watchdog, motors = _rig(budget)
+    setpoint = _Setpoint()
+    for motor in motors:
+        ramp = RateLimitedPercentageInput(setpoint, 50, scheduler=scheduler, step_interval=0.01)
+        ramp.add_percent_changed_callback(lambda percent, motor_=motor: setattr(motor_, "speed", percent))
+    end = monotonic() + seconds
+    while monotonic() < end:
+        setpoint.set(100 - setpoint.current_percent)  # Keep the ramps running back and forth
+        sleep(1)
+    snapshot = watchdog.snapshot()
+    _teardown(scheduler, watchdog, motors)
+    return {name: values for name, values in snapshot.items() if name.startswith("scheduler:")}
+
+
+def bench_stalls(budget: float) -> List[Dict[str, Any]]:
+    results = []
+    bound = HEARTBEAT_INTERVAL + budget + CHECK_INTERVAL
+    for stall in STALLS:
+        scheduler, watchdog, motors = _rig(budget)
+        for motor in motors:
+            motor.speed = 50
+        tripped = Event()
+        alert_times = []
+
+        def on_alert(alert) -> None:
+            alert_times.append(alert.time)
+            tripped.set()
+
+        watchdog.add_alert_callback(on_alert)
+        sleep(0.1)
+        stall_start = []
+
+        def block() -> None:
+            stall_start.append(monotonic())
+            sleep(stall)
+
+        scheduler.schedule(block, 0, name="stall")
+        tripped.wait(stall + bound + 0.1)
+        sleep(0.05)
+        stopped = all(motor.motor.speed == 0 for motor in motors)
+        _teardown(scheduler, watchdog, motors)
+        results.append({
+            "stall_ms": stall * 1000,
+            "tripped": bool(alert_times),
+            "stopped": stopped,
+            "time_to_stop_ms": (alert_times[0] - stall_start[0]) * 1000 if alert_times else None,
+            "bound_ms": bound * 1000,
+        })
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3, help="Duration of the lag measurement.")
+    parser.add_argument("--budget", type=float, default=0.05, help="Heartbeat lag budget in seconds.")
+    args = parser.parse_args()
+    results = {
+        "lag": bench_lag(args.seconds, args.budget),
+        "stalls": bench_stalls(args.budget),
+    }
+    write_results("watchdog", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+asyncio counterparts to the callback based inputs and motor shields.
+
+Events raised on other threads (the RPi.GPIO edge detection thread, the shared scheduler, a dispatcher) are handed
+to the event loop with call_soon_threadsafe, so a single loop can consume events from any number of devices without
+a thread per device:
+
+    async for direction in rotation_events(encoder):
+        ...
+
+Motor writes are performed on a single shared worker thread, keeping potentially blocking GPIO calls (such as those
+to a pigpio daemon) off the event loop while preserving the order of writes.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from threading import Lock
+from typing import AsyncIterator, Callable, Deque, Optional, TypeVar
+
+from srmlib.gpiocontrollers.callbacks import Subscription
+from srmlib.gpiocontrollers.constants import ButtonState, Direction
+from srmlib.gpiocontrollers.inputs import PercentageInput, RateLimitedPercentageInput, RotaryEncoderKY040
+from srmlib.gpiocontrollers.motorshields import MotorShield
+
+T = TypeVar("T")
+
+
+class EventStream(AsyncIterator[T]):
+    """
+    An async iterator of events pushed from any thread. When more events arrive than are consumed, the oldest are
+    dropped once maxsize events are waiting.
+    """
+    _loop: asyncio.AbstractEventLoop
+    _items: Deque[T]
+    _ready: asyncio.Event
+    _closing: bool
+    _closed: bool
+    _subscription: Optional[Subscription[T]]
+    dropped: int
+
+    def __init__(self, *, maxsize: int = 0, loop: asyncio.AbstractEventLoop = None) -> None:
+        """
+        :param maxsize: The most events to hold before dropping the oldest, or 0 for no limit.
+        :param loop: The loop to deliver events on. Defaults to the running loop.
+        """
+        self._loop = loop or asyncio.get_running_loop()
+        self._items = deque(maxlen=maxsize or None)
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._closed = False
+        self._subscription = None
+        self.dropped = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closing
+
+    def push(self, value: T) -> None:
+        """
+        Queues an event. Safe to call from any thread.
+        """
+        if self._closing:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._append, value)
+        except RuntimeError:
+            # The loop has been closed; nothing is left to consume events
+            self._closing = self._closed = True
+
+    def follow(self, subscribe: Callable[[Callable[[T], None]], Subscription[T]]) -> "EventStream[T]":
+        """
+        Subscribes the stream's push method to a source of events, unsubscribing it again when the stream is closed.
+
+        :param subscribe: A function registering a callback with the source, such as a device's add_..._callback.
+        :return: Returns this stream.
+        """
+        self._subscription = subscribe(self.push)
+        return self
+
+    def close(self) -> None:
+        """
+        Ends the stream once the events already pushed have been consumed. Safe to call from any thread.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        if self._subscription is not None:
+            self._subscription.unsubscribe()
+        try:
+            # Queued behind any pending pushes, so that they are still delivered
+            self._loop.call_soon_threadsafe(self._finish)
+        except RuntimeError:
+            self._closed = True
+
+    def _finish(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    def _append(self, value: T) -> None:
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+        self._items.append(value)
+        self._ready.set()
+
+    def __aiter__(self) -> "EventStream[T]":
+        return self
+
+    async def __anext__(self) -> T:
+        while not self._items:
+            if self._closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    async def aclose(self) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "EventStream[T]":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        self.close()
+
+
+def rotation_events(encoder: RotaryEncoderKY040, *, maxsize: int = 0) -> EventStream[Direction]:
+    """
+    :return: Returns a stream of the encoder's rotation events. Must be called from the consuming event loop.
+    """
+    return EventStream(maxsize=maxsize).follow(encoder.add_rotation_callback)
+
+
+def switch_events(encoder: RotaryEncoderKY040, *, maxsize: int = 0) -> EventStream[ButtonState]:
+    """
+    :return: Returns a stream of the encoder's switch events. Must be called from the consuming event loop.
+    """
+    return EventStream(maxsize=maxsize).follow(encoder.add_switch_callback)
+
+
+def percent_changes(percentage_input: PercentageInput, *, latest_only: bool = True) -> EventStream[float]:
+    """
+    :param percentage_input: The input to follow.
+    :param latest_only: If True, a slow consumer only sees the latest percentage rather than every intermediate one.
+    :return: Returns a stream of the input's percentages. Must be called from the consuming event loop.
+    """
+    return EventStream(maxsize=1 if latest_only else 0).follow(percentage_input.add_percent_changed_callback)
+
+
+async def ramp_complete(rate_limited_input: RateLimitedPercentageInput) -> float:
+    """
+    Waits until a rate-limited input has settled on its desired percentage.
+
+    :return: Returns the settled percentage.
+    """
+    if not rate_limited_input.is_ramping:
+        return rate_limited_input.current_percent
+    loop = asyncio.get_running_loop()
+    settled = loop.create_future()
+
+    def settled_handler(percent: float) -> None:
+        loop.call_soon_threadsafe(lambda: settled.done() or settled.set_result(percent))
+
+    with rate_limited_input.add_settled_callback(settled_handler):
+        if not rate_limited_input.is_ramping:  # Settled before the handler was registered
+            return rate_limited_input.current_percent
+        return await settled
+
+
+_shared_executor: Optional[Executor] = None
+_shared_executor_lock = Lock()
+
+
+def _get_shared_executor() -> Executor:
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="srmlib-motor-writes")
+        return _shared_executor
+
+
+async def run_motor_writes(function: Callable[..., T], *args, executor: Executor = None) -> T:
+    """
+    Runs a function making motor writes on an executor, by default the worker thread shared by every
+    AsyncMotorShield, so that it does not block the event loop and is ordered with other motor writes.
+
+    :return: Returns the function's result.
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor or _get_shared_executor(), function, *args)
+
+
+class AsyncMotorShield:
+    """
+    Awaitable wrapper around a MotorShield. Writes run on an executor, by default a single worker thread shared by
+    every AsyncMotorShield, so they never block the event loop and are applied in the order they were awaited.
+    """
+    _motor: MotorShield
+    _executor: Optional[Executor]
+
+    def __init__(self, motor: MotorShield, *, executor: Executor = None) -> None:
+        self._motor = motor
+        self._executor = executor
+
+    @property
+    def motor(self) -> MotorShield:
+        return self._motor
+
+    @property
+    def speed(self) -> float:
+        return self._motor.speed
+
+    @property
+    def direction(self) -> Direction:
+        return self._motor.direction
+
+    async def set_speed(self, speed_: float) -> None:
+        """
+        :param speed_: The new speed setting as a percentage [0, 100]
+        """
+        await self._run(setattr, self._motor, "speed", speed_)
+
+    async def set_direction(self, direction_: Direction) -> None:
+        """
+        :param direction_: The new direction setting.
+        """
+        await self._run(setattr, self._motor, "direction", direction_)
+
+    async def stop(self) -> None:
+        await self.set_speed(0)
+
+    async def _run(self, function, *args) -> None:
+        await run_motor_writes(function, *args, executor=self._executor)
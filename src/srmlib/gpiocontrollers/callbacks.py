@@ -0,0 +1,132 @@
+"""
+Copy-on-write registries of callbacks, shared by every input.
+
+Callbacks are subscribed and unsubscribed from application threads while the RPi.GPIO edge detection thread (or
+the shared scheduler) invokes them. A CallbackRegistry keeps its subscriptions in an immutable tuple which writers
+replace under a lock, so invoking callbacks takes no lock and never sees a half-updated list, and subscribing or
+unsubscribing never waits on a callback. Subscribing returns a Subscription, whose unsubscribe method removes the
+callback again.
+
+A callback raising an exception is reported to the registry's error handler, and the remaining callbacks are
+still invoked.
+"""
+from logging import error
+from threading import Lock
+from typing import Callable, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Subscription(Generic[T]):
+    """
+    Handle to a callback subscribed to a CallbackRegistry. May be used as a context manager, unsubscribing on exit.
+    """
+    __slots__ = ("_registry", "_callback", "_on_unsubscribe", "_active", "failures")
+
+    def __init__(
+            self, registry: "CallbackRegistry[T]", callback: Callable[[T], None],
+            on_unsubscribe: Optional[Callable[[], None]]
+    ) -> None:
+        self._registry = registry
+        self._callback = callback
+        self._on_unsubscribe = on_unsubscribe
+        self._active = True
+        self.failures = 0  # The number of times the callback has raised an exception
+
+    @property
+    def callback(self) -> Callable[[T], None]:
+        return self._callback
+
+    @property
+    def active(self) -> bool:
+        """
+        :return: Returns False once the subscription has been unsubscribed.
+        """
+        return self._active
+
+    def unsubscribe(self) -> None:
+        """
+        Removes the callback from its registry. It is not invoked again, although an invocation already in progress
+        on another thread may complete. Does nothing if already unsubscribed.
+        """
+        self._registry._remove(self)
+
+    def __enter__(self) -> "Subscription[T]":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.unsubscribe()
+
+
+class CallbackRegistry(Generic[T]):
+    """
+    A set of callbacks invoked with a value, safe to subscribe to and unsubscribe from while being invoked.
+    """
+    __slots__ = ("_subscriptions", "_write_lock", "_on_error")
+
+    _subscriptions: Tuple[Subscription[T], ...]
+    _write_lock: Lock
+    _on_error: Callable[[Exception], None]
+
+    def __init__(self, on_error: Callable[[Exception], None] = None) -> None:
+        """
+        :param on_error: Called with any exception a callback raises. Defaults to logging it.
+        """
+        self._subscriptions = ()
+        self._write_lock = Lock()
+        self._on_error = on_error or self._log_error
+
+    def subscribe(self, callback: Callable[[T], None], *, on_unsubscribe: Callable[[], None] = None) -> Subscription[T]:
+        """
+        Registers a callback to be invoked with every value.
+
+        :param callback: The function to invoke.
+        :param on_unsubscribe: Called once when the subscription is unsubscribed, to release anything held for it.
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        subscription = Subscription(self, callback, on_unsubscribe)
+        with self._write_lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def invoke(self, value: T) -> None:
+        """
+        Invokes every subscribed callback with a value. Takes no lock.
+        """
+        for subscription in self._subscriptions:
+            if subscription._active:
+                try:
+                    subscription._callback(value)
+                except Exception as e:
+                    subscription.failures += 1
+                    self._on_error(e)
+
+    @property
+    def callbacks(self) -> Tuple[Callable[[T], None], ...]:
+        """
+        :return: Returns the callbacks currently subscribed, in the order they are invoked.
+        """
+        return tuple(subscription._callback for subscription in self._subscriptions if subscription._active)
+
+    def clear(self) -> None:
+        """
+        Unsubscribes every callback.
+        """
+        for subscription in self._subscriptions:
+            subscription.unsubscribe()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def _remove(self, subscription: Subscription[T]) -> None:
+        with self._write_lock:
+            if not subscription._active:
+                return
+            subscription._active = False
+            self._subscriptions = tuple(existing for existing in self._subscriptions if existing is not subscription)
+        if subscription._on_unsubscribe is not None:
+            subscription._on_unsubscribe()
+
+    @staticmethod
+    def _log_error(e: Exception) -> None:
+        error("Callback threw an exception: %r", e)
@@ -0,0 +1,161 @@
+"""
+Coalescing delivery of callbacks on a worker thread.
+
+A CallbackDispatcher takes callback invocations off the thread that produced them (such as the RPi.GPIO edge
+detection thread). Values delivered to a callback are coalesced, so a slow callback only ever sees the latest
+value rather than a backlog of intermediate ones, and each callback may be limited to a maximum update rate.
+"""
+from logging import error
+from threading import Lock
+from time import monotonic
+from typing import Callable, Generic, Optional, TypeVar
+
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask
+
+T = TypeVar("T")
+
+_NOTHING = object()
+
+
+class CoalescedCallback(Generic[T]):
+    """
+    A callback registered with a CallbackDispatcher. Notifying it with a value replaces any value that has not
+    yet been delivered.
+    """
+    _callback: Callable[[T], None]
+    _min_interval: float
+    _clock: Callable[[], float]
+    _log_id: str
+    _lock: Lock
+    _latest: object
+    _last_delivery_time: Optional[float]
+    _task: ScheduledTask
+
+    def __init__(
+            self, scheduler: Scheduler, callback: Callable[[T], None], max_rate: Optional[float], log_id: str
+    ) -> None:
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError(f"max_rate must be positive, was {max_rate}")
+        self._callback = callback
+        self._min_interval = 0 if max_rate is None else 1 / max_rate
+        self._clock = scheduler.clock
+        self._log_id = log_id
+        self._lock = Lock()
+        self._latest = _NOTHING
+        self._last_delivery_time = None
+        self._task = scheduler.schedule(
+            self._deliver, None, name=f"{log_id} {getattr(callback, '__qualname__', repr(callback))}")
+
+    @property
+    def callback(self) -> Callable[[T], None]:
+        return self._callback
+
+    def notify(self, value: T) -> None:
+        """
+        Queues a value for delivery, replacing any value not yet delivered. Never blocks on the callback.
+
+        :param value: The value to deliver.
+        """
+        with self._lock:
+            self._latest = value
+        self._task.wake()
+
+    def cancel(self) -> None:
+        """
+        Stops delivering values to the callback. A value not yet delivered is dropped.
+        """
+        self._task.cancel()
+
+    def _deliver(self) -> Optional[float]:
+        with self._lock:
+            if self._latest is _NOTHING:
+                return None
+            if self._last_delivery_time is not None:
+                remaining = self._last_delivery_time + self._min_interval - self._clock()
+                if remaining > 0:
+                    return remaining
+            value, self._latest = self._latest, _NOTHING
+            self._last_delivery_time = self._clock()
+        try:
+            self._callback(value)
+        except Exception as e:
+            error("%s Callback threw an exception: %r", self._log_id, e)
+        return None
+
+
+class CallbackDispatcher:
+    """
+    Delivers coalesced callback invocations from a single worker thread.
+    """
+    _scheduler: Scheduler
+
+    def __init__(self, *, tick_resolution: float = 0.001, clock: Callable[[], float] = monotonic, name: str = None,
+                 threaded: bool = True) -> None:
+        """
+        Constructs a dispatcher.
+
+        :param tick_resolution: The resolution in seconds used when enforcing maximum update rates.
+        :param clock: A monotonic clock returning the current time in seconds.
+        :param name: The name to give the worker thread.
+        :param threaded: If False, no worker thread is started and run_pending must be called by the owner.
+        """
+        self._scheduler = Scheduler(
+            tick_resolution=tick_resolution, clock=clock, threaded=threaded,
+            name=name or f"{self.__class__.__name__}-{id(self)}")
+
+    def subscribe(
+            self, callback: Callable[[T], None], *, max_rate: float = None, logging_identifier: str = ""
+    ) -> CoalescedCallback[T]:
+        """
+        Registers a callback to be invoked from the dispatcher's worker thread.
+
+        :param callback: The callback to invoke with the latest value.
+        :param max_rate: The maximum number of times per second to invoke the callback, or None for no limit.
+        :param logging_identifier: Prefix for messages logged about the callback.
+        :return: Returns the registered callback, which values are passed to using notify.
+        """
+        return CoalescedCallback(self._scheduler, callback, max_rate, logging_identifier)
+
+    def run_pending(self) -> Optional[float]:
+        """
+        Delivers every pending value on the calling thread. Only needed for an unthreaded dispatcher.
+
+        :return: Returns the time in seconds until the next rate-limited delivery, or None if nothing is pending.
+        """
+        return self._scheduler.run_pending()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker thread, dropping any values not yet delivered.
+
+        :param wait: If True, blocks until the worker thread has exited.
+        """
+        self._scheduler.shutdown(wait)
+
+
+_default_dispatcher: Optional[CallbackDispatcher] = None
+_default_dispatcher_lock = Lock()
+
+
+def get_default_dispatcher() -> CallbackDispatcher:
+    """
+    :return: Returns the dispatcher shared by all inputs that were not given one explicitly.
+    """
+    global _default_dispatcher
+    with _default_dispatcher_lock:
+        if _default_dispatcher is None:
+            _default_dispatcher = CallbackDispatcher(name="srmlib-dispatcher")
+        return _default_dispatcher
+
+
+def shutdown_default_dispatcher(wait: bool = True) -> None:
+    """
+    Stops the shared dispatcher.
+
+    :param wait: If True, blocks until the worker thread has exited.
+    """
+    global _default_dispatcher
+    with _default_dispatcher_lock:
+        dispatcher, _default_dispatcher = _default_dispatcher, None
+    if dispatcher is not None:
+        dispatcher.shutdown(wait)
@@ -0,0 +1,179 @@
+"""
+Pluggable GPIO backend used by all srmlib.gpiocontrollers devices.
+
+A backend is any object providing the RPi.GPIO API (setmode, setup, input, output, add_event_detect, PWM, ...),
+so the RPi.GPIO module itself is the default backend. It is imported on first use rather than on import, so
+devices can be built against another backend, such as SimulatedGPIO, on machines without GPIO hardware.
+
+Devices can also be constructed without touching GPIO (auto_open=False) and opened together later with
+open_devices, which sets up every pin in one setup call per configuration rather than one call per pin.
+
+The constants below match the values used by RPi.GPIO.
+"""
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Protocol, Sequence, Tuple, Union
+
+BOARD = 10
+BCM = 11
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+BOARD_TO_BCM = {
+    3: 2, 5: 3, 7: 4, 8: 14, 10: 15, 11: 17, 12: 18, 13: 27, 15: 22, 16: 23, 18: 24, 19: 10, 21: 9, 22: 25, 23: 11,
+    24: 8, 26: 7, 27: 0, 28: 1, 29: 5, 31: 6, 32: 12, 33: 13, 35: 19, 36: 16, 37: 26, 38: 20, 40: 21,
+}
+"""Physical (BOARD) pin numbers of the 40-pin header mapped to their Broadcom (BCM) GPIO numbers."""
+BCM_TO_BOARD = {bcm: board for board, bcm in BOARD_TO_BCM.items()}
+
+Channels = Union[int, Sequence[int]]
+EdgeCallback = Callable[[int], None]
+
+
+class PWMChannel(Protocol):
+    def start(self, duty_cycle: float) -> None: ...
+
+    def ChangeDutyCycle(self, duty_cycle: float) -> None: ...
+
+    def ChangeFrequency(self, frequency: float) -> None: ...
+
+    def stop(self) -> None: ...
+
+
+class GPIOBackend(Protocol):
+    """
+    The subset of the RPi.GPIO API used by srmlib.gpiocontrollers.
+    """
+
+    def setmode(self, mode: int) -> None: ...
+
+    def getmode(self) -> Optional[int]: ...
+
+    def setup(self, channel: Channels, direction: int, pull_up_down: int = PUD_OFF, initial: int = None) -> None: ...
+
+    def input(self, channel: int) -> int: ...
+
+    def output(self, channel: Channels, value: Union[int, Sequence[int]]) -> None: ...
+
+    def add_event_detect(self, channel: int, edge: int, callback: EdgeCallback = None, bouncetime: int = None) -> None: ...
+
+    def add_event_callback(self, channel: int, callback: EdgeCallback) -> None: ...
+
+    def remove_event_detect(self, channel: int) -> None: ...
+
+    def PWM(self, channel: int, frequency: float) -> PWMChannel: ...
+
+    def cleanup(self, channel: Channels = None) -> None: ...
+
+
+_backend: Optional[Any] = None
+_backend_lock = Lock()
+
+
+def get_backend() -> GPIOBackend:
+    """
+    :return: Returns the active GPIO backend, importing RPi.GPIO if no other backend has been set.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                import RPi.GPIO
+                _backend = RPi.GPIO
+    return _backend
+
+
+def set_backend(backend: Optional[GPIOBackend]) -> None:
+    """
+    Sets the GPIO backend used by devices constructed from now on.
+
+    :param backend: The backend to use, or None to revert to RPi.GPIO.
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def board_to_bcm(channel: int) -> int:
+    """
+    :param channel: A physical (BOARD) pin number.
+    :return: Returns the Broadcom (BCM) GPIO number of the pin.
+    :raises ValueError: Raised if the pin is not a GPIO pin (such as a power or ground pin).
+    """
+    try:
+        return BOARD_TO_BCM[channel]
+    except KeyError:
+        raise ValueError(f"BOARD pin {channel} is not a GPIO pin") from None
+
+
+class PinSetup(NamedTuple):
+    """
+    The arguments of a single channel's setup call.
+    """
+    channel: int
+    direction: int
+    pull_up_down: int = PUD_OFF
+    initial: Optional[int] = None
+
+
+class DeferredDevice(Protocol):
+    """
+    A device constructed with auto_open=False, whose GPIO setup is performed when opened.
+    """
+
+    @property
+    def pin_setups(self) -> List[PinSetup]: ...
+
+    @property
+    def is_open(self) -> bool: ...
+
+    def open(self, *, pins_ready: bool = False) -> None: ...
+
+
+def setup_pins(pin_setups: Iterable[PinSetup], *, gpio: GPIOBackend = None) -> int:
+    """
+    Sets up many channels, grouping channels with identical settings into a single setup call.
+
+    :param pin_setups: The channels to set up.
+    :param gpio: The backend to set them up on. Defaults to the active backend.
+    :return: Returns the number of setup calls made.
+    :raises ValueError: Raised if a channel is given conflicting settings.
+    """
+    gpio = gpio or get_backend()
+    settings: Dict[int, PinSetup] = {}
+    groups: Dict[Tuple[int, int, Optional[int]], List[int]] = {}
+    for pin_setup in pin_setups:
+        existing = settings.setdefault(pin_setup.channel, pin_setup)
+        if existing != pin_setup:
+            raise ValueError(f"Channel {pin_setup.channel} is set up as both {existing} and {pin_setup}")
+        if existing is pin_setup:
+            groups.setdefault(pin_setup[1:], []).append(pin_setup.channel)
+    for (direction, pull_up_down, initial), channels in groups.items():
+        if direction == OUT:
+            gpio.setup(channels, direction, initial=LOW if initial is None else initial)
+        else:
+            gpio.setup(channels, direction, pull_up_down=pull_up_down)
+    return len(groups)
+
+
+def open_devices(devices: Iterable[DeferredDevice], *, mode: int = BOARD) -> None:
+    """
+    Opens devices constructed with auto_open=False, setting up all of their pins in a batch first.
+
+    :param devices: The devices to open.
+    :param mode: The pin numbering the devices were configured with.
+    """
+    devices = [device for device in devices if not device.is_open]
+    gpio = get_backend()
+    if gpio.getmode() != mode:
+        gpio.setmode(mode)
+    setup_pins((pin_setup for device in devices for pin_setup in device.pin_setups), gpio=gpio)
+    for device in devices:
+        device.open(pins_ready=True)
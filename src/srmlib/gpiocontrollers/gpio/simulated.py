@@ -0,0 +1,570 @@
+"""
+Hardware-free GPIO backend driven by a deterministic virtual clock.
+
+SimulatedGPIO implements the RPi.GPIO API in memory. Tests and benchmarks inject input levels or edge sequences
+into its pins, which invoke edge detection callbacks synchronously (honouring bouncetime like RPi.GPIO does), and
+every output and PWM write is recorded with its virtual timestamp. Schedulers attached to the VirtualClock run
+their tasks as the clock is advanced, so ramps and other timed work run as fast as the host can compute them.
+"""
+import struct
+from collections import defaultdict
+from socketserver import BaseRequestHandler, ThreadingTCPServer
+from threading import Lock, Thread
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Protocol, Sequence, Set, Tuple, Union
+
+from srmlib.gpiocontrollers.gpio import (
+    BOARD, BCM, OUT, IN, LOW, HIGH, PUD_OFF, PUD_DOWN, PUD_UP, RISING, FALLING, BOTH, Channels, EdgeCallback
+)
+from srmlib.gpiocontrollers.scheduling import Scheduler
+
+
+class _Runnable(Protocol):
+    def run_pending(self) -> Optional[float]: ...
+
+
+class VirtualClock:
+    """
+    A monotonic clock which only moves when advanced. Calling the clock returns the current time in seconds.
+    """
+    _now: float
+    _runnables: List[_Runnable]
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+        self._runnables = []
+
+    def __call__(self) -> float:
+        return self._now
+
+    def monotonic_ns(self) -> int:
+        return round(self._now * 1_000_000_000)
+
+    def create_scheduler(self, *, tick_resolution: float = 0.001, name: str = None) -> Scheduler:
+        """
+        :return: Returns an unthreaded scheduler running on this clock, attached so it runs as the clock advances.
+        """
+        scheduler = Scheduler(tick_resolution=tick_resolution, clock=self, name=name, threaded=False)
+        self.attach(scheduler)
+        return scheduler
+
+    def attach(self, runnable: _Runnable) -> None:
+        """
+        Attaches an unthreaded scheduler (or anything with an equivalent run_pending method, such as an unthreaded
+        CallbackDispatcher) so that its work is run as the clock advances.
+        """
+        self._runnables.append(runnable)
+
+    def advance(self, seconds: float) -> None:
+        """
+        Moves the clock forward, stopping at every deadline of the attached schedulers along the way to run the
+        tasks that are due.
+
+        :param seconds: The time to advance by.
+        """
+        if seconds < 0:
+            raise ValueError(f"A monotonic clock cannot go backwards, was asked to advance {seconds}")
+        end = self._now + seconds
+        while True:
+            deadlines = [delay for delay in (runnable.run_pending() for runnable in self._runnables)
+                         if delay is not None]
+            if not deadlines or self._now + min(deadlines) > end:
+                break
+            self._now += min(deadlines)
+        self._now = end
+        self.run_pending()
+
+    def run_pending(self) -> None:
+        """
+        Runs the work of every attached scheduler which is due at the current time, without advancing.
+        """
+        for runnable in self._runnables:
+            runnable.run_pending()
+
+
+class OutputWrite(NamedTuple):
+    time: float
+    channel: int
+    value: int
+
+
+class PWMEvent(NamedTuple):
+    time: float
+    channel: int
+    operation: str
+    value: Optional[float]
+
+
+class SimulatedPWM:
+    """
+    In-memory stand in for an RPi.GPIO PWM object, recording every operation performed on it.
+    """
+    channel: int
+    frequency: float
+    duty_cycle: float
+    running: bool
+
+    def __init__(self, gpio: "SimulatedGPIO", channel: int, frequency: float) -> None:
+        if channel in gpio._pwms:
+            raise RuntimeError(f"A PWM object already exists for channel {channel}")
+        self._gpio = gpio
+        self.channel = channel
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+        gpio._pwms[channel] = self
+
+    def start(self, duty_cycle: float) -> None:
+        self._check_duty_cycle(duty_cycle)
+        self.duty_cycle = duty_cycle
+        self.running = True
+        self._record("start", duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle: float) -> None:
+        self._check_duty_cycle(duty_cycle)
+        self.duty_cycle = duty_cycle
+        self._record("ChangeDutyCycle", duty_cycle)
+
+    def ChangeFrequency(self, frequency: float) -> None:
+        if frequency <= 0:
+            raise ValueError(f"frequency must be greater than 0.0, was {frequency}")
+        self.frequency = frequency
+        self._record("ChangeFrequency", frequency)
+
+    def stop(self) -> None:
+        self.running = False
+        self._record("stop", None)
+
+    def _record(self, operation: str, value: Optional[float]) -> None:
+        self._gpio.pwm_events.append(PWMEvent(self._gpio.clock(), self.channel, operation, value))
+
+    @staticmethod
+    def _check_duty_cycle(duty_cycle: float) -> None:
+        if not 0 <= duty_cycle <= 100:
+            raise ValueError(f"dutycycle must have a value from 0.0 to 100.0, was {duty_cycle}")
+
+
+class SimulatedGPIO:
+    """
+    In-memory implementation of the RPi.GPIO API, for use as a backend via srmlib.gpiocontrollers.gpio.set_backend.
+    """
+    BOARD = BOARD
+    BCM = BCM
+    OUT = OUT
+    IN = IN
+    LOW = LOW
+    HIGH = HIGH
+    PUD_OFF = PUD_OFF
+    PUD_DOWN = PUD_DOWN
+    PUD_UP = PUD_UP
+    RISING = RISING
+    FALLING = FALLING
+    BOTH = BOTH
+
+    clock: VirtualClock
+    writes: List[OutputWrite]
+    pwm_events: List[PWMEvent]
+    _mode: Optional[int]
+    _directions: Dict[int, int]
+    _levels: Dict[int, int]
+    _event_detects: Dict[int, Tuple[int, List[EdgeCallback], int]]
+    _last_callback_times: Dict[int, float]
+    _pwms: Dict[int, SimulatedPWM]
+    _external_levels: Dict[int, int]
+    _output_listeners: Dict[int, List[Callable[[int], None]]]
+
+    def __init__(self, clock: VirtualClock = None, *, external_levels: Dict[int, int] = None) -> None:
+        """
+        :param clock: The clock used to timestamp events. Defaults to a new VirtualClock.
+        :param external_levels: Levels driven onto input channels by external circuitry (such as a KY040's own
+                pull-up resistors), which take precedence over the pull up/down given to setup.
+        """
+        self.clock = clock or VirtualClock()
+        self.writes = []
+        self.pwm_events = []
+        self._mode = None
+        self._directions = {}
+        self._levels = defaultdict(int)
+        self._event_detects = {}
+        self._last_callback_times = {}
+        self._pwms = {}
+        self._external_levels = dict(external_levels or {})
+        self._output_listeners = {}
+
+    # RPi.GPIO API
+
+    def setmode(self, mode: int) -> None:
+        if mode not in {BOARD, BCM}:
+            raise ValueError(f"An invalid mode was passed to setmode(): {mode}")
+        if self._mode is not None and self._mode != mode:
+            raise ValueError("A different mode has already been set!")
+        self._mode = mode
+
+    def getmode(self) -> Optional[int]:
+        return self._mode
+
+    def setup(self, channel: Channels, direction: int, pull_up_down: int = PUD_OFF, initial: int = None) -> None:
+        self._check_mode()
+        for channel_ in self._channels(channel):
+            self._directions[channel_] = direction
+            if direction == OUT:
+                self._levels[channel_] = LOW if initial is None else initial
+            elif channel_ in self._external_levels:
+                self._levels[channel_] = self._external_levels[channel_]
+            else:
+                self._levels[channel_] = HIGH if pull_up_down == PUD_UP else LOW
+
+    def input(self, channel: int) -> int:
+        self._check_setup(channel)
+        return self._levels[channel]
+
+    def output(self, channel: Channels, value: Union[int, Sequence[int]]) -> None:
+        channels = self._channels(channel)
+        values = [value] * len(channels) if isinstance(value, int) else list(value)
+        if len(values) != len(channels):
+            raise RuntimeError("Number of channels != number of values")
+        for channel_, value_ in zip(channels, values):
+            if self._directions.get(channel_) != OUT:
+                raise RuntimeError(f"The GPIO channel {channel_} has not been set up as an OUTPUT")
+            self._levels[channel_] = HIGH if value_ else LOW
+            self.writes.append(OutputWrite(self.clock(), channel_, self._levels[channel_]))
+            for listener in self._output_listeners.get(channel_, ()):
+                listener(self._levels[channel_])
+
+    def add_event_detect(self, channel: int, edge: int, callback: EdgeCallback = None, bouncetime: int = None) -> None:
+        self._check_setup(channel)
+        if self._directions[channel] != IN:
+            raise RuntimeError(f"You must setup() the GPIO channel {channel} as an input first")
+        if channel in self._event_detects:
+            raise RuntimeError(f"Conflicting edge detection already enabled for GPIO channel {channel}")
+        self._event_detects[channel] = (edge, [callback] if callback else [], bouncetime or 0)
+
+    def add_event_callback(self, channel: int, callback: EdgeCallback) -> None:
+        if channel not in self._event_detects:
+            raise RuntimeError(f"Add event detection using add_event_detect first before adding a callback")
+        self._event_detects[channel][1].append(callback)
+
+    def remove_event_detect(self, channel: int) -> None:
+        self._event_detects.pop(channel, None)
+        self._last_callback_times.pop(channel, None)
+
+    def PWM(self, channel: int, frequency: float) -> SimulatedPWM:
+        self._check_setup(channel)
+        return SimulatedPWM(self, channel, frequency)
+
+    def cleanup(self, channel: Channels = None) -> None:
+        channels = list(self._directions) if channel is None else self._channels(channel)
+        for channel_ in channels:
+            self._directions.pop(channel_, None)
+            self._levels.pop(channel_, None)
+            self._pwms.pop(channel_, None)
+            self.remove_event_detect(channel_)
+        if channel is None:
+            self._mode = None
+
+    # Simulation API
+
+    def level(self, channel: int) -> int:
+        """
+        :return: Returns the current level of a channel, whether it is an input or an output.
+        """
+        return self._levels[channel]
+
+    def pwm(self, channel: int) -> SimulatedPWM:
+        """
+        :return: Returns the PWM object created for a channel.
+        """
+        return self._pwms[channel]
+
+    def add_output_listener(self, channel: int, listener: Callable[[int], None]) -> None:
+        """
+        Registers a function to be called with the level of every write to an output channel, so that simulated
+        external circuitry can respond to it.
+        """
+        self._output_listeners.setdefault(channel, []).append(listener)
+
+    def set_input(self, channel: int, level: int) -> None:
+        """
+        Drives an input channel to a level, invoking its edge detection callbacks if the level changed.
+
+        :param channel: The channel to drive.
+        :param level: The new level, LOW (0) or HIGH (1).
+        """
+        self._check_setup(channel)
+        level = HIGH if level else LOW
+        previous = self._levels[channel]
+        self._levels[channel] = level
+        if previous == level or channel not in self._event_detects:
+            return
+        edge, callbacks, bouncetime = self._event_detects[channel]
+        if edge != BOTH and edge != (RISING if level else FALLING):
+            return
+        now = self.clock()
+        last_callback_time = self._last_callback_times.get(channel)
+        if last_callback_time is not None and (now - last_callback_time) * 1000 < bouncetime:
+            return
+        self._last_callback_times[channel] = now
+        for callback in callbacks:
+            callback(channel)
+
+    def inject(self, events: Iterable[Tuple[float, int, int]]) -> None:
+        """
+        Plays a sequence of input changes, advancing the clock to each one before applying it.
+
+        :param events: Tuples of (delay in seconds since the previous event, channel, level).
+        """
+        for delay, channel, level in events:
+            if delay:
+                self.clock.advance(delay)
+            self.set_input(channel, level)
+
+    def _check_mode(self) -> None:
+        if self._mode is None:
+            raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or "
+                               "GPIO.setmode(GPIO.BCM)")
+
+    def _check_setup(self, channel: int) -> None:
+        if channel not in self._directions:
+            raise RuntimeError(f"The GPIO channel {channel} has not been set up")
+
+    @staticmethod
+    def _channels(channel: Channels) -> List[int]:
+        return [channel] if isinstance(channel, int) else list(channel)
+
+
+def quadrature_edges(clk_pin: int, dt_pin: int, detents: int, *, interval: float = 0.01,
+                     forward: bool = True) -> List[Tuple[float, int, int]]:
+    """
+    Builds the edge sequence a KY040 style rotary encoder produces when turned, for use with SimulatedGPIO.inject.
+    Both pins rest HIGH between detents.
+
+    :param clk_pin: The encoder's CLK channel.
+    :param dt_pin: The encoder's DT channel.
+    :param detents: The number of detents to turn.
+    :param interval: The time in seconds between successive edges.
+    :param forward: True to turn clockwise, False to turn counter-clockwise.
+    :return: Returns tuples of (delay in seconds, channel, level).
+    """
+    first, second = (clk_pin, dt_pin) if forward else (dt_pin, clk_pin)
+    events = []
+    for _ in range(detents):
+        events += [(interval, first, LOW), (interval, second, LOW), (interval, first, HIGH), (interval, second, HIGH)]
+    return events
+
+
+class SimulatedShiftRegisterChain:
+    """
+    A chain of 74HC165 shift registers wired to a SimulatedGPIO, as expected by scanning.ShiftRegisterChain. Its
+    parallel inputs are pulled up, so inputs rest HIGH and a pressed switch reads LOW.
+    """
+    _gpio: SimulatedGPIO
+    _data_pin: int
+    _levels: List[int]
+    _latched: List[int]
+    _position: int
+    _loading: bool
+
+    def __init__(self, gpio: SimulatedGPIO, load_pin: int, clock_pin: int, data_pin: int, registers: int = 1) -> None:
+        """
+        Attaches the chain to the gpio. Its pins must be set up (by opening the bank reading them) before it is read.
+        """
+        self._gpio = gpio
+        self._data_pin = data_pin
+        self._levels = [HIGH] * (registers * 8)
+        self._latched = list(self._levels)
+        self._position = 0
+        self._loading = False
+        gpio.add_output_listener(load_pin, self._on_load)
+        gpio.add_output_listener(clock_pin, self._on_clock)
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def set_level(self, index: int, level: int) -> None:
+        """
+        Drives a parallel input, numbered in shift order.
+        """
+        self._levels[index] = HIGH if level else LOW
+
+    def press(self, index: int) -> None:
+        self.set_level(index, LOW)
+
+    def release(self, index: int) -> None:
+        self.set_level(index, HIGH)
+
+    def _on_load(self, level: int) -> None:
+        # SH/LD LOW continuously loads the parallel inputs, and QH follows the first of them
+        self._loading = not level
+        if self._loading:
+            self._latched = list(self._levels)
+            self._position = 0
+            self._gpio.set_input(self._data_pin, self._latched[0])
+
+    def _on_clock(self, level: int) -> None:
+        if not level or self._loading:
+            return
+        self._position += 1
+        # SER of the furthest register is tied LOW
+        bit = self._latched[self._position] if self._position < len(self._latched) else LOW
+        self._gpio.set_input(self._data_pin, bit)
+
+
+class SimulatedDiodeMatrix:
+    """
+    A diode matrix of switches wired to a SimulatedGPIO, as expected by scanning.DiodeMatrix. A column reads LOW
+    while a row driven LOW has a closed switch in that column.
+    """
+    _gpio: SimulatedGPIO
+    _row_pins: List[int]
+    _column_pins: List[int]
+    _closed: Set[Tuple[int, int]]
+
+    def __init__(self, gpio: SimulatedGPIO, row_pins: Sequence[int], column_pins: Sequence[int]) -> None:
+        self._gpio = gpio
+        self._row_pins = list(row_pins)
+        self._column_pins = list(column_pins)
+        self._closed = set()
+        for row_pin in self._row_pins:
+            gpio.add_output_listener(row_pin, lambda _: self._update_columns())
+
+    def press(self, row: int, column: int) -> None:
+        self._closed.add((row, column))
+
+    def release(self, row: int, column: int) -> None:
+        self._closed.discard((row, column))
+
+    def _update_columns(self) -> None:
+        driven_rows = {row for row, pin in enumerate(self._row_pins) if not self._gpio.level(pin)}
+        for column, column_pin in enumerate(self._column_pins):
+            closed = any((row, column) in self._closed for row in driven_rows)
+            self._gpio.set_input(column_pin, LOW if closed else HIGH)
+
+
+# Frequencies available to pigpio's DMA-timed PWM at its default 5us sample rate
+_PIGPIO_FREQUENCIES = (8000, 4000, 2000, 1600, 1000, 800, 500, 400, 320, 250, 200, 160, 100, 80, 50, 40, 20, 10)
+_PIGPIO_HARDWARE_PWM_PINS = {12, 13, 18, 19}
+_PI_BAD_GPIO = -3
+_PI_BAD_DUTYCYCLE = -8
+_PI_BAD_DUTYRANGE = -21
+_PI_NOT_HPWM_GPIO = -95
+_PI_BAD_HPWM_DUTY = -97
+_PI_UNKNOWN_COMMAND = -88
+
+
+class PigpioPinState:
+    """
+    The state of a pin on a MockPigpioDaemon.
+    """
+    def __init__(self) -> None:
+        self.mode = 0
+        self.level = 0
+        self.frequency = 800
+        self.range = 255
+        self.dutycycle = 0
+        self.hardware_frequency = 0
+        self.hardware_duty = 0
+
+
+class MockPigpioDaemon:
+    """
+    A local stand in for pigpiod implementing the socket commands used by PigpioPWMBackend, for use in tests.
+    Use as a context manager, connecting to the port it reports.
+    """
+    commands: List[Tuple[int, int, int, bytes]]
+    pins: Dict[int, PigpioPinState]
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.commands = []
+        self.pins = defaultdict(PigpioPinState)
+        self._lock = Lock()
+        daemon = self
+
+        class Handler(BaseRequestHandler):
+            def handle(self) -> None:
+                while True:
+                    header = self._receive(16)
+                    if header is None:
+                        return
+                    command, p1, p2, length = struct.unpack("<IIII", header)
+                    extension = self._receive(length) if length else b""
+                    result = daemon._execute(command, p1, p2, extension or b"")
+                    self.request.sendall(struct.pack("<IIIi", command, p1, p2, result))
+
+            def _receive(self, size: int) -> Optional[bytes]:
+                data = b""
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        return None
+                    data += chunk
+                return data
+
+        ThreadingTCPServer.allow_reuse_address = True
+        self._server = ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, name="MockPigpioDaemon", daemon=True)
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self) -> "MockPigpioDaemon":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _execute(self, command: int, p1: int, p2: int, extension: bytes) -> int:
+        with self._lock:
+            self.commands.append((command, p1, p2, extension))
+            if p1 > 53:
+                return _PI_BAD_GPIO
+            pin = self.pins[p1]
+            if command == 0:  # MODES
+                pin.mode = p2
+                return 0
+            if command == 4:  # WRITE
+                pin.level = 1 if p2 else 0
+                pin.dutycycle = 0
+                return 0
+            if command == 5:  # PWM
+                if p2 > pin.range:
+                    return _PI_BAD_DUTYCYCLE
+                pin.dutycycle = p2
+                return 0
+            if command == 6:  # PRS
+                if not 25 <= p2 <= 40000:
+                    return _PI_BAD_DUTYRANGE
+                pin.range = p2
+                return self._real_range(pin)
+            if command == 7:  # PFS
+                pin.frequency = min(_PIGPIO_FREQUENCIES, key=lambda frequency: abs(frequency - p2))
+                return pin.frequency
+            if command == 22:  # PRG
+                return pin.range
+            if command == 23:  # PFG
+                return pin.hardware_frequency or pin.frequency
+            if command == 24:  # PRRG
+                return self._real_range(pin)
+            if command == 83:  # GDC
+                return pin.dutycycle
+            if command == 86:  # HP
+                if p1 not in _PIGPIO_HARDWARE_PWM_PINS:
+                    return _PI_NOT_HPWM_GPIO
+                duty = struct.unpack("<I", extension)[0] if len(extension) == 4 else 0
+                if duty > 1_000_000:
+                    return _PI_BAD_HPWM_DUTY
+                pin.hardware_frequency = p2
+                pin.hardware_duty = duty
+                return 0
+            return _PI_UNKNOWN_COMMAND
+
+    @staticmethod
+    def _real_range(pin: PigpioPinState) -> int:
+        return 200_000 // pin.frequency
@@ -1,12 +1,18 @@
 from abc import ABC
 from logging import debug, error
-from threading import Thread
-from time import sleep
-from typing import List, Callable
-
-from RPi.GPIO import setmode, BOARD, input as gpio_input, add_event_detect, BOTH, setup, IN, PUD_DOWN
+from threading import Lock
+from typing import List, Callable, Optional, Sequence
 
+from srmlib.gpiocontrollers import metrics
+from srmlib.gpiocontrollers.callbacks import CallbackRegistry, Subscription
 from srmlib.gpiocontrollers.constants import PRESSED, RELEASED, ButtonState, FORWARD, BACKWARD, Direction
+from srmlib.gpiocontrollers.dispatch import CallbackDispatcher, get_default_dispatcher
+from srmlib.gpiocontrollers.gpio import BOARD, BOTH, IN, PUD_DOWN, PinSetup, get_backend, setup_pins
+from srmlib.gpiocontrollers.momentum import MomentumProfile, LinearMomentum, RampState
+from srmlib.gpiocontrollers.quadrature import FULL_STEP, QuadratureDecoder, Resolution
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask, get_default_scheduler
+from srmlib.gpiocontrollers.switches import PRESS, RELEASE, Debouncer, SwitchEvent, SwitchEventCallback, \
+    SwitchPipeline, SwitchStage
 from srmlib.gpiocontrollers.util import calculate_percentage, clamp
 
 SwitchCallback = Callable[[ButtonState], None]
@@ -14,76 +20,209 @@ RotationCallback = Callable[[Direction], None]
 
 
 class PercentageInput(ABC):
-    _percent_changed_callbacks: List[Callable[[float], None]]
+    _percent_changed_callbacks: CallbackRegistry[float]
+    _source_subscriptions: List[Subscription]
+    _dispatcher: Optional[CallbackDispatcher]
     _current_percent: float
+    _metrics: metrics.DeviceMetrics
     _log_id: str
 
-    def __init__(self, *args, logging_identifier: str = None, initial_percent: float = 0, **kwargs) -> None:
+    def __init__(
+            self, *args, logging_identifier: str = None, initial_percent: float = 0,
+            dispatcher: CallbackDispatcher = None, **kwargs
+    ) -> None:
+        """
+        :param logging_identifier: Prefix for messages logged about this input.
+        :param initial_percent: The starting percentage [0, 100].
+        :param dispatcher: If provided, callbacks are invoked from the dispatcher's worker thread with only the
+                latest percentage, rather than synchronously on the thread that changed the percentage.
+        """
         super(PercentageInput, self).__init__(*args, **kwargs)
-        self._percent_changed_callbacks = []
-        self._current_percent = initial_percent
         self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._percent_changed_callbacks = CallbackRegistry(self._log_callback_error)
+        self._source_subscriptions = []
+        self._dispatcher = dispatcher
+        self._current_percent = initial_percent
+        self._metrics = metrics.register(self._log_id[1:-1], self.__class__.__name__)
 
-    def add_percent_changed_callback(self, callback: Callable[[float], None]) -> None:
+    @property
+    def current_percent(self) -> float:
+        """
+        :return: Returns the current input as a percentage [0, 100].
+        """
+        return self._current_percent
+
+    def add_percent_changed_callback(
+            self, callback: Callable[[float], None], *, max_rate: float = None
+    ) -> Subscription[float]:
         """
         Registers a new callback to be invoked whenever the input percentage changes.
 
         :param callback: A function that accepts the current input as a percentage [0, 100].
+        :param max_rate: The maximum number of times per second to invoke the callback. Intermediate percentages
+                are dropped, so the callback always receives the latest one. Rate-limited callbacks are invoked
+                from this input's dispatcher, or the shared dispatcher if it has none.
+        :return: Returns a handle which can be used to unsubscribe the callback.
         """
-        self._percent_changed_callbacks.append(callback)
+        if self._dispatcher is None and max_rate is None:
+            return self._percent_changed_callbacks.subscribe(callback)
+        dispatcher = self._dispatcher or get_default_dispatcher()
+        dispatched_callback = dispatcher.subscribe(callback, max_rate=max_rate, logging_identifier=self._log_id)
+        return self._percent_changed_callbacks.subscribe(
+            dispatched_callback.notify, on_unsubscribe=dispatched_callback.cancel)
+
+    def close(self) -> None:
+        """
+        Stops following the inputs or encoders this input is derived from. Callbacks registered with this input stay
+        registered.
+        """
+        for subscription in self._source_subscriptions:
+            subscription.unsubscribe()
+        self._source_subscriptions.clear()
 
     def _invoke_all_callbacks(self) -> None:
-        debug(f"{self._log_id} Input percentage changed to {self._current_percent}. Invoking callbacks.")
-        for callback in self._percent_changed_callbacks:
-            try:
-                callback(self._current_percent)
-            except RuntimeError as e:
-                error(f"{self._log_id} Switch callback threw an exception: {e}")
+        percent = self._current_percent
+        debug("%s Input percentage changed to %s. Invoking callbacks.", self._log_id, percent)
+        if metrics.enabled:
+            self._metrics.count("percent_changes")
+            self._metrics.invoke_callbacks(
+                self._percent_changed_callbacks.callbacks, percent, self._log_callback_error)
+            return
+        self._percent_changed_callbacks.invoke(percent)
+
+    def _log_callback_error(self, e: Exception) -> None:
+        error("%s Percentage callback threw an exception: %s", self._log_id, e)
 
 
 class RateLimitedPercentageInput(PercentageInput):
     _desired_percent: float
-    _thread: Thread
-    _terminated: bool
+    _momentum: MomentumProfile
+    _ramp_state: RampState
+    _step_interval: float
+    _clock: Callable[[], float]
+    _last_step_time: Optional[float]
+    _settled_time: float
+    _settled_callbacks: CallbackRegistry[float]
+    _task: ScheduledTask
 
     def __init__(
-            self, percentage_input: PercentageInput, max_percent_change_per_second: float, *args,
-            initial_percent: float = 0, **kwargs
+            self, percentage_input: PercentageInput, max_percent_change_per_second: Optional[float], *args,
+            initial_percent: float = 0, momentum: MomentumProfile = None, scheduler: Scheduler = None,
+            step_interval: float = 0.25, **kwargs
     ) -> None:
+        """
+        Constructs an input which follows another percentage input, limiting how quickly it may change.
+
+        :param percentage_input: The input to follow.
+        :param max_percent_change_per_second: The maximum rate at which this input's percentage may change. Only
+                used (and only required) when no momentum profile is given.
+        :param initial_percent: The starting percentage [0, 100].
+        :param momentum: The profile describing how this input moves towards the followed input's percentage.
+                Defaults to a LinearMomentum of max_percent_change_per_second.
+        :param scheduler: The scheduler to ramp on. Defaults to the scheduler shared by all inputs.
+        :param step_interval: The time in seconds between ramp steps while ramping. Ramps are integrated over the
+                measured time between steps, so this controls smoothness rather than rate.
+        """
         super().__init__(*args, initial_percent=initial_percent, **kwargs)
-        self._terminated = False
+        if momentum is None:
+            if max_percent_change_per_second is None:
+                raise ValueError("Either max_percent_change_per_second or momentum must be provided")
+            momentum = LinearMomentum(max_percent_change_per_second)
+        scheduler = scheduler or get_default_scheduler()
         self._desired_percent = initial_percent
+        self._momentum = momentum
+        self._ramp_state = RampState()
+        self._step_interval = step_interval
+        self._clock = scheduler.clock
+        self._last_step_time = None
+        self._settled_time = float("-inf")
+        self._settled_callbacks = CallbackRegistry(self._log_callback_error)
+        self._task = scheduler.schedule(self._ramp_step, None, name=f"{self._log_id} ramp")
 
         def percent_changed_handler(percent: float) -> None:
             self._desired_percent = percent
-            debug(f"{self._log_id} Desired input percentage changed to {self._current_percent}. "
-                  f"Rate-limited invocation to follow.")
-
-        percentage_input.add_percent_changed_callback(percent_changed_handler)
-
-        def acceleration_thread() -> None:
-            loop_time = 0.25
-            while not self._terminated:
-                if self._current_percent != self._desired_percent:
-                    is_within_one_step = abs(self._current_percent - self._desired_percent) < max_percent_change_per_second
-                    if is_within_one_step:
-                        self._current_percent = self._desired_percent
-                    else:
-                        sign = loop_time if self._current_percent < self._desired_percent else -loop_time
-                        self._current_percent = clamp(
-                            self._current_percent + (sign * max_percent_change_per_second),
-                            0,
-                            100
-                        )
-                    self._invoke_all_callbacks()
-                sleep(loop_time)
-
-        self._thread = Thread(target=acceleration_thread)
-        self._thread.start()
+            debug("%s Desired input percentage changed to %s. Rate-limited invocation to follow.",
+                  self._log_id, percent)
+            self._task.wake()
+
+        self._source_subscriptions.append(percentage_input.add_percent_changed_callback(percent_changed_handler))
+
+    @property
+    def desired_percent(self) -> float:
+        """
+        :return: Returns the percentage being ramped towards.
+        """
+        return self._desired_percent
+
+    @property
+    def is_ramping(self) -> bool:
+        """
+        :return: Returns True until the current percentage has settled on the desired percentage.
+        """
+        return self._current_percent != self._desired_percent or self._ramp_state != RampState()
+
+    @property
+    def momentum(self) -> MomentumProfile:
+        return self._momentum
+
+    @momentum.setter
+    def momentum(self, momentum: MomentumProfile) -> None:
+        """
+        :param momentum: The profile to use for ramping from now on. Takes effect on the next ramp step.
+        """
+        self._momentum = momentum
+
+    def add_settled_callback(self, callback: Callable[[float], None]) -> Subscription[float]:
+        """
+        Registers a callback to be invoked, from the scheduler's thread, whenever a ramp ends and is_ramping becomes
+        False. This includes ramps which end without changing the percentage, such as when the desired percentage
+        returns to the current one before the next ramp step.
+
+        :param callback: A function that accepts the settled percentage [0, 100].
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._settled_callbacks.subscribe(callback)
+
+    def _ramp_step(self) -> Optional[float]:
+        now = self._clock()
+        if self._current_percent == self._desired_percent and self._ramp_state == RampState():
+            self._last_step_time = None
+            self._settled_callbacks.invoke(self._current_percent)
+            return None
+        if self._last_step_time is None:
+            # Starting a new ramp: step as soon as woken, as though one step interval had passed, but measured from
+            # no earlier than the last ramp settled, so that frequent small changes cannot outpace the rate
+            dt = min(self._step_interval, now - self._settled_time)
+        else:
+            dt = now - self._last_step_time
+        self._last_step_time = now
+        if metrics.enabled:
+            self._metrics.count("ramp_steps")
+        new_percent, self._ramp_state = self._momentum.advance(
+            self._current_percent, self._desired_percent, self._ramp_state, dt)
+        new_percent = clamp(new_percent, 0, 100)
+        if new_percent != self._current_percent:
+            self._current_percent = new_percent
+            self._invoke_all_callbacks()
+        if self._current_percent == self._desired_percent and self._ramp_state == RampState():
+            self._last_step_time = None
+            self._settled_time = now
+            self._settled_callbacks.invoke(self._current_percent)
+            return None
+        return self._step_interval
 
     def terminate(self) -> None:
-        self._terminated = True
-        self._thread.join()
+        """
+        Stops ramping this input. To stop every input sharing a scheduler at once, shut the scheduler down instead.
+        """
+        self._task.cancel()
+
+    def close(self) -> None:
+        """
+        Stops ramping and following the input this input is derived from.
+        """
+        self.terminate()
+        super().close()
 
 
 class RotaryEncoderKY040:
@@ -92,88 +231,325 @@ class RotaryEncoderKY040:
     Datasheet: https://www.rcscomponents.kiev.ua/datasheets/ky-040-datasheet.pdf
     """
     _log_id: str
-    _clk_state: int
-    _dt_state: int
-    _sw_state: int
-    _switch_callbacks: List[SwitchCallback]
-    _rotation_callbacks: List[RotationCallback]
-
-    def __init__(self, clk_pin: int, dt_pin: int, sw_pin: int, *, logging_identifier: str = None) -> None:
-        setmode(BOARD)
-        setup(clk_pin, IN, pull_up_down=PUD_DOWN)
-        setup(dt_pin, IN, pull_up_down=PUD_DOWN)
-        setup(sw_pin, IN, pull_up_down=PUD_DOWN)
-        self._clk_state = gpio_input(clk_pin)
-        self._dt_state = gpio_input(dt_pin)
-        self._sw_state = gpio_input(sw_pin)
-        self._switch_callbacks = []
-        self._rotation_callbacks = []
+    _clk_pin: int
+    _dt_pin: int
+    _sw_pin: int
+    _resolution: Resolution
+    _decoder: Optional[QuadratureDecoder]
+    _switch_pipeline: SwitchPipeline
+    _switch_callbacks: CallbackRegistry[ButtonState]
+    _rotation_callbacks: CallbackRegistry[Direction]
+    _metrics: metrics.DeviceMetrics
+
+    def __init__(
+            self, clk_pin: int, dt_pin: int, sw_pin: int, *, logging_identifier: str = None,
+            resolution: Resolution = FULL_STEP, switch_stages: Sequence[SwitchStage] = (),
+            switch_settle_time: float = 0.005, scheduler: Scheduler = None, auto_open: bool = True
+    ) -> None:
+        """
+        Constructs a controller for a KY040 rotary encoder.
+
+        :param clk_pin: The gpio pin connected to the encoder's CLK pin.
+        :param dt_pin: The gpio pin connected to the encoder's DT pin.
+        :param sw_pin: The gpio pin connected to the encoder's SW pin.
+        :param logging_identifier: Prefix for messages logged about this encoder.
+        :param resolution: The number of quarter steps per rotation event: FULL_STEP (one event per detent),
+                HALF_STEP or QUARTER_STEP.
+        :param switch_stages: Gesture stages (such as LongPress or DoubleClick) whose events are passed to switch
+                event callbacks.
+        :param switch_settle_time: The time in seconds the switch must be stable before a press or release is
+                reported.
+        :param scheduler: The scheduler running the switch's debounce and gesture timers. Defaults to the
+                scheduler shared by all devices.
+        :param auto_open: If True, the pins are set up immediately. Otherwise no GPIO is touched until open is
+                called, or the encoder is opened along with other devices by open_devices.
+        """
+        self._clk_pin = clk_pin
+        self._dt_pin = dt_pin
+        self._sw_pin = sw_pin
+        self._resolution = resolution
+        self._decoder = None
         self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._switch_callbacks = CallbackRegistry(self._log_switch_callback_error)
+        self._rotation_callbacks = CallbackRegistry(self._log_rotation_callback_error)
+        self._metrics = metrics.register(self._log_id[1:-1], self.__class__.__name__)
+        self._switch_pipeline = SwitchPipeline(
+            switch_stages, debouncer=Debouncer(switch_settle_time), scheduler=scheduler,
+            logging_identifier=f"{self._log_id[1:-1]} switch")
+        self._switch_pipeline.add_callback(self._switch_event)
+        if auto_open:
+            self.open()
+
+    @property
+    def pin_setups(self) -> List[PinSetup]:
+        """
+        :return: Returns the pins this encoder sets up when opened.
+        """
+        return [PinSetup(pin, IN, PUD_DOWN) for pin in (self._clk_pin, self._dt_pin, self._sw_pin)]
+
+    @property
+    def is_open(self) -> bool:
+        return self._decoder is not None
+
+    def open(self, *, pins_ready: bool = False) -> None:
+        """
+        Sets up the encoder's pins and starts detecting edges. Does nothing if already open.
+
+        :param pins_ready: If True, the pins have already been set up (by open_devices), and only edge detection
+                is started.
+        """
+        if self._decoder is not None:
+            return
+        clk_pin, dt_pin, sw_pin = self._clk_pin, self._dt_pin, self._sw_pin
+        gpio = get_backend()
+        gpio_input = gpio.input
+        if not pins_ready:
+            gpio.setmode(BOARD)
+            setup_pins(self.pin_setups, gpio=gpio)
+        decoder = self._decoder = QuadratureDecoder(
+            (gpio_input(clk_pin) << 1) | gpio_input(dt_pin), resolution=self._resolution)
+        switch_pipeline = self._switch_pipeline
+        switch_pipeline.reset(PRESSED if not gpio_input(sw_pin) else RELEASED)
+        device_metrics = self._metrics
+        device_metrics.add_gauge("position", lambda: decoder.position)
+        device_metrics.add_gauge("invalid_transitions", lambda: decoder.invalid_transitions)
 
         def switch_callback(_) -> None:
-            current_state = gpio_input(sw_pin)  # Read the current state of the button pin
-            if current_state != self._sw_state:
-                self._invoke_switch_callbacks(PRESSED if not current_state else RELEASED)
-            self._sw_state = current_state
-
-        def rotation_callback(pin: int) -> None:
-            current_state = gpio_input(pin)  # Read the current state of the button pin
-            last = (self._clk_state, self._dt_state)
-            if pin == dt_pin:
-                self._dt_state = current_state
-            elif pin == clk_pin:
-                self._clk_state = current_state
-            current = (self._clk_state, self._dt_state)
-            if last != current and all(current):
-                self._invoke_rotation_callbacks(FORWARD if last[0] else BACKWARD)
-
-        add_event_detect(clk_pin, BOTH, callback=rotation_callback, bouncetime=1)
-        add_event_detect(dt_pin, BOTH, callback=rotation_callback, bouncetime=1)
-        add_event_detect(sw_pin, BOTH, callback=switch_callback, bouncetime=1)
+            # The level is sampled as close to the edge as possible; the pipeline waits for it to settle
+            switch_pipeline.edge(PRESSED if not gpio_input(sw_pin) else RELEASED)
+
+        decode = decoder.update
+
+        def rotation_callback(_) -> None:
+            # Sample both pins rather than trusting the edge, so edges missed or reordered by the edge detection
+            # thread show up as invalid transitions instead of phantom steps
+            steps = decode((gpio_input(clk_pin) << 1) | gpio_input(dt_pin))
+            if metrics.enabled:
+                device_metrics.count("edges")
+            if steps:
+                direction = FORWARD if steps > 0 else BACKWARD
+                for _ in range(abs(steps)):
+                    self._invoke_rotation_callbacks(direction)
+
+        # No bouncetime: contact bounce is rejected by the decoder, while a bouncetime would drop real edges
+        gpio.add_event_detect(clk_pin, BOTH, callback=rotation_callback)
+        gpio.add_event_detect(dt_pin, BOTH, callback=rotation_callback)
+        # No bouncetime either: the switch is debounced on edge timestamps by its pipeline
+        gpio.add_event_detect(sw_pin, BOTH, callback=switch_callback)
         debug(f"{self._log_id} Initialized with clk={clk_pin};dt={dt_pin};sw={sw_pin}")
 
-    def add_switch_callback(self, callback: SwitchCallback) -> None:
-        self._switch_callbacks.append(callback)
+    def close(self) -> None:
+        """
+        Stops detecting edges and the switch pipeline's timers. Callbacks stay registered, and are invoked again if
+        the encoder is reopened.
+        """
+        if self._decoder is None:
+            return
+        gpio = get_backend()
+        for pin in (self._clk_pin, self._dt_pin, self._sw_pin):
+            gpio.remove_event_detect(pin)
+        self._switch_pipeline.close()
+        self._decoder = None
+
+    @property
+    def position(self) -> int:
+        """
+        :return: Returns the net number of steps rotated since opening, positive being forward.
+        """
+        return self._decoder.position if self._decoder is not None else 0
+
+    @property
+    def invalid_transitions(self) -> int:
+        """
+        :return: Returns the number of invalid quadrature transitions rejected as noise.
+        """
+        return self._decoder.invalid_transitions if self._decoder is not None else 0
 
-    def add_rotation_callback(self, callback: RotationCallback) -> None:
-        self._rotation_callbacks.append(callback)
+    @property
+    def switch_state(self) -> ButtonState:
+        """
+        :return: Returns the debounced state of the switch.
+        """
+        return self._switch_pipeline.state
+
+    def add_switch_callback(self, callback: SwitchCallback) -> Subscription[ButtonState]:
+        """
+        Registers a callback to be invoked with PRESSED or RELEASED whenever the debounced switch state changes.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._switch_callbacks.subscribe(callback)
+
+    def add_switch_event_callback(self, callback: SwitchEventCallback) -> Subscription[SwitchEvent]:
+        """
+        Registers a callback to be invoked with every event from the switch's pipeline: PRESS and RELEASE, and the
+        gestures detected by the stages the encoder was constructed with.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._switch_pipeline.add_callback(callback)
+
+    def add_rotation_callback(self, callback: RotationCallback) -> Subscription[Direction]:
+        """
+        Registers a callback to be invoked with FORWARD or BACKWARD for every step the encoder is turned.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._rotation_callbacks.subscribe(callback)
+
+    def _switch_event(self, event: SwitchEvent) -> None:
+        if event.kind == PRESS:
+            self._invoke_switch_callbacks(PRESSED)
+        elif event.kind == RELEASE:
+            self._invoke_switch_callbacks(RELEASED)
 
     def _invoke_switch_callbacks(self, switch_state: ButtonState) -> None:
-        debug(f"{self._log_id} Switch state changed, now is {switch_state}. Invoking callbacks.")
-        for callback in self._switch_callbacks:
-            try:
-                callback(switch_state)
-            except RuntimeError as e:
-                error(f"{self._log_id} Switch callback threw an exception: {e}")
+        debug("%s Switch state changed, now is %s. Invoking callbacks.", self._log_id, switch_state)
+        if metrics.enabled:
+            self._metrics.count("switch_events")
+            self._metrics.invoke_callbacks(
+                self._switch_callbacks.callbacks, switch_state, self._log_switch_callback_error)
+            return
+        self._switch_callbacks.invoke(switch_state)
 
     def _invoke_rotation_callbacks(self, direction: Direction) -> None:
-        debug(f"{self._log_id} {direction} Direction event occurred. Invoking callbacks.")
-        for callback in self._rotation_callbacks:
-            try:
-                callback(direction)
-            except RuntimeError as e:
-                error(f"{self._log_id} Direction callback threw an exception: {e}")
+        debug("%s %s Direction event occurred. Invoking callbacks.", self._log_id, direction)
+        if metrics.enabled:
+            self._metrics.count("rotation_events")
+            self._metrics.invoke_callbacks(
+                self._rotation_callbacks.callbacks, direction, self._log_rotation_callback_error)
+            return
+        self._rotation_callbacks.invoke(direction)
+
+    def _log_switch_callback_error(self, e: Exception) -> None:
+        error("%s Switch callback threw an exception: %s", self._log_id, e)
+
+    def _log_rotation_callback_error(self, e: Exception) -> None:
+        error("%s Direction callback threw an exception: %s", self._log_id, e)
+
+
+class EncoderAcceleration:
+    """
+    Velocity curve for accelerated rotary encoder stepping. Slow turns move one position per detent, while fast
+    spins move several, so that a wide range can be covered in a few turns without losing fine control.
+    """
+    _curve: Callable[[float], float]
+    _slow_velocity: float
+    _fast_velocity: float
+    _max_multiplier: float
+    _burst_window: float
+
+    def __init__(
+            self, curve: Callable[[float], float] = None, *, slow_velocity: float = 5, fast_velocity: float = 50,
+            max_multiplier: float = 10, burst_window: float = 0.05
+    ) -> None:
+        """
+        :param curve: A function mapping rotation velocity (detents per second) to positions moved per detent.
+                Defaults to a linear ramp from 1 at slow_velocity to max_multiplier at fast_velocity.
+        :param slow_velocity: The velocity at or below which each detent moves one position.
+        :param fast_velocity: The velocity at or above which each detent moves max_multiplier positions.
+        :param max_multiplier: The most positions a single detent may move.
+        :param burst_window: The time in seconds over which detents are gathered into a single update.
+        """
+        if not 0 <= slow_velocity < fast_velocity:
+            raise ValueError(f"slow_velocity must be non-negative and less than fast_velocity, "
+                             f"were {slow_velocity} and {fast_velocity}")
+        if max_multiplier < 1:
+            raise ValueError(f"max_multiplier must be at least 1, was {max_multiplier}")
+        self._curve = curve or self._linear_curve
+        self._slow_velocity = slow_velocity
+        self._fast_velocity = fast_velocity
+        self._max_multiplier = max_multiplier
+        self._burst_window = burst_window
+
+    @property
+    def burst_window(self) -> float:
+        return self._burst_window
+
+    def positions_per_detent(self, velocity: float) -> int:
+        """
+        :param velocity: The rotation velocity in detents per second.
+        :return: Returns the number of positions a detent turned at the velocity moves, at least 1.
+        """
+        return max(1, round(self._curve(velocity)))
+
+    def _linear_curve(self, velocity: float) -> float:
+        fraction = (velocity - self._slow_velocity) / (self._fast_velocity - self._slow_velocity)
+        return 1 + clamp(fraction, 0, 1) * (self._max_multiplier - 1)
 
 
 class RotaryEncoderPercentageInput(PercentageInput):
+    _burst_task: Optional[ScheduledTask]
+
     def __init__(
             self, rotary_encoder: RotaryEncoderKY040, min_rotary_position: int, max_rotary_position: int,
-            initial_rotary_position: int = 0, *args, **kwargs
+            initial_rotary_position: int = 0, *args, acceleration: EncoderAcceleration = None,
+            scheduler: Scheduler = None, **kwargs
     ) -> None:
+        """
+        Constructs an input whose percentage is the position of a rotary encoder within a range.
+
+        :param rotary_encoder: The encoder to follow.
+        :param min_rotary_position: The position corresponding to 0%.
+        :param max_rotary_position: The position corresponding to 100%.
+        :param initial_rotary_position: The starting position.
+        :param acceleration: If provided, detents move further the faster the encoder is spun, and the percentage
+                is updated once per burst of detents rather than once per detent.
+        :param scheduler: The scheduler used to gather bursts of detents when accelerated. Defaults to the
+                scheduler shared by all inputs.
+        """
         initial_percent = calculate_percentage(initial_rotary_position, min_rotary_position, max_rotary_position)
         super(RotaryEncoderPercentageInput, self).__init__(*args, initial_percent=initial_percent, **kwargs)
         container = {
             "position": clamp(initial_rotary_position, min_rotary_position, max_rotary_position)
         }
+        self._burst_task = None
 
-        def rotary_encoder_rotation_handler(direction: Direction) -> None:
-            current_position = clamp(
-                container["position"] + (1 if direction == FORWARD else -1),
-                min_rotary_position,
-                max_rotary_position
-            )
+        def move(steps: int) -> None:
+            current_position = clamp(container["position"] + steps, min_rotary_position, max_rotary_position)
             self._current_percent = calculate_percentage(current_position, min_rotary_position, max_rotary_position)
             container["position"] = current_position
             self._invoke_all_callbacks()
 
-        rotary_encoder.add_rotation_callback(rotary_encoder_rotation_handler)
+        if acceleration is None:
+            def rotary_encoder_rotation_handler(direction: Direction) -> None:
+                move(1 if direction == FORWARD else -1)
+        else:
+            scheduler = scheduler or get_default_scheduler()
+            clock = scheduler.clock
+            lock = Lock()
+            burst = {"steps": 0, "last_detent_time": None, "last_direction": None}
+
+            def flush_burst() -> None:
+                with lock:
+                    steps, burst["steps"] = burst["steps"], 0
+                if clamp(container["position"] + steps, min_rotary_position, max_rotary_position) != container["position"]:
+                    move(steps)
+
+            task = self._burst_task = scheduler.schedule(flush_burst, None, name=f"{self._log_id} burst")
+
+            def rotary_encoder_rotation_handler(direction: Direction) -> None:
+                now = clock()
+                last_detent_time = burst["last_detent_time"]
+                if last_detent_time is None or direction != burst["last_direction"] or now <= last_detent_time:
+                    velocity = 0
+                else:
+                    velocity = 1 / (now - last_detent_time)
+                burst["last_detent_time"] = now
+                burst["last_direction"] = direction
+                positions = acceleration.positions_per_detent(velocity)
+                with lock:
+                    burst["steps"] += positions if direction == FORWARD else -positions
+                # Only starts a burst window when none is waiting, atomically with respect to the scheduler running
+                # flush_burst: steps added while it runs are flushed by a fresh window
+                task.wake(acceleration.burst_window)
+
+        self._source_subscriptions.append(rotary_encoder.add_rotation_callback(rotary_encoder_rotation_handler))
+
+    def close(self) -> None:
+        """
+        Stops following the encoder. Detents in a burst not yet applied are dropped.
+        """
+        if self._burst_task is not None:
+            self._burst_task.cancel()
+        super().close()
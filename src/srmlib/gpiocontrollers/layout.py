@@ -0,0 +1,480 @@
+"""
+Declarative construction of a layout's encoders, inputs and motor shields from a JSON or TOML configuration.
+
+    mode = "BOARD"                  # Numbering of the pins below: "BOARD" (default) or "BCM"
+
+    [encoders.knob1]
+    clk = 11
+    dt = 13
+    sw = 15
+
+    [inputs.throttle1]
+    type = "encoder"                # A RotaryEncoderPercentageInput
+    encoder = "knob1"
+    min = 0
+    max = 50
+
+    [inputs.throttle1_momentum]
+    type = "rate_limited"           # A RateLimitedPercentageInput
+    source = "throttle1"
+    rate = 20
+
+    [motors.cab1]
+    direction = 16
+    pwm = 12
+    pwm_mode = "sign_magnitude"     # Or "locked_antiphase", matching how the motor shield is wired
+
+The whole configuration is validated before any device is built: every pin is translated to BOARD numbering and
+recorded in a PinIndex, so that two devices claiming the same pin, or a pin which is not a GPIO pin, is reported
+up front. Devices are then constructed without touching GPIO and opened together by open_devices, which sets up
+every pin in a handful of batched calls.
+
+Layout.reload applies a changed configuration by rebuilding only the devices whose settings (or whose sources'
+settings) changed, leaving every other device, and anything holding on to it, untouched.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from srmlib.gpiocontrollers.gpio import BCM, BCM_TO_BOARD, BOARD, BOARD_TO_BCM, open_devices
+from srmlib.gpiocontrollers.inputs import (
+    EncoderAcceleration, PercentageInput, RateLimitedPercentageInput, RotaryEncoderKY040, RotaryEncoderPercentageInput
+)
+from srmlib.gpiocontrollers.motorshields import LOCKED_ANTIPHASE, SIGN_MAGNITUDE, CytronMD10C, MotorShield
+from srmlib.gpiocontrollers.pwm import PigpioPWMBackend, PWMBackend
+
+_MODES = {"BOARD": BOARD, "BCM": BCM}
+_SECTIONS = ("encoders", "inputs", "motors")
+_TOP_LEVEL_KEYS = {"mode", "pigpio", *_SECTIONS}
+_ACCELERATION_KEYS = ("slow_velocity", "fast_velocity", "max_multiplier", "burst_window")
+
+
+class LayoutError(ValueError):
+    """
+    Raised when a layout configuration is invalid.
+    """
+    pass
+
+
+class PinIndex:
+    """
+    Records which device claims each pin, by BOARD number.
+    """
+    _mode: int
+    _owners: Dict[int, Tuple[str, str]]
+
+    def __init__(self, mode: int = BOARD) -> None:
+        """
+        :param mode: The numbering pins are claimed with, BOARD or BCM.
+        """
+        if mode not in {BOARD, BCM}:
+            raise ValueError(f"mode must be BOARD or BCM, was {mode}")
+        self._mode = mode
+        self._owners = {}
+
+    def to_board(self, pin: int) -> int:
+        """
+        :return: Returns the BOARD number of a pin given in this index's numbering.
+        :raises LayoutError: Raised if the pin is not a GPIO pin.
+        """
+        if self._mode == BCM:
+            if pin not in BCM_TO_BOARD:
+                raise LayoutError(f"BCM {pin} is not a GPIO pin")
+            return BCM_TO_BOARD[pin]
+        if pin not in BOARD_TO_BCM:
+            raise LayoutError(f"BOARD pin {pin} is not a GPIO pin")
+        return pin
+
+    def claim(self, pin: int, device: str, role: str) -> int:
+        """
+        :param pin: The pin, in this index's numbering.
+        :param device: The name of the device claiming the pin.
+        :param role: What the device uses the pin for, such as "clk".
+        :return: Returns the BOARD number of the pin.
+        :raises LayoutError: Raised if the pin is not a GPIO pin, or is already claimed.
+        """
+        board_pin = self.to_board(pin)
+        owner = self._owners.get(board_pin)
+        if owner is not None:
+            raise LayoutError(f"{device}.{role} and {owner[0]}.{owner[1]} both claim BOARD pin {board_pin} "
+                              f"(BCM {BOARD_TO_BCM[board_pin]})")
+        self._owners[board_pin] = (device, role)
+        return board_pin
+
+    def owner(self, board_pin: int) -> Optional[Tuple[str, str]]:
+        """
+        :return: Returns the (device, role) claiming a BOARD pin, or None if it is free.
+        """
+        return self._owners.get(board_pin)
+
+    def pins_of(self, device: str) -> Dict[str, int]:
+        """
+        :return: Returns the BOARD pins claimed by a device, keyed by role.
+        """
+        return {role: pin for pin, (owner, role) in self._owners.items() if owner == device}
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+
+class _DeviceSpec(NamedTuple):
+    section: str
+    kind: str
+    pins: Tuple[Tuple[str, int], ...]
+    options: Tuple[Tuple[str, Any], ...]
+    sources: Tuple[str, ...]
+
+
+class LayoutChanges(NamedTuple):
+    """
+    The devices affected by a reload, by name.
+    """
+    added: List[str]
+    removed: List[str]
+    rebuilt: List[str]
+    kept: List[str]
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _take(settings: Dict[str, Any], name: str, key: str, *, default: Any = ..., types: tuple = (int, float)) -> Any:
+    if key not in settings:
+        if default is ...:
+            raise LayoutError(f"{name} is missing {key!r}")
+        return default
+    value = settings.pop(key)
+    if not isinstance(value, types) or isinstance(value, bool) and bool not in types:
+        raise LayoutError(f"{name}.{key} must be of type {' or '.join(t.__name__ for t in types)}, was {value!r}")
+    return value
+
+
+def _mapping(value: Any, name: str) -> Mapping[str, Any]:
+    if not isinstance(value, Mapping):
+        raise LayoutError(f"{name} must be a table of settings, was {value!r}")
+    return value
+
+
+def _parse(config: Mapping[str, Any]) -> Tuple[Dict[str, _DeviceSpec], PinIndex, Dict[str, Any]]:
+    config = _mapping(config, "The layout")
+    unknown = set(config) - _TOP_LEVEL_KEYS
+    if unknown:
+        raise LayoutError(f"Unknown top level keys {sorted(unknown)}")
+    mode_name = config.get("mode", "BOARD")
+    if mode_name not in _MODES:
+        raise LayoutError(f"mode must be one of {sorted(_MODES)}, was {mode_name!r}")
+    pin_index = PinIndex(_MODES[mode_name])
+    specs: Dict[str, _DeviceSpec] = {}
+
+    def add(section: str, name: str, kind: str, pins: Dict[str, int], options: Dict[str, Any],
+            sources: Tuple[str, ...] = ()) -> None:
+        if name in specs:
+            raise LayoutError(f"{name} is defined in both {specs[name].section} and {section}")
+        claimed = tuple((role, pin_index.claim(pin, name, role)) for role, pin in pins.items())
+        specs[name] = _DeviceSpec(section, kind, claimed, _freeze(options), sources)
+
+    for name, raw in _mapping(config.get("encoders", {}), "encoders").items():
+        settings = dict(_mapping(raw, name))
+        pins = {role: _take(settings, name, role, types=(int,)) for role in ("clk", "dt", "sw")}
+        options = {"resolution": _take(settings, name, "resolution", default=4, types=(int,))}
+        _reject_unknown(name, settings)
+        add("encoders", name, "ky040", pins, options)
+
+    for name, raw in _mapping(config.get("inputs", {}), "inputs").items():
+        settings = dict(_mapping(raw, name))
+        kind = _take(settings, name, "type", types=(str,))
+        if kind == "encoder":
+            source = _take(settings, name, "encoder", types=(str,))
+            options = {
+                "min": _take(settings, name, "min", types=(int,)),
+                "max": _take(settings, name, "max", types=(int,)),
+                "initial": _take(settings, name, "initial", default=0, types=(int,)),
+                "acceleration": _parse_acceleration(
+                    name, _take(settings, name, "acceleration", default=False, types=(bool, dict))),
+            }
+        elif kind == "rate_limited":
+            source = _take(settings, name, "source", types=(str,))
+            options = {
+                "rate": _take(settings, name, "rate"),
+                "step_interval": _take(settings, name, "step_interval", default=0.25),
+                "initial": _take(settings, name, "initial", default=0),
+            }
+        else:
+            raise LayoutError(f"{name}.type must be 'encoder' or 'rate_limited', was {kind!r}")
+        _reject_unknown(name, settings)
+        add("inputs", name, kind, {}, options, (source,))
+
+    for name, raw in _mapping(config.get("motors", {}), "motors").items():
+        settings = dict(_mapping(raw, name))
+        kind = _take(settings, name, "type", default="cytron", types=(str,))
+        if kind != "cytron":
+            raise LayoutError(f"{name}.type must be 'cytron', was {kind!r}")
+        pins = {role: _take(settings, name, role, types=(int,)) for role in ("direction", "pwm")}
+        options = {
+            "frequency": _take(settings, name, "frequency", default=200),
+            "pwm_backend": _take(settings, name, "pwm_backend", default="software", types=(str,)),
+            "pwm_mode": _take(settings, name, "pwm_mode", default=SIGN_MAGNITUDE, types=(str,)),
+        }
+        if options["pwm_backend"] not in {"software", "pigpio"}:
+            raise LayoutError(f"{name}.pwm_backend must be 'software' or 'pigpio', was {options['pwm_backend']!r}")
+        if options["pwm_mode"] not in {SIGN_MAGNITUDE, LOCKED_ANTIPHASE}:
+            raise LayoutError(
+                f"{name}.pwm_mode must be '{SIGN_MAGNITUDE}' or '{LOCKED_ANTIPHASE}', was {options['pwm_mode']!r}")
+        _reject_unknown(name, settings)
+        add("motors", name, kind, pins, options)
+
+    for name, spec in specs.items():
+        for source in spec.sources:
+            expected = "encoders" if spec.kind == "encoder" else "inputs"
+            if source not in specs or specs[source].section != expected:
+                raise LayoutError(f"{name} refers to {source!r}, which is not defined in {expected}")
+    _check_acyclic(specs)
+    return specs, pin_index, dict(_mapping(config.get("pigpio", {}), "pigpio"))
+
+
+def _parse_acceleration(name: str, acceleration: Any) -> Any:
+    if not isinstance(acceleration, dict):
+        return acceleration
+    settings = dict(acceleration)
+    name = f"{name}.acceleration"
+    options = {key: _take(settings, name, key) for key in _ACCELERATION_KEYS if key in settings}
+    _reject_unknown(name, settings)
+    try:
+        EncoderAcceleration(**options)
+    except ValueError as e:
+        raise LayoutError(f"{name} is invalid: {e}") from None
+    return options or True  # An empty table asks for the default acceleration
+
+
+def _reject_unknown(name: str, settings: Dict[str, Any]) -> None:
+    if settings:
+        raise LayoutError(f"{name} has unknown settings {sorted(settings)}")
+
+
+def _check_acyclic(specs: Dict[str, _DeviceSpec]) -> None:
+    visiting: Set[str] = set()
+    done: Set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise LayoutError(f"{name} is its own source")
+        visiting.add(name)
+        for source in specs[name].sources:
+            visit(source)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in specs:
+        visit(name)
+
+
+class Layout:
+    """
+    The devices built from a layout configuration, accessible by name.
+    """
+    _specs: Dict[str, _DeviceSpec]
+    _pin_index: PinIndex
+    _devices: Dict[str, Any]
+    _pigpio_settings: Dict[str, Any]
+    _pigpio_backend: Optional[PigpioPWMBackend]
+
+    def __init__(self, config: Mapping[str, Any]) -> None:
+        """
+        Validates a configuration and builds and opens its devices.
+
+        :param config: The configuration, as read from JSON or TOML.
+        :raises LayoutError: Raised if the configuration is invalid. No GPIO has been touched if so.
+        """
+        self._specs, self._pin_index, self._pigpio_settings = _parse(config)
+        self._devices = {}
+        self._pigpio_backend = None
+        self._build(list(self._specs))
+
+    @property
+    def pin_index(self) -> PinIndex:
+        return self._pin_index
+
+    @property
+    def encoders(self) -> Dict[str, RotaryEncoderKY040]:
+        return self._section("encoders")
+
+    @property
+    def inputs(self) -> Dict[str, PercentageInput]:
+        return self._section("inputs")
+
+    @property
+    def motors(self) -> Dict[str, MotorShield]:
+        return self._section("motors")
+
+    def __getitem__(self, name: str) -> Any:
+        return self._devices[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._devices
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._devices)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def reload(self, config: Mapping[str, Any]) -> LayoutChanges:
+        """
+        Applies a changed configuration. Devices whose settings and sources are unchanged are kept as they are;
+        the rest are closed and rebuilt.
+
+        :raises LayoutError: Raised if the new configuration is invalid, in which case nothing is changed.
+        :raises Exception: Raised if building the changed devices fails, in which case they are closed and the
+                devices they were to replace are reopened, leaving the layout as it was.
+        """
+        specs, pin_index, pigpio_settings = _parse(config)
+        if pigpio_settings != self._pigpio_settings and self._pigpio_backend is not None:
+            raise LayoutError("pigpio settings cannot be changed by a reload")
+        kept: Set[str] = set()
+        for name in self._build_order(specs):
+            if (specs[name] == self._specs.get(name)
+                    and all(source in kept for source in specs[name].sources)):
+                kept.add(name)
+        retired = [name for name in self._specs if name not in kept]
+        # Devices with pins are closed to free them for the new devices. Inputs hold no pins, so are only closed
+        # once the new devices have been built, and can be put back untouched if building fails
+        retired_devices = {name: self._devices.pop(name) for name in retired}
+        retired_hardware = [device for name, device in retired_devices.items() if self._specs[name].pins]
+        for device in retired_hardware:
+            device.close()
+        previous = self._specs, self._pin_index, self._pigpio_settings
+        self._specs, self._pin_index, self._pigpio_settings = specs, pin_index, pigpio_settings
+        built = [name for name in specs if name not in kept]
+        try:
+            self._build(built)
+        except Exception:
+            for name in reversed(self._build_order(specs)):
+                if name in built and name in self._devices:
+                    self._retire(name)
+            self._specs, self._pin_index, self._pigpio_settings = previous
+            devices = {**self._devices, **retired_devices}
+            self._devices = {name: devices[name] for name in self._build_order(self._specs)}
+            open_devices(retired_hardware)
+            raise
+        # Dependents first, so that nothing is left following a closed device
+        for name in reversed(self._build_order(previous[0])):
+            device = retired_devices.get(name)
+            if isinstance(device, PercentageInput):
+                device.close()
+        return LayoutChanges(
+            added=[name for name in built if name not in retired],
+            removed=[name for name in retired if name not in specs],
+            rebuilt=[name for name in built if name in retired],
+            kept=[name for name in specs if name in kept],
+        )
+
+    def close(self) -> None:
+        """
+        Closes every device, stopping motors and ramps.
+        """
+        for name in reversed(self._build_order(self._specs)):
+            if name in self._devices:
+                self._retire(name)
+        if self._pigpio_backend is not None:
+            self._pigpio_backend.close()
+            self._pigpio_backend = None
+
+    def _section(self, section: str) -> Dict[str, Any]:
+        return {name: device for name, device in self._devices.items() if self._specs[name].section == section}
+
+    @staticmethod
+    def _build_order(specs: Dict[str, _DeviceSpec]) -> List[str]:
+        order: List[str] = []
+        placed: Set[str] = set()
+
+        def place(name: str) -> None:
+            if name in placed:
+                return
+            for source in specs[name].sources:
+                place(source)
+            placed.add(name)
+            order.append(name)
+
+        for name in specs:
+            place(name)
+        return order
+
+    def _build(self, names: List[str]) -> None:
+        names = set(names)
+        created = []
+        for name in self._build_order(self._specs):
+            if name not in names:
+                continue
+            spec = self._specs[name]
+            pins = dict(spec.pins)
+            options = dict(spec.options)
+            if spec.kind == "ky040":
+                device = RotaryEncoderKY040(
+                    pins["clk"], pins["dt"], pins["sw"], logging_identifier=name, resolution=options["resolution"],
+                    auto_open=False)
+                created.append(device)
+            elif spec.kind == "encoder":
+                acceleration = options["acceleration"]
+                if acceleration:
+                    acceleration = EncoderAcceleration(**dict(acceleration)) if acceleration is not True \
+                        else EncoderAcceleration()
+                device = RotaryEncoderPercentageInput(
+                    self._devices[spec.sources[0]], options["min"], options["max"], options["initial"],
+                    acceleration=acceleration or None, logging_identifier=name)
+            elif spec.kind == "rate_limited":
+                device = RateLimitedPercentageInput(
+                    self._devices[spec.sources[0]], options["rate"], initial_percent=options["initial"],
+                    step_interval=options["step_interval"], logging_identifier=name)
+            else:
+                device = CytronMD10C(
+                    pins["direction"], pins["pwm"], logging_identifier=name, pwm_frequency=options["frequency"],
+                    pwm_backend=self._pwm_backend(options["pwm_backend"]), auto_open=False,
+                    pwm_mode=options["pwm_mode"])
+                created.append(device)
+            self._devices[name] = device
+        open_devices(created)
+
+    def _pwm_backend(self, name: str) -> Optional[PWMBackend]:
+        if name == "software":
+            return None
+        if self._pigpio_backend is None:
+            self._pigpio_backend = PigpioPWMBackend(**self._pigpio_settings)
+        return self._pigpio_backend
+
+    def _retire(self, name: str) -> None:
+        device = self._devices.pop(name)
+        if isinstance(device, (RotaryEncoderKY040, CytronMD10C, PercentageInput)):
+            device.close()
+
+
+def read_layout_config(path: str) -> Dict[str, Any]:
+    """
+    Reads a layout configuration from a .json or .toml file. TOML requires Python 3.11, or the tomli package.
+    """
+    if path.endswith(".json"):
+        with open(path) as file:
+            return json.load(file)
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise LayoutError("Reading TOML layouts requires Python 3.11 or the tomli package") from None
+        with open(path, "rb") as file:
+            return tomllib.load(file)
+    raise LayoutError(f"Layout files must be .json or .toml, was {path}")
+
+
+def load_layout(path: str) -> Layout:
+    """
+    Reads a layout configuration file and builds its devices.
+    """
+    return Layout(read_layout_config(path))
@@ -0,0 +1,298 @@
+"""
+Low-overhead instrumentation of srmlib.gpiocontrollers devices.
+
+Every input and motor shield registers a DeviceMetrics on construction. While metrics are disabled (the default)
+the hot paths only check the module level `enabled` flag; once enabled they count events (edges, invalid
+transitions, callbacks, ramp steps, PWM writes), time each callback fan-out into a latency histogram, and record
+callbacks which run longer than `slow_callback_threshold`.
+
+    from srmlib.gpiocontrollers import metrics
+    metrics.enable()
+    ...
+    metrics.snapshot()                      # Nested dictionaries, for logging or JSON
+    metrics.start_metrics_server(9108)      # Text exposition at http://127.0.0.1:9108/metrics
+"""
+from logging import warning
+from threading import Lock, Thread
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+from weakref import WeakSet
+
+T = TypeVar("T")
+
+HISTOGRAM_BUCKETS = 40
+"""The number of buckets in a LatencyHistogram."""
+
+enabled = False
+"""Whether metrics are being collected. Use enable and disable to change."""
+slow_callback_threshold = 0.005
+"""Callbacks taking longer than this many seconds are recorded, and logged, as slow."""
+
+
+def enable(*, slow_callback_threshold_seconds: float = None) -> None:
+    """
+    Starts collecting metrics.
+
+    :param slow_callback_threshold_seconds: If provided, replaces the duration above which a callback is slow.
+    """
+    global enabled, slow_callback_threshold
+    if slow_callback_threshold_seconds is not None:
+        slow_callback_threshold = slow_callback_threshold_seconds
+    enabled = True
+
+
+def disable() -> None:
+    """
+    Stops collecting metrics. Values collected so far are kept.
+    """
+    global enabled
+    enabled = False
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations in nanoseconds, with power of two buckets.
+    """
+    __slots__ = ("_buckets", "count", "total_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self._buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @classmethod
+    def from_buckets(cls, buckets: List[int], total_ns: int, max_ns: int) -> "LatencyHistogram":
+        """
+        Rebuilds a histogram from its bucket counts, such as those kept by another process.
+        """
+        if len(buckets) != HISTOGRAM_BUCKETS:
+            raise ValueError(f"A histogram has {HISTOGRAM_BUCKETS} buckets, was given {len(buckets)}")
+        histogram = cls()
+        histogram._buckets = list(buckets)
+        histogram.count = sum(buckets)
+        histogram.total_ns = total_ns
+        histogram.max_ns = max_ns
+        return histogram
+
+    @staticmethod
+    def bucket_index(duration_ns: int) -> int:
+        """
+        :return: Returns the index of the bucket a duration is counted in.
+        """
+        return min(duration_ns.bit_length(), HISTOGRAM_BUCKETS - 1)
+
+    def record(self, duration_ns: int) -> None:
+        self._buckets[min(duration_ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile(self, fraction: float) -> int:
+        """
+        :return: Returns an upper bound on the duration below which the given fraction of samples fall.
+        """
+        if not self.count:
+            return 0
+        threshold = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self._buckets):
+            seen += bucket
+            if seen >= threshold:
+                return min(1 << index, self.max_ns)
+        return self.max_ns
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000 if self.count else 0,
+            "p50_us": self.percentile(0.5) / 1000,
+            "p99_us": self.percentile(0.99) / 1000,
+            "max_us": self.max_ns / 1000,
+        }
+
+
+class DeviceMetrics:
+    """
+    Metrics collected for a single device.
+    """
+    __slots__ = ("name", "kind", "counters", "gauges", "fan_out", "slow_callbacks", "_lock", "__weakref__")
+
+    def __init__(self, name: str, kind: str) -> None:
+        self.name = name
+        self.kind = kind
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.fan_out = LatencyHistogram()
+        self.slow_callbacks: Dict[str, Tuple[int, int]] = {}
+        self._lock = Lock()
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        counters = self.counters
+        counters[counter] = counters.get(counter, 0) + amount
+
+    def add_gauge(self, gauge: str, read: Callable[[], float]) -> None:
+        """
+        Reports a value the device already tracks, read only when a snapshot is taken.
+
+        :param gauge: The name of the value.
+        :param read: A function returning the current value.
+        """
+        self.gauges[gauge] = read
+
+    def invoke_callbacks(
+            self, callbacks: Iterable[Callable[[T], None]], value: T, on_error: Callable[[Exception], None]
+    ) -> None:
+        """
+        Invokes callbacks as a device's dispatch loop does, timing the fan-out and each callback.
+
+        :param callbacks: The callbacks to invoke.
+        :param value: The value to invoke them with.
+        :param on_error: Called with any exception a callback raises, matching the devices' own callback registries.
+        """
+        threshold_ns = int(slow_callback_threshold * 1_000_000_000)
+        invoked = 0
+        start = previous = perf_counter_ns()
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                self.count("callback_errors")
+                on_error(e)
+            now = perf_counter_ns()
+            if now - previous > threshold_ns:
+                self._record_slow_callback(callback, now - previous)
+            previous = now
+            invoked += 1
+        self.count("callbacks_invoked", invoked)
+        self.fan_out.record(previous - start)
+
+    def _record_slow_callback(self, callback: Callable, duration_ns: int) -> None:
+        name = getattr(callback, "__qualname__", None) or repr(callback)
+        module = getattr(callback, "__module__", None)
+        if module:
+            name = f"{module}.{name}"
+        with self._lock:
+            count, worst_ns = self.slow_callbacks.get(name, (0, 0))
+            self.slow_callbacks[name] = (count + 1, max(worst_ns, duration_ns))
+        warning("%s Slow callback %s took %.3f ms", self.name, name, duration_ns / 1_000_000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            slow_callbacks = {
+                name: {"count": count, "max_ms": worst_ns / 1_000_000}
+                for name, (count, worst_ns) in self.slow_callbacks.items()
+            }
+        return {
+            "kind": self.kind,
+            "counters": dict(self.counters),
+            "gauges": {gauge: read() for gauge, read in self.gauges.items()},
+            "callback_fan_out": self.fan_out.snapshot(),
+            "slow_callbacks": slow_callbacks,
+        }
+
+
+_devices: "WeakSet[DeviceMetrics]" = WeakSet()
+_devices_lock = Lock()
+
+
+def register(name: str, kind: str) -> DeviceMetrics:
+    """
+    Creates the metrics for a device. They are included in snapshots for as long as the device holds on to them.
+
+    :param name: The device's logging identifier.
+    :param kind: The type of device, usually its class name.
+    """
+    device_metrics = DeviceMetrics(name, kind)
+    with _devices_lock:
+        _devices.add(device_metrics)
+    return device_metrics
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    :return: Returns the metrics of every live device, keyed by logging identifier.
+    """
+    with _devices_lock:
+        devices = sorted(_devices, key=lambda device: device.name)
+    result = {}
+    for device in devices:
+        name = device.name
+        suffix = 2
+        while name in result:
+            name = f"{device.name}#{suffix}"
+            suffix += 1
+        result[name] = device.snapshot()
+    return result
+
+
+def format_text(metrics_snapshot: Dict[str, Dict[str, Any]] = None) -> str:
+    """
+    :return: Returns a snapshot in a plain text exposition format, one metric per line.
+    """
+    metrics_snapshot = snapshot() if metrics_snapshot is None else metrics_snapshot
+    lines: List[str] = []
+    for device, values in metrics_snapshot.items():
+        labels = f'device="{device}",kind="{values["kind"]}"'
+        for counter, value in sorted(values["counters"].items()):
+            lines.append(f"srmlib_{counter}_total{{{labels}}} {value}")
+        for gauge, value in sorted(values["gauges"].items()):
+            lines.append(f"srmlib_{gauge}{{{labels}}} {value:g}")
+        for statistic, value in values["callback_fan_out"].items():
+            lines.append(f"srmlib_callback_fan_out_{statistic}{{{labels}}} {value:g}")
+        for callback, slow in values["slow_callbacks"].items():
+            lines.append(f'srmlib_slow_callbacks_total{{{labels},callback="{callback}"}} {slow["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Serves metrics over HTTP from a background thread: text at /metrics and JSON at /metrics.json.
+    """
+
+    def __init__(self, port: int, host: str = "127.0.0.1") -> None:
+        # Imported here, as http.server alone takes longer to import than the rest of the library
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from json import dumps
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body, content_type = format_text().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = dumps(snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, name="srmlib-metrics", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1") -> MetricsServer:
+    """
+    Starts serving metrics over HTTP. Metrics must also be enabled to be collected.
+
+    :param port: The port to listen on, or 0 for any free port.
+    :param host: The interface to listen on. Defaults to localhost only.
+    """
+    return MetricsServer(port, host)
@@ -0,0 +1,284 @@
+"""
+Momentum profiles describing how a RateLimitedPercentageInput moves towards its desired percentage.
+
+Profiles are integrated over the measured time between ramp steps, so the effective rates do not depend on how
+often (or how punctually) the ramp is stepped.
+"""
+from abc import ABC, abstractmethod
+from math import copysign, sqrt
+from typing import Callable, List, NamedTuple, Tuple
+
+# How close (in percent) a ramp coming to rest must be to the desired percentage to be treated as having arrived
+_ARRIVAL_TOLERANCE = 1e-6
+# Precision to which JerkLimitedMomentum searches for the strongest acceleration which can still stop in time
+_BISECTIONS = 40
+
+
+class RampState(NamedTuple):
+    """
+    The motion of a ramp, carried from one advance to the next. A settled ramp has the default (zero) state.
+    """
+    velocity: float = 0
+    """The rate of change in percent per second."""
+    acceleration: float = 0
+    """The change in rate in percent per second per second. Left at 0 by profiles which do not limit jerk."""
+
+
+class MomentumProfile(ABC):
+    """
+    Describes how a percentage moves towards a desired percentage over time.
+    """
+
+    @abstractmethod
+    def advance(self, current: float, desired: float, state: RampState, dt: float) -> Tuple[float, RampState]:
+        """
+        Advances a ramp by a period of time.
+
+        :param current: The current percentage.
+        :param desired: The percentage being moved towards.
+        :param state: The ramp's motion, as returned by the previous advance.
+        :param dt: The time in seconds since the previous advance.
+        :return: Returns the new percentage and the ramp's new motion. Once the desired percentage has been
+                reached, the percentage must equal it exactly and the state must be the default RampState().
+        """
+        pass
+
+
+def _move_towards(current: float, desired: float, max_change: float) -> float:
+    if abs(desired - current) <= max_change:
+        return desired
+    return current + copysign(max_change, desired - current)
+
+
+class LinearMomentum(MomentumProfile):
+    """
+    Moves at a constant rate, changing direction instantly.
+    """
+    _rate: float
+
+    def __init__(self, rate: float) -> None:
+        """
+        :param rate: The rate of change in percent per second.
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, was {rate}")
+        self._rate = rate
+
+    def advance(self, current: float, desired: float, state: RampState, dt: float) -> Tuple[float, RampState]:
+        new = _move_towards(current, desired, self._rate * dt)
+        return new, RampState() if new == desired else RampState(copysign(self._rate, desired - current))
+
+
+class AccelerationBrakingMomentum(MomentumProfile):
+    """
+    Moves at a constant rate, using separate rates for accelerating (increasing percentage) and braking
+    (decreasing percentage).
+    """
+    _acceleration_rate: float
+    _braking_rate: float
+
+    def __init__(self, acceleration_rate: float, braking_rate: float) -> None:
+        """
+        :param acceleration_rate: The rate of increase in percent per second.
+        :param braking_rate: The rate of decrease in percent per second.
+        """
+        if acceleration_rate <= 0 or braking_rate <= 0:
+            raise ValueError(f"rates must be positive, were {acceleration_rate} and {braking_rate}")
+        self._acceleration_rate = acceleration_rate
+        self._braking_rate = braking_rate
+
+    def advance(self, current: float, desired: float, state: RampState, dt: float) -> Tuple[float, RampState]:
+        rate = self._acceleration_rate if desired > current else self._braking_rate
+        new = _move_towards(current, desired, rate * dt)
+        return new, RampState() if new == desired else RampState(copysign(rate, desired - current))
+
+
+class AccelerationLimitedMomentum(MomentumProfile):
+    """
+    Limits the acceleration (how quickly the rate of change itself may change), easing in and out of every ramp.
+    The rate follows a trapezoidal profile: it changes linearly up to the maximum rate and back down to stop at the
+    desired percentage, and direction reversals slow down before speeding up again. The acceleration itself changes
+    instantly (jerk is not limited), so this is not a true S-curve; see JerkLimitedMomentum for that.
+    """
+    _max_rate: float
+    _acceleration: float
+    _braking_rate: float
+
+    def __init__(self, max_rate: float, acceleration: float, *, braking_rate: float = None) -> None:
+        """
+        :param max_rate: The maximum rate of increase in percent per second.
+        :param acceleration: The maximum change in rate, in percent per second per second.
+        :param braking_rate: The maximum rate of decrease in percent per second. Defaults to max_rate.
+        """
+        braking_rate = max_rate if braking_rate is None else braking_rate
+        if max_rate <= 0 or acceleration <= 0 or braking_rate <= 0:
+            raise ValueError(f"rates must be positive, were {max_rate}, {acceleration} and {braking_rate}")
+        self._max_rate = max_rate
+        self._acceleration = acceleration
+        self._braking_rate = braking_rate
+
+    def advance(self, current: float, desired: float, state: RampState, dt: float) -> Tuple[float, RampState]:
+        velocity = state.velocity
+        distance = desired - current
+        if distance == 0 and abs(velocity) <= self._acceleration * dt:
+            return desired, RampState()
+        limit = self._max_rate if distance > 0 else self._braking_rate
+        # Fastest rate from which the ramp can still ease to a stop at the desired percentage, looking one step
+        # ahead so that braking starts on time rather than a step late
+        stoppable_rate = sqrt(2 * self._acceleration * max(0.0, abs(distance) - abs(velocity) * dt))
+        target_velocity = copysign(min(limit, stoppable_rate), distance)
+        new_velocity = _move_towards(velocity, target_velocity, self._acceleration * dt)
+        new = current + (velocity + new_velocity) / 2 * dt
+        if distance != 0 and (new - desired) * distance >= 0 and new_velocity * distance >= 0:
+            return desired, RampState()
+        return new, RampState(new_velocity)
+
+
+def _constant_jerk_step(velocity: float, acceleration: float, new_acceleration: float, dt: float) \
+        -> Tuple[float, float]:
+    """
+    :return: Returns the distance travelled and the final velocity when the acceleration changes linearly to
+            new_acceleration over dt.
+    """
+    jerk = (new_acceleration - acceleration) / dt
+    distance = velocity * dt + acceleration * dt * dt / 2 + jerk * dt ** 3 / 6
+    return distance, velocity + (acceleration + new_acceleration) / 2 * dt
+
+
+def _stopping_plan(velocity: float, acceleration: float, max_acceleration: float, jerk: float) \
+        -> List[Tuple[float, float]]:
+    """
+    :return: Returns the quickest way to come to rest (with zero acceleration) from a non-negative velocity, as
+            (duration, jerk) phases: decelerate harder, hold the peak deceleration, then ease off.
+    """
+    peak = sqrt(max(0.0, jerk * velocity + acceleration * acceleration / 2))
+    hold = 0.0
+    if peak > max_acceleration:
+        peak = max_acceleration
+        hold = (velocity + acceleration * acceleration / (2 * jerk) - peak * peak / jerk) / peak
+    if acceleration + peak < 0:
+        # Already decelerating harder than the peak, so there is nothing to do but ease off
+        peak = -acceleration
+    return [(max(0.0, (acceleration + peak) / jerk), -jerk), (hold, 0.0), (peak / jerk, jerk)]
+
+
+def _follow(velocity: float, acceleration: float, plan: List[Tuple[float, float]], dt: float) \
+        -> Tuple[float, float, float, bool]:
+    """
+    Follows a plan of (duration, jerk) phases for up to dt.
+
+    :return: Returns the distance travelled, the final velocity and acceleration, and whether the plan finished.
+    """
+    distance = 0.0
+    for duration, jerk in plan:
+        duration = min(duration, dt)
+        distance += velocity * duration + acceleration * duration ** 2 / 2 + jerk * duration ** 3 / 6
+        velocity += acceleration * duration + jerk * duration ** 2 / 2
+        acceleration += jerk * duration
+        dt -= duration
+        if dt <= 0:
+            return distance, velocity, acceleration, False
+    return distance, velocity, acceleration, True
+
+
+def _boundary(predicate: Callable[[float], bool], low: float, high: float) -> float:
+    """
+    Bisects for the point between low and high where predicate changes, given that it differs at the two ends.
+
+    :return: Returns the point nearest the boundary at which predicate holds.
+    """
+    holds_low = predicate(low)
+    for _ in range(_BISECTIONS):
+        middle = (low + high) / 2
+        if predicate(middle) == holds_low:
+            low = middle
+        else:
+            high = middle
+    return low if holds_low else high
+
+
+class JerkLimitedMomentum(MomentumProfile):
+    """
+    Limits both the acceleration and the jerk (how quickly the acceleration itself may change), giving a true
+    S-curve: the rate eases in and out of every change, and the ramp comes to rest at the desired percentage with
+    neither rate nor acceleration left over.
+
+    Each advance picks the strongest acceleration within the jerk limit from which the ramp can still ease to a
+    stop at the desired percentage. A ramp which is asked to stop sooner than it can is brought to rest as quickly
+    as the limits allow, and may then reverse onto the desired percentage.
+    """
+    _max_rate: float
+    _acceleration: float
+    _jerk: float
+    _braking_rate: float
+
+    def __init__(self, max_rate: float, acceleration: float, jerk: float, *, braking_rate: float = None) -> None:
+        """
+        :param max_rate: The maximum rate of increase in percent per second.
+        :param acceleration: The maximum change in rate, in percent per second per second.
+        :param jerk: The maximum change in acceleration, in percent per second per second per second.
+        :param braking_rate: The maximum rate of decrease in percent per second. Defaults to max_rate.
+        """
+        braking_rate = max_rate if braking_rate is None else braking_rate
+        if max_rate <= 0 or acceleration <= 0 or jerk <= 0 or braking_rate <= 0:
+            raise ValueError(
+                f"rates must be positive, were {max_rate}, {acceleration}, {jerk} and {braking_rate}")
+        self._max_rate = max_rate
+        self._acceleration = acceleration
+        self._jerk = jerk
+        self._braking_rate = braking_rate
+
+    def advance(self, current: float, desired: float, state: RampState, dt: float) -> Tuple[float, RampState]:
+        distance = desired - current
+        if distance == 0 and state == RampState() or dt <= 0:
+            return current, state
+        # Work in the direction of the desired percentage, so that it is always ahead
+        sign = 1 if distance > 0 or distance == 0 and state.velocity < 0 else -1
+        remaining = abs(distance)
+        velocity, acceleration = sign * state.velocity, sign * state.acceleration
+        max_acceleration, jerk = self._acceleration, self._jerk
+        limit = self._max_rate if sign > 0 else self._braking_rate
+
+        def can_stop(new_acceleration: float) -> bool:
+            travelled, new_velocity = _constant_jerk_step(velocity, acceleration, new_acceleration, dt)
+            stopping_distance = 0.0
+            if new_velocity > 0 or new_acceleration > 0:
+                stopping_distance = _follow(new_velocity, new_acceleration, _stopping_plan(
+                    max(0.0, new_velocity), new_acceleration, max_acceleration, jerk), float("inf"))[0]
+            return (travelled + stopping_distance <= remaining
+                    and new_velocity + max(0.0, new_acceleration) ** 2 / (2 * jerk) <= limit)
+
+        def can_ease_off(new_acceleration: float) -> bool:
+            # Easing off a deceleration takes away a further new_acceleration ** 2 / (2 * jerk) of rate, which must
+            # not reverse the ramp
+            _, new_velocity = _constant_jerk_step(velocity, acceleration, new_acceleration, dt)
+            return new_acceleration >= 0 or new_acceleration ** 2 <= 2 * jerk * max(0.0, new_velocity)
+
+        lowest = max(acceleration - jerk * dt, -max_acceleration)
+        highest = min(acceleration + jerk * dt, max_acceleration)
+        new_acceleration = None
+        if can_stop(lowest):
+            strongest = highest if can_stop(highest) else _boundary(can_stop, lowest, highest)
+            if can_ease_off(lowest):
+                weakest = lowest
+            elif can_ease_off(strongest):
+                weakest = _boundary(can_ease_off, lowest, strongest)
+            else:
+                weakest = None
+            if weakest is not None and weakest <= strongest:
+                new_acceleration = strongest
+        if new_acceleration is not None:
+            travelled, new_velocity = _constant_jerk_step(velocity, acceleration, new_acceleration, dt)
+            arrived = travelled >= remaining or new_velocity <= 0 and remaining - travelled <= _ARRIVAL_TOLERANCE
+        else:
+            # No acceleration within the limits stops in time, so stop as quickly as possible instead, carrying on
+            # past the desired percentage if need be
+            plan = _stopping_plan(max(0.0, velocity), acceleration, max_acceleration, jerk) \
+                if velocity > 0 or acceleration > 0 else [(-acceleration / jerk, jerk)]
+            travelled, new_velocity, new_acceleration, stopped = _follow(velocity, acceleration, plan, dt)
+            arrived = stopped and abs(remaining - travelled) <= _ARRIVAL_TOLERANCE
+            if stopped:
+                new_velocity = new_acceleration = 0.0
+        if arrived:
+            return desired, RampState()
+        return current + sign * travelled, RampState(sign * new_velocity, sign * new_acceleration)
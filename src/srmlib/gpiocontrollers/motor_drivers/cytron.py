@@ -1,6 +1,7 @@
 from typing import Literal
 
-from RPi.GPIO import PWM, setup, OUT, LOW, output
+from srmlib.gpiocontrollers.gpio import LOW, OUT, GPIOBackend, get_backend
+from srmlib.gpiocontrollers.pwm import PWMBackend, PWMOutput, SoftwarePWMBackend
 
 
 class CytronMD10C:
@@ -20,18 +21,19 @@ class CytronMD10C:
 
     Notes:
     - The Cytron MD10C supports both Sign-Magnitude PWM and Locked-Antiphase PWM. This
-      implementation currently only supports SignMagnitude. See User Manual for details.
+      implementation only supports Sign-Magnitude; for Locked-Antiphase, use
+      srmlib.gpiocontrollers.motorshields.CytronMD10C with pwm_mode=LOCKED_ANTIPHASE. See User Manual for details.
     """
-    # TODO: Add support for Locked-Antiphase PWM
 
+    _gpio: GPIOBackend
     _duty_cycle: float
-    _pwm: PWM
+    _pwm: PWMOutput
     _direction: Literal[0, 1]
     _dir_channel: int
 
     def __init__(
             self, dir_channel: int, pwm_channel: int, *args,
-            pwm_frequency: float = 50, **kwargs
+            pwm_frequency: float = 50, pwm_backend: PWMBackend = None, **kwargs
     ) -> None:
         """
         Constructs a controller for a Cytron MD10C Motor Driver
@@ -41,13 +43,14 @@ class CytronMD10C:
         :param pwm_channel: The GPIO channel connected to the motor driver's PWM pin,
                 either as a board or BCM number depending on GPIO mode.
         :param pwm_frequency: The pwm frequency in Hz. Cytron MD10C supports
-                'up to 20KHz'.
+                'up to 20KHz', which requires a hardware-timed pwm backend to achieve cleanly.
+        :param pwm_backend: The backend generating the pwm signal. Defaults to software pwm.
         """
         super().__init__(*args, **kwargs)
-        setup(pwm_channel, OUT, initial=LOW)
-        setup(dir_channel, OUT, initial=LOW)
+        self._gpio = get_backend()
+        self._gpio.setup(dir_channel, OUT, initial=LOW)
         self._duty_cycle = 0
-        self._pwm = PWM(pwm_channel, pwm_frequency)
+        self._pwm = (pwm_backend or SoftwarePWMBackend()).open(pwm_channel, pwm_frequency)
         self._direction = 0
         self._dir_channel = dir_channel
 
@@ -64,13 +67,19 @@ class CytronMD10C:
         :param duty_cycle: The value to set the pwm duty cycle to as a percentage [0, 100].
         :raises ValueError: Raised if the duty cycle is invalid.
         """
-        if not 0 <= duty_cycle <= 1:
+        if not 0 <= duty_cycle <= 100:
             raise ValueError(f"PWM duty cycle must be between 0 and 100 (inclusive), was {duty_cycle}")
+        if duty_cycle == self._duty_cycle:
+            return
         self._duty_cycle = duty_cycle
-        if duty_cycle == 0:
-            self._pwm.stop()
-        else:
-            self._pwm.start(duty_cycle)
+        self._pwm.set_duty_cycle(duty_cycle)
+
+    @property
+    def pwm(self) -> PWMOutput:
+        """
+        :return: Returns the pwm output, which reports the achieved frequency and duty resolution.
+        """
+        return self._pwm
 
     @property
     def direction(self) -> Literal[0, 1]:
@@ -87,8 +96,10 @@ class CytronMD10C:
         """
         if direction not in {0, 1}:
             raise ValueError(f"Direction must be either 0 (forward) or 1 (backward), was {direction}")
+        if direction == self._direction:
+            return
         self._direction = direction
-        output(self._dir_channel, direction)
+        self._gpio.output(self._dir_channel, direction)
 
 
 
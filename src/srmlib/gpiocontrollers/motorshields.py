@@ -3,14 +3,33 @@ Useful Links:
 - RPi.GPIO PWM: https://sourceforge.net/p/raspberry-gpio-python/wiki/PWM/
 """
 from abc import ABC, abstractmethod
-from logging import debug
-
-from RPi.GPIO import setup, OUT, LOW, PWM, getmode, BOARD, output
+from logging import debug, error
+from threading import Lock
+from typing import Dict, Hashable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
 
+from srmlib.gpiocontrollers import metrics
 from srmlib.gpiocontrollers.constants import FORWARD, BACKWARD, Direction
+from srmlib.gpiocontrollers.gpio import BOARD, HIGH, LOW, OUT, GPIOBackend, PinSetup, get_backend, setup_pins
+from srmlib.gpiocontrollers.pwm import PWMBackend, PWMOutput, SoftwarePWMBackend
 
 _VALID_DIRECTIONS = {FORWARD, BACKWARD}
 
+SIGN_MAGNITUDE = "sign_magnitude"
+"""The PWM pin carries the speed and the DIR pin the direction."""
+LOCKED_ANTIPHASE = "locked_antiphase"
+"""The PWM pin is held HIGH and the DIR pin carries both speed and direction: 50% duty is stopped."""
+_PWM_MODES = {SIGN_MAGNITUDE, LOCKED_ANTIPHASE}
+
+
+class WriteCounts(NamedTuple):
+    """
+    Counts of hardware writes requested of a motor shield.
+    """
+    issued: int
+    """Writes which reached the hardware."""
+    elided: int
+    """Writes skipped because the hardware was already in the requested state."""
+
 
 class MotorShield(ABC):
     def __init__(self, *args, **kwargs) -> None:
@@ -62,39 +81,135 @@ class CytronMD10C(MotorShield):
     Controller for a Cytron 10A DC Motor Driver, model number MD10C
     Product Page: https://www.cytron.io/p-10amp-5v-30v-dc-motor-driver
     User Manual: https://docs.google.com/document/d/1rgQzn-nWn-qcWNnHjDZvIYqUrdCeBQQxXA-TU3BF0AQ/view
+
+    Supports both of the MD10C's PWM modes:
+    - SIGN_MAGNITUDE (default): the pwm signal drives the PWM pin and the direction is written to the DIR pin.
+    - LOCKED_ANTIPHASE: the PWM pin is held HIGH and the pwm signal drives the DIR pin, with 50% duty stopped, below
+      50% forward and above 50% reverse. Speed and direction are then both a single duty cycle, so reversing (see
+      signed_speed) is one pwm update with no GPIO writes, and there is no dead spot around zero. The motor is
+      driven (and braked) for the whole period, so a higher pwm frequency than in sign-magnitude mode is advisable.
     """
 
     _speed: float
-    _pwm: PWM
+    _gpio: Optional[GPIOBackend]
+    _pwm: Optional[PWMOutput]
     _direction_pin: int
+    _pwm_pin: int
+    _pwm_frequency: float
+    _pwm_backend: Optional[PWMBackend]
     _direction: Direction
+    _pwm_mode: str
+    _writes_issued: int
+    _writes_elided: int
+    _metrics: metrics.DeviceMetrics
     _log_id: str
 
     def __init__(
             self, direction_pin: int, pulse_width_modulation_pin: int, *args,
-            logging_identifier: str = None, **kwargs
+            logging_identifier: str = None, pwm_frequency: float = 200, pwm_backend: PWMBackend = None,
+            auto_open: bool = True, pwm_mode: str = SIGN_MAGNITUDE, **kwargs
     ) -> None:
         """
         Construct a controller for a Cytron MD10C motor shield
 
         :param direction_pin: The gpio pin connected to the motor shield's direction pin.
         :param pulse_width_modulation_pin: The gpio pin connected to the motor shield's pwm pin.
+        :param pwm_frequency: The requested pwm frequency in Hz. The MD10C supports up to 20KHz.
+        :param pwm_backend: The backend generating the pwm signal. Defaults to software pwm.
+        :param auto_open: If True, the pins are set up immediately. Otherwise no GPIO is touched until open is
+                called, or the motor shield is opened along with other devices by open_devices.
+        :param pwm_mode: SIGN_MAGNITUDE or LOCKED_ANTIPHASE, matching how the motor shield is wired.
+        :raises ValueError: Raised if the pwm mode is invalid.
         """
+        if pwm_mode not in _PWM_MODES:
+            raise ValueError(f"pwm_mode must be one of {','.join(sorted(_PWM_MODES))}, was {pwm_mode!r}")
         super().__init__(*args, **kwargs)
-        if getmode() != BOARD:
+        self._gpio = None
+        self._pwm = None
+        self._speed = 0
+        self._direction_pin = direction_pin
+        self._pwm_pin = pulse_width_modulation_pin
+        self._pwm_frequency = pwm_frequency
+        self._pwm_backend = pwm_backend
+        self._direction = FORWARD  # The direction pin starts LOW
+        self._pwm_mode = pwm_mode
+        self._writes_issued = 0
+        self._writes_elided = 0
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._metrics = metrics.register(self._log_id[1:-1], self.__class__.__name__)
+        if auto_open:
+            self.open()
+
+    @property
+    def pin_setups(self) -> List[PinSetup]:
+        """
+        :return: Returns the pins this motor shield sets up when opened, other than the pin carrying the pwm signal,
+                which is set up by its pwm backend. In locked-antiphase mode that is the direction pin, and the pwm
+                pin is set up LOW until the pwm signal is centred.
+        """
+        if self._pwm_mode == LOCKED_ANTIPHASE:
+            return [PinSetup(self._pwm_pin, OUT, initial=LOW)]
+        return [PinSetup(self._direction_pin, OUT, initial=LOW)]
+
+    @property
+    def pwm_mode(self) -> str:
+        """
+        :return: Returns SIGN_MAGNITUDE or LOCKED_ANTIPHASE.
+        """
+        return self._pwm_mode
+
+    @property
+    def is_open(self) -> bool:
+        return self._pwm is not None
+
+    def open(self, *, pins_ready: bool = False) -> None:
+        """
+        Sets up the motor shield's pins, leaving the motor stopped and set forward. Does nothing if already open.
+
+        :param pins_ready: If True, the direction pin has already been set up (by open_devices).
+        """
+        if self._pwm is not None:
+            return
+        gpio = get_backend()
+        if gpio.getmode() != BOARD:
             # TODO kirypto 2022-Sep-17: Determine if it is safe to call setmode multiple times, and
             #  do that instead if so
             raise ValueError(
                 f"GPIO board mode must be BOARD to use the {CytronMD10C.__name__}. "
                 f"(Use PRi.GPIO.setmode to set this)")
 
-        setup(pulse_width_modulation_pin, OUT, initial=LOW)
-        setup(direction_pin, OUT, initial=LOW)
+        if not pins_ready:
+            setup_pins(self.pin_setups, gpio=gpio)
+        self._gpio = gpio
+        backend = self._pwm_backend or SoftwarePWMBackend()
+        if self._pwm_mode == LOCKED_ANTIPHASE:
+            self._pwm = backend.open(self._direction_pin, self._pwm_frequency)
+            self._pwm.set_duty_cycle(50)  # Stopped, before enabling the outputs
+            gpio.output(self._pwm_pin, HIGH)
+        else:
+            self._pwm = backend.open(self._pwm_pin, self._pwm_frequency)
+        debug(f"{self._log_id} Initialized with dir={self._direction_pin};pwm={self._pwm_pin};mode={self._pwm_mode}")
+
+    def close(self) -> None:
+        """
+        Stops the motor and releases its pins, including releasing its pwm output through the pwm backend. The motor
+        shield may be opened again afterwards.
+        """
+        if self._pwm is None:
+            return
+        pwm_backend = self._pwm_backend or SoftwarePWMBackend()
+        if self._pwm_mode == LOCKED_ANTIPHASE:
+            self._gpio.output(self._pwm_pin, LOW)  # Brake before the pwm signal stops on the direction pin
+            pwm_backend.release(self._pwm)
+            self._gpio.cleanup(self._pwm_pin)
+        else:
+            pwm_backend.release(self._pwm)
+            self._gpio.output(self._direction_pin, LOW)
+            self._gpio.cleanup(self._direction_pin)
+        self._pwm = None
+        self._gpio = None
         self._speed = 0
-        self._pwm = PWM(pulse_width_modulation_pin, 200)
-        self._direction_pin = direction_pin
-        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
-        debug(f"{self._log_id} Initialized with dir={direction_pin};pwm={pulse_width_modulation_pin}")
+        self._direction = FORWARD
 
     @property
     def speed(self) -> float:
@@ -114,9 +229,56 @@ class CytronMD10C(MotorShield):
         """
         if not (0 <= speed_ <= 100):
             raise ValueError(f"speed must be a percentage from 0 to 100 inclusive, was {speed_}")
+        if self._pwm is None:
+            raise RuntimeError(f"{self._log_id} Must be opened before setting the speed")
+        if speed_ == self._speed:
+            self._writes_elided += 1
+            return
+        self._speed = speed_
+        self._pwm.set_duty_cycle(self._duty_cycle_for(speed_, self._direction))
+        self._writes_issued += 1
+        if metrics.enabled:
+            self._metrics.count("pwm_writes")
+        debug("%s Set speed to %s", self._log_id, speed_)
+
+    @property
+    def signed_speed(self) -> float:
+        """
+        Getter for the current speed and direction as one signed percentage [-100, 100], negative being backward.
+
+        :return: Returns the current signed speed as a percentage [-100, 100].
+        """
+        return self._speed if self._direction == FORWARD else -self._speed
+
+    @signed_speed.setter
+    def signed_speed(self, signed_speed_: float) -> None:
+        """
+        Setter for the speed and direction as one signed percentage [-100, 100], negative being backward. A speed of
+        0 leaves the direction unchanged. In locked-antiphase mode this is a single pwm update, even when reversing;
+        in sign-magnitude mode reversing also writes the direction pin.
+
+        :param signed_speed_: The new signed speed setting as a percentage [-100, 100].
+        """
+        if not (-100 <= signed_speed_ <= 100):
+            raise ValueError(f"signed speed must be a percentage from -100 to 100 inclusive, was {signed_speed_}")
+        direction_ = FORWARD if signed_speed_ > 0 else BACKWARD if signed_speed_ < 0 else self._direction
+        speed_ = abs(signed_speed_)
+        if self._pwm_mode != LOCKED_ANTIPHASE:
+            self.direction = direction_
+            self.speed = speed_
+            return
+        if self._pwm is None:
+            raise RuntimeError(f"{self._log_id} Must be opened before setting the speed")
+        if speed_ == self._speed and direction_ == self._direction:
+            self._writes_elided += 1
+            return
         self._speed = speed_
-        self._pwm.start(self._speed)
-        debug(f"{self._log_id} Set speed to {speed_}")
+        self._direction = direction_
+        self._pwm.set_duty_cycle(self._duty_cycle_for(speed_, direction_))
+        self._writes_issued += 1
+        if metrics.enabled:
+            self._metrics.count("pwm_writes")
+        debug("%s Set signed speed to %s", self._log_id, signed_speed_)
 
     @property
     def direction(self) -> Direction:
@@ -136,6 +298,187 @@ class CytronMD10C(MotorShield):
         """
         if direction_ not in _VALID_DIRECTIONS:
             raise ValueError(f"{direction_} is not a valid direction, must be one of {','.join([str(direction) for direction in _VALID_DIRECTIONS])}")
+        if self._gpio is None:
+            raise RuntimeError(f"{self._log_id} Must be opened before setting the direction")
+        if direction_ == self._direction:
+            self._writes_elided += 1
+            return
         self._direction = direction_
-        debug(f"{self._log_id} Set direction to {direction_}")
-        output(self._direction_pin, 0 if self._direction == FORWARD else 1)  # For GPIO: forward = 0, backward = 1
+        debug("%s Set direction to %s", self._log_id, direction_)
+        if self._pwm_mode == LOCKED_ANTIPHASE:
+            if self._speed == 0:
+                self._writes_elided += 1  # Stopped is 50% duty in either direction
+                return
+            self._pwm.set_duty_cycle(self._duty_cycle_for(self._speed, direction_))
+            self._writes_issued += 1
+            if metrics.enabled:
+                self._metrics.count("pwm_writes")
+            return
+        self._gpio.output(self._direction_pin, 0 if self._direction == FORWARD else 1)  # For GPIO: forward = 0, backward = 1
+        self._writes_issued += 1
+        if metrics.enabled:
+            self._metrics.count("direction_writes")
+
+    @property
+    def pwm(self) -> Optional[PWMOutput]:
+        """
+        :return: Returns the pwm output driving the motor shield, which reports the achieved frequency and duty
+                resolution, or None until opened.
+        """
+        return self._pwm
+
+    @property
+    def write_counts(self) -> WriteCounts:
+        """
+        :return: Returns how many speed and direction writes were issued to the hardware, and how many were skipped
+                because the value was unchanged.
+        """
+        return WriteCounts(self._writes_issued, self._writes_elided)
+
+    def _duty_cycle_for(self, speed_: float, direction_: Direction) -> float:
+        if self._pwm_mode == LOCKED_ANTIPHASE:
+            # The DIR pin is LOW for forward in sign-magnitude mode, so forward is below 50% duty
+            return 50 - direction_ * speed_ / 2
+        return speed_
+
+
+class MotorUpdate(NamedTuple):
+    """
+    A change to apply to a motor in a MotorBank. Fields left as None are not changed.
+    """
+    speed: Optional[float] = None
+    direction: Optional[Direction] = None
+
+
+class MotorBank:
+    """
+    A group of motor shields which can be updated together. Updates are validated up front and then applied in a
+    single pass, skipping any motor whose speed and direction already match.
+    """
+    _motors: Dict[Hashable, MotorShield]
+    _lock: Lock
+    _log_id: str
+
+    def __init__(self, motors: Mapping[Hashable, MotorShield] = None, *, logging_identifier: str = None) -> None:
+        """
+        :param motors: The motors to register, keyed by an identifier such as a block or cab name.
+        :param logging_identifier: Prefix for messages logged about this bank.
+        """
+        self._motors = dict(motors or {})
+        self._lock = Lock()
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+
+    def register(self, key: Hashable, motor: MotorShield) -> None:
+        """
+        Adds a motor to the bank.
+
+        :param key: The identifier to update the motor by.
+        :param motor: The motor.
+        :raises ValueError: Raised if the identifier is already registered.
+        """
+        with self._lock:
+            if key in self._motors:
+                raise ValueError(f"{self._log_id} A motor is already registered as {key!r}")
+            self._motors[key] = motor
+
+    def unregister(self, key: Hashable) -> MotorShield:
+        """
+        Removes a motor from the bank, leaving its speed and direction unchanged.
+
+        :param key: The identifier of the motor.
+        :return: Returns the removed motor.
+        """
+        with self._lock:
+            return self._motors.pop(key)
+
+    def __getitem__(self, key: Hashable) -> MotorShield:
+        return self._motors[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._motors
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._motors))
+
+    def __len__(self) -> int:
+        return len(self._motors)
+
+    def apply(self, updates: Mapping[Hashable, Union[MotorUpdate, Tuple[Optional[float], Optional[Direction]]]]) -> int:
+        """
+        Applies speed and direction changes to many motors at once. Every update is validated before any is applied,
+        so an invalid update leaves all motors unchanged. If a write fails (such as on a motor which has not been
+        opened), the motors already written are restored to their previous speeds and directions before the error
+        is raised.
+
+        :param updates: The changes to apply, keyed by motor identifier.
+        :return: Returns the number of speed and direction writes performed.
+        :raises KeyError: Raised if an update is for an unregistered motor.
+        :raises ValueError: Raised if an update has an invalid speed or direction.
+        """
+        with self._lock:
+            motors = self._motors
+            changes = []
+            for key, (speed_, direction_) in updates.items():
+                motor = motors[key]
+                if speed_ is not None and not (0 <= speed_ <= 100):
+                    raise ValueError(f"speed for {key!r} must be a percentage from 0 to 100 inclusive, was {speed_}")
+                if direction_ is not None and direction_ not in _VALID_DIRECTIONS:
+                    raise ValueError(f"{direction_} for {key!r} is not a valid direction")
+                if direction_ is not None and direction_ == motor.direction:
+                    direction_ = None
+                if speed_ is not None and speed_ == motor.speed:
+                    speed_ = None
+                if direction_ is not None or speed_ is not None:
+                    changes.append((motor, speed_, direction_))
+
+            writes = 0
+            written = []
+            try:
+                for motor, speed_, direction_ in changes:
+                    written.append((motor, motor.speed, motor.direction))
+                    if direction_ is not None:
+                        motor.direction = direction_
+                        writes += 1
+                    if speed_ is not None:
+                        motor.speed = speed_
+                        writes += 1
+            except Exception:
+                self._restore(written)
+                raise
+        debug("%s Applied %s writes for %s updates", self._log_id, writes, len(updates))
+        return writes
+
+    def set_all(self, speed_: float = None, direction_: Direction = None) -> int:
+        """
+        Sets every motor in the bank to the same speed and/or direction.
+
+        :return: Returns the number of speed and direction writes performed.
+        """
+        return self.apply({key: MotorUpdate(speed_, direction_) for key in self})
+
+    def emergency_stop(self) -> None:
+        """
+        Sets the speed of every motor to 0. A motor which fails to stop does not prevent the others from stopping;
+        failures are logged and the first is re-raised once every motor has been attempted.
+        """
+        with self._lock:
+            motors = list(self._motors.items())
+        first_failure = None
+        for key, motor in motors:
+            try:
+                motor.speed = 0
+            except Exception as e:
+                error("%s Failed to stop motor %r: %r", self._log_id, key, e)
+                first_failure = first_failure or e
+        if first_failure is not None:
+            raise first_failure
+
+    def _restore(self, written: List[Tuple[MotorShield, float, Direction]]) -> None:
+        for motor, speed_, direction_ in reversed(written):
+            try:
+                if motor.speed != speed_:
+                    motor.speed = speed_
+                if motor.direction != direction_:
+                    motor.direction = direction_
+            except Exception as e:
+                error("%s Failed to restore a motor after a failed update: %r", self._log_id, e)
@@ -0,0 +1,325 @@
+"""
+Motor output from a dedicated worker process.
+
+In a busy application, motor writes made from the main process wait on the GIL behind the UI, networking and
+logging, which shows up as stutter in locomotive speed. A MotorWorker constructs the motors in a child process
+instead, and hands out RemoteMotorShield front-ends whose setters only write the new speed and direction into a
+block of shared memory. The worker polls the block and applies changes to GPIO, recording how long each took to
+arrive:
+
+    with MotorWorker([partial(CytronMD10C, 16, 12), partial(CytronMD10C, 18, 32)]) as worker:
+        worker[0].speed = 40
+        ...
+        worker.apply_latency()
+
+Each motor has a 64 byte slot in the block. The front-end writes commands (speed, direction and the time written)
+under a sequence lock: the sequence number is odd while a write is in progress, so the worker never applies a
+half-written command, and only the latest command is applied. The worker writes back what it applied.
+"""
+import struct
+from logging import error
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from time import monotonic_ns, sleep
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from srmlib.gpiocontrollers.constants import FORWARD, BACKWARD, Direction
+from srmlib.gpiocontrollers.gpio import BOARD, GPIOBackend, get_backend, set_backend
+from srmlib.gpiocontrollers.metrics import HISTOGRAM_BUCKETS, LatencyHistogram
+from srmlib.gpiocontrollers.motor_drivers.cytron import CytronMD10C as CytronMD10CDriver
+from srmlib.gpiocontrollers.motorshields import MotorShield
+
+MotorFactory = Callable[[], Union[MotorShield, CytronMD10CDriver]]
+"""A picklable function constructing a motor in the worker process, such as functools.partial(CytronMD10C, 16, 12)."""
+
+_STARTING = 0
+_READY = 1
+_FAILED = -1
+
+# Header: state, stop requested, heartbeat time, apply errors. The front-end only writes stop requested, and the
+# worker everything else
+_HEADER = struct.Struct("<qqqq")
+_STATE = struct.Struct("<q")
+_STOP = struct.Struct("<q")
+_STOP_OFFSET = 8
+_HEARTBEAT = struct.Struct("<qq")
+_HEARTBEAT_OFFSET = 16
+# Latency histogram: bucket counts, total ns, max ns
+_HISTOGRAM = struct.Struct(f"<{HISTOGRAM_BUCKETS}qqq")
+_HISTOGRAM_OFFSET = _HEADER.size
+_BUCKET = struct.Struct("<q")
+_HISTOGRAM_TOTALS = struct.Struct("<qq")
+_HISTOGRAM_TOTALS_OFFSET = _HISTOGRAM_OFFSET + HISTOGRAM_BUCKETS * 8
+_SLOTS_OFFSET = 384
+_SLOT_SIZE = 64
+# Command, written by the front-end: sequence, speed, direction, time written
+_SEQUENCE = struct.Struct("<Q")
+_COMMAND = struct.Struct("<Qdqq")
+_COMMAND_FIELDS = struct.Struct("<dqq")
+# Status, written by the worker: sequence applied, speed, direction, latency of the last command
+_STATUS = struct.Struct("<Qdqq")
+_STATUS_OFFSET = 32
+
+
+class RemoteMotorShield(MotorShield):
+    """
+    Front-end to a motor driven by a MotorWorker. Setting the speed or direction only writes to shared memory, so
+    it never waits on GPIO or the worker.
+    """
+    _buffer: Optional[memoryview]
+    _offset: int
+    _speed: float
+    _direction: Direction
+    _sequence: int
+    _lock: Lock
+
+    def __init__(self, buffer: memoryview, slot: int, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._buffer = buffer
+        self._offset = _SLOTS_OFFSET + slot * _SLOT_SIZE
+        self._speed = 0
+        self._direction = FORWARD
+        self._sequence = 0
+        self._lock = Lock()
+
+    @property
+    def speed(self) -> float:
+        """
+        :return: Returns the speed last set, which the worker may not have applied yet.
+        """
+        return self._speed
+
+    @speed.setter
+    def speed(self, speed_: float) -> None:
+        if not (0 <= speed_ <= 100):
+            raise ValueError(f"speed must be a percentage from 0 to 100 inclusive, was {speed_}")
+        if speed_ == self._speed:
+            return
+        self._speed = speed_
+        self._publish()
+
+    @property
+    def direction(self) -> Direction:
+        """
+        :return: Returns the direction last set, which the worker may not have applied yet.
+        """
+        return self._direction
+
+    @direction.setter
+    def direction(self, direction_: Direction) -> None:
+        if direction_ not in {FORWARD, BACKWARD}:
+            raise ValueError(f"{direction_} is not a valid direction, must be one of {FORWARD},{BACKWARD}")
+        if direction_ == self._direction:
+            return
+        self._direction = direction_
+        self._publish()
+
+    @property
+    def applied_speed(self) -> float:
+        """
+        :return: Returns the speed the worker last applied.
+        """
+        return _STATUS.unpack_from(self._checked_buffer(), self._offset + _STATUS_OFFSET)[1]
+
+    @property
+    def applied_direction(self) -> Direction:
+        """
+        :return: Returns the direction the worker last applied.
+        """
+        return _STATUS.unpack_from(self._checked_buffer(), self._offset + _STATUS_OFFSET)[2] or FORWARD
+
+    @property
+    def pending(self) -> bool:
+        """
+        :return: Returns True while the worker has yet to apply the latest speed and direction.
+        """
+        return _STATUS.unpack_from(self._checked_buffer(), self._offset + _STATUS_OFFSET)[0] != self._sequence
+
+    def _publish(self) -> None:
+        buffer = self._checked_buffer()
+        with self._lock:
+            sequence = self._sequence
+            # A write in progress has an odd sequence number, so the worker skips it until it is complete
+            _SEQUENCE.pack_into(buffer, self._offset, sequence + 1)
+            _COMMAND_FIELDS.pack_into(buffer, self._offset + 8, self._speed, self._direction, monotonic_ns())
+            _SEQUENCE.pack_into(buffer, self._offset, sequence + 2)
+            self._sequence = sequence + 2
+
+    def _checked_buffer(self) -> memoryview:
+        buffer = self._buffer
+        if buffer is None:
+            raise RuntimeError("The motor worker has been stopped")
+        return buffer
+
+    def _detach(self) -> None:
+        self._buffer = None
+
+
+class MotorWorker:
+    """
+    A child process which constructs motors and applies the speeds and directions set on their RemoteMotorShield
+    front-ends. The motors are stopped when the worker is.
+    """
+    _memory: Optional[SharedMemory]
+    _process: Any
+    _motors: List[RemoteMotorShield]
+
+    def __init__(
+            self, factories: Sequence[MotorFactory], *, poll_interval: float = 0.001,
+            backend_factory: Callable[[], GPIOBackend] = None, gpio_mode: Optional[int] = BOARD,
+            start_method: str = None, start_timeout: float = 10
+    ) -> None:
+        """
+        Starts the worker and waits for it to construct the motors.
+
+        :param factories: Functions constructing each motor in the worker. They must be picklable.
+        :param poll_interval: The time in seconds between the worker's checks for new commands.
+        :param backend_factory: If provided, constructs the GPIO backend used in the worker. Defaults to RPi.GPIO.
+        :param gpio_mode: The pin numbering the worker sets before constructing the motors, or None to leave it.
+        :param start_method: The multiprocessing start method. Defaults to the platform's default.
+        :param start_timeout: The most time in seconds to wait for the motors to be constructed.
+        :raises RuntimeError: Raised if the worker fails to construct the motors.
+        """
+        self._memory = SharedMemory(create=True, size=_SLOTS_OFFSET + len(factories) * _SLOT_SIZE)
+        buffer = self._memory.buf
+        buffer[:] = bytes(len(buffer))
+        self._motors = [RemoteMotorShield(buffer, slot) for slot in range(len(factories))]
+        self._process = get_context(start_method).Process(
+            target=_run_worker, args=(self._memory.name, list(factories), poll_interval, backend_factory, gpio_mode),
+            name="srmlib-motor-worker", daemon=True)
+        self._process.start()
+        waited = 0.0
+        while self._state() == _STARTING and self._process.is_alive() and waited < start_timeout:
+            sleep(0.01)
+            waited += 0.01
+        if self._state() != _READY:
+            self.stop()
+            raise RuntimeError("The motor worker failed to start; see its log for details")
+
+    def __getitem__(self, index: int) -> RemoteMotorShield:
+        return self._motors[index]
+
+    def __iter__(self) -> Iterator[RemoteMotorShield]:
+        return iter(self._motors)
+
+    def __len__(self) -> int:
+        return len(self._motors)
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    @property
+    def apply_errors(self) -> int:
+        """
+        :return: Returns the number of commands the worker failed to apply.
+        """
+        return _HEADER.unpack_from(self._memory.buf)[3]
+
+    def apply_latency(self) -> Dict[str, float]:
+        """
+        :return: Returns the distribution of times from a setter being called to the worker applying the change.
+        """
+        values = _HISTOGRAM.unpack_from(self._memory.buf, _HISTOGRAM_OFFSET)
+        return LatencyHistogram.from_buckets(list(values[:HISTOGRAM_BUCKETS]), values[-2], values[-1]).snapshot()
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Stops the motors and the worker, and releases the shared memory. The front-ends cannot be used afterwards.
+        """
+        if self._memory is None:
+            return
+        _STOP.pack_into(self._memory.buf, _STOP_OFFSET, 1)
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        for motor in self._motors:
+            motor._detach()
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+    def __enter__(self) -> "MotorWorker":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def _state(self) -> int:
+        return _HEADER.unpack_from(self._memory.buf)[0]
+
+
+def _apply(motor: Union[MotorShield, CytronMD10CDriver], speed: float, direction: Direction) -> None:
+    if isinstance(motor, CytronMD10CDriver):
+        motor.direction = 0 if direction == FORWARD else 1
+        motor.duty_cycle = speed
+    else:
+        motor.direction = direction
+        motor.speed = speed
+
+
+def _run_worker(
+        memory_name: str, factories: List[MotorFactory], poll_interval: float,
+        backend_factory: Optional[Callable[[], GPIOBackend]], gpio_mode: Optional[int]
+) -> None:
+    memory = SharedMemory(name=memory_name)
+    buffer = memory.buf
+    try:
+        if backend_factory is not None:
+            set_backend(backend_factory())
+        if gpio_mode is not None and get_backend().getmode() != gpio_mode:
+            get_backend().setmode(gpio_mode)
+        motors = [factory() for factory in factories]
+    except Exception as e:
+        error("[MotorWorker] Failed to construct motors: %r", e)
+        _HEARTBEAT.pack_into(buffer, _HEARTBEAT_OFFSET, monotonic_ns(), 0)
+        _STATE.pack_into(buffer, 0, _FAILED)
+        del buffer
+        memory.close()
+        return
+
+    offsets = [_SLOTS_OFFSET + slot * _SLOT_SIZE for slot in range(len(motors))]
+    applied = [0] * len(motors)
+    buckets = [0] * HISTOGRAM_BUCKETS
+    total_ns = max_ns = errors = 0
+    _HEARTBEAT.pack_into(buffer, _HEARTBEAT_OFFSET, monotonic_ns(), 0)
+    # Only the state is written, so that a stop requested while the motors were being constructed still stops
+    _STATE.pack_into(buffer, 0, _READY)
+    try:
+        while not _HEADER.unpack_from(buffer)[1]:
+            for index, (motor, offset) in enumerate(zip(motors, offsets)):
+                sequence, speed, direction, written_ns = _COMMAND.unpack_from(buffer, offset)
+                if sequence == applied[index] or sequence & 1:
+                    continue
+                if _SEQUENCE.unpack_from(buffer, offset)[0] != sequence:
+                    continue  # Overwritten while being read; picked up on the next poll
+                try:
+                    _apply(motor, speed, direction)
+                except Exception as e:
+                    errors += 1
+                    error("[MotorWorker] Failed to apply speed %s and direction %s to motor %s: %r",
+                          speed, direction, index, e)
+                latency_ns = max(0, monotonic_ns() - written_ns)
+                applied[index] = sequence
+                _STATUS.pack_into(buffer, offset + _STATUS_OFFSET, sequence, speed, direction, latency_ns)
+                bucket = LatencyHistogram.bucket_index(latency_ns)
+                buckets[bucket] += 1
+                total_ns += latency_ns
+                max_ns = max(max_ns, latency_ns)
+                _BUCKET.pack_into(buffer, _HISTOGRAM_OFFSET + bucket * 8, buckets[bucket])
+                _HISTOGRAM_TOTALS.pack_into(buffer, _HISTOGRAM_TOTALS_OFFSET, total_ns, max_ns)
+            _HEARTBEAT.pack_into(buffer, _HEARTBEAT_OFFSET, monotonic_ns(), errors)
+            sleep(poll_interval)
+    finally:
+        for index, motor in enumerate(motors):
+            try:
+                if isinstance(motor, CytronMD10CDriver):
+                    motor.duty_cycle = 0
+                else:
+                    motor.speed = 0
+            except Exception as e:
+                error("[MotorWorker] Failed to stop motor %s: %r", index, e)
+        del buffer
+        memory.close()
@@ -0,0 +1,324 @@
+"""
+Selectable PWM backends for motor drivers.
+
+- SoftwarePWMBackend (the default) uses the software PWM of the active GPIO backend (RPi.GPIO), which is timed by
+  a CPU thread per channel and jitters under load.
+- PigpioPWMBackend drives PWM through a pigpio daemon (pigpiod), whose DMA-timed PWM runs independently of the
+  CPU. It can also use the Pi's hardware PWM peripheral on BCM 12, 13, 18 and 19, which supports clean output at
+  tens of kHz.
+
+Every PWMOutput reports the frequency actually achieved and the number of distinct duty cycle steps available,
+since both backends may differ from what was requested.
+
+pigpio socket protocol: https://abyz.me.uk/rpi/pigpio/sif.html
+"""
+import socket
+import struct
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Optional
+
+from srmlib.gpiocontrollers.gpio import BOARD, LOW, OUT, PWMChannel, board_to_bcm, get_backend
+
+
+class PWMOutput(ABC):
+    """
+    A single PWM output channel. The duty cycle is set as a percentage [0, 100].
+    """
+
+    @property
+    @abstractmethod
+    def duty_cycle(self) -> float:
+        """
+        :return: Returns the duty cycle last set, as a percentage [0, 100].
+        """
+        pass
+
+    @abstractmethod
+    def set_duty_cycle(self, duty_cycle: float) -> None:
+        """
+        :param duty_cycle: The duty cycle as a percentage [0, 100].
+        """
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        """
+        Stops the output, leaving it LOW.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def frequency(self) -> float:
+        """
+        :return: Returns the PWM frequency actually achieved, in Hz.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def duty_resolution(self) -> int:
+        """
+        :return: Returns the number of distinct steps between fully off and fully on.
+        """
+        pass
+
+
+class PWMBackend(ABC):
+    """
+    Creates PWM outputs. Channels are numbered according to the active GPIO backend's mode.
+    """
+
+    @abstractmethod
+    def open(self, channel: int, frequency: float) -> PWMOutput:
+        """
+        Configures a channel as a PWM output, initially LOW.
+
+        :param channel: The channel, as a BOARD or BCM number depending on GPIO mode.
+        :param frequency: The requested frequency in Hz.
+        :return: Returns the output.
+        """
+        pass
+
+    def release(self, output: PWMOutput) -> None:
+        """
+        Stops an output opened by this backend and frees its channel, so that the channel may be opened again.
+
+        :param output: The output. It must not be used afterwards.
+        """
+        output.stop()
+
+
+class SoftwarePWM(PWMOutput):
+    """
+    PWM output using the GPIO backend's software PWM. PWM is started once and its duty cycle changed in place
+    afterwards, so that the waveform is not restarted on every change.
+    """
+    _pwm: Optional[PWMChannel]
+    _channel: int
+    _frequency: float
+    _duty_cycle: float
+    _started: bool
+
+    def __init__(self, channel: int, frequency: float) -> None:
+        gpio = get_backend()
+        gpio.setup(channel, OUT, initial=LOW)
+        self._pwm = gpio.PWM(channel, frequency)
+        self._channel = channel
+        self._frequency = frequency
+        self._duty_cycle = 0
+        self._started = False
+
+    @property
+    def duty_cycle(self) -> float:
+        return self._duty_cycle
+
+    def set_duty_cycle(self, duty_cycle: float) -> None:
+        if self._started:
+            self._pwm.ChangeDutyCycle(duty_cycle)
+        else:
+            self._pwm.start(duty_cycle)
+            self._started = True
+        self._duty_cycle = duty_cycle
+
+    def stop(self) -> None:
+        if self._started:
+            self._pwm.stop()
+            self._started = False
+        self._duty_cycle = 0
+
+    def close(self) -> None:
+        """
+        Stops the output and frees its channel. RPi.GPIO only frees a channel once its PWM object is discarded, so
+        the output must not be used afterwards.
+        """
+        if self._pwm is None:
+            return
+        self.stop()
+        self._pwm = None
+        get_backend().cleanup(self._channel)
+
+    @property
+    def frequency(self) -> float:
+        # Software PWM does not report what it achieves; it aims for the requested frequency
+        return self._frequency
+
+    @property
+    def duty_resolution(self) -> int:
+        # RPi.GPIO times pulses in microseconds, giving one step per microsecond of period
+        return max(1, int(1_000_000 / self._frequency))
+
+
+class SoftwarePWMBackend(PWMBackend):
+    def open(self, channel: int, frequency: float) -> PWMOutput:
+        return SoftwarePWM(channel, frequency)
+
+    def release(self, output: PWMOutput) -> None:
+        output.close()
+
+
+class PigpioError(RuntimeError):
+    """
+    Raised when the pigpio daemon rejects a command.
+    """
+    command: int
+    code: int
+
+    def __init__(self, command: int, code: int) -> None:
+        super().__init__(f"pigpio command {command} failed with error {code}")
+        self.command = command
+        self.code = code
+
+
+# pigpio socket interface command numbers
+PI_CMD_MODES = 0
+PI_CMD_WRITE = 4
+PI_CMD_PWM = 5
+PI_CMD_PRS = 6
+PI_CMD_PFS = 7
+PI_CMD_PRG = 22
+PI_CMD_PFG = 23
+PI_CMD_PRRG = 24
+PI_CMD_GDC = 83
+PI_CMD_HP = 86
+PI_OUTPUT = 1
+
+HARDWARE_PWM_PINS = frozenset({12, 13, 18, 19})
+"""BCM numbers of the pins able to output hardware PWM."""
+_HARDWARE_PWM_CLOCK = 250_000_000
+_HARDWARE_PWM_RANGE = 1_000_000
+
+
+class PigpioConnection:
+    """
+    A connection to a pigpio daemon, shared by every output opened through it.
+    """
+    _socket: socket.socket
+    _lock: Lock
+
+    def __init__(self, host: str = "localhost", port: int = 8888, *, timeout: float = 1.0) -> None:
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._lock = Lock()
+
+    def command(self, command: int, p1: int = 0, p2: int = 0, extension: bytes = b"") -> int:
+        """
+        Sends a command to the daemon and waits for its result.
+
+        :return: Returns the command's result.
+        :raises PigpioError: Raised if the daemon reports an error.
+        """
+        request = struct.pack("<IIII", command, p1, p2, len(extension)) + extension
+        with self._lock:
+            self._socket.sendall(request)
+            response = b""
+            while len(response) < 16:
+                chunk = self._socket.recv(16 - len(response))
+                if not chunk:
+                    raise ConnectionError("pigpio daemon closed the connection")
+                response += chunk
+        result = struct.unpack("<IIIi", response)[3]
+        if result < 0:
+            raise PigpioError(command, result)
+        return result
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class PigpioPWM(PWMOutput):
+    """
+    PWM output generated by a pigpio daemon, using either DMA-timed PWM on any pin, or the hardware PWM peripheral.
+    """
+    _connection: PigpioConnection
+    _pin: int
+    _hardware: bool
+    _frequency: float
+    _range: int
+    _duty_cycle: float
+
+    def __init__(self, connection: PigpioConnection, pin: int, frequency: float, *, hardware: bool = False) -> None:
+        """
+        :param connection: The daemon connection.
+        :param pin: The BCM number of the pin.
+        :param frequency: The requested frequency in Hz.
+        :param hardware: If True, use the hardware PWM peripheral (BCM 12, 13, 18 or 19 only).
+        """
+        if hardware and pin not in HARDWARE_PWM_PINS:
+            raise ValueError(f"Hardware PWM is only available on BCM {sorted(HARDWARE_PWM_PINS)}, was {pin}")
+        self._connection = connection
+        self._pin = pin
+        self._hardware = hardware
+        self._duty_cycle = 0
+        connection.command(PI_CMD_MODES, pin, PI_OUTPUT)
+        connection.command(PI_CMD_WRITE, pin, LOW)
+        if hardware:
+            self._frequency = frequency
+            self._range = _HARDWARE_PWM_RANGE
+        else:
+            self._frequency = connection.command(PI_CMD_PFS, pin, int(round(frequency)))
+            # Use every step the achieved frequency allows
+            self._range = connection.command(PI_CMD_PRRG, pin)
+            connection.command(PI_CMD_PRS, pin, self._range)
+
+    @property
+    def duty_cycle(self) -> float:
+        return self._duty_cycle
+
+    def set_duty_cycle(self, duty_cycle: float) -> None:
+        duty = int(round(duty_cycle / 100 * self._range))
+        if self._hardware:
+            self._connection.command(PI_CMD_HP, self._pin, int(round(self._frequency)), struct.pack("<I", duty))
+        else:
+            self._connection.command(PI_CMD_PWM, self._pin, duty)
+        self._duty_cycle = duty_cycle
+
+    def stop(self) -> None:
+        if self._hardware:
+            self._connection.command(PI_CMD_HP, self._pin, 0, struct.pack("<I", 0))
+        self._connection.command(PI_CMD_WRITE, self._pin, LOW)
+        self._duty_cycle = 0
+
+    @property
+    def frequency(self) -> float:
+        return self._frequency
+
+    @property
+    def duty_resolution(self) -> int:
+        if self._hardware:
+            return min(_HARDWARE_PWM_RANGE, int(_HARDWARE_PWM_CLOCK / self._frequency))
+        return self._range
+
+
+class PigpioPWMBackend(PWMBackend):
+    """
+    Opens PWM outputs on a pigpio daemon. Channels given in BOARD numbering are translated to the BCM numbers
+    pigpio uses.
+    """
+    _connection: PigpioConnection
+    _hardware: bool
+
+    def __init__(
+            self, host: str = "localhost", port: int = 8888, *, hardware: bool = False,
+            connection: PigpioConnection = None
+    ) -> None:
+        """
+        :param host: The host running pigpiod.
+        :param port: The port pigpiod listens on.
+        :param hardware: If True, outputs use the hardware PWM peripheral.
+        :param connection: An existing connection to share, in place of connecting to host and port.
+        """
+        self._connection = connection or PigpioConnection(host, port)
+        self._hardware = hardware
+
+    @property
+    def connection(self) -> PigpioConnection:
+        return self._connection
+
+    def open(self, channel: int, frequency: float) -> PWMOutput:
+        pin = board_to_bcm(channel) if get_backend().getmode() == BOARD else channel
+        return PigpioPWM(self._connection, pin, frequency, hardware=self._hardware)
+
+    def close(self) -> None:
+        self._connection.close()
@@ -0,0 +1,86 @@
+"""
+Table-driven decoding of quadrature signals, such as those produced by a KY040 rotary encoder.
+
+The two signals form a 2-bit state, (A << 1) | B. Every pair of successive states indexes a precomputed 16-entry
+table giving the movement: one quarter step forward or backward, no movement, or an invalid transition (both
+signals changed at once), which is treated as noise and never moves the position by itself. Quarter steps are
+accumulated and reported at the chosen resolution, so missed or bouncing edges never produce spurious steps.
+"""
+from typing import Literal
+
+FULL_STEP = 4
+HALF_STEP = 2
+QUARTER_STEP = 1
+Resolution = Literal[4, 2, 1]
+"""The number of quarter steps per reported step."""
+
+_INVALID = 2
+# Indexed by (previous_state << 2) | current_state. Forward rotation is the sequence 3 -> 1 -> 0 -> 2 -> 3, which
+# is CLK falling before DT when the state is (CLK << 1) | DT.
+_TRANSITIONS = (
+    0, -1, 1, _INVALID,
+    1, 0, _INVALID, -1,
+    -1, _INVALID, 0, 1,
+    _INVALID, 1, -1, 0,
+)
+
+
+class QuadratureDecoder:
+    """
+    Decodes successive 2-bit quadrature states into steps.
+    """
+    __slots__ = ("_state", "_detent_state", "_resolution", "_count", "position", "invalid_transitions")
+
+    def __init__(self, initial_state: int, *, resolution: Resolution = FULL_STEP, detent_state: int = 3) -> None:
+        """
+        :param initial_state: The current state, (A << 1) | B.
+        :param resolution: The number of quarter steps per reported step: FULL_STEP, HALF_STEP or QUARTER_STEP.
+        :param detent_state: The state the encoder rests in at a detent. Full steps are reported on arriving at
+                it, and half steps on arriving at it or its opposite.
+        """
+        if resolution not in {FULL_STEP, HALF_STEP, QUARTER_STEP}:
+            raise ValueError(f"resolution must be one of {FULL_STEP}, {HALF_STEP} or {QUARTER_STEP}, was {resolution}")
+        self._state = initial_state & 3
+        self._detent_state = detent_state & 3
+        self._resolution = resolution
+        self._count = 0
+        self.position = 0
+        self.invalid_transitions = 0
+
+    @property
+    def state(self) -> int:
+        return self._state
+
+    @property
+    def resolution(self) -> Resolution:
+        return self._resolution
+
+    def update(self, state: int) -> int:
+        """
+        Advances the decoder to a new state.
+
+        :param state: The new state, (A << 1) | B.
+        :return: Returns the number of steps completed by the transition: positive forward, negative backward.
+        """
+        movement = _TRANSITIONS[(self._state << 2) | state]
+        self._state = state
+        if movement == _INVALID:
+            # Direction unknown, but arriving at a detent still settles any partial step accumulated so far
+            self.invalid_transitions += 1
+            movement = 0
+        elif movement == 0:
+            return 0
+        count = self._count + movement
+        resolution = self._resolution
+        if resolution == QUARTER_STEP:
+            steps = count
+        elif state == self._detent_state or (resolution == HALF_STEP and state == self._detent_state ^ 3):
+            # Round to the nearest step, so that a step with a missed edge is still counted
+            steps = (abs(count) + resolution // 2) // resolution
+            steps = steps if count > 0 else -steps
+        else:
+            self._count = count
+            return 0
+        self._count = 0
+        self.position += steps
+        return steps
@@ -0,0 +1,443 @@
+"""
+Compact recording and replay of GPIO edge streams and the outputs they produce.
+
+A Recorder captures raw input edges, switch events, percentage input changes and motor shield writes, each with a
+monotonic nanosecond timestamp. Events are appended to an array of 64-bit integers (three per event) and written
+to disk in blocks by a background thread, so a capture can run for hours on a Pi at the cost of one array append
+per event:
+
+    with Recorder("throttle.srmrec") as recorder:
+        recorder.record_edges([CLK_PIN, DT_PIN, SW_PIN])
+        recorder.record_percentage(throttle, "throttle")
+        motor = recorder.record_motor(motor, "motor")
+        ...
+
+A Replayer plays the captured edges back into a SimulatedGPIO, through freshly constructed encoders and inputs,
+either in real time or as fast as possible, for reproducing and profiling problems away from the layout.
+
+File format: an 8 byte magic number followed by blocks, each a 4 byte tag and a little-endian uint32 payload
+length. "SRC " blocks name a source (uint16 id, then UTF-8 name), and "EVTS" blocks hold events as little-endian
+int64 triples of (timestamp ns, kind << 16 | source, value). A capture cut short still loads up to its last
+complete block.
+"""
+import struct
+import sys
+from array import array
+from logging import error
+from queue import Queue
+from threading import Lock, Thread
+from time import monotonic_ns, perf_counter, sleep
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from srmlib.gpiocontrollers.constants import ButtonState, Direction
+from srmlib.gpiocontrollers.gpio import GPIOBackend, HIGH, LOW, get_backend
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.inputs import PercentageInput, RotaryEncoderKY040
+from srmlib.gpiocontrollers.motorshields import MotorShield
+
+EDGE = 0
+"""An input channel changed level. The source is the channel and the value its new level."""
+LEVEL = 1
+"""The level of an input channel when recording of it began. The source is the channel."""
+SWITCH = 2
+"""An encoder's switch changed state. The value is PRESSED or RELEASED."""
+PERCENT = 3
+"""A percentage input changed. The value is the new percentage."""
+MOTOR_SPEED = 4
+"""A motor shield's speed was set. The value is the speed."""
+MOTOR_DIRECTION = 5
+"""A motor shield's direction was set. The value is the direction."""
+
+_SCALED_KINDS = frozenset({PERCENT, MOTOR_SPEED})
+_VALUE_SCALE = 1_000_000
+_MAGIC = b"SRMREC\x00\x01"
+_BLOCK_HEADER = struct.Struct("<4sI")
+_SOURCE_ID = struct.Struct("<H")
+_SOURCE_BLOCK = b"SRC "
+_EVENTS_BLOCK = b"EVTS"
+_INTS_PER_EVENT = 3
+_EVENT_BYTES = _INTS_PER_EVENT * 8
+
+
+class RecordedEvent(NamedTuple):
+    time_ns: int
+    kind: int
+    source: int
+    value: float
+
+
+class Recording:
+    """
+    A loaded capture.
+    """
+    _events: array
+    sources: Dict[int, str]
+
+    def __init__(self, events: array, sources: Dict[int, str]) -> None:
+        """
+        :param events: The raw events, three integers per event.
+        :param sources: The names of the recorded devices, keyed by source id.
+        """
+        self._events = events
+        self.sources = dict(sources)
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        """
+        :param path: The capture file to load.
+        :return: Returns the capture.
+        :raises ValueError: Raised if the file is not a capture.
+        """
+        with open(path, "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a recording")
+            events = array("q")
+            sources = {}
+            while True:
+                header = file.read(_BLOCK_HEADER.size)
+                if len(header) < _BLOCK_HEADER.size:
+                    break
+                tag, length = _BLOCK_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    break  # Cut short while writing
+                if tag == _SOURCE_BLOCK:
+                    sources[_SOURCE_ID.unpack_from(payload)[0]] = payload[_SOURCE_ID.size:].decode()
+                elif tag == _EVENTS_BLOCK:
+                    events.frombytes(payload[:len(payload) - len(payload) % _EVENT_BYTES])
+        if sys.byteorder == "big":
+            events.byteswap()
+        return cls(events, sources)
+
+    def __len__(self) -> int:
+        return len(self._events) // _INTS_PER_EVENT
+
+    def __iter__(self) -> Iterator[RecordedEvent]:
+        events = self._events
+        for index in range(0, len(events), _INTS_PER_EVENT):
+            kind_source = events[index + 1]
+            kind = kind_source >> 16
+            value = events[index + 2]
+            yield RecordedEvent(
+                events[index], kind, kind_source & 0xFFFF, value / _VALUE_SCALE if kind in _SCALED_KINDS else value)
+
+    def events(self, kind: int = None, source: int = None) -> List[RecordedEvent]:
+        """
+        :param kind: If provided, only events of this kind are returned.
+        :param source: If provided, only events from this source (or channel) are returned.
+        :return: Returns the matching events, in the order they were recorded.
+        """
+        return [event for event in self
+                if (kind is None or event.kind == kind) and (source is None or event.source == source)]
+
+    @property
+    def duration_ns(self) -> int:
+        """
+        :return: Returns the time between the first and last events.
+        """
+        events = self._events
+        return events[-_INTS_PER_EVENT] - events[0] if events else 0
+
+
+class Recorder:
+    """
+    Appends events to an in-memory buffer. Whenever the buffer fills it is handed to a writer thread, which writes
+    it to the capture file, so recording an event never waits on the disk. Safe to record to from any thread.
+    """
+    _file: Optional[BinaryIO]
+    _events: array
+    _flush_every: int
+    _clock_ns: Callable[[], int]
+    _sources: Dict[int, str]
+    _lock: Lock
+    _closed: bool
+    _blocks: "Queue[Optional[Tuple[bytes, Union[array, bytes]]]]"
+    _writer: Optional[Thread]
+
+    def __init__(self, path: str = None, *, flush_every: int = 4096, clock_ns: Callable[[], int] = monotonic_ns) -> None:
+        """
+        :param path: The capture file to write. If omitted, events are kept in memory until the recorder is
+                discarded.
+        :param flush_every: The number of events to buffer before writing them to the file.
+        :param clock_ns: The clock to timestamp events with, in nanoseconds. When recording a SimulatedGPIO, pass
+                its clock's monotonic_ns.
+        """
+        if flush_every < 1:
+            raise ValueError(f"flush_every must be at least 1, was {flush_every}")
+        self._file = None
+        self._writer = None
+        self._blocks = Queue()
+        if path is not None:
+            self._file = open(path, "wb")
+            self._file.write(_MAGIC)
+            self._writer = Thread(target=self._write_blocks, name="srmlib-recorder", daemon=True)
+            self._writer.start()
+        self._events = array("q")
+        self._flush_every = flush_every * _INTS_PER_EVENT
+        self._clock_ns = clock_ns
+        self._sources = {}
+        self._lock = Lock()
+        self._closed = False
+
+    def record(self, kind: int, source: int, value: float) -> None:
+        """
+        Appends an event, timestamped now. Does nothing once the recorder has been closed, so that devices still
+        calling back while a capture is being closed are not disturbed.
+
+        :param kind: The kind of event, such as EDGE or PERCENT.
+        :param source: The channel or source id the event came from.
+        :param value: The event's value.
+        """
+        if kind in _SCALED_KINDS:
+            value = round(value * _VALUE_SCALE)
+        with self._lock:
+            if self._closed:
+                return
+            events = self._events
+            events.append(self._clock_ns())
+            events.append((kind << 16) | source)
+            events.append(value)
+            if self._file is not None and len(events) >= self._flush_every:
+                self._events = array("q")
+                # Queued while holding the lock so that full buffers are written in order
+                self._blocks.put((_EVENTS_BLOCK, events))
+
+    def add_source(self, name: str) -> int:
+        """
+        Names a device recorded from.
+
+        :return: Returns the source id to record the device's events with.
+        :raises RuntimeError: Raised if the recorder has been closed.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The recorder has been closed")
+            source = len(self._sources)
+            self._sources[source] = name
+            if self._file is not None:
+                self._blocks.put((_SOURCE_BLOCK, _SOURCE_ID.pack(source) + name.encode()))
+        return source
+
+    def record_edges(self, channels: Iterable[int], *, gpio: GPIOBackend = None) -> None:
+        """
+        Records every edge on input channels. Each channel must already have edge detection enabled for BOTH edges,
+        as it does once an encoder has been constructed on it.
+
+        :param channels: The channels to record.
+        :param gpio: The GPIO backend the channels belong to. Defaults to the active backend.
+        """
+        gpio = gpio or get_backend()
+        gpio_input = gpio.input
+        record = self.record
+        for channel in channels:
+            record(LEVEL, channel, gpio_input(channel))
+
+            def edge_callback(channel_: int) -> None:
+                record(EDGE, channel_, gpio_input(channel_))
+
+            gpio.add_event_callback(channel, edge_callback)
+
+    def record_switch(self, encoder: RotaryEncoderKY040, name: str = "switch") -> int:
+        """
+        Records an encoder's switch events.
+
+        :return: Returns the source id of the switch.
+        """
+        source = self.add_source(name)
+
+        def switch_handler(switch_state: ButtonState) -> None:
+            self.record(SWITCH, source, switch_state)
+
+        encoder.add_switch_callback(switch_handler)
+        return source
+
+    def record_percentage(self, percentage_input: PercentageInput, name: str = "percentage") -> int:
+        """
+        Records every change of a percentage input.
+
+        :return: Returns the source id of the input.
+        """
+        source = self.add_source(name)
+
+        def percent_changed_handler(percent: float) -> None:
+            self.record(PERCENT, source, percent)
+
+        percentage_input.add_percent_changed_callback(percent_changed_handler)
+        return source
+
+    def record_motor(self, motor: MotorShield, name: str = "motor") -> "RecordingMotorShield":
+        """
+        :return: Returns a motor shield to use in place of the given one, which records every speed and direction
+                set through it.
+        """
+        return RecordingMotorShield(motor, self, self.add_source(name))
+
+    def recording(self) -> Recording:
+        """
+        :return: Returns the events recorded so far. Only available when recording to memory.
+        """
+        if self._file is not None:
+            raise RuntimeError("Recordings written to a file must be loaded with Recording.load once closed")
+        with self._lock:
+            return Recording(array("q", self._events), self._sources)
+
+    def flush(self) -> None:
+        """
+        Writes any buffered events to the capture file, waiting until they have been written.
+        """
+        if self._file is None:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            events, self._events = self._events, array("q")
+            if events:
+                self._blocks.put((_EVENTS_BLOCK, events))
+        self._blocks.join()
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Writes any buffered events and closes the capture file. Events recorded afterwards are ignored.
+        """
+        if self._file is None:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            events, self._events = self._events, array("q")
+            if events:
+                self._blocks.put((_EVENTS_BLOCK, events))
+            self._blocks.put(None)
+        self._writer.join()
+        self._file.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _write_blocks(self) -> None:
+        blocks = self._blocks
+        file = self._file
+        while True:
+            block = blocks.get()
+            try:
+                if block is None:
+                    return
+                tag, payload = block
+                if isinstance(payload, array):
+                    payload = self._to_little_endian(payload)
+                file.write(_BLOCK_HEADER.pack(tag, len(payload)))
+                file.write(payload)
+            except Exception as e:
+                error("[Recorder] Failed to write a block to the capture file: %r", e)
+            finally:
+                blocks.task_done()
+
+    @staticmethod
+    def _to_little_endian(events: array) -> bytes:
+        if sys.byteorder == "big":
+            events.byteswap()
+        return events.tobytes()
+
+
+class RecordingMotorShield(MotorShield):
+    """
+    Passes speed and direction through to another motor shield, recording each one set.
+    """
+    _motor: MotorShield
+    _recorder: Recorder
+    _source: int
+
+    def __init__(self, motor: MotorShield, recorder: Recorder, source: int, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._motor = motor
+        self._recorder = recorder
+        self._source = source
+
+    @property
+    def motor(self) -> MotorShield:
+        return self._motor
+
+    @property
+    def speed(self) -> float:
+        return self._motor.speed
+
+    @speed.setter
+    def speed(self, speed_: float) -> None:
+        self._motor.speed = speed_
+        self._recorder.record(MOTOR_SPEED, self._source, speed_)
+
+    @property
+    def direction(self) -> Direction:
+        return self._motor.direction
+
+    @direction.setter
+    def direction(self, direction_: Direction) -> None:
+        self._motor.direction = direction_
+        self._recorder.record(MOTOR_DIRECTION, self._source, direction_)
+
+
+class Replayer:
+    """
+    Plays the edges of a capture back into a SimulatedGPIO. Construct the simulated backend with initial_levels,
+    then the devices under test on it (with schedulers created from its clock), then replay.
+    """
+    _recording: Recording
+
+    def __init__(self, recording: Recording) -> None:
+        self._recording = recording
+
+    def initial_levels(self) -> Dict[int, int]:
+        """
+        :return: Returns the level of each recorded channel when recording began, keyed by channel.
+        """
+        levels = {}
+        for event in self._recording:
+            if event.kind == LEVEL:
+                levels.setdefault(event.source, int(event.value))
+            elif event.kind == EDGE:
+                # Captured without its starting level; it must have been the opposite of the first edge
+                levels.setdefault(event.source, LOW if event.value else HIGH)
+        return levels
+
+    def edges(self) -> List[Tuple[float, int, int]]:
+        """
+        :return: Returns the recorded edges as (delay in seconds since the previous edge, channel, level), as
+                accepted by SimulatedGPIO.inject. The first delay is measured from the start of the recording.
+        """
+        edges = []
+        previous_ns = None
+        for event in self._recording:
+            if previous_ns is None:
+                previous_ns = event.time_ns
+            if event.kind == EDGE:
+                edges.append(((event.time_ns - previous_ns) / 1_000_000_000, event.source, int(event.value)))
+                previous_ns = event.time_ns
+        return edges
+
+    def replay(self, gpio: SimulatedGPIO, *, realtime: bool = False) -> int:
+        """
+        Plays the recorded edges into a simulated backend, advancing its clock by the recorded delays so that
+        ramps and other scheduled work run as they did when recorded.
+
+        :param gpio: The backend to play into.
+        :param realtime: If True, wait out each delay on the wall clock as well, reproducing the original timing.
+                Otherwise replay as fast as possible.
+        :return: Returns the number of edges played.
+        """
+        edges = self.edges()
+        deadline = perf_counter()
+        for delay, channel, level in edges:
+            if realtime:
+                deadline += delay
+                remaining = deadline - perf_counter()
+                if remaining > 0:
+                    sleep(remaining)
+            if delay:
+                gpio.clock.advance(delay)
+            gpio.set_input(channel, level)
+        return len(edges)
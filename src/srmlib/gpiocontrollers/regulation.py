@@ -0,0 +1,346 @@
+"""
+Closed-loop speed regulation of motor shields.
+
+A SpeedRegulator holds a motor at a target speed whatever the load, grade or locomotive, by measuring the speed
+actually achieved through a SpeedFeedback (a tachometer or encoder pulse counter, or sampled back-EMF) and
+correcting the motor shield's speed setting with a PID controller. Every regulator runs its control loop as a task
+on a Scheduler (by default the one shared by all devices), and records the jitter of its control interval and the
+CPU time of each loop.
+"""
+from abc import ABC, abstractmethod
+from logging import debug
+from math import sqrt
+from time import thread_time_ns
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from srmlib.gpiocontrollers import metrics
+from srmlib.gpiocontrollers.callbacks import Subscription
+from srmlib.gpiocontrollers.gpio import BOARD, IN, PUD_OFF, RISING, PinSetup, get_backend, setup_pins
+from srmlib.gpiocontrollers.inputs import PercentageInput
+from srmlib.gpiocontrollers.motorshields import MotorShield
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask, get_default_scheduler
+from srmlib.gpiocontrollers.util import clamp
+
+
+class SpeedFeedback(ABC):
+    """
+    A measurement of a motor's actual speed.
+    """
+
+    @abstractmethod
+    def read(self, now: float) -> float:
+        """
+        Measures the speed. Called once per control loop.
+
+        :param now: The current time, on the regulator's clock.
+        :return: Returns the measured speed as a percentage [0, 100] of the motor's full speed.
+        """
+        pass
+
+
+class PulseCounterFeedback(SpeedFeedback):
+    """
+    Measures speed by counting pulses from a tachometer or encoder, as the pulse rate since the previous read.
+    """
+    _pin: Optional[int]
+    _full_speed_rate: float
+    _pulses: int
+    _last_pulses: int
+    _last_time: Optional[float]
+    _open: bool
+
+    def __init__(self, pin: Optional[int], full_speed_rate: float, *, auto_open: bool = True) -> None:
+        """
+        :param pin: The gpio pin the pulses arrive on, or None if pulses are counted by calling count.
+        :param full_speed_rate: The pulses per second at full speed.
+        :param auto_open: If True, the pin is set up immediately. Otherwise no GPIO is touched until open is
+                called, or the feedback is opened along with other devices by open_devices.
+        """
+        if full_speed_rate <= 0:
+            raise ValueError(f"full_speed_rate must be positive, was {full_speed_rate}")
+        self._pin = pin
+        self._full_speed_rate = full_speed_rate
+        self._pulses = 0
+        self._last_pulses = 0
+        self._last_time = None
+        self._open = False
+        if auto_open:
+            self.open()
+
+    @property
+    def pin_setups(self) -> List[PinSetup]:
+        return [] if self._pin is None else [PinSetup(self._pin, IN, PUD_OFF)]
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def open(self, *, pins_ready: bool = False) -> None:
+        """
+        Sets up the pin and starts counting pulses on it. Does nothing if already open.
+
+        :param pins_ready: If True, the pin has already been set up (by open_devices).
+        """
+        if self._open:
+            return
+        if self._pin is not None:
+            gpio = get_backend()
+            if not pins_ready:
+                gpio.setmode(BOARD)
+                setup_pins(self.pin_setups, gpio=gpio)
+            gpio.add_event_detect(self._pin, RISING, callback=lambda _: self.count())
+        self._open = True
+
+    @property
+    def pulses(self) -> int:
+        return self._pulses
+
+    def count(self, pulses: int = 1) -> None:
+        """
+        Counts pulses. Called from the edge detection thread, or by whatever else observes the pulses.
+        """
+        self._pulses += pulses
+
+    def read(self, now: float) -> float:
+        # Only the counting thread writes _pulses, so a snapshot of it needs no lock
+        pulses = self._pulses
+        last_time, self._last_time = self._last_time, now
+        new_pulses, self._last_pulses = pulses - self._last_pulses, pulses
+        if last_time is None or now <= last_time:
+            return 0.0
+        return new_pulses / (now - last_time) / self._full_speed_rate * 100
+
+
+class SampledFeedback(SpeedFeedback):
+    """
+    Measures speed from a sampled quantity proportional to it, such as a motor's back-EMF read through an ADC while
+    the drive is briefly switched off.
+    """
+    _sample: Callable[[], float]
+    _full_scale: float
+
+    def __init__(self, sample: Callable[[], float], full_scale: float) -> None:
+        """
+        :param sample: A function returning the sampled quantity.
+        :param full_scale: The value of the sample at full speed.
+        """
+        if full_scale <= 0:
+            raise ValueError(f"full_scale must be positive, was {full_scale}")
+        self._sample = sample
+        self._full_scale = full_scale
+
+    def read(self, now: float) -> float:
+        return self._sample() / self._full_scale * 100
+
+
+class PIDGains(NamedTuple):
+    """
+    Gains of a PID controller, in percent of output per percent of speed error.
+    """
+    kp: float
+    ki: float
+    """Per second of accumulated error."""
+    kd: float = 0.0
+    """Per percent per second of change in measured speed."""
+    feed_forward: float = 1.0
+    """Output per percent of target speed, applied before correction. 1 starts from the open loop setting."""
+
+
+class LoopStats(NamedTuple):
+    """
+    Statistics of a control loop's timing, since it started or its stats were last reset.
+    """
+    loops: int
+    mean_interval: float
+    """The mean time in seconds between loops."""
+    jitter: float
+    """The root mean square deviation in seconds of the time between loops from the nominal control interval."""
+    max_jitter: float
+    """The largest deviation in seconds of the time between loops from the nominal control interval."""
+    mean_cpu_us: float
+    """The mean CPU time of a loop, including reading feedback and writing the motor."""
+    max_cpu_us: float
+
+
+class SpeedRegulator:
+    """
+    Regulates a motor shield to a target speed using a PID controller on measured speed.
+
+    Integral windup is prevented by clamping: the integral never accumulates beyond what brings the output to the
+    limit of its range, so the loop recovers as soon as the target becomes reachable again. The derivative acts on
+    the measured speed rather than the error, so target changes do not kick the output. A target of 0 stops the
+    motor outright and clears the integral.
+    """
+    _motor: MotorShield
+    _feedback: SpeedFeedback
+    _gains: PIDGains
+    _interval: float
+    _output_limits: Tuple[float, float]
+    _clock: Callable[[], float]
+    _target: float
+    _integral: float
+    _last_measured: Optional[float]
+    _last_time: Optional[float]
+    _measured: float
+    _loops: int
+    _interval_sum: float
+    _deviation_squared_sum: float
+    _max_deviation: float
+    _cpu_ns_sum: int
+    _max_cpu_ns: int
+    _task: ScheduledTask
+    _target_subscription: Optional[Subscription[float]]
+    _metrics: metrics.DeviceMetrics
+    _log_id: str
+
+    def __init__(
+            self, motor: MotorShield, feedback: SpeedFeedback, gains: PIDGains, *, control_rate: float = 50,
+            target: PercentageInput = None, output_limits: Tuple[float, float] = (0, 100),
+            scheduler: Scheduler = None, logging_identifier: str = None
+    ) -> None:
+        """
+        :param motor: The motor shield to regulate. Its direction is left to the caller.
+        :param feedback: The measurement of the motor's speed.
+        :param gains: The controller's gains.
+        :param control_rate: The number of control loops per second. Limited by the scheduler's tick resolution.
+        :param target: An input to follow as the target speed. The target may also be set directly.
+        :param output_limits: The range of speed settings the regulator may write to the motor shield.
+        :param scheduler: The scheduler to run the control loop on. Defaults to the scheduler shared by all devices.
+        :param logging_identifier: Prefix for messages logged about this regulator.
+        """
+        scheduler = scheduler or get_default_scheduler()
+        if control_rate <= 0 or 1 / control_rate < scheduler.tick_resolution:
+            raise ValueError(f"control_rate must be positive and at most 1 / the scheduler's tick resolution "
+                             f"({1 / scheduler.tick_resolution}), was {control_rate}")
+        if not 0 <= output_limits[0] < output_limits[1] <= 100:
+            raise ValueError(f"output_limits must be an increasing range within [0, 100], was {output_limits}")
+        self._motor = motor
+        self._feedback = feedback
+        self._gains = gains
+        self._interval = 1 / control_rate
+        self._output_limits = output_limits
+        self._clock = scheduler.clock
+        self._target = 0
+        self._integral = 0
+        self._last_measured = None
+        self._last_time = None
+        self._measured = 0
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._metrics = metrics.register(self._log_id[1:-1], self.__class__.__name__)
+        self._metrics.add_gauge("target", lambda: self._target)
+        self._metrics.add_gauge("measured", lambda: self._measured)
+        self.reset_stats()
+        self._target_subscription = None
+        if target is not None:
+            self._target = target.current_percent
+            self._target_subscription = target.add_percent_changed_callback(self._set_target)
+        self._task = scheduler.schedule(self._control_step, 0, name=f"{self._log_id} control")
+
+    @property
+    def target(self) -> float:
+        """
+        :return: Returns the target speed as a percentage [0, 100].
+        """
+        return self._target
+
+    @target.setter
+    def target(self, target: float) -> None:
+        """
+        :param target: The new target speed as a percentage [0, 100]. Takes effect on the next control loop.
+        """
+        if not 0 <= target <= 100:
+            raise ValueError(f"target must be a percentage [0, 100], was {target}")
+        self._target = target
+
+    @property
+    def measured(self) -> float:
+        """
+        :return: Returns the speed measured by the last control loop, as a percentage [0, 100].
+        """
+        return self._measured
+
+    @property
+    def gains(self) -> PIDGains:
+        return self._gains
+
+    @gains.setter
+    def gains(self, gains: PIDGains) -> None:
+        """
+        :param gains: The gains to use from the next control loop. The integral is kept, so retuning is bumpless.
+        """
+        self._gains = gains
+
+    def stats(self) -> LoopStats:
+        """
+        :return: Returns statistics of the control loop's timing.
+        """
+        intervals = self._loops - 1  # The first loop has no interval
+        if intervals < 1:
+            return LoopStats(self._loops, 0.0, 0.0, 0.0, self._cpu_ns_sum / max(self._loops, 1) / 1000,
+                             self._max_cpu_ns / 1000)
+        return LoopStats(
+            loops=self._loops,
+            mean_interval=self._interval_sum / intervals,
+            jitter=sqrt(self._deviation_squared_sum / intervals),
+            max_jitter=self._max_deviation,
+            mean_cpu_us=self._cpu_ns_sum / self._loops / 1000,
+            max_cpu_us=self._max_cpu_ns / 1000,
+        )
+
+    def reset_stats(self) -> None:
+        self._loops = 0
+        self._interval_sum = 0.0
+        self._deviation_squared_sum = 0.0
+        self._max_deviation = 0.0
+        self._cpu_ns_sum = 0
+        self._max_cpu_ns = 0
+
+    def terminate(self) -> None:
+        """
+        Stops regulating, leaving the motor at its last speed setting, and stops following the target input.
+        """
+        self._task.cancel()
+        if self._target_subscription is not None:
+            self._target_subscription.unsubscribe()
+
+    def _set_target(self, target: float) -> None:
+        self._target = target
+
+    def _control_step(self) -> float:
+        cpu_start = thread_time_ns()
+        now = self._clock()
+        measured = self._measured = self._feedback.read(now)
+        target = self._target
+        last_time, self._last_time = self._last_time, now
+        last_measured, self._last_measured = self._last_measured, measured
+        if target == 0:
+            self._integral = 0
+            output = 0
+        else:
+            gains = self._gains
+            low, high = self._output_limits
+            error = target - measured
+            dt = now - last_time if last_time is not None else 0
+            derivative = (measured - last_measured) / dt if dt > 0 else 0
+            base = gains.feed_forward * target + gains.kp * error - gains.kd * derivative
+            # The integral only holds as much as brings the output to its limits, so it cannot wind up
+            self._integral = clamp(self._integral + gains.ki * error * dt, low - base, high - base)
+            output = clamp(base + self._integral, low, high)
+        self._motor.speed = output
+        if metrics.enabled:
+            self._metrics.count("control_loops")
+        self._record_loop(now, last_time, thread_time_ns() - cpu_start)
+        debug("%s Target %s, measured %s, output %s", self._log_id, target, measured, output)
+        return self._interval
+
+    def _record_loop(self, now: float, last_time: Optional[float], cpu_ns: int) -> None:
+        self._loops += 1
+        self._cpu_ns_sum += cpu_ns
+        self._max_cpu_ns = max(self._max_cpu_ns, cpu_ns)
+        if last_time is None:
+            return
+        interval = now - last_time
+        deviation = interval - self._interval
+        self._interval_sum += interval
+        self._deviation_squared_sum += deviation * deviation
+        self._max_deviation = max(self._max_deviation, abs(deviation))
@@ -0,0 +1,339 @@
+"""
+Scanned inputs for control panels with more switches than the Pi has pins.
+
+An InputBank reads every input it holds in a single clocked burst: a ShiftRegisterChain of 74HC165 parallel-in
+shift registers needs three pins however long the chain, and a DiodeMatrix needs one pin per row and column. A bank
+reads its inputs into an int bitmask, bit i being set if input i is PRESSED.
+
+ScannedInputs reads a bank on the shared Scheduler at a fixed scan rate. Successive scans are compared with
+bitwise operations, so a scan in which nothing changed costs a few integer operations beyond the read itself, and
+only the inputs which changed are reported, as PRESSED or RELEASED to SwitchCallbacks.
+"""
+from abc import ABC, abstractmethod
+from logging import debug, error
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from srmlib.gpiocontrollers import metrics
+from srmlib.gpiocontrollers.callbacks import CallbackRegistry, Subscription
+from srmlib.gpiocontrollers.constants import PRESSED, RELEASED, ButtonState
+from srmlib.gpiocontrollers.gpio import (
+    BOARD, HIGH, IN, LOW, OUT, PUD_OFF, PUD_UP, GPIOBackend, PinSetup, get_backend, setup_pins
+)
+from srmlib.gpiocontrollers.inputs import SwitchCallback
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask, get_default_scheduler
+
+InputChangeCallback = Callable[[int, ButtonState], None]
+
+
+class InputBank(ABC):
+    """
+    A set of inputs read together.
+    """
+    _gpio: Optional[GPIOBackend]
+
+    def __init__(self, *, auto_open: bool = True) -> None:
+        """
+        :param auto_open: If True, the pins are set up immediately. Otherwise no GPIO is touched until open is
+                called, or the bank is opened along with other devices by open_devices.
+        """
+        self._gpio = None
+        if auto_open:
+            self.open()
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """
+        :return: Returns the number of inputs in the bank.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def pin_setups(self) -> List[PinSetup]:
+        """
+        :return: Returns the pins this bank sets up when opened.
+        """
+        pass
+
+    @property
+    def is_open(self) -> bool:
+        return self._gpio is not None
+
+    def open(self, *, pins_ready: bool = False) -> None:
+        """
+        Sets up the bank's pins. Does nothing if already open.
+
+        :param pins_ready: If True, the pins have already been set up (by open_devices).
+        """
+        if self._gpio is not None:
+            return
+        gpio = get_backend()
+        if not pins_ready:
+            gpio.setmode(BOARD)
+            setup_pins(self.pin_setups, gpio=gpio)
+        self._gpio = gpio
+
+    @abstractmethod
+    def read(self) -> int:
+        """
+        Reads every input in the bank.
+
+        :return: Returns a bitmask with bit i set if input i is PRESSED.
+        """
+        pass
+
+
+class ShiftRegisterChain(InputBank):
+    """
+    A chain of 74HC165 parallel-in, serial-out shift registers, each register's QH feeding the SER pin of the next
+    register towards the Pi, and the last register's QH feeding data_pin. Inputs are numbered in the order they are
+    shifted out: input 0 is D7 of the register nearest the Pi, input 8 is D7 of the register behind it, and so on.
+    """
+    _load_pin: int
+    _clock_pin: int
+    _data_pin: int
+    _size: int
+    _invert: int
+
+    def __init__(
+            self, load_pin: int, clock_pin: int, data_pin: int, registers: int = 1, *, active_low: bool = True,
+            auto_open: bool = True
+    ) -> None:
+        """
+        :param load_pin: The gpio pin connected to every register's SH/LD pin.
+        :param clock_pin: The gpio pin connected to every register's CLK pin. CLK INH must be tied LOW.
+        :param data_pin: The gpio pin connected to the last register's QH pin.
+        :param registers: The number of registers in the chain.
+        :param active_low: If True, an input reading LOW is PRESSED, as with switches to ground and pull-ups.
+        :param auto_open: If True, the pins are set up immediately.
+        """
+        if registers < 1:
+            raise ValueError(f"registers must be at least 1, was {registers}")
+        self._load_pin = load_pin
+        self._clock_pin = clock_pin
+        self._data_pin = data_pin
+        self._size = registers * 8
+        self._invert = (1 << self._size) - 1 if active_low else 0
+        super().__init__(auto_open=auto_open)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def pin_setups(self) -> List[PinSetup]:
+        return [
+            PinSetup(self._load_pin, OUT, initial=HIGH),
+            PinSetup(self._clock_pin, OUT, initial=LOW),
+            PinSetup(self._data_pin, IN, PUD_OFF),
+        ]
+
+    def read(self) -> int:
+        gpio = self._gpio
+        output, gpio_input = gpio.output, gpio.input
+        clock_pin, data_pin = self._clock_pin, self._data_pin
+        # Latch every parallel input at once, then shift them out
+        output(self._load_pin, LOW)
+        output(self._load_pin, HIGH)
+        bits = 0
+        for index in range(self._size):
+            if gpio_input(data_pin):
+                bits |= 1 << index
+            output(clock_pin, HIGH)
+            output(clock_pin, LOW)
+        return bits ^ self._invert
+
+
+class DiodeMatrix(InputBank):
+    """
+    A matrix of switches, each in series with a diode, between row and column lines. Rows are driven LOW one at a
+    time while the pulled-up columns are read, the diodes preventing ghost presses when several switches are closed.
+    Input row * len(column_pins) + column is the switch between that row and column.
+    """
+    _row_pins: List[int]
+    _column_pins: List[int]
+
+    def __init__(self, row_pins: Sequence[int], column_pins: Sequence[int], *, auto_open: bool = True) -> None:
+        """
+        :param row_pins: The gpio pins connected to the rows (the diodes' cathode side).
+        :param column_pins: The gpio pins connected to the columns.
+        :param auto_open: If True, the pins are set up immediately.
+        """
+        if not row_pins or not column_pins:
+            raise ValueError("A matrix needs at least one row and one column")
+        self._row_pins = list(row_pins)
+        self._column_pins = list(column_pins)
+        super().__init__(auto_open=auto_open)
+
+    @property
+    def size(self) -> int:
+        return len(self._row_pins) * len(self._column_pins)
+
+    @property
+    def pin_setups(self) -> List[PinSetup]:
+        return ([PinSetup(pin, OUT, initial=HIGH) for pin in self._row_pins]
+                + [PinSetup(pin, IN, PUD_UP) for pin in self._column_pins])
+
+    def read(self) -> int:
+        gpio = self._gpio
+        output, gpio_input = gpio.output, gpio.input
+        column_pins = self._column_pins
+        width = len(column_pins)
+        bits = 0
+        shift = 0
+        for row_pin in self._row_pins:
+            output(row_pin, LOW)
+            for column, column_pin in enumerate(column_pins):
+                if not gpio_input(column_pin):
+                    bits |= 1 << (shift + column)
+            output(row_pin, HIGH)
+            shift += width
+        return bits
+
+
+class ScannedInputs:
+    """
+    Scans an InputBank at a fixed rate, reporting each input that changed state.
+
+    An input's change is only accepted once it has read the same in stable_scans consecutive scans, which debounces
+    switches whose bounce is shorter than that many scan intervals. The first scan establishes the initial state of
+    every input without reporting it.
+    """
+    _bank: InputBank
+    _interval: float
+    _history: List[int]
+    _state: Optional[int]
+    _callbacks: Dict[int, CallbackRegistry[ButtonState]]
+    _change_callbacks: CallbackRegistry[Tuple[int, ButtonState]]
+    _task: ScheduledTask
+    _metrics: metrics.DeviceMetrics
+    _log_id: str
+
+    def __init__(
+            self, bank: InputBank, *, scan_rate: float = 100, stable_scans: int = 2, scheduler: Scheduler = None,
+            logging_identifier: str = None
+    ) -> None:
+        """
+        :param bank: The bank to scan. Scanning starts once it is open.
+        :param scan_rate: The number of scans per second. Limited by the scheduler's tick resolution.
+        :param stable_scans: The number of consecutive scans an input must read the same for a change to be
+                accepted. 1 accepts every change immediately.
+        :param scheduler: The scheduler to scan on. Defaults to the scheduler shared by all devices.
+        :param logging_identifier: Prefix for messages logged about these inputs.
+        """
+        scheduler = scheduler or get_default_scheduler()
+        if scan_rate <= 0 or 1 / scan_rate < scheduler.tick_resolution:
+            raise ValueError(f"scan_rate must be positive and at most 1 / the scheduler's tick resolution "
+                             f"({1 / scheduler.tick_resolution}), was {scan_rate}")
+        if stable_scans < 1:
+            raise ValueError(f"stable_scans must be at least 1, was {stable_scans}")
+        self._bank = bank
+        self._interval = 1 / scan_rate
+        self._history = [0] * stable_scans
+        self._state = None
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._callbacks = {}
+        self._change_callbacks = CallbackRegistry(self._log_callback_error)
+        self._metrics = metrics.register(self._log_id[1:-1], self.__class__.__name__)
+        self._task = scheduler.schedule(self._scan_step, 0, name=f"{self._log_id} scan")
+
+    @property
+    def bank(self) -> InputBank:
+        return self._bank
+
+    @property
+    def state(self) -> int:
+        """
+        :return: Returns the accepted state of every input, as a bitmask with bit i set if input i is PRESSED.
+        """
+        return self._state or 0
+
+    def __getitem__(self, index: int) -> ButtonState:
+        """
+        :return: Returns the accepted state of an input, PRESSED or RELEASED.
+        """
+        self._check_index(index)
+        return PRESSED if self.state >> index & 1 else RELEASED
+
+    def add_switch_callback(self, index: int, callback: SwitchCallback) -> Subscription[ButtonState]:
+        """
+        Registers a callback to be invoked with PRESSED or RELEASED whenever an input changes state.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        self._check_index(index)
+        registry = self._callbacks.get(index)
+        if registry is None:
+            registry = self._callbacks.setdefault(index, CallbackRegistry(self._log_callback_error))
+        return registry.subscribe(callback)
+
+    def add_change_callback(self, callback: InputChangeCallback) -> Subscription[Tuple[int, ButtonState]]:
+        """
+        Registers a callback to be invoked with the index and new state of every input that changes.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._change_callbacks.subscribe(lambda change: callback(*change))
+
+    def scan(self) -> int:
+        """
+        Reads the bank once and reports the inputs that changed. Called by the scheduler; may also be called
+        directly, such as from a test.
+
+        :return: Returns a bitmask of the inputs whose accepted state changed.
+        """
+        raw = self._bank.read()
+        history = self._history
+        history.pop(0)
+        history.append(raw)
+        if self._state is None:
+            self._state = raw
+            history[:] = [raw] * len(history)
+            return 0
+        stable_pressed = stable_released = -1
+        for sample in history:
+            stable_pressed &= sample
+            stable_released &= ~sample
+        state = self._state
+        new_state = (state | stable_pressed) & ~stable_released
+        changed = new_state ^ state
+        if metrics.enabled:
+            self._metrics.count("scans")
+        if not changed:
+            return 0
+        self._state = new_state
+        if metrics.enabled:
+            self._metrics.count("changes", bin(changed).count("1"))
+        remaining = changed
+        while remaining:
+            lowest = remaining & -remaining
+            index = lowest.bit_length() - 1
+            self._invoke_callbacks(index, PRESSED if new_state & lowest else RELEASED)
+            remaining ^= lowest
+        return changed
+
+    def terminate(self) -> None:
+        """
+        Stops scanning.
+        """
+        self._task.cancel()
+
+    def _scan_step(self) -> float:
+        if self._bank.is_open:
+            self.scan()
+        return self._interval
+
+    def _invoke_callbacks(self, index: int, switch_state: ButtonState) -> None:
+        debug("%s Input %s changed, now is %s. Invoking callbacks.", self._log_id, index, switch_state)
+        registry = self._callbacks.get(index)
+        if registry is not None:
+            registry.invoke(switch_state)
+        self._change_callbacks.invoke((index, switch_state))
+
+    def _check_index(self, index: int) -> None:
+        if not 0 <= index < self._bank.size:
+            raise ValueError(f"index must be in [0, {self._bank.size}), was {index}")
+
+    def _log_callback_error(self, e: Exception) -> None:
+        error("%s Input callback threw an exception: %s", self._log_id, e)
@@ -0,0 +1,309 @@
+"""
+Shared scheduling of timed work for srmlib.gpiocontrollers.
+
+Rather than each device running its own polling thread, timed work (such as the ramping done by
+RateLimitedPercentageInput) is registered with a Scheduler. A scheduler runs every due task from a single
+thread, sleeps until the earliest deadline, and sits idle when nothing is scheduled.
+"""
+import heapq
+from itertools import count
+from logging import error
+from threading import Condition, Lock, Thread, current_thread
+from time import monotonic
+from typing import Callable, List, Optional, Tuple
+
+ScheduledFunction = Callable[[], Optional[float]]
+"""
+A function run by a Scheduler. It returns the delay in seconds until it should run again, or None to go idle
+until it is woken.
+"""
+LagObserver = Callable[["ScheduledTask", float], None]
+"""
+A function called by a Scheduler just before running each task, with the task and how late it is in seconds.
+"""
+
+
+class ScheduledTask:
+    """
+    Handle to a function registered with a Scheduler.
+    """
+    __slots__ = ("_scheduler", "_function", "_generation", "_pending", "_cancelled", "name")
+
+    def __init__(self, scheduler: "Scheduler", function: ScheduledFunction, name: str) -> None:
+        self._scheduler = scheduler
+        self._function = function
+        self._generation = 0
+        self._pending = False
+        self._cancelled = False
+        self.name = name
+
+    @property
+    def pending(self) -> bool:
+        """
+        :return: Returns True if the task is waiting on a deadline, False if it is idle or cancelled.
+        """
+        return self._pending
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def wake(self, delay: float = 0) -> None:
+        """
+        Runs an idle task as soon as possible, or after a delay. Has no effect on a task that is already waiting on
+        a deadline.
+
+        :param delay: The delay in seconds until the task should run.
+        """
+        self._scheduler._schedule_task(self, delay, only_if_idle=True)
+
+    def reschedule(self, delay: float) -> None:
+        """
+        Moves the task's next run to the given delay from now, replacing any existing deadline.
+
+        :param delay: The delay in seconds until the task should run.
+        """
+        self._scheduler._schedule_task(self, delay, only_if_idle=False)
+
+    def idle(self) -> None:
+        """
+        Removes any deadline the task is waiting on, leaving it idle until woken or rescheduled.
+        """
+        self._scheduler._idle_task(self)
+
+    def cancel(self) -> None:
+        """
+        Permanently removes the task from its scheduler.
+        """
+        self._scheduler._cancel_task(self)
+
+
+class Scheduler:
+    """
+    Heap-based scheduler which runs timed tasks from a single worker thread.
+
+    The worker thread is started on first use and waits on the earliest deadline, so a scheduler with no
+    pending tasks costs nothing. Tasks due within one tick of each other are run in the same wake-up.
+    """
+    _tick_resolution: float
+    _clock: Callable[[], float]
+    _name: str
+    _heap: List[Tuple[float, int, int, ScheduledTask]]
+    _sequence: count
+    _condition: Condition
+    _thread: Optional[Thread]
+    _threaded: bool
+    _shut_down: bool
+    _lag_observer: Optional[LagObserver]
+
+    def __init__(
+            self, *, tick_resolution: float = 0.01, clock: Callable[[], float] = monotonic, name: str = None,
+            threaded: bool = True
+    ) -> None:
+        """
+        Constructs a scheduler.
+
+        :param tick_resolution: The resolution in seconds of the scheduler. Tasks due within this time of each
+                other are run together, and a repeating task never runs more often than this.
+        :param clock: A monotonic clock returning the current time in seconds.
+        :param name: The name to give the worker thread.
+        :param threaded: If False, no worker thread is started and run_pending must be called by the owner.
+        """
+        if tick_resolution <= 0:
+            raise ValueError(f"tick_resolution must be positive, was {tick_resolution}")
+        self._tick_resolution = tick_resolution
+        self._clock = clock
+        self._name = name or f"{self.__class__.__name__}-{id(self)}"
+        self._heap = []
+        self._sequence = count()
+        self._condition = Condition()
+        self._thread = None
+        self._threaded = threaded
+        self._shut_down = False
+        self._lag_observer = None
+
+    @property
+    def tick_resolution(self) -> float:
+        return self._tick_resolution
+
+    @property
+    def clock(self) -> Callable[[], float]:
+        return self._clock
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def is_idle(self) -> bool:
+        """
+        :return: Returns True if no task is waiting on a deadline.
+        """
+        with self._condition:
+            return not any(task._pending for _, _, _, task in self._heap)
+
+    def schedule(self, function: ScheduledFunction, delay: Optional[float] = 0, *, name: str = None) -> ScheduledTask:
+        """
+        Registers a function to be run by the scheduler.
+
+        :param function: The function to run. Its return value is the delay until it should run again, or None
+                to go idle until woken.
+        :param delay: The delay in seconds until the first run, or None to register the task as idle.
+        :param name: A name for the task, used when logging.
+        :return: Returns a handle which can be used to wake, reschedule or cancel the task.
+        """
+        task = ScheduledTask(self, function, name or getattr(function, "__qualname__", repr(function)))
+        if self._shut_down:
+            raise RuntimeError(f"[{self._name}] Cannot schedule {task.name}, scheduler has been shut down")
+        if delay is not None:
+            self._schedule_task(task, delay, only_if_idle=False)
+        return task
+
+    def set_lag_observer(self, observer: Optional[LagObserver]) -> None:
+        """
+        Sets the function told how late each task runs relative to its deadline, replacing any previous one, such as
+        to measure the scheduler's wake-up lag. Called on the scheduler's thread, so it must be quick.
+
+        :param observer: The observer, or None to stop observing.
+        """
+        self._lag_observer = observer
+
+    def run_pending(self) -> Optional[float]:
+        """
+        Runs every task that is due on the calling thread. Called by the worker thread, or by the owner of an
+        unthreaded scheduler.
+
+        :return: Returns the time in seconds until the next deadline, or None if there are no pending tasks.
+        """
+        with self._condition:
+            horizon = self._clock() + self._tick_resolution / 2
+            due = []
+            while self._heap and self._heap[0][0] <= horizon:
+                deadline, _, generation, task = heapq.heappop(self._heap)
+                if task._generation == generation and task._pending:
+                    task._pending = False
+                    due.append((deadline, generation, task))
+
+        lag_observer = self._lag_observer
+        for deadline, generation, task in due:
+            if lag_observer is not None:
+                lag_observer(task, max(0.0, self._clock() - deadline))
+            try:
+                next_delay = task._function()
+            except Exception as e:
+                error(f"[{self._name}] Task {task.name} threw an exception and was cancelled: {e!r}")
+                task.cancel()
+                continue
+            if next_delay is not None:
+                with self._condition:
+                    # Only repeat if the task was not woken, rescheduled or cancelled while it was running
+                    if task._generation == generation and not task._cancelled:
+                        self._push(task, max(next_delay, self._tick_resolution))
+
+        return self.time_until_next_deadline()
+
+    def time_until_next_deadline(self) -> Optional[float]:
+        """
+        :return: Returns the time in seconds until the next deadline, or None if there are no pending tasks.
+        """
+        with self._condition:
+            self._discard_stale_entries()
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._clock())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Cancels every task and stops the worker thread.
+
+        :param wait: If True, blocks until the worker thread has exited.
+        """
+        with self._condition:
+            self._shut_down = True
+            for _, _, _, task in self._heap:
+                task._cancelled = True
+                task._pending = False
+            self._heap.clear()
+            self._condition.notify_all()
+            thread = self._thread
+        if wait and thread is not None and thread is not current_thread():
+            thread.join()
+
+    def _schedule_task(self, task: ScheduledTask, delay: float, only_if_idle: bool) -> None:
+        with self._condition:
+            if self._shut_down:
+                task._cancelled = True
+            if task._cancelled or (only_if_idle and task._pending):
+                return
+            task._generation += 1
+            self._push(task, delay)
+            self._start_thread_if_needed()
+
+    def _idle_task(self, task: ScheduledTask) -> None:
+        with self._condition:
+            if task._pending:
+                task._pending = False
+                task._generation += 1
+
+    def _cancel_task(self, task: ScheduledTask) -> None:
+        with self._condition:
+            task._cancelled = True
+            task._pending = False
+            task._generation += 1
+
+    def _push(self, task: ScheduledTask, delay: float) -> None:
+        task._pending = True
+        heapq.heappush(self._heap, (self._clock() + delay, next(self._sequence), task._generation, task))
+        self._condition.notify()
+
+    def _discard_stale_entries(self) -> None:
+        while self._heap and (self._heap[0][3]._generation != self._heap[0][2] or not self._heap[0][3]._pending):
+            heapq.heappop(self._heap)
+
+    def _start_thread_if_needed(self) -> None:
+        if self._threaded and self._thread is None:
+            self._thread = Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._shut_down:
+                    return
+                self._discard_stale_entries()
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - self._clock()
+                if delay > self._tick_resolution / 2:
+                    self._condition.wait(delay)
+                    continue
+            self.run_pending()
+
+
+_default_scheduler: Optional[Scheduler] = None
+_default_scheduler_lock = Lock()
+
+
+def get_default_scheduler() -> Scheduler:
+    """
+    :return: Returns the scheduler shared by all devices that were not given one explicitly.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None or _default_scheduler._shut_down:
+            _default_scheduler = Scheduler(name="srmlib-scheduler")
+        return _default_scheduler
+
+
+def shutdown_default_scheduler(wait: bool = True) -> None:
+    """
+    Stops the shared scheduler, terminating the timed work of every device using it.
+
+    :param wait: If True, blocks until the worker thread has exited.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        scheduler, _default_scheduler = _default_scheduler, None
+    if scheduler is not None:
+        scheduler.shutdown(wait)
@@ -0,0 +1,341 @@
+"""
+Speed tables mapping a throttle percentage to the duty cycle driving a particular locomotive.
+
+Locomotives differ in the voltage at which they start moving and in their top speed, so driving a motor shield
+directly from a throttle wastes much of the throttle's range. A SpeedTable describes the mapping for one locomotive,
+either as a smooth curve or as DCC style speed steps (such as 28 or 128 steps), and is precomputed into an array when
+built, so that looking up a throttle percentage is an index and at most one interpolation however the table was
+described. Tables may be calibrated from measurements of the speed a locomotive reaches at a number of duty cycles,
+including measurements taken from a Recording.
+
+A SpeedTableMotorShield sits between a throttle and a motor shield, passing every speed set through its table. Its
+table may be swapped at any time, such as when a different locomotive enters the block the motor shield drives.
+"""
+from array import array
+from bisect import bisect_right
+from math import ceil
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from srmlib.gpiocontrollers.callbacks import Subscription
+from srmlib.gpiocontrollers.constants import Direction
+from srmlib.gpiocontrollers.inputs import PercentageInput
+from srmlib.gpiocontrollers.motorshields import MotorShield
+from srmlib.gpiocontrollers.recording import MOTOR_SPEED, PERCENT, Recording
+from srmlib.gpiocontrollers.util import clamp
+
+DCC_28_STEPS = 28
+DCC_128_STEPS = 126  # 128 speed step mode has 126 steps, besides stop and emergency stop
+_STEP_TOLERANCE = 1e-9  # So that the throttle at the top of a step selects that step despite rounding
+
+
+class SpeedTable:
+    """
+    An immutable mapping from throttle percentage to duty cycle percentage. A throttle of 0 always maps to a duty
+    cycle of 0, stopping the motor, whatever the table's start value.
+
+    Prefer building tables with the class methods.
+    """
+    __slots__ = ("_values", "_steps", "_scale", "_last")
+
+    _values: array
+    _steps: Optional[int]
+    _scale: float
+    _last: int
+
+    def __init__(self, values: Sequence[float], *, steps: Optional[int] = None) -> None:
+        """
+        :param values: The duty cycle percentages [0, 100] of evenly spaced throttle percentages from 0 to 100
+                inclusive. At least two values are required.
+        :param steps: If provided, the table has this many speed steps, values holds the duty cycle of each step
+                (preceded by that of stop), and a throttle percentage selects the lowest step at or above it rather
+                than interpolating.
+        """
+        if len(values) < 2:
+            raise ValueError(f"At least two values are required, got {len(values)}")
+        if steps is not None and len(values) != steps + 1:
+            raise ValueError(f"A table of {steps} steps requires {steps + 1} values, got {len(values)}")
+        for value in values:
+            if not 0 <= value <= 100:
+                raise ValueError(f"Duty cycles must be percentages [0, 100], was {value}")
+        self._values = array("d", values)
+        self._steps = steps
+        self._last = len(values) - 1
+        self._scale = self._last / 100
+
+    @classmethod
+    def from_curve(
+            cls, curve: Callable[[float], float], *, steps: int = None, resolution: int = 1000
+    ) -> "SpeedTable":
+        """
+        :param curve: A function mapping a throttle percentage [0, 100] to a duty cycle percentage [0, 100]. Only
+                called while building the table.
+        :param steps: If provided, the throttle is divided into this many speed steps, each driven at the curve's
+                value at the top of the step.
+        :param resolution: When not stepped, the number of intervals the curve is sampled at. Throttle percentages
+                between samples are linearly interpolated.
+        :return: Returns the table.
+        """
+        intervals = resolution if steps is None else steps
+        if intervals < 1:
+            raise ValueError(f"steps and resolution must be at least 1, was {intervals}")
+        return cls([clamp(curve(index * 100 / intervals), 0, 100) for index in range(intervals + 1)], steps=steps)
+
+    @classmethod
+    def linear(
+            cls, start: float = 0, top: float = 100, *, steps: int = None, resolution: int = 1000
+    ) -> "SpeedTable":
+        """
+        :param start: The duty cycle at the lowest throttle setting above 0, at which the locomotive starts moving.
+        :param top: The duty cycle at full throttle, limiting the locomotive's top speed.
+        :return: Returns a table rising linearly from start to top.
+        """
+        if not 0 <= start <= top <= 100:
+            raise ValueError(f"start and top must satisfy 0 <= start <= top <= 100, were {start} and {top}")
+        return cls.from_curve(lambda throttle: start + (top - start) * throttle / 100, steps=steps,
+                              resolution=resolution)
+
+    @classmethod
+    def from_points(
+            cls, points: Iterable[Tuple[float, float]], *, steps: int = None, resolution: int = 1000
+    ) -> "SpeedTable":
+        """
+        :param points: (throttle, duty cycle) percentage pairs. Duty cycles between points are linearly
+                interpolated, and held flat beyond the first and last points.
+        :return: Returns a table through the points.
+        """
+        throttles, duty_cycles = _sorted_points(points)
+        return cls.from_curve(lambda throttle: _interpolate(throttles, duty_cycles, throttle), steps=steps,
+                              resolution=resolution)
+
+    @classmethod
+    def from_steps(cls, step_values: Sequence[float], *, max_value: float = 255) -> "SpeedTable":
+        """
+        Builds a table from the values of each speed step, as held in a DCC decoder's speed table (CVs 67 to 94
+        for 28 steps).
+
+        :param step_values: The value of each step above stop, from lowest to highest.
+        :param max_value: The value corresponding to a duty cycle of 100%.
+        :return: Returns a stepped table.
+        """
+        if max_value <= 0:
+            raise ValueError(f"max_value must be positive, was {max_value}")
+        return cls([0.0] + [value / max_value * 100 for value in step_values], steps=len(step_values))
+
+    @classmethod
+    def calibrate(
+            cls, measurements: Iterable[Tuple[float, float]], *, top_speed: float = None, steps: int = None,
+            resolution: int = 1000
+    ) -> "SpeedTable":
+        """
+        Builds a table under which a locomotive's speed is proportional to the throttle, from measurements of the
+        speed it reaches at a number of duty cycles.
+
+        :param measurements: (duty cycle percentage, speed) pairs, in any order. Speeds may be in any unit. Several
+                measurements at one duty cycle are averaged, and a duty cycle measured no faster than a lower one
+                (such as from measurement noise) is ignored.
+        :param top_speed: The speed at full throttle. Defaults to the highest speed measured.
+        :return: Returns the calibrated table.
+        :raises ValueError: Raised if no measurement shows the locomotive moving.
+        """
+        totals: Dict[float, List[float]] = {}
+        for duty_cycle, speed in measurements:
+            if not 0 <= duty_cycle <= 100:
+                raise ValueError(f"Duty cycles must be percentages [0, 100], was {duty_cycle}")
+            total = totals.setdefault(duty_cycle, [0.0, 0])
+            total[0] += speed
+            total[1] += 1
+        start = 0.0
+        fastest = 0.0
+        moving: List[Tuple[float, float]] = []  # (speed, duty cycle), with strictly increasing speeds
+        for duty_cycle in sorted(totals):
+            speed, count = totals[duty_cycle]
+            speed /= count
+            if speed <= 0:
+                if not moving:
+                    start = duty_cycle
+            elif speed > fastest:
+                fastest = speed
+                moving.append((speed, duty_cycle))
+        if not moving:
+            raise ValueError("No measurement shows the locomotive moving")
+        if top_speed is None:
+            top_speed = fastest
+        if top_speed <= 0:
+            raise ValueError(f"top_speed must be positive, was {top_speed}")
+        points = [(0.0, start)] + [(speed / top_speed * 100, duty_cycle) for speed, duty_cycle in moving]
+        return cls.from_points(points, steps=steps, resolution=resolution)
+
+    @property
+    def steps(self) -> Optional[int]:
+        """
+        :return: Returns the number of speed steps, or None if the table is smooth.
+        """
+        return self._steps
+
+    @property
+    def values(self) -> Tuple[float, ...]:
+        return tuple(self._values)
+
+    def lookup(self, throttle: float) -> float:
+        """
+        :param throttle: The throttle percentage [0, 100]. Values outside the range are clamped.
+        :return: Returns the duty cycle percentage [0, 100] to drive the motor at.
+        """
+        if throttle <= 0:
+            return 0.0
+        position = throttle * self._scale
+        if self._steps is not None:
+            return self._values[min(ceil(position - _STEP_TOLERANCE), self._last)]
+        index = int(position)
+        if index >= self._last:
+            return self._values[self._last]
+        low = self._values[index]
+        return low + (self._values[index + 1] - low) * (position - index)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SpeedTable) and self._steps == other._steps and self._values == other._values
+
+    def __hash__(self) -> int:
+        return hash((self._steps, tuple(self._values)))
+
+    def __repr__(self) -> str:
+        kind = f"{self._steps} steps" if self._steps is not None else f"resolution {self._last}"
+        return f"{self.__class__.__name__}({kind}, {self._values[1]:.1f}..{self._values[-1]:.1f}%)"
+
+
+def measurements_from_recording(
+        recording: Recording, motor_source: int, speed_source: int, *, settle_time: float = 0.5
+) -> List[Tuple[float, float]]:
+    """
+    Extracts calibration measurements from a recording of a motor shield (with Recorder.record_motor) and of a
+    percentage input measuring the locomotive's speed (with Recorder.record_percentage), such as one fed by a
+    SpeedRegulator's measured speed.
+
+    :param recording: The recording.
+    :param motor_source: The source id of the motor shield.
+    :param speed_source: The source id of the speed measurements.
+    :param settle_time: The seconds after each change of duty cycle during which speeds are ignored, while the
+            locomotive accelerates.
+    :return: Returns (duty cycle, speed) pairs for SpeedTable.calibrate.
+    """
+    settle_ns = int(settle_time * 1_000_000_000)
+    measurements = []
+    duty_cycle = None
+    changed_ns = 0
+    for event in recording:
+        if event.kind == MOTOR_SPEED and event.source == motor_source:
+            if event.value != duty_cycle:
+                duty_cycle = event.value
+                changed_ns = event.time_ns
+        elif event.kind == PERCENT and event.source == speed_source:
+            if duty_cycle is not None and event.time_ns - changed_ns >= settle_ns:
+                measurements.append((duty_cycle, event.value))
+    return measurements
+
+
+class SpeedTableMotorShield(MotorShield):
+    """
+    Drives another motor shield through a speed table. Its speed is the throttle percentage, and the wrapped motor
+    shield's speed is the duty cycle the table maps it to.
+    """
+    _motor: MotorShield
+    _table: SpeedTable
+    _throttle: float
+    _lock: Lock
+    _throttle_subscription: Optional[Subscription[float]]
+
+    def __init__(
+            self, motor: MotorShield, table: SpeedTable, *args, throttle: PercentageInput = None, **kwargs
+    ) -> None:
+        """
+        :param motor: The motor shield to drive.
+        :param table: The speed table of the locomotive being driven.
+        :param throttle: An input to follow as the throttle. The speed may also be set directly.
+        """
+        super().__init__(*args, **kwargs)
+        self._motor = motor
+        self._table = table
+        self._throttle = 0
+        self._lock = Lock()
+        self._throttle_subscription = None
+        if throttle is not None:
+            self.speed = throttle.current_percent
+            self._throttle_subscription = throttle.add_percent_changed_callback(self._set_speed)
+
+    @property
+    def motor(self) -> MotorShield:
+        return self._motor
+
+    @property
+    def table(self) -> SpeedTable:
+        return self._table
+
+    @table.setter
+    def table(self, table: SpeedTable) -> None:
+        """
+        :param table: The speed table to drive through from now on. The motor is immediately moved to the new
+                table's duty cycle for the current throttle.
+        """
+        with self._lock:
+            self._table = table
+            self._motor.speed = table.lookup(self._throttle)
+
+    @property
+    def duty_cycle(self) -> float:
+        """
+        :return: Returns the duty cycle percentage the wrapped motor shield is driven at.
+        """
+        return self._motor.speed
+
+    @property
+    def speed(self) -> float:
+        return self._throttle
+
+    @speed.setter
+    def speed(self, speed_: float) -> None:
+        if not (0 <= speed_ <= 100):
+            raise ValueError(f"speed must be a percentage from 0 to 100 inclusive, was {speed_}")
+        self._set_speed(speed_)
+
+    @property
+    def direction(self) -> Direction:
+        return self._motor.direction
+
+    @direction.setter
+    def direction(self, direction_: Direction) -> None:
+        self._motor.direction = direction_
+
+    def close(self) -> None:
+        """
+        Stops following the throttle input, if any. The wrapped motor shield is left as it is.
+        """
+        if self._throttle_subscription is not None:
+            self._throttle_subscription.unsubscribe()
+            self._throttle_subscription = None
+
+    def _set_speed(self, speed_: float) -> None:
+        with self._lock:
+            self._throttle = speed_
+            self._motor.speed = self._table.lookup(speed_)
+
+
+def _sorted_points(points: Iterable[Tuple[float, float]]) -> Tuple[List[float], List[float]]:
+    ordered = sorted(points)
+    if not ordered:
+        raise ValueError("At least one point is required")
+    for throttle, duty_cycle in ordered:
+        if not 0 <= duty_cycle <= 100:
+            raise ValueError(f"Duty cycles must be percentages [0, 100], was {duty_cycle}")
+    return [throttle for throttle, _ in ordered], [duty_cycle for _, duty_cycle in ordered]
+
+
+def _interpolate(xs: List[float], ys: List[float], x: float) -> float:
+    index = bisect_right(xs, x)
+    if index == 0:
+        return ys[0]
+    if index == len(xs):
+        return ys[-1]
+    x0, x1 = xs[index - 1], xs[index]
+    y0, y1 = ys[index - 1], ys[index]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
@@ -0,0 +1,303 @@
+"""
+A live snapshot of device state in shared memory, for dashboards, loggers and other local processes.
+
+A StatePublisher samples the percentage of each input and the speed and direction of each motor shield it is given,
+on the shared Scheduler at a fixed rate, and writes any that changed into a memory-mapped file with a fixed layout.
+Sampling keeps publishing off the devices' callback paths entirely, and readers never touch the publisher, so any
+number of processes may read the table with no cost to the control loop. A StateReader maps the same file and reads
+devices by name.
+
+Every slot is guarded by a sequence lock: its writer makes the slot's sequence number odd, writes the slot, then
+makes it even again. A reader reads the sequence number, the slot and the sequence number again, and retries if the
+two differ or are odd, so it never sees a half-written slot and never blocks the writer.
+
+Layout, all little endian, for readers written in other languages:
+
+- Header (64 bytes): magic b"SRMSTATE", version (u16), capacity (u16), slot size (u16), 2 bytes padding, the number
+  of slots in use (u32), then padding.
+- Slots (64 bytes each, one cache line) following the header: sequence number (u64), kind (u8, INPUT or MOTOR),
+  direction (i8, FORWARD or BACKWARD for motors, 0 for inputs), 6 bytes padding, percentage or speed (f64), time of
+  the last change in monotonic nanoseconds (i64), name (32 bytes of utf-8, null padded).
+
+A slot's name is written before the number of slots in use is raised to include it, and never changes afterwards.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from logging import debug
+from threading import Lock
+from time import monotonic_ns, sleep
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from srmlib.gpiocontrollers.inputs import PercentageInput
+from srmlib.gpiocontrollers.motorshields import MotorShield
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask, get_default_scheduler
+
+INPUT = 1
+MOTOR = 2
+
+_MAGIC = b"SRMSTATE"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHHHxxI")
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 16
+_COUNT = struct.Struct("<I")
+_SEQUENCE = struct.Struct("<Q")
+_VALUES = struct.Struct("<Bbxxxxxxdq")
+_VALUES_OFFSET = 8
+_NAME_OFFSET = 32
+_NAME_SIZE = 32
+_SLOT_SIZE = 64
+_MAX_READ_ATTEMPTS = 1000
+
+
+def default_state_path() -> str:
+    """
+    :return: Returns the path the state table is published at by default: in /dev/shm where it exists, so that the
+            table never touches a disk, or otherwise the temporary directory.
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "srmlib-state")
+
+
+class DeviceState(NamedTuple):
+    name: str
+    kind: int
+    """INPUT or MOTOR."""
+    value: float
+    """The input's percentage, or the motor shield's speed, as a percentage [0, 100]."""
+    direction: int
+    """The motor shield's direction, or 0 for an input."""
+    updated_ns: int
+    """The time the state last changed, from time.monotonic_ns (or the publisher's clock_ns)."""
+
+
+class StatePublisher:
+    """
+    Publishes the state of inputs and motor shields into a memory-mapped state table.
+    """
+    _path: str
+    _capacity: int
+    _interval: float
+    _file: int
+    _map: mmap.mmap
+    _sources: List[Tuple[int, Callable[[], Tuple[float, int]]]]
+    _published: List[Optional[Tuple[float, int]]]
+    _names: Dict[str, int]
+    _clock_ns: Callable[[], int]
+    _lock: Lock
+    _task: ScheduledTask
+    _log_id: str
+
+    def __init__(
+            self, path: str = None, *, capacity: int = 64, publish_rate: float = 50, scheduler: Scheduler = None,
+            clock_ns: Callable[[], int] = monotonic_ns, logging_identifier: str = None
+    ) -> None:
+        """
+        :param path: The file to publish the table in, replacing any existing table. Defaults to
+                default_state_path().
+        :param capacity: The most devices the table can hold.
+        :param publish_rate: The number of times per second every device's state is sampled. Limited by the
+                scheduler's tick resolution.
+        :param scheduler: The scheduler to sample on. Defaults to the scheduler shared by all devices.
+        :param clock_ns: The clock timestamping changes, in nanoseconds.
+        :param logging_identifier: Prefix for messages logged about this publisher.
+        """
+        scheduler = scheduler or get_default_scheduler()
+        if not 0 < capacity <= 0xFFFF:
+            raise ValueError(f"capacity must be in [1, 65535], was {capacity}")
+        if publish_rate <= 0 or 1 / publish_rate < scheduler.tick_resolution:
+            raise ValueError(f"publish_rate must be positive and at most 1 / the scheduler's tick resolution "
+                             f"({1 / scheduler.tick_resolution}), was {publish_rate}")
+        self._path = path or default_state_path()
+        self._capacity = capacity
+        self._sources = []
+        self._published = []
+        self._names = {}
+        self._clock_ns = clock_ns
+        self._lock = Lock()
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        size = _HEADER_SIZE + capacity * _SLOT_SIZE
+        self._file = os.open(self._path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._file, size)
+        self._map = mmap.mmap(self._file, size)
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, capacity, _SLOT_SIZE, 0)
+        self._interval = 1 / publish_rate
+        debug("%s Publishing %s devices at most to %s", self._log_id, capacity, self._path)
+        self._task = scheduler.schedule(self.publish, 0, name=f"{self._log_id} publish")
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def add_input(self, name: str, percentage_input: PercentageInput) -> None:
+        """
+        Publishes an input's percentage.
+
+        :param name: The name readers find the input by. At most 32 bytes of utf-8, unique within the table.
+        """
+        self._add(name, INPUT, lambda: (percentage_input.current_percent, 0))
+
+    def add_motor(self, name: str, motor: MotorShield) -> None:
+        """
+        Publishes a motor shield's speed and direction.
+
+        :param name: The name readers find the motor shield by. At most 32 bytes of utf-8, unique within the table.
+        """
+        self._add(name, MOTOR, lambda: (motor.speed, motor.direction))
+
+    def publish(self) -> float:
+        """
+        Samples every device and writes those whose state changed. Called by the scheduler; may also be called
+        directly, such as to publish a change immediately.
+
+        :return: Returns the delay until the next sample.
+        """
+        with self._lock:
+            published = self._published
+            for slot, (kind, sample) in enumerate(self._sources):
+                state = sample()
+                if state != published[slot]:
+                    published[slot] = state
+                    self._write(slot, kind, state[0], state[1])
+        return self._interval
+
+    def close(self) -> None:
+        """
+        Stops publishing and unmaps the table. The file is left in place for readers, holding the last state
+        published; remove it once no reader needs it.
+        """
+        self._task.cancel()
+        with self._lock:
+            if self._map.closed:
+                return
+            self._map.close()
+            os.close(self._file)
+
+    def __enter__(self) -> "StatePublisher":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _add(self, name: str, kind: int, sample: Callable[[], Tuple[float, int]]) -> None:
+        encoded = name.encode()
+        if len(encoded) > _NAME_SIZE:
+            raise ValueError(f"name must be at most {_NAME_SIZE} bytes of utf-8, was {name!r}")
+        with self._lock:
+            if name in self._names:
+                raise ValueError(f"A device is already published as {name!r}")
+            slot = len(self._sources)
+            if slot >= self._capacity:
+                raise ValueError(f"The state table is full, holding {self._capacity} devices")
+            offset = _HEADER_SIZE + slot * _SLOT_SIZE
+            self._map[offset + _NAME_OFFSET:offset + _NAME_OFFSET + _NAME_SIZE] = encoded.ljust(_NAME_SIZE, b"\0")
+            value, direction = state = sample()
+            self._write(slot, kind, value, direction)
+            self._sources.append((kind, sample))
+            self._published.append(state)
+            self._names[name] = slot
+            # Raised last, so that readers only find the slot once it is complete
+            _COUNT.pack_into(self._map, _COUNT_OFFSET, slot + 1)
+
+    def _write(self, slot: int, kind: int, value: float, direction: int) -> None:
+        offset = _HEADER_SIZE + slot * _SLOT_SIZE
+        sequence = _SEQUENCE.unpack_from(self._map, offset)[0]
+        _SEQUENCE.pack_into(self._map, offset, sequence + 1)
+        _VALUES.pack_into(self._map, offset + _VALUES_OFFSET, kind, direction, value, self._clock_ns())
+        _SEQUENCE.pack_into(self._map, offset, sequence + 2)
+
+
+class StateReader:
+    """
+    Reads a state table published by a StatePublisher, in this or any other process. Reading never blocks or slows
+    the publisher.
+    """
+    _path: str
+    _file: int
+    _map: mmap.mmap
+    _capacity: int
+    _slots: Dict[str, int]
+
+    def __init__(self, path: str = None) -> None:
+        """
+        :param path: The file the table is published in. Defaults to default_state_path().
+        :raises ValueError: Raised if the file is not a state table.
+        """
+        self._path = path or default_state_path()
+        self._file = os.open(self._path, os.O_RDONLY)
+        try:
+            self._map = mmap.mmap(self._file, 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            os.close(self._file)
+            raise ValueError(f"{self._path} is not a state table")
+        magic, version, capacity, slot_size, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION or slot_size != _SLOT_SIZE:
+            self.close()
+            raise ValueError(f"{self._path} is not a version {_VERSION} state table")
+        self._capacity = capacity
+        self._slots = {}
+
+    @property
+    def names(self) -> List[str]:
+        """
+        :return: Returns the names of the published devices, in the order they were added.
+        """
+        self._refresh()
+        return list(self._slots)
+
+    def read(self, name: str) -> DeviceState:
+        """
+        :return: Returns the current state of a device.
+        :raises KeyError: Raised if no device is published with the name.
+        """
+        slot = self._slots.get(name)
+        if slot is None:
+            self._refresh()
+            slot = self._slots[name]
+        return self._read_slot(name, slot)
+
+    def snapshot(self) -> Dict[str, DeviceState]:
+        """
+        :return: Returns the current state of every device, keyed by name. Each device's state is consistent,
+                although devices may be read either side of a single publish.
+        """
+        self._refresh()
+        return {name: self._read_slot(name, slot) for name, slot in self._slots.items()}
+
+    def __iter__(self) -> Iterator[DeviceState]:
+        return iter(self.snapshot().values())
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+            os.close(self._file)
+
+    def __enter__(self) -> "StateReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _refresh(self) -> None:
+        count = min(_COUNT.unpack_from(self._map, _COUNT_OFFSET)[0], self._capacity)
+        for slot in range(len(self._slots), count):
+            offset = _HEADER_SIZE + slot * _SLOT_SIZE + _NAME_OFFSET
+            name = self._map[offset:offset + _NAME_SIZE].rstrip(b"\0").decode()
+            self._slots[name] = slot
+
+    def _read_slot(self, name: str, slot: int) -> DeviceState:
+        table = self._map
+        offset = _HEADER_SIZE + slot * _SLOT_SIZE
+        for _ in range(_MAX_READ_ATTEMPTS):
+            before = _SEQUENCE.unpack_from(table, offset)[0]
+            if not before & 1:  # Odd while being written
+                kind, direction, value, updated_ns = _VALUES.unpack_from(table, offset + _VALUES_OFFSET)
+                if _SEQUENCE.unpack_from(table, offset)[0] == before:
+                    return DeviceState(name, kind, value, direction, updated_ns)
+            sleep(0)  # Let the writer finish
+        raise RuntimeError(f"Could not read a consistent state of {name!r} from {self._path}; is its writer stuck?")
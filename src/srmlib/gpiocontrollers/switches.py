@@ -0,0 +1,437 @@
+"""
+Debouncing and gesture detection for switches.
+
+A SwitchPipeline turns timestamped edges from a switch into a stream of SwitchEvents. Its first stage, a
+Debouncer, only accepts a new state once the switch has settled on it, emitting PRESS and RELEASE events stamped
+with the time of the edge that started them. Further stages are composed after it, each seeing the events emitted
+by the stage before: LongPress adds LONG_PRESS, DoubleClick adds CLICK and DOUBLE_CLICK, and AutoRepeat adds
+REPEAT while the switch is held.
+
+Stages needing a timer schedule it on a Scheduler (by default the one shared by all devices) rather than running
+threads or timers of their own, so a panel of buttons costs a handful of heap entries while idle.
+"""
+from abc import ABC, abstractmethod
+from logging import error
+from threading import RLock
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from srmlib.gpiocontrollers.callbacks import CallbackRegistry, Subscription
+from srmlib.gpiocontrollers.constants import PRESSED, ButtonState
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask, get_default_scheduler
+
+PRESS = "press"
+RELEASE = "release"
+LONG_PRESS = "long_press"
+CLICK = "click"
+DOUBLE_CLICK = "double_click"
+REPEAT = "repeat"
+
+
+class SwitchEvent(NamedTuple):
+    """
+    An event emitted by a SwitchPipeline.
+    """
+    kind: str
+    timestamp: float
+    """The time the event occurred, on the pipeline's clock. For PRESS and RELEASE, the time of the first edge."""
+
+
+SwitchEventCallback = Callable[[SwitchEvent], None]
+
+
+class SwitchStage(ABC):
+    """
+    A stage of a SwitchPipeline. Stages receive each event emitted by the stage before them and emit events to the
+    stage after them, usually passing on the events they receive along with any they detect.
+    """
+    _pipeline: Optional["SwitchPipeline"]
+    _emit: Optional[SwitchEventCallback]
+
+    def __init__(self) -> None:
+        self._pipeline = None
+        self._emit = None
+
+    def attach(self, pipeline: "SwitchPipeline", emit: SwitchEventCallback) -> None:
+        """
+        Called once by the pipeline the stage is added to.
+
+        :param pipeline: The pipeline, whose schedule method timed stages use for their timers.
+        :param emit: The function passing events to the next stage.
+        """
+        if self._pipeline is not None:
+            raise ValueError(f"{self.__class__.__name__} is already part of a pipeline")
+        self._pipeline = pipeline
+        self._emit = emit
+
+    @abstractmethod
+    def feed(self, event: SwitchEvent) -> None:
+        """
+        Receives an event from the previous stage. Called with the pipeline's lock held.
+        """
+        pass
+
+    def reset(self) -> None:
+        """
+        Discards any gesture in progress. Called with the pipeline's lock held.
+        """
+        pass
+
+
+class Debouncer:
+    """
+    Accepts a switch state once no edge has been seen for settle_time. Bounces (and glitches returning to the
+    accepted state) within that time are absorbed, whatever order the edges arrive in.
+    """
+    _settle_time: float
+    _state: ButtonState
+    _pending_state: ButtonState
+    _first_edge_time: Optional[float]
+    _last_edge_time: float
+    _emit: Optional[Callable[[ButtonState, float], None]]
+    _task: Optional[ScheduledTask]
+
+    def __init__(self, settle_time: float = 0.005, *, initial_state: ButtonState = 0) -> None:
+        """
+        :param settle_time: The time in seconds a switch must be stable before its state is accepted.
+        :param initial_state: The state of the switch when the pipeline is created, PRESSED or RELEASED.
+        """
+        if settle_time <= 0:
+            raise ValueError(f"settle_time must be positive, was {settle_time}")
+        self._settle_time = settle_time
+        self._state = initial_state
+        self._pending_state = initial_state
+        self._first_edge_time = None
+        self._last_edge_time = 0
+        self._emit = None
+        self._task = None
+
+    @property
+    def state(self) -> ButtonState:
+        """
+        :return: Returns the last accepted state.
+        """
+        return self._state
+
+    def attach(self, pipeline: "SwitchPipeline", emit: Callable[[ButtonState, float], None]) -> None:
+        if self._task is not None:
+            raise ValueError("Debouncer is already part of a pipeline")
+        self._emit = emit
+        self._task = pipeline.schedule(self._settle, name="debounce")
+
+    def edge(self, state: ButtonState, timestamp: float, now: float) -> None:
+        """
+        Receives a state sampled at an edge. Called with the pipeline's lock held.
+        """
+        if self._first_edge_time is None:
+            self._first_edge_time = timestamp
+        self._pending_state = state
+        self._last_edge_time = timestamp
+        self._task.reschedule(max(0.0, timestamp + self._settle_time - now))
+
+    def reset(self, state: ButtonState) -> None:
+        """
+        Accepts a state without emitting it, discarding any edges not yet settled. Called with the pipeline's lock
+        held.
+        """
+        self._state = state
+        self._pending_state = state
+        self._first_edge_time = None
+
+    def _settle(self, now: float) -> Optional[float]:
+        remaining = self._last_edge_time + self._settle_time - now
+        if remaining > 0:
+            return remaining
+        first_edge_time, self._first_edge_time = self._first_edge_time, None
+        if self._pending_state != self._state:
+            self._state = self._pending_state
+            self._emit(self._state, first_edge_time)
+        return None
+
+
+class LongPress(SwitchStage):
+    """
+    Emits LONG_PRESS once the switch has been held for a threshold.
+    """
+    _threshold: float
+    _pressed_at: Optional[float]
+    _task: ScheduledTask
+
+    def __init__(self, threshold: float = 0.8) -> None:
+        """
+        :param threshold: The time in seconds the switch must be held.
+        """
+        super().__init__()
+        if threshold <= 0:
+            raise ValueError(f"threshold must be positive, was {threshold}")
+        self._threshold = threshold
+        self._pressed_at = None
+
+    def attach(self, pipeline: "SwitchPipeline", emit: SwitchEventCallback) -> None:
+        super().attach(pipeline, emit)
+        self._task = pipeline.schedule(self._fire, name="long press")
+
+    def feed(self, event: SwitchEvent) -> None:
+        self._emit(event)
+        if event.kind == PRESS:
+            self._pressed_at = event.timestamp
+            self._task.reschedule(max(0.0, event.timestamp + self._threshold - self._pipeline.clock()))
+        elif event.kind == RELEASE:
+            self._pressed_at = None
+
+    def reset(self) -> None:
+        self._pressed_at = None
+
+    def _fire(self, now: float) -> Optional[float]:
+        if self._pressed_at is None:
+            return None
+        remaining = self._pressed_at + self._threshold - now
+        if remaining > 0:
+            return remaining
+        self._emit(SwitchEvent(LONG_PRESS, self._pressed_at + self._threshold))
+        self._pressed_at = None
+        return None
+
+
+class DoubleClick(SwitchStage):
+    """
+    Emits CLICK for a press and release, or DOUBLE_CLICK for two of them with the second press starting within a
+    window of the first release. A CLICK is only emitted once the window has passed without a second press. A press
+    which became a LONG_PRESS (from an earlier LongPress stage) is not a click.
+    """
+    _window: float
+    _first_release: Optional[float]
+    _second_press: bool
+    _long_press: bool
+    _task: ScheduledTask
+
+    def __init__(self, window: float = 0.3) -> None:
+        """
+        :param window: The time in seconds after a click's release within which a second press makes a double
+                click.
+        """
+        super().__init__()
+        if window <= 0:
+            raise ValueError(f"window must be positive, was {window}")
+        self._window = window
+        self._first_release = None
+        self._second_press = False
+        self._long_press = False
+
+    def attach(self, pipeline: "SwitchPipeline", emit: SwitchEventCallback) -> None:
+        super().attach(pipeline, emit)
+        self._task = pipeline.schedule(self._expire, name="double click")
+
+    def feed(self, event: SwitchEvent) -> None:
+        self._emit(event)
+        if event.kind == PRESS:
+            self._long_press = False
+            if self._first_release is not None:
+                if event.timestamp - self._first_release <= self._window:
+                    self._second_press = True
+                else:
+                    # The window passed before the timer ran
+                    self._emit(SwitchEvent(CLICK, self._first_release))
+                    self._first_release = None
+        elif event.kind == LONG_PRESS:
+            self._long_press = True
+            if self._second_press:
+                # The second press was held, so the first was a click on its own
+                self._emit(SwitchEvent(CLICK, self._first_release))
+                self._first_release = None
+                self._second_press = False
+        elif event.kind == RELEASE and not self._long_press:
+            if self._second_press:
+                self._emit(SwitchEvent(DOUBLE_CLICK, event.timestamp))
+                self._first_release = None
+                self._second_press = False
+            else:
+                self._first_release = event.timestamp
+                self._task.reschedule(max(0.0, event.timestamp + self._window - self._pipeline.clock()))
+
+    def reset(self) -> None:
+        self._first_release = None
+        self._second_press = False
+        self._long_press = False
+
+    def _expire(self, now: float) -> Optional[float]:
+        if self._first_release is None or self._second_press:
+            return None
+        remaining = self._first_release + self._window - now
+        if remaining > 0:
+            return remaining
+        self._emit(SwitchEvent(CLICK, self._first_release))
+        self._first_release = None
+        return None
+
+
+class AutoRepeat(SwitchStage):
+    """
+    Emits REPEAT while the switch is held, starting after a delay and then at a fixed interval, like a held key.
+    """
+    _delay: float
+    _interval: float
+    _next_repeat: Optional[float]
+    _task: ScheduledTask
+
+    def __init__(self, delay: float = 0.5, interval: float = 0.1) -> None:
+        """
+        :param delay: The time in seconds the switch must be held before the first REPEAT.
+        :param interval: The time in seconds between subsequent REPEATs.
+        """
+        super().__init__()
+        if delay <= 0 or interval <= 0:
+            raise ValueError(f"delay and interval must be positive, were {delay} and {interval}")
+        self._delay = delay
+        self._interval = interval
+        self._next_repeat = None
+
+    def attach(self, pipeline: "SwitchPipeline", emit: SwitchEventCallback) -> None:
+        super().attach(pipeline, emit)
+        self._task = pipeline.schedule(self._repeat, name="auto repeat")
+
+    def feed(self, event: SwitchEvent) -> None:
+        self._emit(event)
+        if event.kind == PRESS:
+            self._next_repeat = event.timestamp + self._delay
+            self._task.reschedule(max(0.0, self._next_repeat - self._pipeline.clock()))
+        elif event.kind == RELEASE:
+            self._next_repeat = None
+
+    def reset(self) -> None:
+        self._next_repeat = None
+
+    def _repeat(self, now: float) -> Optional[float]:
+        if self._next_repeat is None:
+            return None
+        # Catch up on repeats due in the same tick, so the count depends only on how long the switch was held
+        while self._next_repeat <= now:
+            self._emit(SwitchEvent(REPEAT, self._next_repeat))
+            self._next_repeat += self._interval
+        return self._next_repeat - now
+
+
+class SwitchPipeline:
+    """
+    Turns timestamped switch edges into debounced PRESS and RELEASE events, passed through a chain of gesture
+    stages to the pipeline's callbacks.
+
+    Edges may be fed from any thread. Stages run, and callbacks are invoked, with the pipeline's lock held, so
+    events are delivered in order whether they were caused by an edge or a timer.
+    """
+    _debouncer: Debouncer
+    _stages: List[SwitchStage]
+    _scheduler: Scheduler
+    _clock: Callable[[], float]
+    _callbacks: CallbackRegistry[SwitchEvent]
+    _tasks: List[ScheduledTask]
+    _lock: RLock
+    _closed: bool
+    _log_id: str
+
+    def __init__(
+            self, stages: Sequence[SwitchStage] = (), *, debouncer: Debouncer = None, scheduler: Scheduler = None,
+            logging_identifier: str = None
+    ) -> None:
+        """
+        :param stages: The gesture stages, in the order events pass through them.
+        :param debouncer: The debouncer edges are fed to. Defaults to a Debouncer with its default settle time.
+        :param scheduler: The scheduler running the pipeline's timers. Defaults to the scheduler shared by all
+                devices.
+        :param logging_identifier: Prefix for messages logged about this pipeline.
+        """
+        self._scheduler = scheduler or get_default_scheduler()
+        self._clock = self._scheduler.clock
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._callbacks = CallbackRegistry(self._log_callback_error)
+        self._tasks = []
+        self._lock = RLock()
+        self._closed = False
+        self._stages = list(stages)
+        self._debouncer = debouncer or Debouncer()
+        emit = self._deliver
+        for stage in reversed(self._stages):
+            stage.attach(self, emit)
+            emit = stage.feed
+        first_stage = emit
+
+        def debounced(state: ButtonState, timestamp: float) -> None:
+            first_stage(SwitchEvent(PRESS if state == PRESSED else RELEASE, timestamp))
+
+        self._debouncer.attach(self, debounced)
+
+    @property
+    def clock(self) -> Callable[[], float]:
+        return self._clock
+
+    @property
+    def state(self) -> ButtonState:
+        """
+        :return: Returns the debounced state of the switch.
+        """
+        return self._debouncer.state
+
+    def add_callback(self, callback: SwitchEventCallback) -> Subscription[SwitchEvent]:
+        """
+        Registers a callback to be invoked with every event leaving the last stage.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._callbacks.subscribe(callback)
+
+    def edge(self, state: ButtonState, timestamp: float = None) -> None:
+        """
+        Feeds the state of the switch sampled at an edge.
+
+        :param state: The state of the switch, PRESSED or RELEASED.
+        :param timestamp: The time of the edge, on the pipeline's clock. Defaults to now.
+        """
+        now = self._clock()
+        with self._lock:
+            if self._closed:
+                return
+            self._debouncer.edge(state, now if timestamp is None else timestamp, now)
+
+    def reset(self, state: ButtonState) -> None:
+        """
+        Sets the debounced state of the switch without emitting an event, such as when its pin is (re)opened.
+        Pending timers and any gesture in progress are discarded, and a closed pipeline accepts edges again.
+        """
+        with self._lock:
+            for task in self._tasks:
+                task.idle()
+            self._debouncer.reset(state)
+            for stage in self._stages:
+                stage.reset()
+            self._closed = False
+
+    def schedule(self, function: Callable[[float], Optional[float]], *, name: str) -> ScheduledTask:
+        """
+        Registers an idle timer for a stage. The function is called with the pipeline's lock held and the current
+        time, and returns the delay until it should run again or None.
+        """
+        clock = self._clock
+
+        def run() -> Optional[float]:
+            with self._lock:
+                if self._closed:
+                    return None
+                return function(clock())
+
+        task = self._scheduler.schedule(run, None, name=f"{self._log_id} {name}")
+        self._tasks.append(task)
+        return task
+
+    def close(self) -> None:
+        """
+        Stops the pipeline's timers and ignores edges until it is reset. Events not yet emitted are dropped.
+        """
+        with self._lock:
+            self._closed = True
+            for task in self._tasks:
+                task.idle()
+
+    def _deliver(self, event: SwitchEvent) -> None:
+        self._callbacks.invoke(event)
+
+    def _log_callback_error(self, e: Exception) -> None:
+        error("%s Switch event callback threw an exception: %s", self._log_id, e)
@@ -0,0 +1,429 @@
+"""
+Network throttle server, letting phones, tablets and other programs act as throttles alongside physical inputs.
+
+Named channels are registered on the server: PercentageInput sources, whose percentage is published to clients, and
+MotorShield sinks, which clients set the speed and direction of. Clients connect over TCP and exchange JSON messages,
+either one per line, or as WebSocket text frames (for browsers) on the same port:
+
+    -> {"op": "set", "channel": "cab1", "speed": 40, "direction": -1}
+    <- {"op": "state", "channel": "cab1", "speed": 40, "direction": -1}
+    <- {"op": "state", "channel": "knob1", "percent": 12.5}
+
+On connecting, a client receives {"op": "channels", ...} describing every channel, followed by its current state.
+
+Updates are coalesced per channel: however many sets or percentage changes arrive between flushes (at most
+max_rate per second), each channel is written once with its latest value and broadcast once. A broadcast is encoded
+a single time and the same bytes written to every client; a client too slow to keep up is skipped, and sent the full
+current state once it has caught up.
+
+    async with ThrottleServer(port=8765) as server:
+        server.register_input("knob1", knob)
+        server.register_motor("cab1", motor)
+        await server.serve_forever()
+"""
+import asyncio
+import json
+from base64 import b64encode
+from hashlib import sha1
+from logging import debug, error
+from struct import pack, unpack
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from srmlib.gpiocontrollers.aio import run_motor_writes
+from srmlib.gpiocontrollers.callbacks import Subscription
+from srmlib.gpiocontrollers.constants import FORWARD, BACKWARD
+from srmlib.gpiocontrollers.inputs import PercentageInput
+from srmlib.gpiocontrollers.motorshields import MotorShield
+
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OPCODE_TEXT = 0x1
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+_MAX_MESSAGE_SIZE = 64 * 1024
+_HANDSHAKE_WAIT = 0.25
+_MESSAGES_PER_TURN = 32
+
+
+def _websocket_frame(payload: bytes, opcode: int = _OPCODE_TEXT) -> bytes:
+    length = len(payload)
+    if length < 126:
+        header = pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _unmask(payload: bytes, mask: bytes) -> bytes:
+    length = len(payload)
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+
+
+class _Client:
+    __slots__ = ("reader", "writer", "websocket", "stale")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, websocket: bool) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.websocket = websocket
+        self.stale = False
+
+    async def receive(self) -> Optional[bytes]:
+        """
+        :return: Returns the next message, or None once the client disconnects.
+        """
+        if not self.websocket:
+            line = await self.reader.readline()
+            return line or None
+        while True:
+            first, second = await self.reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = unpack("!H", await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = unpack("!Q", await self.reader.readexactly(8))[0]
+            if length > _MAX_MESSAGE_SIZE:
+                raise ValueError(f"WebSocket frame of {length} bytes exceeds the limit of {_MAX_MESSAGE_SIZE}")
+            mask = await self.reader.readexactly(4) if second & 0x80 else None
+            payload = await self.reader.readexactly(length)
+            if mask is not None:
+                payload = _unmask(payload, mask)
+            if opcode == _OPCODE_TEXT:
+                return payload
+            if opcode == _OPCODE_CLOSE:
+                self.writer.write(_websocket_frame(b"", _OPCODE_CLOSE))
+                return None
+            if opcode == _OPCODE_PING:
+                self.writer.write(_websocket_frame(payload, _OPCODE_PONG))
+
+    def send(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Encodes and sends messages to this client alone.
+        """
+        encoded = [json.dumps(message, separators=(",", ":")).encode() for message in messages]
+        if self.websocket:
+            self.writer.write(b"".join(_websocket_frame(payload) for payload in encoded))
+        else:
+            self.writer.write(b"".join(payload + b"\n" for payload in encoded))
+
+
+class ThrottleServer:
+    """
+    asyncio server exposing percentage inputs and motor shields to network clients.
+    """
+    _host: str
+    _port: int
+    _min_interval: float
+    _write_buffer_limit: int
+    _inputs: Dict[str, PercentageInput]
+    _input_subscriptions: Dict[str, Subscription[float]]
+    _motors: Dict[str, MotorShield]
+    _clients: Set[_Client]
+    _dirty: Set[str]
+    _pending: Dict[str, Tuple[Optional[float], Optional[int]]]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _server: Optional[asyncio.AbstractServer]
+    _flush_handle: Optional[asyncio.TimerHandle]
+    _flush_task: Optional[asyncio.Task]
+    _flushing: bool
+    _last_flush: float
+    _stopped: bool
+    messages_received: int
+    broadcasts: int
+
+    def __init__(
+            self, *, host: str = "127.0.0.1", port: int = 8765, max_rate: float = 50,
+            write_buffer_limit: int = 64 * 1024
+    ) -> None:
+        """
+        :param host: The interface to listen on. Use "0.0.0.0" to accept clients from other devices.
+        :param port: The port to listen on, or 0 for any free port.
+        :param max_rate: The most times per second each channel is written and broadcast.
+        :param write_buffer_limit: The number of unsent bytes beyond which a client is considered too slow, and
+                broadcasts to it are skipped until it catches up.
+        """
+        if max_rate <= 0:
+            raise ValueError(f"max_rate must be positive, was {max_rate}")
+        self._host = host
+        self._port = port
+        self._min_interval = 1 / max_rate
+        self._write_buffer_limit = write_buffer_limit
+        self._inputs = {}
+        self._input_subscriptions = {}
+        self._motors = {}
+        self._clients = set()
+        self._dirty = set()
+        self._pending = {}
+        self._loop = None
+        self._server = None
+        self._flush_handle = None
+        self._flush_task = None
+        self._flushing = False
+        self._last_flush = 0.0
+        self._stopped = False
+        self.messages_received = 0
+        self.broadcasts = 0
+
+    @property
+    def port(self) -> int:
+        """
+        :return: Returns the port being listened on, which is only known once started if port 0 was requested.
+        """
+        if self._server is not None:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def register_input(self, channel: str, percentage_input: PercentageInput) -> None:
+        """
+        Publishes an input's percentage to clients as a read-only channel. Must be called on the server's loop once
+        started, or before starting.
+        """
+        self._check_channel_free(channel)
+        self._inputs[channel] = percentage_input
+
+        def percent_changed_handler(_) -> None:
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self._mark_dirty, channel)
+
+        self._input_subscriptions[channel] = percentage_input.add_percent_changed_callback(percent_changed_handler)
+
+    def unregister_input(self, channel: str) -> PercentageInput:
+        """
+        Stops publishing an input, so that the channel may be registered again. Clients connecting afterwards are
+        not told of the channel. Must be called on the server's loop once started.
+
+        :param channel: The channel the input was registered as.
+        :return: Returns the input.
+        :raises KeyError: Raised if no input is registered as the channel.
+        """
+        percentage_input = self._inputs.pop(channel)
+        self._input_subscriptions.pop(channel).unsubscribe()
+        self._dirty.discard(channel)
+        return percentage_input
+
+    def register_motor(self, channel: str, motor: MotorShield) -> None:
+        """
+        Lets clients set a motor's speed and direction. Writes are made on the executor shared with AsyncMotorShield,
+        so they never block the server.
+        """
+        self._check_channel_free(channel)
+        self._motors[channel] = motor
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = False
+        self._server = await asyncio.start_server(
+            self._handle_connection, self._host, self._port, limit=_MAX_MESSAGE_SIZE)
+        debug("[ThrottleServer] Listening on %s:%s", self._host, self.port)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        """
+        Disconnects every client and stops listening. Every input is unregistered, so the server stops following
+        them. Requests still being handled are dropped rather than written to the motors.
+        """
+        self._stopped = True
+        self._pending.clear()
+        self._dirty.clear()
+        for channel in list(self._inputs):
+            self.unregister_input(channel)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+        for client in list(self._clients):
+            client.writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "ThrottleServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.stop()
+
+    def _check_channel_free(self, channel: str) -> None:
+        if channel in self._inputs or channel in self._motors:
+            raise ValueError(f"A channel is already registered as {channel!r}")
+
+    def _channel_state(self, channel: str) -> Dict[str, Any]:
+        if channel in self._inputs:
+            return {"op": "state", "channel": channel, "percent": self._inputs[channel].current_percent}
+        motor = self._motors[channel]
+        return {"op": "state", "channel": channel, "speed": motor.speed, "direction": motor.direction}
+
+    def _full_state(self) -> List[Dict[str, Any]]:
+        return [self._channel_state(channel) for channel in (*self._inputs, *self._motors)]
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = None
+        try:
+            try:
+                # Browsers send their WebSocket handshake immediately, while JSON lines clients may wait to be
+                # greeted. Cancelling a partial read leaves the data buffered.
+                first_line = await asyncio.wait_for(reader.readline(), _HANDSHAKE_WAIT)
+            except asyncio.TimeoutError:
+                first_line = None
+            if first_line == b"":
+                return
+            websocket = first_line is not None and first_line.startswith(b"GET ")
+            if websocket:
+                await self._accept_websocket(reader, writer)
+            client = _Client(reader, writer, websocket)
+            self._clients.add(client)
+            client.send([{
+                "op": "channels",
+                "inputs": list(self._inputs),
+                "motors": list(self._motors),
+            }] + self._full_state())
+            message = None if websocket else first_line
+            handled = 0
+            while True:
+                if message is not None and message.strip():
+                    self._handle_message(client, message)
+                    handled += 1
+                    if handled % _MESSAGES_PER_TURN == 0:
+                        # Buffered messages are read without suspending; let other clients and flushes run
+                        await asyncio.sleep(0)
+                message = await client.receive()
+                if message is None:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            error("[ThrottleServer] Disconnecting %s: %s", writer.get_extra_info("peername"), e)
+        finally:
+            self._clients.discard(client)
+            writer.close()
+
+    @staticmethod
+    async def _accept_websocket(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Completes the WebSocket handshake, whose request line has already been read.
+        """
+        request = await reader.readuntil(b"\r\n\r\n")
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            raise ValueError("HTTP request without a WebSocket upgrade")
+        accept = b64encode(sha1(key.encode() + _WEBSOCKET_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    def _handle_message(self, client: _Client, message: bytes) -> None:
+        if self._stopped:
+            return
+        self.messages_received += 1
+        try:
+            request = json.loads(message)
+            operation = request.get("op")
+            if operation == "set":
+                self._handle_set(request)
+            elif operation == "state":
+                client.send(self._full_state())
+            else:
+                raise ValueError(f"Unknown op {operation!r}")
+        except (ValueError, TypeError, AttributeError) as e:
+            client.send([{"op": "error", "message": str(e)}])
+
+    def _handle_set(self, request: Dict[str, Any]) -> None:
+        channel = request.get("channel")
+        if channel in self._inputs:
+            raise ValueError(f"Channel {channel!r} is an input and cannot be set")
+        if channel not in self._motors:
+            raise ValueError(f"Unknown channel {channel!r}")
+        speed_ = request.get("speed")
+        direction_ = request.get("direction")
+        # JSON true and false decode to bools, which are ints (and equal to 1 and 0) in Python
+        if speed_ is not None and not (
+                isinstance(speed_, (int, float)) and not isinstance(speed_, bool) and 0 <= speed_ <= 100):
+            raise ValueError(f"speed must be a percentage from 0 to 100 inclusive, was {speed_}")
+        if direction_ is not None and (isinstance(direction_, bool) or direction_ not in {FORWARD, BACKWARD}):
+            raise ValueError(f"direction must be {FORWARD} or {BACKWARD}, was {direction_}")
+        pending_speed, pending_direction = self._pending.get(channel, (None, None))
+        self._pending[channel] = (
+            pending_speed if speed_ is None else speed_, pending_direction if direction_ is None else direction_)
+        self._mark_dirty(channel)
+
+    def _mark_dirty(self, channel: str) -> None:
+        if self._stopped:
+            return
+        self._dirty.add(channel)
+        if self._flush_handle is None and not self._flushing:
+            delay = max(0.0, self._last_flush + self._min_interval - self._loop.time())
+            self._flush_handle = self._loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flushing = True
+        self._flush_task = self._loop.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        try:
+            dirty, self._dirty = self._dirty, set()
+            pending, self._pending = self._pending, {}
+            if pending:
+                # One trip to the executor for every channel, rather than one per write
+                await run_motor_writes(self._apply, pending)
+            self._last_flush = self._loop.time()
+            # An input unregistered since it changed is no longer published
+            self._broadcast([self._channel_state(channel) for channel in sorted(dirty)
+                             if channel in self._inputs or channel in self._motors])
+        finally:
+            self._flushing = False
+            if self._dirty:
+                self._mark_dirty(next(iter(self._dirty)))
+
+    def _apply(self, pending: Dict[str, Tuple[Optional[float], Optional[int]]]) -> None:
+        for channel, (speed_, direction_) in pending.items():
+            motor = self._motors[channel]
+            try:
+                if direction_ is not None:
+                    motor.direction = direction_
+                if speed_ is not None:
+                    motor.speed = speed_
+            except Exception as e:
+                error("[ThrottleServer] Failed to set channel %r: %r", channel, e)
+
+    def _broadcast(self, messages: List[Dict[str, Any]]) -> None:
+        if not messages or not self._clients:
+            return
+        encoded = [json.dumps(message, separators=(",", ":")).encode() for message in messages]
+        lines = b"".join(payload + b"\n" for payload in encoded)
+        frames = b"".join(_websocket_frame(payload) for payload in encoded)
+        limit = self._write_buffer_limit
+        for client in list(self._clients):
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > limit:
+                client.stale = True
+                continue
+            if client.stale:
+                client.stale = False
+                client.send(self._full_state())
+            else:
+                transport.write(frames if client.websocket else lines)
+        self.broadcasts += 1
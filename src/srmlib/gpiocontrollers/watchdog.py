@@ -0,0 +1,425 @@
+"""
+A watchdog over the control loop, stopping motors when it stalls.
+
+The RPi.GPIO edge detection thread and the Scheduler running ramps and other timed work can each be held up, by a
+slow callback, a garbage collection pause or a blocked logger, and until they recover every motor keeps the speed
+it was last set to. A Watchdog measures, into latency histograms:
+
+- the wake-up lag of each watched Scheduler: how late each of its tasks runs after its deadline, and how late a
+  heartbeat task registered by the watchdog runs.
+- the latency from an input changing to the motor shields it drives being written, for each motor shield wrapped
+  with watch_motor.
+
+Latency budgets are checked from the watchdog's own thread, which does not depend on the scheduler or the edge
+detection thread running. When a budget is exceeded, the watchdog raises an Alert to its callbacks and trips the
+affected motor shields: each is set to speed 0, and ignores any further speed above 0 until the watchdog is reset.
+A motor shield is stopped at most check_interval after its budget is exceeded, provided the watchdog thread is
+able to run; a pause which stops every Python thread (such as a long garbage collection) delays the watchdog too,
+but it acts as soon as the pause ends.
+"""
+from logging import debug, error, warning
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from srmlib.gpiocontrollers import metrics
+from srmlib.gpiocontrollers.callbacks import CallbackRegistry, Subscription
+from srmlib.gpiocontrollers.constants import Direction
+from srmlib.gpiocontrollers.inputs import PercentageInput
+from srmlib.gpiocontrollers.metrics import LatencyHistogram
+from srmlib.gpiocontrollers.motorshields import MotorShield
+from srmlib.gpiocontrollers.scheduling import Scheduler, ScheduledTask
+
+SCHEDULER_LAG = "scheduler_lag"
+OUTPUT_LATENCY = "output_latency"
+
+
+class Alert(NamedTuple):
+    kind: str
+    """SCHEDULER_LAG or OUTPUT_LATENCY."""
+    name: str
+    """The name of the scheduler or motor shield which exceeded its budget."""
+    latency: float
+    """The lag or latency in seconds when the alert was raised. It may grow further."""
+    budget: float
+    time: float
+    """The time the alert was raised, on the watchdog's clock."""
+    tripped: List[str]
+    """The names of the motor shields tripped in response."""
+
+
+AlertCallback = Callable[[Alert], None]
+
+
+class _FollowedInput:
+    __slots__ = ("input", "written_percent", "pending_since", "subscription")
+
+    def __init__(self, percentage_input: PercentageInput) -> None:
+        self.input = percentage_input
+        self.written_percent = percentage_input.current_percent
+        self.pending_since: Optional[float] = None
+        self.subscription: Optional[Subscription[float]] = None
+
+
+class WatchedMotorShield(MotorShield):
+    """
+    Passes speed and direction through to another motor shield, measuring the latency from the inputs it follows
+    changing to its speed being written, and stopping the motor when its watchdog trips it.
+    """
+    _motor: MotorShield
+    _name: str
+    _clock: Callable[[], float]
+    _budget: Optional[float]
+    _followed: List[_FollowedInput]
+    _tripped: bool
+    _latency: LatencyHistogram
+
+    def __init__(
+            self, motor: MotorShield, name: str, clock: Callable[[], float], budget: Optional[float], *args, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._motor = motor
+        self._name = name
+        self._clock = clock
+        self._budget = budget
+        self._followed = []
+        self._tripped = False
+        self._latency = LatencyHistogram()
+
+    @property
+    def motor(self) -> MotorShield:
+        return self._motor
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def tripped(self) -> bool:
+        """
+        :return: Returns True while the motor is held stopped by its watchdog.
+        """
+        return self._tripped
+
+    @property
+    def latency(self) -> LatencyHistogram:
+        """
+        :return: Returns the histogram of latencies from an input changing to the speed being written.
+        """
+        return self._latency
+
+    @property
+    def speed(self) -> float:
+        return self._motor.speed
+
+    @speed.setter
+    def speed(self, speed_: float) -> None:
+        pending_since = self._pending_since()
+        for followed in self._followed:
+            followed.written_percent = followed.input.current_percent
+            followed.pending_since = None
+        if pending_since is not None:
+            self._latency.record(int((self._clock() - pending_since) * 1_000_000_000))
+        if self._tripped and speed_ > 0:
+            debug("[%s] Ignored speed %s while tripped", self._name, speed_)
+            return
+        self._motor.speed = speed_
+
+    @property
+    def direction(self) -> Direction:
+        return self._motor.direction
+
+    @direction.setter
+    def direction(self, direction_: Direction) -> None:
+        self._motor.direction = direction_
+
+    def follow(self, percentage_input: PercentageInput) -> None:
+        """
+        Measures the latency from the input changing to this motor shield's speed being written. The input must
+        drive the motor shield, directly or through ramps and other stages, for the latency to be meaningful.
+
+        A change is only waited on while the input differs from its percentage when the speed was last written, so
+        that changes which cancel out before they reach the motor shield (such as a knob turned and turned back
+        before the next ramp step) are not mistaken for a stalled output.
+        """
+        followed = _FollowedInput(percentage_input)
+
+        def input_changed(percent: float) -> None:
+            if percent == followed.written_percent:
+                followed.pending_since = None
+            elif followed.pending_since is None:
+                followed.pending_since = self._clock()
+
+        followed.subscription = percentage_input.add_percent_changed_callback(input_changed)
+        self._followed.append(followed)
+
+    def close(self) -> None:
+        """
+        Stops following inputs.
+        """
+        for followed in self._followed:
+            followed.subscription.unsubscribe()
+        self._followed.clear()
+
+    def _pending_since(self) -> Optional[float]:
+        pending = [followed.pending_since for followed in self._followed if followed.pending_since is not None]
+        return min(pending) if pending else None
+
+    def _overdue(self, now: float) -> Optional[float]:
+        pending_since = self._pending_since()
+        if self._budget is None or pending_since is None or now - pending_since <= self._budget:
+            return None
+        return now - pending_since
+
+    def _trip(self) -> bool:
+        if self._tripped:
+            return False
+        self._tripped = True
+        try:
+            self._motor.speed = 0
+        except Exception as e:
+            error("[%s] Failed to stop the motor: %r", self._name, e)
+        return True
+
+    def _reset(self) -> None:
+        self._tripped = False
+        for followed in self._followed:
+            followed.pending_since = None
+
+
+class _WatchedScheduler:
+    __slots__ = ("scheduler", "name", "interval", "budget", "motors", "last_beat", "heartbeat", "task_lag",
+                 "heartbeat_task", "alerted")
+
+    def __init__(
+            self, scheduler: Scheduler, name: str, interval: float, budget: float, motors: List[WatchedMotorShield],
+            now: float
+    ) -> None:
+        self.scheduler = scheduler
+        self.name = name
+        self.interval = interval
+        self.budget = budget
+        self.motors = motors
+        self.last_beat = now
+        self.heartbeat = LatencyHistogram()
+        self.task_lag = LatencyHistogram()
+        self.heartbeat_task: Optional[ScheduledTask] = None
+        self.alerted = False
+
+
+class Watchdog:
+    """
+    Measures the lag and latency of the control loop, and stops motors when they exceed their budgets.
+    """
+    _clock: Callable[[], float]
+    _check_interval: float
+    _threaded: bool
+    _schedulers: List[_WatchedScheduler]
+    _motors: Dict[str, WatchedMotorShield]
+    _alert_callbacks: CallbackRegistry[Alert]
+    _lock: Lock
+    _stop: Event
+    _thread: Optional[Thread]
+    _metrics: metrics.DeviceMetrics
+    _log_id: str
+
+    def __init__(
+            self, *, check_interval: float = 0.01, clock: Callable[[], float] = monotonic, threaded: bool = True,
+            logging_identifier: str = None
+    ) -> None:
+        """
+        :param check_interval: The seconds between checks of every budget, bounding how long after a budget is
+                exceeded the affected motors are stopped.
+        :param clock: A monotonic clock returning the current time in seconds. Must be the clock of every watched
+                scheduler.
+        :param threaded: If False, no thread is started and run_pending must be called by the owner, such as by
+                attaching the watchdog to a VirtualClock.
+        :param logging_identifier: Prefix for messages logged about this watchdog.
+        """
+        if check_interval <= 0:
+            raise ValueError(f"check_interval must be positive, was {check_interval}")
+        self._clock = clock
+        self._check_interval = check_interval
+        self._threaded = threaded
+        self._schedulers = []
+        self._motors = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self._log_id = f"[{logging_identifier or f'{self.__class__.__name__}-{id(self)}'}]"
+        self._alert_callbacks = CallbackRegistry(self._log_callback_error)
+        self._metrics = metrics.register(self._log_id[1:-1], self.__class__.__name__)
+
+    @property
+    def check_interval(self) -> float:
+        return self._check_interval
+
+    def add_alert_callback(self, callback: AlertCallback) -> Subscription[Alert]:
+        """
+        Registers a callback to be invoked with every alert, from the watchdog's thread.
+
+        :return: Returns a handle which can be used to unsubscribe the callback.
+        """
+        return self._alert_callbacks.subscribe(callback)
+
+    def watch_motor(
+            self, motor: MotorShield, name: str, *, inputs: Iterable[PercentageInput] = (), budget: float = None
+    ) -> WatchedMotorShield:
+        """
+        Protects a motor shield, so that it can be tripped by this watchdog.
+
+        :param motor: The motor shield to protect.
+        :param name: The name to report the motor shield by.
+        :param inputs: The inputs driving the motor shield, whose changes should reach it within the budget.
+        :param budget: The most seconds from an input changing to the motor shield's speed being written before
+                the motor is tripped. None only measures the latency.
+        :return: Returns a motor shield to drive in place of the given one.
+        """
+        if budget is not None and budget <= 0:
+            raise ValueError(f"budget must be positive, was {budget}")
+        with self._lock:
+            if name in self._motors:
+                raise ValueError(f"A motor shield is already watched as {name!r}")
+            watched = WatchedMotorShield(motor, name, self._clock, budget)
+            self._motors[name] = watched
+        for percentage_input in inputs:
+            watched.follow(percentage_input)
+        self._start_thread_if_needed()
+        return watched
+
+    def watch_scheduler(
+            self, scheduler: Scheduler, *, budget: float, interval: float = 0.05,
+            motors: Iterable[WatchedMotorShield] = None, name: str = None
+    ) -> None:
+        """
+        Measures a scheduler's wake-up lag, tripping motors if it stalls.
+
+        :param scheduler: The scheduler to watch. Replaces any lag observer it has.
+        :param budget: The most seconds the watchdog's heartbeat task may run late before motors are tripped.
+        :param interval: The seconds between heartbeats.
+        :param motors: The motor shields to trip. Defaults to every motor shield watched by this watchdog.
+        :param name: The name to report the scheduler by.
+        """
+        if budget <= 0 or interval <= 0:
+            raise ValueError(f"budget and interval must be positive, were {budget} and {interval}")
+        watched = _WatchedScheduler(scheduler, name or scheduler.name, interval, budget,
+                                    None if motors is None else list(motors), self._clock())
+
+        def observe_lag(_, lag: float) -> None:
+            watched.task_lag.record(int(lag * 1_000_000_000))
+
+        def heartbeat() -> float:
+            now = self._clock()
+            watched.heartbeat.record(int(max(0.0, now - watched.last_beat - interval) * 1_000_000_000))
+            watched.last_beat = now
+            return interval
+
+        scheduler.set_lag_observer(observe_lag)
+        watched.heartbeat_task = scheduler.schedule(heartbeat, interval, name=f"{self._log_id} heartbeat")
+        with self._lock:
+            self._schedulers.append(watched)
+        self._start_thread_if_needed()
+
+    def check(self) -> List[Alert]:
+        """
+        Checks every budget, raising alerts and tripping motors for those exceeded. Called by the watchdog's
+        thread; may also be called directly.
+
+        :return: Returns the alerts raised.
+        """
+        now = self._clock()
+        alerts = []
+        with self._lock:
+            for watched in self._schedulers:
+                lag = now - watched.last_beat - watched.interval
+                if lag <= watched.budget:
+                    watched.alerted = False
+                elif not watched.alerted:
+                    watched.alerted = True
+                    motors = list(self._motors.values()) if watched.motors is None else watched.motors
+                    tripped = [motor.name for motor in motors if motor._trip()]
+                    alerts.append(Alert(SCHEDULER_LAG, watched.name, lag, watched.budget, now, tripped))
+            for motor in self._motors.values():
+                latency = motor._overdue(now)
+                if latency is not None and motor._trip():
+                    alerts.append(Alert(OUTPUT_LATENCY, motor.name, latency, motor._budget, now, [motor.name]))
+        for alert in alerts:
+            warning("%s %s of %s was %.3fs, over its budget of %.3fs. Tripped %s", self._log_id, alert.kind,
+                    alert.name, alert.latency, alert.budget, alert.tripped)
+            if metrics.enabled:
+                self._metrics.count("alerts")
+                self._metrics.count("trips", len(alert.tripped))
+            self._alert_callbacks.invoke(alert)
+        return alerts
+
+    def reset(self) -> None:
+        """
+        Releases every tripped motor shield, letting speeds above 0 through again.
+        """
+        with self._lock:
+            for motor in self._motors.values():
+                motor._reset()
+
+    @property
+    def tripped(self) -> List[str]:
+        """
+        :return: Returns the names of the motor shields currently tripped.
+        """
+        return [name for name, motor in self._motors.items() if motor.tripped]
+
+    def histograms(self) -> Dict[str, LatencyHistogram]:
+        """
+        :return: Returns the latency histograms, in nanoseconds, for tuning budgets: "scheduler:<name>:heartbeat"
+                and "scheduler:<name>:tasks" for each watched scheduler, and "motor:<name>" for each motor shield.
+        """
+        histograms = {}
+        for watched in self._schedulers:
+            histograms[f"scheduler:{watched.name}:heartbeat"] = watched.heartbeat
+            histograms[f"scheduler:{watched.name}:tasks"] = watched.task_lag
+        for name, motor in self._motors.items():
+            histograms[f"motor:{name}"] = motor.latency
+        return histograms
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Returns a summary of every histogram, for logging or JSON.
+        """
+        return {name: histogram.snapshot() for name, histogram in self.histograms().items()}
+
+    def run_pending(self) -> float:
+        """
+        Runs a check. Called by the watchdog's thread, or by the owner of an unthreaded watchdog.
+
+        :return: Returns the time in seconds until the next check.
+        """
+        self.check()
+        return self._check_interval
+
+    def shutdown(self) -> None:
+        """
+        Stops the watchdog's thread and heartbeats. Tripped motor shields stay tripped.
+        """
+        self._stop.set()
+        with self._lock:
+            for watched in self._schedulers:
+                watched.heartbeat_task.cancel()
+                watched.scheduler.set_lag_observer(None)
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _start_thread_if_needed(self) -> None:
+        with self._lock:
+            if self._threaded and self._thread is None and not self._stop.is_set():
+                self._thread = Thread(target=self._run, name=self._log_id[1:-1], daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                error("%s Check failed: %r", self._log_id, e)
+
+    def _log_callback_error(self, e: Exception) -> None:
+        error("%s Alert callback threw an exception: %s", self._log_id, e)
@@ -0,0 +1,91 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import (
+    set_backend, open_devices, setup_pins, PinSetup, BOARD, HIGH, IN, LOW, OUT, PUD_DOWN, PUD_UP
+)
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+
+
+class _CountingGPIO(SimulatedGPIO):
+    setup_calls: int
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.setup_calls = 0
+
+    def setup(self, *args, **kwargs) -> None:
+        self.setup_calls += 1
+        super().setup(*args, **kwargs)
+
+
+class SetupPinsTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = _CountingGPIO()
+        self.gpio.setmode(BOARD)
+
+    def test__setup_pins__should_make_one_call_per_configuration(self) -> None:
+        # Act
+        calls = setup_pins([
+            PinSetup(11, IN, PUD_DOWN), PinSetup(13, IN, PUD_DOWN), PinSetup(15, IN, PUD_UP),
+            PinSetup(16, OUT, initial=LOW), PinSetup(18, OUT, initial=LOW), PinSetup(11, IN, PUD_DOWN),
+        ], gpio=self.gpio)
+
+        # Assert
+        self.assertEqual(3, calls)
+        self.assertEqual(3, self.gpio.setup_calls)
+        self.assertEqual(HIGH, self.gpio.input(15))
+        self.assertEqual(LOW, self.gpio.level(18))
+
+    def test__setup_pins__should_reject_conflicting_settings(self) -> None:
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            setup_pins([PinSetup(11, IN, PUD_DOWN), PinSetup(11, OUT)], gpio=self.gpio)
+
+
+class OpenDevicesTest(TestCase):
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__construct__should_not_touch_gpio_until_opened(self) -> None:
+        # Arrange
+        set_backend(None)  # Resolving the backend would fail without RPi.GPIO
+
+        # Act
+        encoder = RotaryEncoderKY040(11, 13, 15, auto_open=False)
+        motor = CytronMD10C(16, 12, auto_open=False)
+
+        # Assert
+        self.assertFalse(encoder.is_open)
+        self.assertFalse(motor.is_open)
+        self.assertEqual(0, encoder.position)
+
+    def test__open_devices__should_batch_pin_setup(self) -> None:
+        # Arrange
+        encoder_pins = [(11, 13, 15), (19, 21, 23), (29, 31, 33)]
+        gpio = _CountingGPIO(external_levels={pin: HIGH for pins in encoder_pins for pin in pins})
+        set_backend(gpio)
+        encoders = [RotaryEncoderKY040(*pins, auto_open=False) for pins in encoder_pins]
+        motors = [CytronMD10C(direction_pin, pwm_pin, auto_open=False)
+                  for direction_pin, pwm_pin in [(16, 12), (18, 32), (22, 35)]]
+
+        # Act
+        open_devices(encoders + motors)
+        gpio.inject(quadrature_edges(19, 21, 2))
+        motors[1].speed = 40
+
+        # Assert
+        self.assertTrue(all(device.is_open for device in encoders + motors))
+        self.assertEqual(2 + len(motors), gpio.setup_calls)  # Inputs, direction pins, then one per PWM pin
+        self.assertEqual(2, encoders[1].position)
+        self.assertEqual(40, gpio.pwm(32).duty_cycle)
+
+    def test__speed__should_require_open(self) -> None:
+        # Arrange
+        set_backend(SimulatedGPIO())
+        motor = CytronMD10C(16, 12, auto_open=False)
+
+        # Act / Assert
+        with self.assertRaises(RuntimeError):
+            motor.speed = 10
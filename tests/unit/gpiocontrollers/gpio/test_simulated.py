@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import BOARD, IN, OUT, BOTH, RISING, PUD_DOWN, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, VirtualClock, OutputWrite
+
+
+class VirtualClockTest(TestCase):
+    def test__advance__should_run_scheduled_tasks_at_their_deadlines(self) -> None:
+        # Arrange
+        clock = VirtualClock()
+        scheduler = clock.create_scheduler()
+        runs = []
+
+        def task() -> float:
+            runs.append(clock())
+            return 1
+
+        scheduler.schedule(task, 1)
+
+        # Act
+        clock.advance(3.5)
+
+        # Assert
+        self.assertEqual([1, 2, 3], [round(run, 6) for run in runs])
+        self.assertEqual(3.5, clock())
+
+
+class SimulatedGPIOTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(BOARD)
+
+    def test__set_input__should_invoke_callbacks_for_matching_edges(self) -> None:
+        # Arrange
+        edges = []
+        self.gpio.setup(3, IN, pull_up_down=PUD_DOWN)
+        self.gpio.add_event_detect(3, RISING, callback=edges.append)
+
+        # Act
+        self.gpio.set_input(3, HIGH)
+        self.gpio.set_input(3, LOW)
+        self.gpio.set_input(3, HIGH)
+
+        # Assert
+        self.assertEqual([3, 3], edges)
+
+    def test__set_input__should_ignore_edges_within_bouncetime(self) -> None:
+        # Arrange
+        edges = []
+        self.gpio.setup(3, IN, pull_up_down=PUD_DOWN)
+        self.gpio.add_event_detect(3, BOTH, callback=edges.append, bouncetime=5)
+
+        # Act
+        self.gpio.inject([(0, 3, HIGH), (0.001, 3, LOW), (0.01, 3, HIGH)])
+
+        # Assert
+        self.assertEqual(2, len(edges))
+
+    def test__output__should_record_timestamped_writes(self) -> None:
+        # Arrange
+        self.gpio.setup(5, OUT, initial=LOW)
+
+        # Act
+        self.gpio.clock.advance(2)
+        self.gpio.output(5, HIGH)
+
+        # Assert
+        self.assertEqual([OutputWrite(2, 5, HIGH)], self.gpio.writes)
+        self.assertEqual(HIGH, self.gpio.level(5))
+
+    def test__setup__should_require_mode(self) -> None:
+        # Arrange
+        gpio = SimulatedGPIO()
+
+        # Act / Assert
+        with self.assertRaises(RuntimeError):
+            gpio.setup(3, IN)
@@ -0,0 +1,129 @@
+import asyncio
+from threading import Thread
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.aio import (
+    AsyncMotorShield, percent_changes, ramp_complete, rotation_events, switch_events
+)
+from srmlib.gpiocontrollers.constants import FORWARD, BACKWARD, PRESSED, RELEASED
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import (
+    RotaryEncoderKY040, RotaryEncoderPercentageInput, RateLimitedPercentageInput
+)
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.scheduling import Scheduler
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+
+
+class AsyncInputsTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, scheduler=self.gpio.clock.create_scheduler())
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__rotation_events__should_deliver_events_from_another_thread(self) -> None:
+        async def scenario():
+            stream = rotation_events(self.encoder)
+            edges = quadrature_edges(CLK_PIN, DT_PIN, 2) + quadrature_edges(CLK_PIN, DT_PIN, 1, forward=False)
+            Thread(target=self.gpio.inject, args=(edges,)).start()
+            return [await stream.__anext__() for _ in range(3)]
+
+        # Act
+        directions = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertEqual([FORWARD, FORWARD, BACKWARD], directions)
+
+    def test__switch_events__should_end_when_closed(self) -> None:
+        async def scenario():
+            stream = switch_events(self.encoder)
+            self.gpio.inject([(0.1, SW_PIN, LOW), (0.1, SW_PIN, HIGH)])
+            self.gpio.clock.advance(0.01)  # Let the release settle
+            stream.close()
+            return [state async for state in stream]
+
+        # Act
+        states = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertEqual([PRESSED, RELEASED], states)
+
+    def test__percent_changes__should_only_deliver_latest_percentage(self) -> None:
+        async def scenario():
+            percentage_input = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+            stream = percent_changes(percentage_input)
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 5))
+            return await stream.__anext__(), stream.dropped
+
+        # Act
+        percent, dropped = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertEqual(50, percent)
+        self.assertEqual(4, dropped)
+
+    def test__ramp_complete__should_wait_for_ramp_to_settle(self) -> None:
+        async def scenario():
+            scheduler = self.gpio.clock.create_scheduler()
+            source = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+            rate_limited = RateLimitedPercentageInput(source, 50, scheduler=scheduler, step_interval=0.05)
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 5))
+            waiter = asyncio.ensure_future(ramp_complete(rate_limited))
+            await asyncio.sleep(0)
+            settled_early = waiter.done()
+            self.gpio.clock.advance(2)
+            return settled_early, await waiter
+
+        # Act
+        settled_early, percent = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertFalse(settled_early)
+        self.assertEqual(50, percent)
+
+    def test__ramp_complete__should_resolve_when_desired_percent_returns_to_current(self) -> None:
+        async def scenario():
+            scheduler = Scheduler(clock=self.gpio.clock, threaded=False)  # Run by hand, so no ramp step is taken
+            source = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+            rate_limited = RateLimitedPercentageInput(source, 50, scheduler=scheduler)
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+            waiter = asyncio.ensure_future(ramp_complete(rate_limited))
+            await asyncio.sleep(0)
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, forward=False))
+            scheduler.run_pending()
+            return await waiter
+
+        # Act
+        percent = asyncio.run(asyncio.wait_for(scenario(), 1))
+
+        # Assert
+        self.assertEqual(0, percent)
+
+
+class AsyncMotorShieldTest(TestCase):
+    def test__set_speed__should_apply_writes_in_order(self) -> None:
+        # Arrange
+        gpio = SimulatedGPIO()
+        gpio.setmode(BOARD)
+        set_backend(gpio)
+        motor = AsyncMotorShield(CytronMD10C(16, 12))
+
+        async def scenario():
+            await motor.set_direction(BACKWARD)
+            for speed in (10, 20, 30):
+                await motor.set_speed(speed)
+
+        # Act
+        asyncio.run(scenario())
+        set_backend(None)
+
+        # Assert
+        self.assertEqual((30, BACKWARD), (motor.speed, motor.direction))
+        self.assertEqual([10, 20, 30], [event.value for event in gpio.pwm_events])
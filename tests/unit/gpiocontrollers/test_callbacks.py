@@ -0,0 +1,151 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.callbacks import CallbackRegistry
+from srmlib.gpiocontrollers.constants import FORWARD
+from srmlib.gpiocontrollers.gpio import set_backend, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040, RotaryEncoderPercentageInput
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+
+
+class CallbackRegistryTest(TestCase):
+    def test__invoke__should_call_callbacks_in_subscription_order(self) -> None:
+        # Arrange
+        registry = CallbackRegistry()
+        calls = []
+        registry.subscribe(lambda value: calls.append(("first", value)))
+        registry.subscribe(lambda value: calls.append(("second", value)))
+
+        # Act
+        registry.invoke(1)
+
+        # Assert
+        self.assertEqual([("first", 1), ("second", 1)], calls)
+
+    def test__unsubscribe__should_stop_invoking_callback(self) -> None:
+        # Arrange
+        registry = CallbackRegistry()
+        values = []
+        unsubscribed = []
+        subscription = registry.subscribe(values.append, on_unsubscribe=lambda: unsubscribed.append(True))
+        registry.invoke(1)
+
+        # Act
+        subscription.unsubscribe()
+        subscription.unsubscribe()
+        registry.invoke(2)
+
+        # Assert
+        self.assertEqual([1], values)
+        self.assertFalse(subscription.active)
+        self.assertEqual([True], unsubscribed)
+        self.assertEqual(0, len(registry))
+
+    def test__invoke__should_isolate_failing_callbacks(self) -> None:
+        # Arrange
+        errors = []
+        registry = CallbackRegistry(errors.append)
+        values = []
+
+        def failing_callback(_) -> None:
+            raise KeyError("broken")
+
+        failing = registry.subscribe(failing_callback)
+        registry.subscribe(values.append)
+
+        # Act
+        registry.invoke(1)
+        registry.invoke(2)
+
+        # Assert
+        self.assertEqual([1, 2], values)
+        self.assertEqual(2, failing.failures)
+        self.assertEqual(2, len(errors))
+        self.assertIsInstance(errors[0], KeyError)
+
+    def test__invoke__should_allow_changes_from_within_callbacks(self) -> None:
+        # Arrange
+        registry = CallbackRegistry()
+        calls = []
+        subscriptions = []
+
+        def unsubscribe_next(value: int) -> None:
+            calls.append(("unsubscribe_next", value))
+            subscriptions[1].unsubscribe()
+            registry.subscribe(lambda value_: calls.append(("late", value_)))
+
+        subscriptions.append(registry.subscribe(unsubscribe_next))
+        subscriptions.append(registry.subscribe(lambda value: calls.append(("next", value))))
+
+        # Act
+        registry.invoke(1)
+
+        # Assert
+        self.assertEqual([("unsubscribe_next", 1)], calls)
+        subscriptions[0].unsubscribe()
+        registry.invoke(2)
+        self.assertEqual([("unsubscribe_next", 1), ("late", 2)], calls)
+
+    def test__subscription__should_unsubscribe_on_exit(self) -> None:
+        # Arrange
+        registry = CallbackRegistry()
+        values = []
+
+        # Act
+        with registry.subscribe(values.append):
+            registry.invoke(1)
+        registry.invoke(2)
+
+        # Assert
+        self.assertEqual([1], values)
+
+
+class InputSubscriptionTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, scheduler=self.gpio.clock.create_scheduler())
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__add_rotation_callback__should_keep_dispatching_past_failing_callback(self) -> None:
+        # Arrange
+        directions = []
+        self.encoder.add_rotation_callback(lambda _: 1 / 0)
+        self.encoder.add_rotation_callback(directions.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+
+        # Assert
+        self.assertEqual([FORWARD] * 2, directions)
+
+    def test__add_percent_changed_callback__should_return_unsubscribable_handle(self) -> None:
+        # Arrange
+        percentage_input = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+        percentages = []
+        subscription = percentage_input.add_percent_changed_callback(percentages.append)
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+
+        # Act
+        subscription.unsubscribe()
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+
+        # Assert
+        self.assertEqual([10], percentages)
+        self.assertEqual(20, percentage_input.current_percent)
+
+    def test__close__should_stop_following_encoder(self) -> None:
+        # Arrange
+        percentage_input = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+
+        # Act
+        percentage_input.close()
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3))
+
+        # Assert
+        self.assertEqual(0, percentage_input.current_percent)
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.dispatch import CallbackDispatcher
+
+
+class CallbackDispatcherTest(TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.dispatcher = CallbackDispatcher(tick_resolution=0.001, clock=lambda: self.now, threaded=False)
+        self.received = []
+
+    def test__notify__should_deliver_only_latest_value(self) -> None:
+        # Arrange
+        callback = self.dispatcher.subscribe(self.received.append)
+
+        # Act
+        for value in range(100):
+            callback.notify(value)
+        self.dispatcher.run_pending()
+
+        # Assert
+        self.assertEqual([99], self.received)
+
+    def test__notify__should_not_invoke_callback_on_notifying_thread(self) -> None:
+        # Arrange
+        callback = self.dispatcher.subscribe(self.received.append)
+
+        # Act
+        callback.notify(1)
+
+        # Assert
+        self.assertEqual([], self.received)
+
+    def test__notify__should_limit_delivery_to_max_rate(self) -> None:
+        # Arrange
+        callback = self.dispatcher.subscribe(self.received.append, max_rate=10)
+        callback.notify(1)
+        self.dispatcher.run_pending()
+
+        # Act
+        self.now = 0.05
+        callback.notify(2)
+        callback.notify(3)
+        self.dispatcher.run_pending()
+        delivered_early = list(self.received)
+        self.now = 0.1
+        self.dispatcher.run_pending()
+
+        # Assert
+        self.assertEqual([1], delivered_early)
+        self.assertEqual([1, 3], self.received)
+
+    def test__notify__should_isolate_failing_callbacks(self) -> None:
+        # Arrange
+        def failing(_) -> None:
+            raise ValueError("failure")
+
+        failing_callback = self.dispatcher.subscribe(failing)
+        callback = self.dispatcher.subscribe(self.received.append)
+
+        # Act
+        failing_callback.notify(1)
+        callback.notify(1)
+        self.dispatcher.run_pending()
+        failing_callback.notify(2)
+        callback.notify(2)
+        self.dispatcher.run_pending()
+
+        # Assert
+        self.assertEqual([1, 2], self.received)
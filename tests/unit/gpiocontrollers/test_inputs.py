@@ -0,0 +1,219 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import FORWARD, BACKWARD, PRESSED, RELEASED
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.quadrature import HALF_STEP
+from srmlib.gpiocontrollers.inputs import (
+    RotaryEncoderKY040, RotaryEncoderPercentageInput, RateLimitedPercentageInput, EncoderAcceleration
+)
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+
+
+class RotaryEncoderKY040Test(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, scheduler=self.gpio.clock.create_scheduler())
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__add_rotation_callback__should_report_each_detent(self) -> None:
+        # Arrange
+        directions = []
+        self.encoder.add_rotation_callback(directions.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3))
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2, forward=False))
+
+        # Assert
+        self.assertEqual([FORWARD] * 3 + [BACKWARD] * 2, directions)
+
+    def test__add_rotation_callback__should_not_drop_steps_when_spun_fast(self) -> None:
+        # Arrange
+        directions = []
+        self.encoder.add_rotation_callback(directions.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 100, interval=0.00005))
+
+        # Assert
+        self.assertEqual([FORWARD] * 100, directions)
+        self.assertEqual(100, self.encoder.position)
+
+    def test__add_rotation_callback__should_report_half_steps(self) -> None:
+        # Arrange
+        self.gpio.cleanup()
+        self.gpio.setmode(BOARD)
+        encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, resolution=HALF_STEP)
+        directions = []
+        encoder.add_rotation_callback(directions.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+
+        # Assert
+        self.assertEqual([FORWARD] * 4, directions)
+
+    def test__add_switch_callback__should_report_presses_and_releases(self) -> None:
+        # Arrange
+        states = []
+        self.encoder.add_switch_callback(states.append)
+
+        # Act
+        self.gpio.inject([(0.1, SW_PIN, LOW), (0.1, SW_PIN, HIGH)])
+        self.gpio.clock.advance(0.01)  # Let the release settle
+
+        # Assert
+        self.assertEqual([PRESSED, RELEASED], states)
+
+
+class RotaryEncoderPercentageInputTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__rotation__should_change_percentage_within_range(self) -> None:
+        # Arrange
+        percentage_input = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+        percentages = []
+        percentage_input.add_percent_changed_callback(percentages.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 12))
+
+        # Assert
+        self.assertEqual([10 * step for step in range(1, 11)] + [100, 100], percentages)
+
+
+class RateLimitedPercentageInputTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.scheduler = self.gpio.clock.create_scheduler()
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN)
+        self.source = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__ramp__should_follow_source_at_configured_rate(self) -> None:
+        # Arrange
+        rate_limited = RateLimitedPercentageInput(
+            self.source, 20, scheduler=self.scheduler, step_interval=0.05)
+        percentages = []
+        rate_limited.add_percent_changed_callback(percentages.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 10, interval=0.001))
+        self.gpio.clock.advance(2.05)
+        halfway = rate_limited._current_percent
+        self.gpio.clock.advance(10)
+
+        # Assert
+        self.assertAlmostEqual(42, halfway, delta=1)  # The first step is taken as soon as the source changes
+        self.assertEqual(100, percentages[-1])
+        self.assertTrue(self.scheduler.is_idle)
+
+    def test__ramp__should_not_depend_on_step_interval(self) -> None:
+        # Arrange
+        coarse = RateLimitedPercentageInput(self.source, 20, scheduler=self.scheduler, step_interval=0.5)
+        fine = RateLimitedPercentageInput(self.source, 20, scheduler=self.scheduler, step_interval=0.01)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 10, interval=0.001))
+        self.gpio.clock.advance(1.01)
+        started = coarse._current_percent, fine._current_percent
+        self.gpio.clock.advance(2)
+
+        # Assert
+        self.assertAlmostEqual(40, coarse._current_percent - started[0], delta=1)
+        self.assertAlmostEqual(40, fine._current_percent - started[1], delta=1)
+
+    def test__ramp__should_step_as_soon_as_source_changes(self) -> None:
+        # Arrange
+        rate_limited = RateLimitedPercentageInput(self.source, 20, scheduler=self.scheduler, step_interval=0.5)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+        self.gpio.clock.advance(0.01)
+        first_step = rate_limited._current_percent
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 5, interval=0.001))
+        self.gpio.clock.advance(0.01)
+
+        # Assert
+        self.assertEqual(10, first_step)
+        # Settling does not earn the following changes a step interval of their own
+        self.assertLess(rate_limited._current_percent, 11)
+
+    def test__add_settled_callback__should_report_each_ramp_ending(self) -> None:
+        # Arrange
+        rate_limited = RateLimitedPercentageInput(self.source, 20, scheduler=self.scheduler, step_interval=0.05)
+        settled = []
+        rate_limited.add_settled_callback(settled.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+        self.gpio.clock.advance(1)
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001))
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001, forward=False))
+        self.gpio.clock.advance(1)
+
+        # Assert
+        self.assertEqual([10, 10], settled)
+        self.assertFalse(rate_limited.is_ramping)
+
+
+class AcceleratedRotaryEncoderPercentageInputTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.scheduler = self.gpio.clock.create_scheduler()
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN)
+        self.percentage_input = RotaryEncoderPercentageInput(
+            self.encoder, 0, 1000, scheduler=self.scheduler,
+            acceleration=EncoderAcceleration(slow_velocity=5, fast_velocity=50, max_multiplier=10, burst_window=0.05))
+        self.percentages = []
+        self.percentage_input.add_percent_changed_callback(self.percentages.append)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__rotation__should_move_one_position_per_slow_detent(self) -> None:
+        # Act
+        for _ in range(3):
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.01))
+            self.gpio.clock.advance(1)
+
+        # Assert
+        self.assertEqual([0.1, 0.2, 0.3], [round(percent, 6) for percent in self.percentages])
+
+    def test__close__should_cancel_a_burst_in_progress(self) -> None:
+        # Arrange
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3, interval=0.001))
+
+        # Act
+        self.percentage_input.close()
+        self.gpio.clock.advance(0.1)
+
+        # Assert
+        self.assertEqual([], self.percentages)
+        self.assertTrue(self.scheduler.is_idle)
+
+    def test__rotation__should_move_further_and_update_once_per_burst_when_spun_fast(self) -> None:
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 10, interval=0.001))
+        self.gpio.clock.advance(0.1)
+
+        # Assert
+        self.assertEqual(1, len(self.percentages))
+        self.assertEqual(9.1, round(self.percentages[0], 6))
@@ -0,0 +1,284 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import set_backend, BCM, BOARD, HIGH, OUT
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RateLimitedPercentageInput, RotaryEncoderPercentageInput
+from srmlib.gpiocontrollers.layout import Layout, LayoutError, PinIndex, load_layout
+from srmlib.gpiocontrollers.motorshields import LOCKED_ANTIPHASE, SIGN_MAGNITUDE, CytronMD10C
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+def _config(**overrides) -> dict:
+    config = {
+        "encoders": {"knob": {"clk": CLK_PIN, "dt": DT_PIN, "sw": SW_PIN}},
+        "inputs": {
+            "throttle": {"type": "encoder", "encoder": "knob", "min": 0, "max": 10},
+            "momentum": {"type": "rate_limited", "source": "throttle", "rate": 20},
+        },
+        "motors": {"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN}},
+    }
+    config.update(overrides)
+    return config
+
+
+class PinIndexTest(TestCase):
+    def test__claim__should_translate_bcm_to_board(self) -> None:
+        # Arrange
+        pin_index = PinIndex(BCM)
+
+        # Act
+        board_pin = pin_index.claim(17, "knob", "clk")
+
+        # Assert
+        self.assertEqual(11, board_pin)
+        self.assertEqual(("knob", "clk"), pin_index.owner(11))
+
+    def test__claim__should_reject_claimed_and_non_gpio_pins(self) -> None:
+        # Arrange
+        pin_index = PinIndex(BOARD)
+        pin_index.claim(11, "knob", "clk")
+
+        # Act / Assert
+        with self.assertRaises(LayoutError):
+            pin_index.claim(11, "cab", "pwm")
+        with self.assertRaises(LayoutError):
+            pin_index.claim(2, "cab", "pwm")  # 5V
+
+
+class LayoutTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__init__should_build_and_open_every_device(self) -> None:
+        # Act
+        layout = Layout(_config())
+
+        # Assert
+        self.assertEqual({"knob", "throttle", "momentum", "cab"}, set(layout))
+        self.assertTrue(layout.encoders["knob"].is_open)
+        self.assertIsInstance(layout.inputs["throttle"], RotaryEncoderPercentageInput)
+        self.assertIsInstance(layout.inputs["momentum"], RateLimitedPercentageInput)
+        self.assertIsInstance(layout["cab"], CytronMD10C)
+        self.assertTrue(layout["cab"].is_open)
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+        self.assertEqual(20, layout["throttle"].current_percent)
+        layout.close()
+
+    def test__init__should_translate_bcm_pins(self) -> None:
+        # Act
+        layout = Layout(_config(mode="BCM", motors={"cab": {"direction": 23, "pwm": 18}}, encoders={
+            "knob": {"clk": 17, "dt": 27, "sw": 22}}))
+
+        # Assert
+        self.assertEqual({"clk": CLK_PIN, "dt": DT_PIN, "sw": SW_PIN}, layout.pin_index.pins_of("knob"))
+        self.assertEqual({"direction": DIRECTION_PIN, "pwm": PWM_PIN}, layout.pin_index.pins_of("cab"))
+        layout.close()
+
+    def test__init__should_build_locked_antiphase_motors(self) -> None:
+        # Act
+        layout = Layout(_config(motors={"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN,
+                                                "pwm_mode": "locked_antiphase"}}))
+
+        # Assert
+        self.assertEqual(LOCKED_ANTIPHASE, layout["cab"].pwm_mode)
+        self.assertEqual(50, self.gpio.pwm(DIRECTION_PIN).duty_cycle)
+        self.assertEqual(HIGH, self.gpio.level(PWM_PIN))
+        layout.close()
+
+    def test__init__should_reject_invalid_configurations_before_touching_gpio(self) -> None:
+        # Arrange
+        set_backend(None)  # Resolving the backend would fail without RPi.GPIO
+        invalid = [
+            _config(motors={"cab": {"direction": CLK_PIN, "pwm": PWM_PIN}}),
+            _config(motors={"knob": {"direction": DIRECTION_PIN, "pwm": PWM_PIN}}),
+            _config(motors={"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN, "speed": 5}}),
+            _config(motors={"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN, "pwm_mode": "antiphase"}}),
+            _config(inputs={"throttle": {"type": "encoder", "encoder": "cab", "min": 0, "max": 10}}),
+            _config(inputs={"a": {"type": "rate_limited", "source": "b", "rate": 1},
+                            "b": {"type": "rate_limited", "source": "a", "rate": 1}}),
+            _config(mode="WIRINGPI"),
+            _config(inputs={"throttle": {"type": "encoder", "encoder": "knob", "min": 0, "max": 10,
+                                         "acceleration": {"fast": 10}}}),
+            _config(inputs={"throttle": {"type": "encoder", "encoder": "knob", "min": 0, "max": 10,
+                                         "acceleration": {"max_multiplier": 0}}}),
+            _config(motors=[{"direction": DIRECTION_PIN, "pwm": PWM_PIN}]),
+            _config(motors={"cab": [DIRECTION_PIN, PWM_PIN]}),
+        ]
+
+        # Act / Assert
+        for config in invalid:
+            with self.subTest(config=config), self.assertRaises(LayoutError):
+                Layout(config)
+
+    def test__reload__should_keep_unchanged_devices(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        knob, throttle, momentum, cab = (layout[name] for name in ("knob", "throttle", "momentum", "cab"))
+        cab.speed = 40
+
+        # Act
+        changes = layout.reload(_config(inputs={
+            "throttle": {"type": "encoder", "encoder": "knob", "min": 0, "max": 20},
+            "momentum": {"type": "rate_limited", "source": "throttle", "rate": 20},
+        }, motors={"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN}, "cab2": {"direction": 18, "pwm": 22}}))
+
+        # Assert
+        self.assertEqual(["cab2"], changes.added)
+        self.assertEqual([], changes.removed)
+        self.assertEqual(["throttle", "momentum"], changes.rebuilt)
+        self.assertEqual(["knob", "cab"], changes.kept)
+        self.assertIs(knob, layout["knob"])
+        self.assertIs(cab, layout["cab"])
+        self.assertEqual(40, cab.speed)
+        self.assertIsNot(throttle, layout["throttle"])
+        self.assertIsNot(momentum, layout["momentum"])
+        self.assertTrue(layout["cab2"].is_open)
+        layout.close()
+
+    def test__reload__should_close_removed_devices_and_free_their_pins(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        cab = layout["cab"]
+        cab.speed = 40
+
+        # Act
+        changes = layout.reload(_config(motors={"cab3": {"direction": PWM_PIN, "pwm": DIRECTION_PIN}}))
+
+        # Assert
+        self.assertEqual(["cab"], changes.removed)
+        self.assertEqual(["cab3"], changes.added)
+        self.assertFalse(cab.is_open)
+        self.assertEqual(("cab3", "pwm"), layout.pin_index.owner(DIRECTION_PIN))
+        layout.close()
+
+    def test__reload__should_rebuild_motor_on_the_same_pins(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        cab = layout["cab"]
+
+        # Act
+        changes = layout.reload(_config(motors={"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN,
+                                                        "frequency": 1000}}))
+        layout["cab"].speed = 30
+
+        # Assert
+        self.assertEqual(["cab"], changes.rebuilt)
+        self.assertIsNot(cab, layout["cab"])
+        self.assertEqual(1000, self.gpio.pwm(PWM_PIN).frequency)
+        self.assertEqual(30, self.gpio.pwm(PWM_PIN).duty_cycle)
+        layout.close()
+
+    def test__reload__should_rebuild_motor_when_pwm_mode_changes(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        antiphase = _config(motors={"cab": {"direction": DIRECTION_PIN, "pwm": PWM_PIN,
+                                            "pwm_mode": "locked_antiphase"}})
+
+        # Act
+        layout.reload(antiphase)
+        layout["cab"].signed_speed = -20
+        antiphase_duty_cycle = self.gpio.pwm(DIRECTION_PIN).duty_cycle
+        layout.reload(_config())
+        layout["cab"].speed = 30
+
+        # Assert
+        self.assertEqual(60, antiphase_duty_cycle)
+        self.assertEqual(30, self.gpio.pwm(PWM_PIN).duty_cycle)
+        self.assertEqual(SIGN_MAGNITUDE, layout["cab"].pwm_mode)
+        layout.close()
+
+    def test__reload__should_restore_previous_devices_when_building_fails(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        cab = layout["cab"]
+        self.gpio.setup(32, OUT)
+        self.gpio.PWM(32, 100)  # Held by something outside the layout
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            layout.reload(_config(motors={"cab": {"direction": DIRECTION_PIN, "pwm": 32}}))
+        restored_cab = layout["cab"]
+        changes = layout.reload(_config(encoders={"knob": {"clk": CLK_PIN, "dt": DT_PIN, "sw": SW_PIN,
+                                                           "resolution": 2}}))
+
+        # Assert
+        self.assertIs(cab, restored_cab)
+        self.assertTrue(cab.is_open)
+        self.assertEqual(("cab", "pwm"), layout.pin_index.owner(PWM_PIN))
+        self.assertEqual(["knob", "throttle", "momentum"], changes.rebuilt)
+        layout["cab"].speed = 30
+        self.assertEqual(30, self.gpio.pwm(PWM_PIN).duty_cycle)
+        layout.close()
+
+    def test__reload__should_put_back_previous_inputs_with_their_state_when_building_fails(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        self.gpio.setup(32, OUT)
+        self.gpio.PWM(32, 100)  # Held by something outside the layout
+        knob, throttle = layout["knob"], layout["throttle"]
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            layout.reload(_config(encoders={"knob": {"clk": CLK_PIN, "dt": DT_PIN, "sw": SW_PIN, "resolution": 2}},
+                                  motors={"cab": {"direction": DIRECTION_PIN, "pwm": 32}}))
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+
+        # Assert
+        self.assertIs(knob, layout["knob"])
+        self.assertIs(throttle, layout["throttle"])
+        self.assertEqual(30, throttle.current_percent)
+        self.assertEqual(["knob", "throttle", "momentum", "cab"], list(layout))
+        layout.close()
+
+    def test__reload__should_stop_rebuilt_inputs_following_their_sources(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        old_throttle = layout["throttle"]
+
+        # Act
+        layout.reload(_config(inputs={"throttle": {"type": "encoder", "encoder": "knob", "min": 0, "max": 20}}))
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+
+        # Assert
+        self.assertEqual(0, old_throttle.current_percent)
+        self.assertEqual(10, layout["throttle"].current_percent)
+        layout.close()
+
+    def test__reload__should_leave_layout_unchanged_when_invalid(self) -> None:
+        # Arrange
+        layout = Layout(_config())
+        cab = layout["cab"]
+
+        # Act / Assert
+        with self.assertRaises(LayoutError):
+            layout.reload(_config(motors={"cab": {"direction": CLK_PIN, "pwm": PWM_PIN}}))
+        self.assertIs(cab, layout["cab"])
+        self.assertTrue(cab.is_open)
+        layout.close()
+
+    def test__load_layout__should_read_json(self) -> None:
+        # Arrange
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "layout.json")
+            with open(path, "w") as file:
+                json.dump(_config(), file)
+
+            # Act
+            layout = load_layout(path)
+
+        # Assert
+        self.assertEqual(4, len(layout))
+        layout.close()
@@ -0,0 +1,127 @@
+from json import loads
+from unittest import TestCase
+from urllib.request import urlopen
+
+from srmlib.gpiocontrollers import metrics
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040
+from srmlib.gpiocontrollers.metrics import LatencyHistogram
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+class MetricsTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        # Devices from other tests may still be alive, so each test's devices are named after the test
+        self.name = self._testMethodName
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, logging_identifier=self.name)
+
+    def tearDown(self) -> None:
+        metrics.disable()
+        set_backend(None)
+
+    def test__snapshot__should_count_edges_and_callbacks_when_enabled(self) -> None:
+        # Arrange
+        metrics.enable()
+        self.encoder.add_rotation_callback(lambda _: None)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3))
+        encoder_metrics = metrics.snapshot()[self.name]
+
+        # Assert
+        self.assertEqual(12, encoder_metrics["counters"]["edges"])
+        self.assertEqual(3, encoder_metrics["counters"]["rotation_events"])
+        self.assertEqual(3, encoder_metrics["counters"]["callbacks_invoked"])
+        self.assertEqual(3, encoder_metrics["callback_fan_out"]["count"])
+        self.assertEqual(3, encoder_metrics["gauges"]["position"])
+
+    def test__snapshot__should_not_count_when_disabled(self) -> None:
+        # Arrange
+        received = []
+        self.encoder.add_rotation_callback(received.append)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3))
+        encoder_metrics = metrics.snapshot()[self.name]
+
+        # Assert
+        self.assertEqual(3, len(received))
+        self.assertEqual({}, encoder_metrics["counters"])
+        self.assertEqual(0, encoder_metrics["callback_fan_out"]["count"])
+
+    def test__snapshot__should_name_slow_callbacks(self) -> None:
+        # Arrange
+        metrics.enable(slow_callback_threshold_seconds=0)
+
+        def slow_rotation_handler(_) -> None:
+            pass
+
+        self.encoder.add_rotation_callback(slow_rotation_handler)
+
+        # Act
+        with self.assertLogs(level="WARNING"):
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+        slow_callbacks = metrics.snapshot()[self.name]["slow_callbacks"]
+
+        # Assert
+        self.assertEqual(1, len(slow_callbacks))
+        name, slow = next(iter(slow_callbacks.items()))
+        self.assertIn("slow_rotation_handler", name)
+        self.assertEqual(1, slow["count"])
+
+    def test__snapshot__should_count_motor_writes(self) -> None:
+        # Arrange
+        metrics.enable()
+        self.gpio.setmode(BOARD)
+        motor = CytronMD10C(DIRECTION_PIN, PWM_PIN, logging_identifier=f"{self.name}-motor")
+
+        # Act
+        for speed in (10, 20, 20):
+            motor.speed = speed
+        counters = metrics.snapshot()[f"{self.name}-motor"]["counters"]
+
+        # Assert
+        self.assertEqual({"pwm_writes": 2}, counters)
+
+    def test__metrics_server__should_serve_text_and_json(self) -> None:
+        # Arrange
+        metrics.enable()
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+        server = metrics.start_metrics_server(0)
+        try:
+            # Act
+            with urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                text = response.read().decode()
+            with urlopen(f"http://127.0.0.1:{server.port}/metrics.json") as response:
+                json = loads(response.read())
+        finally:
+            server.stop()
+
+        # Assert
+        self.assertIn(f'srmlib_edges_total{{device="{self.name}",kind="RotaryEncoderKY040"}} 4', text)
+        self.assertEqual(4, json[self.name]["counters"]["edges"])
+
+
+class LatencyHistogramTest(TestCase):
+    def test__percentile__should_bound_samples_by_power_of_two_buckets(self) -> None:
+        # Arrange
+        histogram = LatencyHistogram()
+
+        # Act
+        for duration_ns in [1000] * 99 + [1_000_000]:
+            histogram.record(duration_ns)
+
+        # Assert
+        self.assertEqual(1024, histogram.percentile(0.5))
+        self.assertEqual(1024, histogram.percentile(0.99))
+        self.assertEqual(1_000_000, histogram.percentile(1.0))
+        self.assertEqual(1_000_000, histogram.max_ns)
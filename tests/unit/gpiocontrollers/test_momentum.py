@@ -0,0 +1,124 @@
+from typing import List, Tuple
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.momentum import (
+    MomentumProfile, LinearMomentum, AccelerationBrakingMomentum, AccelerationLimitedMomentum, JerkLimitedMomentum,
+    RampState
+)
+
+
+def _ramp(
+        profile: MomentumProfile, current: float, desired: float, dt: float, steps: int,
+        state: RampState = RampState()
+) -> List[Tuple[float, RampState]]:
+    history = []
+    for _ in range(steps):
+        current, state = profile.advance(current, desired, state, dt)
+        history.append((current, state))
+    return history
+
+
+class LinearMomentumTest(TestCase):
+    def test__advance__should_move_at_rate_regardless_of_step_size(self) -> None:
+        # Arrange
+        profile = LinearMomentum(10)
+
+        # Act
+        coarse = _ramp(profile, 0, 100, 0.5, 2)
+        fine = _ramp(profile, 0, 100, 0.01, 100)
+
+        # Assert
+        self.assertAlmostEqual(10, coarse[-1][0])
+        self.assertAlmostEqual(10, fine[-1][0])
+
+    def test__advance__should_arrive_exactly_without_overshooting(self) -> None:
+        # Arrange
+        profile = LinearMomentum(10)
+
+        # Act
+        new, state = profile.advance(45, 50, RampState(10), 1)
+
+        # Assert
+        self.assertEqual(50, new)
+        self.assertEqual(RampState(), state)
+
+
+class AccelerationBrakingMomentumTest(TestCase):
+    def test__advance__should_use_separate_rates_for_accelerating_and_braking(self) -> None:
+        # Arrange
+        profile = AccelerationBrakingMomentum(5, 20)
+
+        # Act
+        accelerated, _ = profile.advance(50, 100, RampState(), 1)
+        braked, _ = profile.advance(50, 0, RampState(), 1)
+
+        # Assert
+        self.assertEqual(55, accelerated)
+        self.assertEqual(30, braked)
+
+
+class AccelerationLimitedMomentumTest(TestCase):
+    def test__advance__should_limit_change_in_rate(self) -> None:
+        # Arrange
+        profile = AccelerationLimitedMomentum(max_rate=20, acceleration=10)
+
+        # Act
+        history = _ramp(profile, 0, 100, 0.1, 5)
+
+        # Assert
+        velocities = [state.velocity for _, state in history]
+        self.assertAlmostEqual(5, velocities[-1])
+        self.assertTrue(all(b - a <= 1 + 1e-9 for a, b in zip([0] + velocities, velocities)))
+
+    def test__advance__should_ease_to_a_stop_at_desired_percent(self) -> None:
+        # Arrange
+        profile = AccelerationLimitedMomentum(max_rate=20, acceleration=10)
+
+        # Act
+        history = _ramp(profile, 0, 50, 0.05, 200)
+
+        # Assert
+        self.assertEqual((50, RampState()), history[-1])
+        self.assertTrue(all(percent <= 50 for percent, _ in history))
+        final_velocities = [state.velocity for _, state in history if state.velocity != 0][-3:]
+        self.assertTrue(all(velocity < 5 for velocity in final_velocities))
+
+
+class JerkLimitedMomentumTest(TestCase):
+    def test__advance__should_limit_change_in_acceleration(self) -> None:
+        # Arrange
+        profile = JerkLimitedMomentum(max_rate=20, acceleration=10, jerk=20)
+
+        # Act
+        history = _ramp(profile, 0, 50, 0.05, 200)
+
+        # Assert
+        accelerations = [0] + [state.acceleration for _, state in history]
+        self.assertTrue(all(abs(b - a) <= 20 * 0.05 + 1e-9 for a, b in zip(accelerations, accelerations[1:])))
+        self.assertTrue(all(abs(acceleration) <= 10 + 1e-9 for acceleration in accelerations))
+        self.assertTrue(all(state.velocity <= 20 + 1e-9 for _, state in history))
+
+    def test__advance__should_come_to_rest_at_desired_percent(self) -> None:
+        # Arrange
+        profile = JerkLimitedMomentum(max_rate=20, acceleration=10, jerk=20)
+
+        # Act
+        history = _ramp(profile, 0, 50, 0.05, 200)
+
+        # Assert
+        self.assertEqual((50, RampState()), history[-1])
+        self.assertTrue(all(percent <= 50 for percent, _ in history))
+
+    def test__advance__should_limit_jerk_when_desired_percent_changes_mid_ramp(self) -> None:
+        # Arrange
+        profile = JerkLimitedMomentum(max_rate=20, acceleration=10, jerk=20)
+        moving = _ramp(profile, 0, 100, 0.05, 60)
+        current, state = moving[-1]
+
+        # Act
+        history = [(current, state)] + _ramp(profile, current, 30, 0.05, 400, state)
+
+        # Assert
+        accelerations = [state.acceleration for _, state in history]
+        self.assertTrue(all(abs(b - a) <= 20 * 0.05 + 1e-9 for a, b in zip(accelerations, accelerations[1:])))
+        self.assertEqual((30, RampState()), history[-1])
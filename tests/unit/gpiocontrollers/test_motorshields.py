@@ -0,0 +1,256 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import FORWARD, BACKWARD
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, BCM, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.motorshields import (
+    LOCKED_ANTIPHASE, CytronMD10C, MotorBank, MotorUpdate, WriteCounts
+)
+
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+class CytronMD10CTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.controller = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__speed__should_set_pwm_duty_cycle(self) -> None:
+        # Act
+        self.controller.speed = 50
+
+        # Assert
+        self.assertEqual(50, self.controller.speed)
+        self.assertEqual(50, self.gpio.pwm(PWM_PIN).duty_cycle)
+        self.assertTrue(self.gpio.pwm(PWM_PIN).running)
+
+    def test__speed__should_start_pwm_once_then_change_duty_cycle(self) -> None:
+        # Act
+        self.controller.speed = 20
+        self.controller.speed = 40
+        self.controller.speed = 0
+
+        # Assert
+        operations = [(event.operation, event.value) for event in self.gpio.pwm_events]
+        self.assertEqual([("start", 20), ("ChangeDutyCycle", 40), ("ChangeDutyCycle", 0)], operations)
+
+    def test__speed__should_skip_unchanged_values(self) -> None:
+        # Act
+        for speed in (30, 30, 30, 60, 60):
+            self.controller.speed = speed
+        self.controller.direction = FORWARD
+
+        # Assert
+        self.assertEqual(2, len(self.gpio.pwm_events))
+        self.assertEqual([], self.gpio.writes)
+        self.assertEqual(WriteCounts(issued=2, elided=4), self.controller.write_counts)
+
+    def test__speed__should_reject_invalid_percentages(self) -> None:
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.controller.speed = 101
+
+    def test__speed__should_require_motor_to_be_open_even_when_unchanged(self) -> None:
+        # Arrange
+        controller = CytronMD10C(18, 32, auto_open=False)
+
+        # Act / Assert
+        with self.assertRaises(RuntimeError):
+            controller.speed = 0
+        with self.assertRaises(RuntimeError):
+            controller.direction = FORWARD
+
+    def test__direction__should_write_direction_pin(self) -> None:
+        # Act
+        self.controller.direction = BACKWARD
+        backward_level = self.gpio.level(DIRECTION_PIN)
+        self.controller.direction = FORWARD
+
+        # Assert
+        self.assertEqual(HIGH, backward_level)
+        self.assertEqual(LOW, self.gpio.level(DIRECTION_PIN))
+        self.assertEqual(FORWARD, self.controller.direction)
+
+    def test__close__should_release_pins_so_motor_can_be_reopened(self) -> None:
+        # Arrange
+        self.controller.direction = BACKWARD
+        self.controller.speed = 40
+        self.controller.close()
+
+        # Act
+        self.controller.open()
+        self.controller.speed = 20
+
+        # Assert
+        self.assertEqual((20, FORWARD), (self.controller.speed, self.controller.direction))
+        self.assertEqual(20, self.gpio.pwm(PWM_PIN).duty_cycle)
+        self.assertEqual(LOW, self.gpio.level(DIRECTION_PIN))
+
+    def test__init__should_require_board_mode(self) -> None:
+        # Arrange
+        gpio = SimulatedGPIO()
+        gpio.setmode(BCM)
+        set_backend(gpio)
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            CytronMD10C(DIRECTION_PIN, PWM_PIN)
+
+
+class CytronMD10CLockedAntiphaseTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.controller = CytronMD10C(DIRECTION_PIN, PWM_PIN, pwm_mode=LOCKED_ANTIPHASE)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__open__should_centre_pwm_on_direction_pin_before_enabling(self) -> None:
+        # Arrange
+        controller = CytronMD10C(18, 32, pwm_mode=LOCKED_ANTIPHASE, auto_open=False)
+        duty_cycles_when_enabled = []
+        self.gpio.add_output_listener(32, lambda level: duty_cycles_when_enabled.append(self.gpio.pwm(18).duty_cycle))
+
+        # Act
+        controller.open()
+
+        # Assert
+        self.assertEqual([50], duty_cycles_when_enabled)
+        self.assertEqual(HIGH, self.gpio.level(32))
+        self.assertTrue(self.gpio.pwm(18).running)
+
+    def test__signed_speed__should_reverse_through_zero_with_single_duty_cycle_updates(self) -> None:
+        # Arrange
+        self.gpio.writes.clear()
+        self.gpio.pwm_events.clear()
+
+        # Act
+        duty_cycles = []
+        for signed_speed in (40, 10, 0, -10, -40):
+            self.controller.signed_speed = signed_speed
+            duty_cycles.append(self.gpio.pwm(DIRECTION_PIN).duty_cycle)
+
+        # Assert
+        self.assertEqual([30, 45, 50, 55, 70], duty_cycles)
+        self.assertEqual(5, len(self.gpio.pwm_events))
+        self.assertEqual([], self.gpio.writes)
+        self.assertEqual((40, BACKWARD, -40), (self.controller.speed, self.controller.direction,
+                                               self.controller.signed_speed))
+
+    def test__direction__should_update_duty_cycle_without_gpio_writes(self) -> None:
+        # Arrange
+        self.controller.direction = BACKWARD  # Stopped, so nothing to write
+        self.controller.speed = 60
+        self.gpio.writes.clear()
+
+        # Act
+        self.controller.direction = FORWARD
+
+        # Assert
+        self.assertEqual([("start", 50), ("ChangeDutyCycle", 80), ("ChangeDutyCycle", 20)],
+                         [(event.operation, event.value) for event in self.gpio.pwm_events])
+        self.assertEqual([], self.gpio.writes)
+        self.assertEqual(WriteCounts(issued=2, elided=1), self.controller.write_counts)
+
+    def test__close__should_brake_before_stopping_pwm(self) -> None:
+        # Arrange
+        self.controller.signed_speed = -50
+        pwm_running_when_braked = []
+        self.gpio.add_output_listener(
+            PWM_PIN, lambda level: pwm_running_when_braked.append(self.gpio.pwm(DIRECTION_PIN).running))
+
+        # Act
+        self.controller.close()
+
+        # Assert
+        self.assertEqual([True], pwm_running_when_braked)
+        self.assertEqual(0, self.controller.signed_speed)
+
+    def test__close__should_release_pins_so_motor_can_be_reopened(self) -> None:
+        # Arrange
+        self.controller.signed_speed = -50
+        self.controller.close()
+
+        # Act
+        self.controller.open()
+        self.controller.signed_speed = 20
+
+        # Assert
+        self.assertEqual(40, self.gpio.pwm(DIRECTION_PIN).duty_cycle)
+        self.assertEqual(HIGH, self.gpio.level(PWM_PIN))
+
+    def test__init__should_reject_unknown_pwm_modes(self) -> None:
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            CytronMD10C(18, 32, pwm_mode="antiphase")
+
+
+class MotorBankTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.bank = MotorBank({
+            "east": CytronMD10C(16, 12),
+            "west": CytronMD10C(18, 32),
+        })
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__apply__should_update_each_motor(self) -> None:
+        # Act
+        writes = self.bank.apply({"east": MotorUpdate(40, BACKWARD), "west": (60, None)})
+
+        # Assert
+        self.assertEqual(3, writes)
+        self.assertEqual((40, BACKWARD), (self.bank["east"].speed, self.bank["east"].direction))
+        self.assertEqual((60, FORWARD), (self.bank["west"].speed, self.bank["west"].direction))
+
+    def test__apply__should_skip_unchanged_values(self) -> None:
+        # Arrange
+        self.bank.apply({"east": MotorUpdate(40, BACKWARD)})
+        pwm_events = len(self.gpio.pwm_events)
+
+        # Act
+        writes = self.bank.apply({"east": MotorUpdate(40, BACKWARD), "west": MotorUpdate(0, FORWARD)})
+
+        # Assert
+        self.assertEqual(0, writes)
+        self.assertEqual(pwm_events, len(self.gpio.pwm_events))
+
+    def test__apply__should_not_change_anything_if_any_update_is_invalid(self) -> None:
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.bank.apply({"east": MotorUpdate(40), "west": MotorUpdate(140)})
+        self.assertEqual(0, self.bank["east"].speed)
+
+    def test__apply__should_restore_motors_already_written_when_a_write_fails(self) -> None:
+        # Arrange
+        self.bank.register("north", CytronMD10C(22, 33, auto_open=False))
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            self.bank.apply({"east": MotorUpdate(40, BACKWARD), "north": (60, None)})
+
+        # Assert
+        self.assertEqual((0, FORWARD), (self.bank["east"].speed, self.bank["east"].direction))
+        self.assertEqual(0, self.bank["north"].speed)
+
+    def test__emergency_stop__should_stop_every_motor(self) -> None:
+        # Arrange
+        self.bank.set_all(speed_=75)
+
+        # Act
+        self.bank.emergency_stop()
+
+        # Assert
+        self.assertEqual([0, 0], [self.bank[key].speed for key in self.bank])
@@ -0,0 +1,110 @@
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from threading import Thread
+from time import monotonic, sleep
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import BACKWARD, FORWARD
+from srmlib.gpiocontrollers.gpio import BOARD, set_backend
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.motor_drivers.cytron import CytronMD10C as CytronMD10CDriver
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.motorworker import MotorWorker, RemoteMotorShield, _run_worker
+
+
+def _wait_until_applied(motor: RemoteMotorShield, timeout: float = 5) -> None:
+    deadline = monotonic() + timeout
+    while motor.pending:
+        if monotonic() > deadline:
+            raise AssertionError("The worker did not apply the command in time")
+        sleep(0.001)
+
+
+class MotorWorkerTest(TestCase):
+    def setUp(self) -> None:
+        self.worker = MotorWorker(
+            [partial(CytronMD10C, 16, 12), partial(CytronMD10CDriver, 18, 32)],
+            backend_factory=SimulatedGPIO, start_method="spawn")
+
+    def tearDown(self) -> None:
+        self.worker.stop()
+
+    def test__speed__should_be_applied_by_the_worker(self) -> None:
+        # Arrange
+        shield, driver = self.worker
+
+        # Act
+        shield.direction = BACKWARD
+        shield.speed = 40
+        driver.speed = 75
+        _wait_until_applied(shield)
+        _wait_until_applied(driver)
+
+        # Assert
+        self.assertEqual(40, shield.applied_speed)
+        self.assertEqual(BACKWARD, shield.applied_direction)
+        self.assertEqual(75, driver.applied_speed)
+        self.assertEqual(FORWARD, driver.applied_direction)
+        self.assertEqual(0, self.worker.apply_errors)
+
+    def test__apply_latency__should_count_applied_commands(self) -> None:
+        # Arrange
+        motor = self.worker[0]
+
+        # Act
+        for speed in (10, 20, 30):
+            motor.speed = speed
+            _wait_until_applied(motor)
+        latency = self.worker.apply_latency()
+
+        # Assert
+        self.assertEqual(3, latency["count"])
+        self.assertGreater(latency["max_us"], 0)
+
+    def test__speed__should_reject_invalid_percentages_without_publishing(self) -> None:
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.worker[0].speed = 101
+        self.assertFalse(self.worker[0].pending)
+
+    def test__stop__should_detach_front_ends(self) -> None:
+        # Arrange
+        motor = self.worker[0]
+
+        # Act
+        self.worker.stop()
+
+        # Assert
+        self.assertFalse(self.worker.is_alive)
+        with self.assertRaises(RuntimeError):
+            motor.speed = 10
+
+
+class MotorWorkerStartupTest(TestCase):
+    def test__init__should_raise_if_motors_cannot_be_constructed(self) -> None:
+        # Act / Assert
+        with self.assertRaises(RuntimeError):
+            # SimulatedGPIO starts without a mode, which CytronMD10C requires to be BOARD
+            MotorWorker([partial(CytronMD10C, 16, 12)], backend_factory=SimulatedGPIO, gpio_mode=None,
+                        start_method="spawn")
+
+    def test__run_worker__should_honour_a_stop_requested_while_starting(self) -> None:
+        # Arrange
+        memory = SharedMemory(create=True, size=1024)
+        memory.buf[:] = bytes(len(memory.buf))
+        memory.buf[8] = 1  # Stop requested, as by a front-end which gave up waiting for the worker
+        worker = Thread(target=_run_worker, args=(memory.name, [partial(CytronMD10C, 16, 12)], 0.001, SimulatedGPIO,
+                                                  BOARD), daemon=True)
+
+        # Act
+        try:
+            worker.start()
+            worker.join(5)
+            stopped = not worker.is_alive()
+        finally:
+            set_backend(None)
+            memory.close()
+            memory.unlink()
+
+        # Assert
+        self.assertTrue(stopped)
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, MockPigpioDaemon
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.pwm import PigpioPWMBackend, PigpioError
+
+
+class PigpioPWMBackendTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.daemon = MockPigpioDaemon().__enter__()
+
+    def tearDown(self) -> None:
+        self.daemon.__exit__()
+        set_backend(None)
+
+    def test__open__should_report_achieved_frequency_and_resolution(self) -> None:
+        # Arrange
+        backend = PigpioPWMBackend(self.daemon.host, self.daemon.port)
+
+        # Act
+        output = backend.open(12, 900)
+
+        # Assert
+        self.assertEqual(1000, output.frequency)
+        self.assertEqual(200, output.duty_resolution)
+        backend.close()
+
+    def test__set_duty_cycle__should_scale_to_real_range(self) -> None:
+        # Arrange
+        backend = PigpioPWMBackend(self.daemon.host, self.daemon.port)
+        motor = CytronMD10C(16, 12, pwm_frequency=1000, pwm_backend=backend)
+
+        # Act
+        motor.speed = 25
+
+        # Assert
+        self.assertEqual(50, self.daemon.pins[18].dutycycle)  # BOARD 12 is BCM 18
+        backend.close()
+
+    def test__set_duty_cycle__should_use_hardware_pwm(self) -> None:
+        # Arrange
+        backend = PigpioPWMBackend(self.daemon.host, self.daemon.port, hardware=True)
+        output = backend.open(12, 20000)
+
+        # Act
+        output.set_duty_cycle(50)
+
+        # Assert
+        self.assertEqual((20000, 500_000), (self.daemon.pins[18].hardware_frequency, self.daemon.pins[18].hardware_duty))
+        self.assertEqual(12500, output.duty_resolution)
+        backend.close()
+
+    def test__open__should_reject_hardware_pwm_on_unsupported_pins(self) -> None:
+        # Arrange
+        backend = PigpioPWMBackend(self.daemon.host, self.daemon.port, hardware=True)
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            backend.open(16, 20000)
+        backend.close()
+
+    def test__command__should_raise_daemon_errors(self) -> None:
+        # Arrange
+        backend = PigpioPWMBackend(self.daemon.host, self.daemon.port)
+
+        # Act / Assert
+        with self.assertRaises(PigpioError):
+            backend.connection.command(5, 18, 1000)
+        backend.close()
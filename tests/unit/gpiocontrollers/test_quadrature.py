@@ -0,0 +1,69 @@
+from typing import List
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.quadrature import QuadratureDecoder, FULL_STEP, HALF_STEP, QUARTER_STEP
+
+FORWARD_DETENT = [1, 0, 2, 3]
+BACKWARD_DETENT = [2, 0, 1, 3]
+
+
+def _decode(decoder: QuadratureDecoder, states: List[int]) -> List[int]:
+    return [steps for steps in (decoder.update(state) for state in states) if steps]
+
+
+class QuadratureDecoderTest(TestCase):
+    def test__update__should_report_one_full_step_per_detent(self) -> None:
+        # Arrange
+        decoder = QuadratureDecoder(3, resolution=FULL_STEP)
+
+        # Act
+        steps = _decode(decoder, FORWARD_DETENT * 2 + BACKWARD_DETENT)
+
+        # Assert
+        self.assertEqual([1, 1, -1], steps)
+        self.assertEqual(1, decoder.position)
+
+    def test__update__should_report_steps_at_chosen_resolution(self) -> None:
+        # Arrange
+        half = QuadratureDecoder(3, resolution=HALF_STEP)
+        quarter = QuadratureDecoder(3, resolution=QUARTER_STEP)
+
+        # Act
+        half_steps = _decode(half, FORWARD_DETENT)
+        quarter_steps = _decode(quarter, FORWARD_DETENT)
+
+        # Assert
+        self.assertEqual([1, 1], half_steps)
+        self.assertEqual([1, 1, 1, 1], quarter_steps)
+
+    def test__update__should_ignore_contact_bounce(self) -> None:
+        # Arrange
+        decoder = QuadratureDecoder(3)
+
+        # Act
+        steps = _decode(decoder, [1, 3, 1, 3, 1, 0, 1, 0, 2, 3])
+
+        # Assert
+        self.assertEqual([1], steps)
+
+    def test__update__should_reject_invalid_transitions_as_noise(self) -> None:
+        # Arrange
+        decoder = QuadratureDecoder(3)
+
+        # Act
+        steps = _decode(decoder, [0, 3, 0, 3])
+
+        # Assert
+        self.assertEqual([], steps)
+        self.assertEqual(4, decoder.invalid_transitions)
+
+    def test__update__should_count_detent_with_a_missed_edge(self) -> None:
+        # Arrange
+        decoder = QuadratureDecoder(3)
+
+        # Act
+        steps = _decode(decoder, [1, 0, 3])
+
+        # Assert
+        self.assertEqual([1], steps)
+        self.assertEqual(1, decoder.invalid_transitions)
@@ -0,0 +1,123 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import PRESSED, RELEASED
+from srmlib.gpiocontrollers.gpio import set_backend, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040, RotaryEncoderPercentageInput
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.recording import (
+    EDGE, LEVEL, MOTOR_SPEED, PERCENT, SWITCH, Recorder, Recording, Replayer
+)
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+class RecorderTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+        self.encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, scheduler=self.gpio.clock.create_scheduler())
+        self.percentage_input = RotaryEncoderPercentageInput(self.encoder, 0, 10)
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.srmrec")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        set_backend(None)
+
+    def test__record__should_write_events_loadable_from_file(self) -> None:
+        # Arrange
+        motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+        with Recorder(self.path, flush_every=5, clock_ns=self.gpio.clock.monotonic_ns) as recorder:
+            recorder.record_edges([CLK_PIN, DT_PIN, SW_PIN])
+            recorder.record_switch(self.encoder)
+            throttle = recorder.record_percentage(self.percentage_input, "throttle")
+            recorded_motor = recorder.record_motor(motor, "motor")
+            self.percentage_input.add_percent_changed_callback(lambda percent: setattr(recorded_motor, "speed", percent))
+
+            # Act
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+            self.gpio.inject([(0.1, SW_PIN, LOW), (0.1, SW_PIN, HIGH)])
+            self.gpio.clock.advance(0.01)  # Let the release settle
+        recording = Recording.load(self.path)
+
+        # Assert
+        self.assertEqual({0: "switch", 1: "throttle", 2: "motor"}, recording.sources)
+        self.assertEqual([HIGH, HIGH, HIGH], [event.value for event in recording.events(LEVEL)])
+        self.assertEqual(10, len(recording.events(EDGE)))
+        self.assertEqual([PRESSED, RELEASED], [event.value for event in recording.events(SWITCH)])
+        self.assertEqual([10.0, 20.0], [event.value for event in recording.events(PERCENT, throttle)])
+        self.assertEqual([10.0, 20.0], [event.value for event in recording.events(MOTOR_SPEED)])
+        self.assertEqual(20, motor.speed)
+        self.assertAlmostEqual(0.285, recording.duration_ns / 1e9)
+
+    def test__load__should_ignore_a_block_cut_short(self) -> None:
+        # Arrange
+        with Recorder(self.path, flush_every=4) as recorder:
+            recorder.record_edges([CLK_PIN, DT_PIN])
+            self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+
+        # Act
+        recording = Recording.load(self.path)
+
+        # Assert
+        self.assertEqual(8, len(recording))
+
+    def test__record__should_ignore_events_after_close(self) -> None:
+        # Arrange
+        recorder = Recorder(self.path, flush_every=2)
+        recorder.record_edges([CLK_PIN, DT_PIN])
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+        recorder.close()
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1))
+        recorder.close()
+
+        # Assert
+        self.assertEqual(6, len(Recording.load(self.path)))
+
+    def test__flush__should_write_buffered_events_before_returning(self) -> None:
+        # Arrange
+        recorder = Recorder(self.path, flush_every=3)
+        recorder.record_edges([CLK_PIN, DT_PIN])
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+
+        # Act
+        recorder.flush()
+        recording = Recording.load(self.path)
+        recorder.close()
+
+        # Assert
+        self.assertEqual(10, len(recording))
+
+    def test__replay__should_reproduce_recorded_percentages(self) -> None:
+        # Arrange
+        recorder = Recorder(clock_ns=self.gpio.clock.monotonic_ns)
+        recorder.record_edges([CLK_PIN, DT_PIN])
+        recorder.record_percentage(self.percentage_input)
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3))
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, forward=False))
+        recording = recorder.recording()
+        replayer = Replayer(recording)
+        replay_gpio = SimulatedGPIO(external_levels=replayer.initial_levels())
+        set_backend(replay_gpio)
+        replayed_input = RotaryEncoderPercentageInput(RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN), 0, 10)
+        replayed_percentages = []
+        replayed_input.add_percent_changed_callback(replayed_percentages.append)
+
+        # Act
+        played = replayer.replay(replay_gpio)
+
+        # Assert
+        self.assertEqual(16, played)
+        self.assertEqual([event.value for event in recording.events(PERCENT)], replayed_percentages)
+        self.assertAlmostEqual(self.gpio.clock(), replay_gpio.clock())
@@ -0,0 +1,126 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.regulation import PIDGains, PulseCounterFeedback, SpeedFeedback, SpeedRegulator
+
+DIRECTION_PIN = 16
+PWM_PIN = 12
+TACHOMETER_PIN = 18
+
+
+class _Locomotive(SpeedFeedback):
+    """
+    First order model of a locomotive whose speed lags the motor's duty cycle, reduced by a load.
+    """
+
+    def __init__(self, motor: CytronMD10C, *, load: float, time_constant: float = 0.2) -> None:
+        self.motor = motor
+        self.load = load
+        self.time_constant = time_constant
+        self.speed = 0.0
+        self.last_time = None
+
+    def read(self, now: float) -> float:
+        if self.last_time is not None:
+            steady_speed = max(0.0, self.motor.speed * (1 - self.load))
+            self.speed += (steady_speed - self.speed) * min(1.0, (now - self.last_time) / self.time_constant)
+        self.last_time = now
+        return self.speed
+
+
+class SpeedRegulatorTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.scheduler = self.gpio.clock.create_scheduler()
+        self.motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__control_loop__should_reach_target_under_load(self) -> None:
+        # Arrange
+        locomotive = _Locomotive(self.motor, load=0.3)
+        regulator = SpeedRegulator(self.motor, locomotive, PIDGains(kp=0.5, ki=4), control_rate=50,
+                                   scheduler=self.scheduler)
+
+        # Act
+        regulator.target = 50
+        self.gpio.clock.advance(5)
+
+        # Assert
+        self.assertAlmostEqual(50, locomotive.speed, delta=0.5)
+        self.assertAlmostEqual(50 / 0.7, self.motor.speed, delta=1)
+
+    def test__control_loop__should_recover_quickly_after_saturating(self) -> None:
+        # Arrange
+        locomotive = _Locomotive(self.motor, load=0.5)
+        regulator = SpeedRegulator(self.motor, locomotive, PIDGains(kp=0.5, ki=4), control_rate=50,
+                                   scheduler=self.scheduler)
+        regulator.target = 80  # Unreachable at this load
+        self.gpio.clock.advance(10)
+        self.assertEqual(100, self.motor.speed)
+
+        # Act
+        regulator.target = 30
+        self.gpio.clock.advance(0.1)
+        recovering_speed = self.motor.speed
+        self.gpio.clock.advance(3)
+
+        # Assert
+        self.assertLess(recovering_speed, 80)
+        self.assertAlmostEqual(60, self.motor.speed, delta=1)
+
+    def test__target__should_stop_motor_when_zero(self) -> None:
+        # Arrange
+        locomotive = _Locomotive(self.motor, load=0.3)
+        regulator = SpeedRegulator(self.motor, locomotive, PIDGains(kp=0.5, ki=4), scheduler=self.scheduler)
+        regulator.target = 50
+        self.gpio.clock.advance(2)
+
+        # Act
+        regulator.target = 0
+        self.gpio.clock.advance(0.1)
+
+        # Assert
+        self.assertEqual(0, self.motor.speed)
+
+    def test__stats__should_report_loops_and_jitter(self) -> None:
+        # Arrange
+        regulator = SpeedRegulator(self.motor, _Locomotive(self.motor, load=0), PIDGains(kp=0.5, ki=4),
+                                   control_rate=50, scheduler=self.scheduler)
+
+        # Act
+        self.gpio.clock.advance(1)
+        stats = regulator.stats()
+
+        # Assert
+        self.assertEqual(51, stats.loops)
+        self.assertAlmostEqual(0.02, stats.mean_interval)
+        self.assertAlmostEqual(0, stats.jitter)
+        self.assertGreaterEqual(stats.max_cpu_us, stats.mean_cpu_us)
+
+
+class PulseCounterFeedbackTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        set_backend(self.gpio)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__read__should_convert_pulse_rate_to_percentage(self) -> None:
+        # Arrange
+        feedback = PulseCounterFeedback(TACHOMETER_PIN, full_speed_rate=1000)
+        feedback.read(self.gpio.clock())
+
+        # Act
+        self.gpio.inject([(0.0005, TACHOMETER_PIN, level) for _ in range(50) for level in (HIGH, LOW)])
+        speed = feedback.read(self.gpio.clock())
+
+        # Assert
+        self.assertEqual(50, feedback.pulses)
+        self.assertAlmostEqual(100, speed)
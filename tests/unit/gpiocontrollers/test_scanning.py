@@ -0,0 +1,114 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import PRESSED, RELEASED
+from srmlib.gpiocontrollers.gpio import set_backend
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedDiodeMatrix, SimulatedGPIO, SimulatedShiftRegisterChain
+from srmlib.gpiocontrollers.scanning import DiodeMatrix, ScannedInputs, ShiftRegisterChain
+
+LOAD_PIN = 11
+CLOCK_PIN = 13
+DATA_PIN = 15
+ROW_PINS = [16, 18, 22]
+COLUMN_PINS = [29, 31, 33, 35]
+
+
+class ShiftRegisterChainTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        set_backend(self.gpio)
+        self.chain = SimulatedShiftRegisterChain(self.gpio, LOAD_PIN, CLOCK_PIN, DATA_PIN, registers=3)
+        self.bank = ShiftRegisterChain(LOAD_PIN, CLOCK_PIN, DATA_PIN, registers=3)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__read__should_return_pressed_inputs_as_bits(self) -> None:
+        # Arrange
+        for index in (0, 9, 23):
+            self.chain.press(index)
+
+        # Act
+        bits = self.bank.read()
+
+        # Assert
+        self.assertEqual(1 << 0 | 1 << 9 | 1 << 23, bits)
+
+    def test__scan__should_report_only_changed_inputs_once_stable(self) -> None:
+        # Arrange
+        scanned = ScannedInputs(self.bank, stable_scans=2, scheduler=self.gpio.clock.create_scheduler())
+        self.chain.press(5)
+        scanned.scan()  # Establishes the initial state
+        changes = []
+        five = []
+        scanned.add_change_callback(lambda index, state: changes.append((index, state)))
+        scanned.add_switch_callback(5, five.append)
+
+        # Act
+        self.chain.release(5)
+        self.chain.press(17)
+        first = scanned.scan()
+        second = scanned.scan()
+        third = scanned.scan()
+
+        # Assert
+        self.assertEqual((0, 1 << 5 | 1 << 17, 0), (first, second, third))
+        self.assertEqual([(5, RELEASED), (17, PRESSED)], changes)
+        self.assertEqual([RELEASED], five)
+        self.assertEqual(PRESSED, scanned[17])
+
+    def test__scan__should_ignore_bounces_shorter_than_stable_scans(self) -> None:
+        # Arrange
+        scanned = ScannedInputs(self.bank, stable_scans=3, scheduler=self.gpio.clock.create_scheduler())
+        scanned.scan()
+        changes = []
+        scanned.add_change_callback(lambda index, state: changes.append((index, state)))
+
+        # Act
+        for pressed in (True, False, True, True, False, False):
+            if pressed:
+                self.chain.press(2)
+            else:
+                self.chain.release(2)
+            scanned.scan()
+
+        # Assert
+        self.assertEqual([], changes)
+
+    def test__scheduler__should_scan_at_scan_rate(self) -> None:
+        # Arrange
+        scanned = ScannedInputs(self.bank, scan_rate=100, stable_scans=1,
+                                scheduler=self.gpio.clock.create_scheduler())
+        changes = []
+        scanned.add_change_callback(lambda index, state: changes.append((self.gpio.clock(), index, state)))
+
+        # Act
+        self.gpio.clock.advance(0.005)
+        self.chain.press(3)
+        self.gpio.clock.advance(0.1)
+
+        # Assert
+        self.assertEqual(1, len(changes))
+        self.assertAlmostEqual(0.01, changes[0][0])
+        scanned.terminate()
+
+
+class DiodeMatrixTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO()
+        set_backend(self.gpio)
+        self.matrix = SimulatedDiodeMatrix(self.gpio, ROW_PINS, COLUMN_PINS)
+        self.bank = DiodeMatrix(ROW_PINS, COLUMN_PINS)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__read__should_not_ghost_with_several_switches_closed(self) -> None:
+        # Arrange
+        for row, column in ((0, 0), (0, 3), (2, 0)):
+            self.matrix.press(row, column)
+
+        # Act
+        bits = self.bank.read()
+
+        # Assert
+        self.assertEqual(1 << 0 | 1 << 3 | 1 << 8, bits)
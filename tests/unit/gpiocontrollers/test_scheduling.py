@@ -0,0 +1,115 @@
+from threading import Event
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.scheduling import Scheduler
+
+
+class SchedulerTest(TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.scheduler = Scheduler(tick_resolution=0.01, clock=lambda: self.now, threaded=False)
+
+    def test__run_pending__should_only_run_tasks_that_are_due(self) -> None:
+        # Arrange
+        runs = []
+        self.scheduler.schedule(lambda: runs.append("early"), 1)
+        self.scheduler.schedule(lambda: runs.append("late"), 2)
+
+        # Act
+        self.now = 1.0
+        next_deadline = self.scheduler.run_pending()
+
+        # Assert
+        self.assertEqual(["early"], runs)
+        self.assertAlmostEqual(1.0, next_deadline)
+
+    def test__run_pending__should_repeat_task_after_returned_delay(self) -> None:
+        # Arrange
+        runs = []
+
+        def task() -> float:
+            runs.append(self.now)
+            return 0.5
+
+        self.scheduler.schedule(task, 0)
+
+        # Act
+        for now in (0.0, 0.25, 0.5, 1.0):
+            self.now = now
+            self.scheduler.run_pending()
+
+        # Assert
+        self.assertEqual([0.0, 0.5, 1.0], runs)
+
+    def test__run_pending__should_leave_scheduler_idle_when_task_returns_none(self) -> None:
+        # Arrange
+        task = self.scheduler.schedule(lambda: None, 0)
+
+        # Act
+        next_deadline = self.scheduler.run_pending()
+
+        # Assert
+        self.assertIsNone(next_deadline)
+        self.assertFalse(task.pending)
+        self.assertTrue(self.scheduler.is_idle)
+
+    def test__wake__should_not_move_an_existing_deadline(self) -> None:
+        # Arrange
+        task = self.scheduler.schedule(lambda: None, 1)
+
+        # Act
+        task.wake()
+
+        # Assert
+        self.assertAlmostEqual(1.0, self.scheduler.time_until_next_deadline())
+
+    def test__wake__should_run_idle_task_after_delay(self) -> None:
+        # Arrange
+        task = self.scheduler.schedule(lambda: None, None)
+
+        # Act
+        task.wake(0.5)
+        task.wake(2)
+
+        # Assert
+        self.assertAlmostEqual(0.5, self.scheduler.time_until_next_deadline())
+
+    def test__cancel__should_prevent_task_from_running(self) -> None:
+        # Arrange
+        runs = []
+        task = self.scheduler.schedule(lambda: runs.append(1), 0)
+
+        # Act
+        task.cancel()
+        self.scheduler.run_pending()
+
+        # Assert
+        self.assertEqual([], runs)
+        self.assertTrue(task.cancelled)
+
+    def test__shutdown__should_cancel_every_task(self) -> None:
+        # Arrange
+        tasks = [self.scheduler.schedule(lambda: None, delay) for delay in (0, 1, 2)]
+
+        # Act
+        self.scheduler.shutdown()
+
+        # Assert
+        self.assertTrue(all(task.cancelled for task in tasks))
+        self.assertIsNone(self.scheduler.time_until_next_deadline())
+        with self.assertRaises(RuntimeError):
+            self.scheduler.schedule(lambda: None)
+
+
+class ThreadedSchedulerTest(TestCase):
+    def test__schedule__should_run_task_on_worker_thread(self) -> None:
+        # Arrange
+        scheduler = Scheduler(tick_resolution=0.001)
+        ran = Event()
+
+        # Act
+        scheduler.schedule(ran.set, 0.01)
+
+        # Assert
+        self.assertTrue(ran.wait(2))
+        scheduler.shutdown()
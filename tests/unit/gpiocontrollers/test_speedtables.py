@@ -0,0 +1,156 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040, RotaryEncoderPercentageInput
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.recording import MOTOR_SPEED, PERCENT, Recorder
+from srmlib.gpiocontrollers.speedtables import (
+    DCC_28_STEPS, SpeedTable, SpeedTableMotorShield, measurements_from_recording
+)
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+class SpeedTableTest(TestCase):
+    def test__linear__should_map_throttle_between_start_and_top(self) -> None:
+        # Arrange
+        table = SpeedTable.linear(20, 80)
+
+        # Act / Assert
+        self.assertEqual(0, table.lookup(0))
+        self.assertAlmostEqual(20, table.lookup(0.001), places=2)
+        self.assertAlmostEqual(50, table.lookup(50))
+        self.assertAlmostEqual(62.03, table.lookup(70.05))
+        self.assertEqual(80, table.lookup(100))
+        self.assertEqual(80, table.lookup(120))
+
+    def test__linear__should_select_step_at_or_above_throttle_when_stepped(self) -> None:
+        # Arrange
+        table = SpeedTable.linear(0, 100, steps=DCC_28_STEPS)
+
+        # Act / Assert
+        self.assertAlmostEqual(100 / 28, table.lookup(0.5))
+        self.assertAlmostEqual(100 / 28, table.lookup(100 / 28))
+        self.assertAlmostEqual(200 / 28, table.lookup(100 / 28 + 0.01))
+        self.assertEqual(100, table.lookup(100))
+
+    def test__from_steps__should_scale_decoder_values(self) -> None:
+        # Arrange
+        step_values = [9 * step for step in range(1, 29)]
+
+        # Act
+        table = SpeedTable.from_steps(step_values)
+
+        # Assert
+        self.assertEqual(28, table.steps)
+        self.assertAlmostEqual(9 / 255 * 100, table.lookup(1))
+        self.assertAlmostEqual(252 / 255 * 100, table.lookup(100))
+
+    def test__from_points__should_interpolate_between_points(self) -> None:
+        # Arrange
+        table = SpeedTable.from_points([(0, 10), (50, 30), (100, 90)])
+
+        # Act / Assert
+        self.assertAlmostEqual(20, table.lookup(25))
+        self.assertAlmostEqual(60, table.lookup(75))
+
+    def test__calibrate__should_make_speed_proportional_to_throttle(self) -> None:
+        # Arrange
+        measurements = [(0, 0), (10, 0), (20, 0), (30, 10), (30, 12), (50, 30), (60, 29), (70, 45), (100, 55)]
+
+        # Act
+        table = SpeedTable.calibrate(measurements, top_speed=50)
+
+        # Assert
+        self.assertAlmostEqual(20, table.lookup(0.001), places=1)
+        self.assertAlmostEqual(30, table.lookup(22))
+        self.assertAlmostEqual(50, table.lookup(60))
+        self.assertAlmostEqual(85, table.lookup(100))
+
+    def test__init__should_reject_invalid_tables(self) -> None:
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            SpeedTable([0])
+        with self.assertRaises(ValueError):
+            SpeedTable([0, 50, 120])
+        with self.assertRaises(ValueError):
+            SpeedTable([0, 50, 100], steps=3)
+        with self.assertRaises(ValueError):
+            SpeedTable.calibrate([(10, 0), (20, 0)])
+
+
+class SpeedTableMotorShieldTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__speed__should_drive_motor_through_table(self) -> None:
+        # Arrange
+        shield = SpeedTableMotorShield(self.motor, SpeedTable.linear(20, 80))
+
+        # Act
+        shield.speed = 50
+
+        # Assert
+        self.assertEqual(50, shield.speed)
+        self.assertAlmostEqual(50, self.motor.speed)
+        self.assertAlmostEqual(50, shield.duty_cycle)
+
+    def test__table__should_reapply_throttle_when_swapped(self) -> None:
+        # Arrange
+        shield = SpeedTableMotorShield(self.motor, SpeedTable.linear(20, 80))
+        shield.speed = 50
+
+        # Act
+        shield.table = SpeedTable.linear(40, 60)
+
+        # Assert
+        self.assertEqual(50, shield.speed)
+        self.assertAlmostEqual(50, self.motor.speed)
+        shield.speed = 100
+        self.assertAlmostEqual(60, self.motor.speed)
+
+    def test__throttle__should_follow_input_until_closed(self) -> None:
+        # Arrange
+        encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN)
+        throttle = RotaryEncoderPercentageInput(encoder, 0, 10)
+        shield = SpeedTableMotorShield(self.motor, SpeedTable.linear(20, 80), throttle=throttle)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 5))
+        shield.close()
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+
+        # Assert
+        self.assertEqual(50, shield.speed)
+        self.assertAlmostEqual(50, self.motor.speed)
+
+
+class MeasurementsFromRecordingTest(TestCase):
+    def test__measurements_from_recording__should_pair_settled_speeds_with_duty_cycles(self) -> None:
+        # Arrange
+        time = [0]
+        recorder = Recorder(clock_ns=lambda: time[0])
+        motor_source = recorder.add_source("motor")
+        speed_source = recorder.add_source("speed")
+        for duty_cycle, speeds in ((30, [2, 10, 10]), (60, [20, 38, 40])):
+            recorder.record(MOTOR_SPEED, motor_source, duty_cycle)
+            for speed in speeds:
+                time[0] += 300_000_000
+                recorder.record(PERCENT, speed_source, speed)
+
+        # Act
+        measurements = measurements_from_recording(recorder.recording(), motor_source, speed_source)
+
+        # Assert
+        self.assertEqual([(30, 10), (30, 10), (60, 38), (60, 40)], measurements)
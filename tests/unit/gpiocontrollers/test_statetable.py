@@ -0,0 +1,126 @@
+import os
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from types import SimpleNamespace
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import BACKWARD
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040, RotaryEncoderPercentageInput
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.statetable import INPUT, MOTOR, StatePublisher, StateReader
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+class StateTableTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state")
+        self.publisher = StatePublisher(self.path, publish_rate=10, scheduler=self.gpio.clock.create_scheduler(),
+                                        clock_ns=lambda: int(self.gpio.clock() * 1_000_000_000))
+        self.motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+
+    def tearDown(self) -> None:
+        self.publisher.close()
+        self.directory.cleanup()
+        set_backend(None)
+
+    def test__publish__should_make_changes_visible_to_readers_each_sample(self) -> None:
+        # Arrange
+        encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN)
+        throttle = RotaryEncoderPercentageInput(encoder, 0, 10)
+        self.publisher.add_input("throttle", throttle)
+        self.publisher.add_motor("cab", self.motor)
+        reader = StateReader(self.path)
+
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 3))
+        self.gpio.clock.advance(0.1)
+
+        # Act
+        self.motor.direction = BACKWARD
+        self.motor.speed = 45
+        unpublished = reader.snapshot()
+        self.gpio.clock.advance(0.1)
+        published = reader.snapshot()
+
+        # Assert
+        self.assertEqual(["throttle", "cab"], reader.names)
+        self.assertEqual(0, unpublished["cab"].value)
+        self.assertEqual((INPUT, 30, 0), published["throttle"][1:4])
+        self.assertEqual((MOTOR, 45, BACKWARD), published["cab"][1:4])
+        self.assertGreater(published["cab"].updated_ns, unpublished["cab"].updated_ns)
+        reader.close()
+
+    def test__read__should_find_devices_added_after_opening(self) -> None:
+        # Arrange
+        reader = StateReader(self.path)
+
+        # Act
+        self.publisher.add_motor("cab", self.motor)
+
+        # Assert
+        self.assertEqual(MOTOR, reader.read("cab").kind)
+        with self.assertRaises(KeyError):
+            reader.read("missing")
+        reader.close()
+
+    def test__add_motor__should_reject_duplicate_and_long_names(self) -> None:
+        # Arrange
+        self.publisher.add_motor("cab", self.motor)
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.publisher.add_motor("cab", self.motor)
+        with self.assertRaises(ValueError):
+            self.publisher.add_motor("x" * 33, self.motor)
+
+    def test__read__should_never_see_half_written_state(self) -> None:
+        # Arrange
+        throttle = SimpleNamespace(current_percent=0)
+        path = os.path.join(self.directory.name, "consistency")
+        # Timestamps derived from the percentage being written, so that a torn read pairs mismatched fields
+        publisher = StatePublisher(path, scheduler=self.gpio.clock.create_scheduler(),
+                                   clock_ns=lambda: throttle.current_percent * 1000)
+        publisher.add_input("throttle", throttle)
+        reader = StateReader(path)
+        stop = Event()
+
+        def write() -> None:
+            percent = 0
+            while not stop.is_set():
+                percent = (percent + 1) % 101
+                throttle.current_percent = percent
+                publisher.publish()
+
+        writer = Thread(target=write)
+        writer.start()
+
+        # Act
+        states = [reader.read("throttle") for _ in range(20000)]
+        stop.set()
+        writer.join()
+
+        # Assert
+        self.assertTrue(all(state.value * 1000 == state.updated_ns for state in states))
+        self.assertGreater(len({state.value for state in states}), 1)
+        reader.close()
+        publisher.close()
+
+    def test__init__should_reject_files_that_are_not_state_tables(self) -> None:
+        # Arrange
+        path = os.path.join(self.directory.name, "other")
+        with open(path, "wb") as file:
+            file.write(b"\0" * 128)
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            StateReader(path)
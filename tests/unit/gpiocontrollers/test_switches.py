@@ -0,0 +1,166 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import PRESSED, RELEASED
+from srmlib.gpiocontrollers.gpio import set_backend, HIGH, LOW
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, VirtualClock
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040
+from srmlib.gpiocontrollers.switches import (
+    CLICK, DOUBLE_CLICK, LONG_PRESS, PRESS, RELEASE, REPEAT, AutoRepeat, Debouncer, DoubleClick, LongPress,
+    SwitchEvent, SwitchPipeline
+)
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+
+
+class SwitchPipelineTest(TestCase):
+    def setUp(self) -> None:
+        self.clock = VirtualClock()
+        self.scheduler = self.clock.create_scheduler()
+        self.events = []
+
+    def _pipeline(self, *stages) -> SwitchPipeline:
+        pipeline = SwitchPipeline(stages, debouncer=Debouncer(0.005), scheduler=self.scheduler)
+        pipeline.add_callback(self.events.append)
+        return pipeline
+
+    def _play(self, pipeline: SwitchPipeline, edges) -> None:
+        for delay, state in edges:
+            self.clock.advance(delay)
+            pipeline.edge(state)
+
+    def _kinds(self):
+        return [event.kind for event in self.events]
+
+    def test__edge__should_report_bouncing_press_once_stamped_with_first_edge(self) -> None:
+        # Arrange
+        pipeline = self._pipeline()
+
+        # Act
+        self._play(pipeline, [(0.1, PRESSED), (0.001, RELEASED), (0.001, PRESSED), (0.001, RELEASED),
+                              (0.001, PRESSED)])
+        self.clock.advance(0.01)
+
+        # Assert
+        self.assertEqual([SwitchEvent(PRESS, 0.1)], self.events)
+        self.assertEqual(PRESSED, pipeline.state)
+
+    def test__edge__should_ignore_glitches_shorter_than_settle_time(self) -> None:
+        # Arrange
+        pipeline = self._pipeline()
+
+        # Act
+        self._play(pipeline, [(0.1, PRESSED), (0.002, RELEASED)])
+        self.clock.advance(0.1)
+
+        # Assert
+        self.assertEqual([], self.events)
+
+    def test__long_press__should_fire_once_while_held(self) -> None:
+        # Arrange
+        pipeline = self._pipeline(LongPress(0.5))
+
+        # Act
+        self._play(pipeline, [(0.1, PRESSED), (0.3, RELEASED), (0.1, PRESSED), (1, RELEASED)])
+        self.clock.advance(0.1)
+
+        # Assert
+        self.assertEqual([PRESS, RELEASE, PRESS, LONG_PRESS, RELEASE], self._kinds())
+        self.assertAlmostEqual(1.0, self.events[3].timestamp)
+
+    def test__double_click__should_distinguish_clicks_double_clicks_and_long_presses(self) -> None:
+        # Arrange
+        pipeline = self._pipeline(LongPress(0.5), DoubleClick(0.3))
+
+        # Act
+        self._play(pipeline, [(0.1, PRESSED), (0.1, RELEASED)])
+        self.clock.advance(1)
+        self._play(pipeline, [(0, PRESSED), (0.1, RELEASED), (0.2, PRESSED), (0.1, RELEASED)])
+        self.clock.advance(1)
+        self._play(pipeline, [(0, PRESSED), (1, RELEASED)])
+        self.clock.advance(1)
+
+        # Assert
+        gestures = [kind for kind in self._kinds() if kind not in {PRESS, RELEASE}]
+        self.assertEqual([CLICK, DOUBLE_CLICK, LONG_PRESS], gestures)
+
+    def test__auto_repeat__should_repeat_at_interval_while_held(self) -> None:
+        # Arrange
+        pipeline = self._pipeline(AutoRepeat(delay=0.5, interval=0.1))
+
+        # Act
+        self._play(pipeline, [(0.1, PRESSED), (0.85, RELEASED)])
+        self.clock.advance(1)
+
+        # Assert
+        self.assertEqual([PRESS] + [REPEAT] * 4 + [RELEASE], self._kinds())
+        self.assertAlmostEqual(0.6, self.events[1].timestamp)
+
+    def test__close__should_stop_timers_until_reset(self) -> None:
+        # Arrange
+        pipeline = self._pipeline(LongPress(0.5))
+        self._play(pipeline, [(0.1, PRESSED)])
+        self.clock.advance(0.1)
+
+        # Act
+        pipeline.close()
+        self.clock.advance(1)
+        self._play(pipeline, [(0, RELEASED)])
+        self.clock.advance(1)
+        pipeline.reset(RELEASED)
+        self._play(pipeline, [(0, PRESSED)])
+        self.clock.advance(1)
+
+        # Assert
+        self.assertEqual([PRESS, PRESS, LONG_PRESS], self._kinds())
+        self.assertEqual(PRESSED, pipeline.state)
+
+
+class RotaryEncoderKY040SwitchTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        set_backend(self.gpio)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def test__switch__should_debounce_and_report_gestures(self) -> None:
+        # Arrange
+        encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, switch_stages=[LongPress(0.5)],
+                                     scheduler=self.gpio.clock.create_scheduler())
+        states = []
+        events = []
+        encoder.add_switch_callback(states.append)
+        encoder.add_switch_event_callback(events.append)
+
+        # Act
+        self.gpio.inject([(0.1, SW_PIN, LOW), (0.0005, SW_PIN, HIGH), (0.0005, SW_PIN, LOW), (1, SW_PIN, HIGH)])
+        self.gpio.clock.advance(0.01)
+
+        # Assert
+        self.assertEqual([PRESSED, RELEASED], states)
+        self.assertEqual([PRESS, LONG_PRESS, RELEASE], [event.kind for event in events])
+        self.assertEqual(RELEASED, encoder.switch_state)
+
+    def test__close__should_stop_switch_gestures_until_reopened(self) -> None:
+        # Arrange
+        encoder = RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN, switch_stages=[AutoRepeat(0.5, 0.1)],
+                                     scheduler=self.gpio.clock.create_scheduler())
+        events = []
+        encoder.add_switch_event_callback(events.append)
+        self.gpio.inject([(0.1, SW_PIN, LOW)])
+        self.gpio.clock.advance(0.55)
+
+        # Act
+        encoder.close()
+        self.gpio.clock.advance(5)
+        closed_kinds = [event.kind for event in events]
+        self.gpio.set_input(SW_PIN, HIGH)
+        encoder.open()
+        self.gpio.inject([(0.1, SW_PIN, LOW)])
+        self.gpio.clock.advance(0.55)
+
+        # Assert
+        self.assertEqual([PRESS, REPEAT], closed_kinds)
+        self.assertEqual([PRESS, REPEAT, PRESS, REPEAT], [event.kind for event in events])
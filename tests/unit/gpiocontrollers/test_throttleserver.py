@@ -0,0 +1,183 @@
+import asyncio
+import json
+from base64 import b64encode
+from struct import pack
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.constants import BACKWARD
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040, RotaryEncoderPercentageInput
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.throttleserver import ThrottleServer
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+async def _read_until(reader: asyncio.StreamReader, predicate) -> dict:
+    while True:
+        message = json.loads(await reader.readline())
+        if predicate(message):
+            return message
+
+
+class ThrottleServerTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+        self.knob = RotaryEncoderPercentageInput(RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN), 0, 10)
+
+    def tearDown(self) -> None:
+        set_backend(None)
+
+    def _server(self) -> ThrottleServer:
+        server = ThrottleServer(port=0, max_rate=100)
+        server.register_input("knob", self.knob)
+        server.register_motor("cab", self.motor)
+        return server
+
+    def test__connect__should_send_channels_and_state(self) -> None:
+        async def scenario():
+            async with self._server() as server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                messages = [json.loads(await reader.readline()) for _ in range(3)]
+                writer.close()
+                return messages
+
+        # Act
+        messages = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertEqual({"op": "channels", "inputs": ["knob"], "motors": ["cab"]}, messages[0])
+        self.assertEqual({"op": "state", "channel": "knob", "percent": 0}, messages[1])
+        self.assertEqual({"op": "state", "channel": "cab", "speed": 0, "direction": 1}, messages[2])
+
+    def test__set__should_coalesce_updates_and_broadcast_to_every_client(self) -> None:
+        async def scenario():
+            async with self._server() as server:
+                clients = [await asyncio.open_connection("127.0.0.1", server.port) for _ in range(3)]
+                for reader, _ in clients:
+                    for _ in range(3):
+                        await reader.readline()
+                _, writer = clients[0]
+                writer.write(b"".join(json.dumps({"op": "set", "channel": "cab", "speed": speed}).encode() + b"\n"
+                                      for speed in range(1, 51)))
+                writer.write(json.dumps({"op": "set", "channel": "cab", "direction": BACKWARD}).encode() + b"\n")
+                states = [await _read_until(reader, lambda message: message.get("speed") == 50)
+                          for reader, _ in clients]
+                for _, writer in clients:
+                    writer.close()
+                return states, server.messages_received
+
+        # Act
+        states, messages_received = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertEqual(51, messages_received)
+        self.assertEqual([{"op": "state", "channel": "cab", "speed": 50, "direction": BACKWARD}] * 3, states)
+        self.assertEqual(50, self.motor.speed)
+        self.assertEqual(BACKWARD, self.motor.direction)
+        self.assertLess(len(self.gpio.pwm_events), 50)
+
+    def test__set__should_reject_invalid_requests(self) -> None:
+        async def scenario():
+            async with self._server() as server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                replies = []
+                for request in ({"op": "set", "channel": "knob", "speed": 5},
+                                {"op": "set", "channel": "cab", "speed": 150},
+                                {"op": "set", "channel": "cab", "speed": True},
+                                {"op": "set", "channel": "cab", "direction": True}):
+                    writer.write(json.dumps(request).encode() + b"\n")
+                    replies.append(await _read_until(reader, lambda message: message["op"] == "error"))
+                writer.close()
+                return replies
+
+        # Act
+        replies = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertEqual(4, len(replies))
+        self.assertEqual(0, self.motor.speed)
+
+    def test__unregister_input__should_detach_from_input(self) -> None:
+        # Arrange
+        server = ThrottleServer(port=0)
+        callbacks = self.knob._percent_changed_callbacks
+        baseline = len(callbacks)
+
+        # Act
+        for _ in range(5):
+            server.register_input("knob", self.knob)
+            server.unregister_input("knob")
+        server.register_input("knob", self.knob)
+        registered = len(callbacks)
+        asyncio.run(server.stop())
+
+        # Assert
+        self.assertEqual(baseline + 1, registered)
+        self.assertEqual(baseline, len(callbacks))
+        with self.assertRaises(KeyError):
+            server.unregister_input("knob")
+
+    def test__stop__should_drop_requests_from_handlers_still_running(self) -> None:
+        async def scenario():
+            server = self._server()
+            await server.start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for _ in range(3):
+                await reader.readline()
+            client = next(iter(server._clients))
+            await server.stop()
+            # A handler that had already read a request before the server stopped
+            server._handle_message(client, json.dumps({"op": "set", "channel": "cab", "speed": 40}).encode())
+            await asyncio.sleep(0.05)
+            writer.close()
+            return server._flush_handle, server._flush_task
+
+        # Act
+        flush_handle, flush_task = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertIsNone(flush_handle)
+        self.assertIsNone(flush_task)
+        self.assertEqual(0, self.motor.speed)
+
+    def test__input_change__should_be_broadcast_to_websocket_clients(self) -> None:
+        async def scenario():
+            async with self._server() as server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                key = b64encode(b"0123456789abcdef").decode()
+                writer.write(f"GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                             f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+                response = await reader.readuntil(b"\r\n\r\n")
+
+                async def read_frame() -> dict:
+                    _, length = await reader.readexactly(2)
+                    return json.loads(await reader.readexactly(length))
+
+                for _ in range(3):
+                    await read_frame()
+                self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 2))
+                state = await read_frame()
+                while state["percent"] != 20:
+                    state = await read_frame()
+                # Masked close frame, as sent by browsers
+                writer.write(pack("!BB", 0x88, 0x80) + b"mask")
+                await reader.read()
+                writer.close()
+                return response, state
+
+        # Act
+        response, state = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+        # Assert
+        self.assertIn(b"101 Switching Protocols", response)
+        self.assertIn(b"Sec-WebSocket-Accept: BACScCJPNqyz+UBoqMH89VmURoA=", response)
+        self.assertEqual({"op": "state", "channel": "knob", "percent": 20}, state)
@@ -0,0 +1,136 @@
+from unittest import TestCase
+
+from srmlib.gpiocontrollers.gpio import set_backend, BOARD, HIGH
+from srmlib.gpiocontrollers.gpio.simulated import SimulatedGPIO, quadrature_edges
+from srmlib.gpiocontrollers.inputs import RotaryEncoderKY040, RotaryEncoderPercentageInput
+from srmlib.gpiocontrollers.motorshields import CytronMD10C
+from srmlib.gpiocontrollers.scheduling import Scheduler
+from srmlib.gpiocontrollers.watchdog import OUTPUT_LATENCY, SCHEDULER_LAG, Watchdog
+
+CLK_PIN = 11
+DT_PIN = 13
+SW_PIN = 15
+DIRECTION_PIN = 16
+PWM_PIN = 12
+
+
+class WatchdogTest(TestCase):
+    def setUp(self) -> None:
+        self.gpio = SimulatedGPIO(external_levels={CLK_PIN: HIGH, DT_PIN: HIGH, SW_PIN: HIGH})
+        self.gpio.setmode(BOARD)
+        set_backend(self.gpio)
+        self.clock = self.gpio.clock
+        self.watchdog = Watchdog(check_interval=0.01, clock=self.clock, threaded=False)
+        self.clock.attach(self.watchdog)
+        self.alerts = []
+        self.watchdog.add_alert_callback(self.alerts.append)
+        self.motor = CytronMD10C(DIRECTION_PIN, PWM_PIN)
+
+    def tearDown(self) -> None:
+        self.watchdog.shutdown()
+        set_backend(None)
+
+    def _run_scheduler(self, scheduler: Scheduler, seconds: float) -> None:
+        for _ in range(round(seconds / 0.005)):
+            self.clock.advance(0.005)
+            scheduler.run_pending()
+
+    def test__watch_scheduler__should_trip_motors_within_bound_when_scheduler_stalls(self) -> None:
+        # Arrange
+        scheduler = Scheduler(tick_resolution=0.001, clock=self.clock, threaded=False, name="control")
+        watched = self.watchdog.watch_motor(self.motor, "cab")
+        self.watchdog.watch_scheduler(scheduler, budget=0.1, interval=0.05)
+        watched.speed = 60
+        self._run_scheduler(scheduler, 1)
+        self.assertEqual([], self.alerts)
+        stalled_at = self.clock()
+
+        # Act
+        self.clock.advance(0.5)  # The scheduler is not run
+
+        # Assert
+        self.assertEqual(1, len(self.alerts))
+        alert = self.alerts[0]
+        self.assertEqual((SCHEDULER_LAG, "control", ["cab"]), (alert.kind, alert.name, alert.tripped))
+        # The last heartbeat was at most one interval before the stall
+        self.assertLessEqual(alert.time, stalled_at + 0.05 + 0.1 + self.watchdog.check_interval + 1e-9)
+        self.assertEqual(0, self.motor.speed)
+        self.assertEqual(["cab"], self.watchdog.tripped)
+
+    def test__tripped_motor__should_ignore_speeds_until_reset(self) -> None:
+        # Arrange
+        scheduler = Scheduler(tick_resolution=0.001, clock=self.clock, threaded=False)
+        watched = self.watchdog.watch_motor(self.motor, "cab")
+        self.watchdog.watch_scheduler(scheduler, budget=0.1, interval=0.05)
+        self.clock.advance(0.5)
+
+        # Act
+        watched.speed = 40
+        ignored_speed = self.motor.speed
+        self.watchdog.reset()
+        self._run_scheduler(scheduler, 0.1)
+        watched.speed = 40
+
+        # Assert
+        self.assertEqual(0, ignored_speed)
+        self.assertEqual(40, self.motor.speed)
+        self.assertEqual([], self.watchdog.tripped)
+
+    def test__watch_motor__should_measure_input_to_output_latency(self) -> None:
+        # Arrange
+        throttle = RotaryEncoderPercentageInput(RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN), 0, 10)
+        watched = self.watchdog.watch_motor(self.motor, "cab", inputs=[throttle], budget=0.1)
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001))
+        self.clock.advance(0.02)
+        watched.speed = throttle.current_percent
+
+        # Assert
+        histogram = self.watchdog.histograms()["motor:cab"]
+        self.assertEqual(1, histogram.count)
+        self.assertAlmostEqual(0.02, histogram.max_ns / 1_000_000_000, delta=0.005)
+        self.assertEqual([], self.alerts)
+
+    def test__watch_motor__should_trip_motor_when_output_misses_budget(self) -> None:
+        # Arrange
+        throttle = RotaryEncoderPercentageInput(RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN), 0, 10)
+        watched = self.watchdog.watch_motor(self.motor, "cab", inputs=[throttle], budget=0.1)
+        watched.speed = 50
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001))
+        self.clock.advance(0.2)  # Nothing writes the motor
+
+        # Assert
+        self.assertEqual([(OUTPUT_LATENCY, "cab")], [(alert.kind, alert.name) for alert in self.alerts])
+        self.assertLessEqual(self.alerts[0].latency, 0.1 + self.watchdog.check_interval + 0.01)
+        self.assertEqual(0, self.motor.speed)
+
+    def test__watch_motor__should_not_trip_motor_when_input_returns_to_written_percent(self) -> None:
+        # Arrange
+        throttle = RotaryEncoderPercentageInput(RotaryEncoderKY040(CLK_PIN, DT_PIN, SW_PIN), 0, 10)
+        watched = self.watchdog.watch_motor(self.motor, "cab", inputs=[throttle], budget=0.1)
+        watched.speed = throttle.current_percent
+
+        # Act
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001))
+        self.gpio.inject(quadrature_edges(CLK_PIN, DT_PIN, 1, interval=0.001, forward=False))
+        self.clock.advance(0.2)  # Nothing writes the motor, as there is nothing new to write
+
+        # Assert
+        self.assertEqual([], self.alerts)
+        self.assertEqual([], self.watchdog.tripped)
+
+    def test__histograms__should_record_scheduler_task_lag(self) -> None:
+        # Arrange
+        scheduler = Scheduler(tick_resolution=0.001, clock=self.clock, threaded=False, name="control")
+        self.watchdog.watch_scheduler(scheduler, budget=0.1, interval=0.01)
+
+        # Act
+        self._run_scheduler(scheduler, 0.2)
+
+        # Assert
+        snapshot = self.watchdog.snapshot()
+        self.assertGreater(snapshot["scheduler:control:tasks"]["count"], 10)
+        self.assertLessEqual(snapshot["scheduler:control:heartbeat"]["max_us"], 5000)